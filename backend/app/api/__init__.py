@@ -1,3 +1,4 @@
 from .routes.data import metrics, data, symbols
 from .routes.backtesting import backtest, pairs, param_optimiser
-from .routes.portfolio import portfolio_weights, save_portfolio, prescreen
+from .routes.portfolio import portfolio_weights, save_portfolio, prescreen, signals
+from .routes.internal import tasks, monitoring
@@ -2,9 +2,9 @@ import asyncio
 import json
 import uuid
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
@@ -12,54 +12,180 @@ from app.database import get_db
 from app.schemas import StrategyRequest
 from app.services.backtesting.engines.backtest_engine import run_backtest
 from app.services.backtesting.helpers.data import (
-    aggregate_walkforward_results, compute_walkforward_results,
-    create_walkforward_windows, prepare_backtest_inputs,
+    aggregate_walkforward_results, backtest_cache_key, compute_walkforward_results,
+    create_walkforward_windows, get_cached_backtest, prepare_backtest_inputs, store_cached_backtest,
 )
+from app.services.backtesting.tasks.backtest_manager import run_backtest_job, run_portfolios_backtest_job
 from app.services.backtesting.tasks.walkforward_manager import run_walkforward_async
+from app.services.scheduler import INTERACTIVE, cpu_scheduler
+from app.stores.cache_stores import get_price_data_version
+from app.stores.task_stores import backtest_tasks_store
 from app.stores.task_stores import walkforward_tasks_store as tasks_store
+from app.utils.cancellation import cancel_task, register_cancellation, release_cancellation
 from app.utils.data_helpers import fetch_price_data
+from app.utils.response_encoding import encode_response, wants_encoded
+from app.utils.result_views import parse_fields, shape_results
+from app.utils.profiling import ProfileSession, profiled, request_profile
+from app.utils.timing import collect_timings, server_timing_header
 
 
 router = APIRouter()
 
+# Seconds an idle SSE stream waits before sending a keepalive comment
+SSE_KEEPALIVE_SECONDS = 15
+
+
+# Query parameter selecting the result shape: "json" (default rows) or "columnar"
+FORMAT_QUERY = Query(None, alias="format", description="Result shape: json (default) or columnar")
+
+# Query flag returning per-stage timings (Server-Timing header, or a "timings" field on object bodies)
+TIMINGS_QUERY = Query(False, description="Return per-stage timings of the run")
+
+
+def result_view_params(
+    points: Optional[int] = Query(None, ge=3, description="Downsample equity curves / returns to this many points (LTTB)"),
+    trades_offset: int = Query(0, ge=0, description="First trade to return per result"),
+    trades_limit: Optional[int] = Query(None, ge=0, description="Maximum trades to return per result"),
+    fields: Optional[str] = Query(None, description="Comma-separated result keys to keep, e.g. metrics,tradeStats"),
+) -> dict:
+    """Query parameters selecting a view of stored results; the stored results are not modified."""
+    return {"points": points, "trades_offset": trades_offset, "trades_limit": trades_limit, "fields": parse_fields(fields)}
+
+
+def _cache_headers(cache: dict) -> dict:
+    """Result-cache metadata for responses whose body is a bare list of results."""
+    if not cache:
+        return {}
+    headers = {"X-Cache": "HIT" if cache["hit"] else "MISS", "X-Cache-Key": cache["key"]}
+    if cache["hit"]:
+        headers["X-Cache-Tier"] = cache["tier"]
+        headers["X-Cache-Created-At"] = str(cache["cached_at"])
+    return headers
+
+
+def _result_response(
+    request: Request, response: Response, content, response_format: str = None, cache: dict = None, view: dict = None,
+    timings: dict = None
+):
+    """
+    Return `content` (a list of results) through the requested view, either
+    as is or compactly encoded (columnar / MessagePack / gzip / zstd) when the
+    client opted in; cache headers (and a Server-Timing header for `timings`)
+    are set either way.
+    """
+    if view:
+        content = shape_results(content, **view)
+    headers = _cache_headers(cache)
+    if timings:
+        headers["Server-Timing"] = server_timing_header(timings)
+    if not wants_encoded(request, response_format):
+        response.headers.update(headers)
+        return content
+    try:
+        return encode_response(request, content, response_format, headers=headers)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 # === Standard full-period backtest ===
 @router.post("/backtest")
-def run_standard_backtest(payload: StrategyRequest, db: Session = Depends(get_db)):
+def run_standard_backtest(
+    payload: StrategyRequest, request: Request, response: Response, use_cache: bool = True,
+    response_format: Optional[str] = FORMAT_QUERY, view: dict = Depends(result_view_params),
+    timings: bool = TIMINGS_QUERY, db: Session = Depends(get_db),
+    profile: Optional[ProfileSession] = Depends(request_profile("backtest"))
+):
     """
     Run a standard backtest over the full period specified in the payload.
     
     Steps:
     1. Prepare input data (symbols, parameters, lookback) using shared helper.
-    2. Fetch OHLCV price data from the database.
-    3. Run backtest engine on the prepared data.
-    4. Return results per symbol.
+    2. Return the cached result if an identical request ran since prices last changed.
+    3. Fetch OHLCV price data from the database.
+    4. Run backtest engine on the prepared data once the CPU scheduler admits it.
+    5. Return results per symbol; X-Cache headers report whether they were cached.
+
+    Pass ?format=columnar, Accept: application/msgpack and/or Accept-Encoding
+    (zstd, gzip) for a compact encoding of the same results, and ?points,
+    ?trades_offset / ?trades_limit or ?fields for a smaller view of them.
+    ?timings=1 adds a Server-Timing header with the time spent per stage;
+    an X-Profile header runs the request under the profiler.
     """
-    try:
-        all_symbols, strategy_symbols, params, lookback = prepare_backtest_inputs(payload)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
+    with profiled(profile):
+        try:
+            all_symbols, strategy_symbols, params, lookback = prepare_backtest_inputs(payload)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    data = fetch_price_data(db, all_symbols, params["startDate"], params["endDate"], lookback)
+        cache_key = backtest_cache_key("backtest", strategy_symbols, params, lookback)
+        cache = None
+        if use_cache:
+            cached, cache = get_cached_backtest(cache_key)
+            if cached is not None:
+                return _result_response(request, response, cached, response_format, cache, view)
 
-    if not data:
-        raise HTTPException(status_code=400, detail="No price data available for the given symbols")
+        version = get_price_data_version()
+        with collect_timings() as stage_timings:
+            data = fetch_price_data(db, all_symbols, params["startDate"], params["endDate"], lookback)
 
-    print("Running standard backtest...")
-    results = run_backtest(data, strategy_symbols, params)
-    print("Completed.")
+            if not data:
+                raise HTTPException(status_code=400, detail="No price data available for the given symbols")
 
-    if not results:
-        raise HTTPException(status_code=404, detail="No price data found for given symbols")
-    
-    return results 
+            # Wait for a CPU slot so concurrent requests cannot oversubscribe the machine
+            with cpu_scheduler.acquire(INTERACTIVE, slots=1, label="backtest"):
+                print("Running standard backtest...")
+                results = run_backtest(data, strategy_symbols, params)
+                print("Completed.")
+
+        if not results:
+            raise HTTPException(status_code=404, detail="No price data found for given symbols")
+
+        store_cached_backtest(cache_key, results, all_symbols, params["endDate"], version)
+        return _result_response(
+            request, response, results, response_format, cache, view, stage_timings.as_dict() if timings else None
+        )
 
 # === Run Backtest over multiple portfolios ===
 @router.post("/backtest/portfolios")
-def run_backtest_multiple_portfolios(payload: List[Dict], db: Session = Depends(get_db)):
+def run_backtest_multiple_portfolios(
+    payload: List[Dict], request: Request, response: Response,
+    response_format: Optional[str] = FORMAT_QUERY, view: dict = Depends(result_view_params),
+    timings: bool = TIMINGS_QUERY, db: Session = Depends(get_db)
+):
     if payload is None or len(payload) == 0:
         raise HTTPException(status_code=404, detail="No portfolios provided")
-    payload.sort(key=lambda p: datetime.strptime(p["testEnd"], "%Y-%m-%d"))
     all_results = []
+    with collect_timings() as stage_timings:
+        for all_symbols, strategy_symbols, params, lookback in _prepare_portfolio_inputs(payload):
+            data = fetch_price_data(db, all_symbols, params["startDate"], params["endDate"], lookback)
+
+            with cpu_scheduler.acquire(INTERACTIVE, slots=1, label="backtest"):
+                results = run_backtest(data, strategy_symbols, params)
+
+            if not results:
+                raise HTTPException(status_code=404, detail="No price data found for given symbols")
+
+            all_results.append(results)
+
+    final_result = compute_walkforward_results(all_results, len(all_results))[0]
+
+    return _result_response(
+        request, response, final_result, response_format, view=view,
+        timings=stage_timings.as_dict() if timings else None
+    )
+
+
+def _prepare_portfolio_inputs(payload: List[Dict]):
+    """
+    Convert saved portfolios into backtest inputs, ordered by test end date.
+
+    Returns:
+        list of (all_symbols, strategy_symbols, params, lookback) per portfolio
+
+    Raises:
+        HTTPException(400) if a portfolio's inputs are invalid
+    """
+    payload.sort(key=lambda p: datetime.strptime(p["testEnd"], "%Y-%m-%d"))
+    portfolios = []
     for p in payload:
         symbolItems = []
         for strat, info in p["portfolio"]["data"].items():
@@ -71,22 +197,189 @@ def run_backtest_multiple_portfolios(payload: List[Dict], db: Session = Depends(
                 })
         inputs = StrategyRequest(symbolItems=symbolItems, params=p["params"])
         try:
-            all_symbols, strategy_symbols, params, lookback = prepare_backtest_inputs(inputs)
+            portfolios.append(prepare_backtest_inputs(inputs))
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
+    return portfolios
 
-        data = fetch_price_data(db, all_symbols, params["startDate"], params["endDate"], lookback)
 
-        results = run_backtest(data, strategy_symbols, params)
+# === Launch asynchronous standard backtest job ===
+@router.post("/backtest/start")
+async def start_standard_backtest(payload: StrategyRequest, use_cache: bool = True):
+    """
+    Start a standard full-period backtest as a background job.
 
-        if not results:
-            raise HTTPException(status_code=404, detail="No price data found for given symbols")
-        
-        all_results.append(results)
+    The job fetches prices, waits for a CPU slot and runs in a worker
+    process; follow it with /backtest/stream/{task_id} and fetch the
+    per-symbol results from /backtest/results/{task_id}. A cached result
+    for an identical request completes the job immediately.
+    """
+    try:
+        all_symbols, strategy_symbols, params, lookback = prepare_backtest_inputs(payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    final_result = compute_walkforward_results(all_results, len(all_results))[0]
+    cache_key = backtest_cache_key("backtest", strategy_symbols, params, lookback)
+    cached, cache = get_cached_backtest(cache_key) if use_cache else (None, None)
+    if cached is not None:
+        return _completed_backtest_job(cached, cache)
+
+    async def job(task_id, token):
+        version = get_price_data_version()
+        await run_backtest_job(task_id, all_symbols, strategy_symbols, params, lookback, cancel_token=token)
+        task = backtest_tasks_store.get(task_id)
+        if task and task.get("status") == "done":
+            store_cached_backtest(cache_key, task["results"], all_symbols, params["endDate"], version)
+
+    return _launch_backtest_job(job, total_runs=1, cache=cache)
+
+
+# === Launch asynchronous multi-portfolio backtest job ===
+@router.post("/backtest/portfolios/start")
+async def start_portfolios_backtest(payload: List[Dict]):
+    """
+    Start a multi-portfolio backtest as a background job.
+
+    Prices for the union of all portfolios' symbols are fetched once and the
+    portfolios run in parallel; the combined result (as returned by
+    /backtest/portfolios) is available from /backtest/results/{task_id}.
+    """
+    if payload is None or len(payload) == 0:
+        raise HTTPException(status_code=404, detail="No portfolios provided")
+    portfolios = _prepare_portfolio_inputs(payload)
 
-    return final_result
+    return _launch_backtest_job(
+        lambda task_id, token: run_portfolios_backtest_job(task_id, portfolios, cancel_token=token),
+        total_runs=len(portfolios)
+    )
+
+
+def _launch_backtest_job(job, total_runs: int, cache: dict = None):
+    """Register a backtest job in the task store and run `job(task_id, token)` in the background."""
+    task_id = str(uuid.uuid4())
+    backtest_tasks_store[task_id] = {
+        "status": "pending",        # pending, fetching, queued, running, done, failed, cancelled
+        "progress": {},             # progress percentage per run
+        "overall_progress": 0.0,    # mean progress over runs, 0–100
+        "total_runs": total_runs,
+        "results": None,
+        "error": None,
+        "cache": cache              # result-cache lookup metadata (None if skipped)
+    }
+    token = register_cancellation("backtest", task_id)
+
+    async def run_task():
+        try:
+            await job(task_id, token)
+        finally:
+            release_cancellation("backtest", task_id)
+
+    asyncio.create_task(run_task())
+    return {"task_id": task_id, "cache": cache}
+
+
+def _completed_backtest_job(results, cache: dict):
+    """Register a job that is already done because its result was cached."""
+    task_id = str(uuid.uuid4())
+    backtest_tasks_store[task_id] = {
+        "status": "done",
+        "progress": {0: 100.0},
+        "overall_progress": 100.0,
+        "total_runs": 1,
+        "results": results,
+        "error": None,
+        "cache": cache
+    }
+    return {"task_id": task_id, "cache": cache}
+
+
+# === Stream backtest job progress via Server-Sent Events (SSE) ===
+@router.get("/backtest/stream/{task_id}")
+async def stream_backtest_progress(task_id: str):
+    """
+    Stream progress of a standard or multi-portfolio backtest job.
+
+    Returns:
+        SSE stream of JSON objects with:
+        - runs: progress percentage per run
+        - overall_progress (0–100)
+        - status (pending/fetching/queued/running/done/failed/cancelled)
+        - queue: CPU scheduler position and estimated start while queued
+        - done=True when finished
+    """
+    async def event_generator():
+        last_state = {}
+        version = -1
+
+        while True:
+            task = backtest_tasks_store.snapshot(task_id, ["progress", "overall_progress", "status", "queue", "error", "cache"])
+            if task is None:
+                yield f"data: {json.dumps({'error': 'Task not found'})}\n\n"
+                break
+
+            progress_snapshot = {
+                "runs": task.get("progress") or {},
+                "overall_progress": task.get("overall_progress") or 0.0,
+                "status": task.get("status") or "unknown",
+                "queue": task.get("queue")
+            }
+
+            if progress_snapshot != last_state:
+                last_state = progress_snapshot
+                yield f"data: {json.dumps(progress_snapshot)}\n\n"
+
+            if progress_snapshot["status"] in ("done", "failed", "cancelled"):
+                yield f"data: {json.dumps({'done': True, 'status': progress_snapshot['status'], 'error': task.get('error'), 'cache': task.get('cache')})}\n\n"
+                break
+
+            # Sleep until the job publishes a change
+            new_version = await backtest_tasks_store.wait_for_update(task_id, version, timeout=SSE_KEEPALIVE_SECONDS)
+            if new_version == version:
+                yield ": keepalive\n\n"
+            version = new_version
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+# === Cancel a running backtest job ===
+@router.post("/backtest/cancel/{task_id}")
+def cancel_backtest(task_id: str):
+    """Cancel a backtest job; running backtests stop at their next date."""
+    if not cancel_task("backtest", task_id):
+        raise HTTPException(status_code=404, detail="Task not found or not running")
+    return {"task_id": task_id, "status": "cancelling"}
+
+
+# === Retrieve backtest job results ===
+@router.get("/backtest/results/{task_id}")
+def get_backtest_results(
+    task_id: str, request: Request, response: Response, response_format: Optional[str] = FORMAT_QUERY,
+    view: dict = Depends(result_view_params), timings: bool = TIMINGS_QUERY
+):
+    """
+    Fetch the results of a finished backtest job.
+
+    Returns:
+    - 404 if the task is not found
+    - 202 while the job is still running
+    - 400 with the error if the job failed or was cancelled
+    - the same results as the synchronous endpoint once done, with X-Cache
+      headers and the same opt-in compact encodings, views and ?timings=1
+    """
+    task = backtest_tasks_store.get(task_id)
+    if not task:
+        return JSONResponse({"detail": "Task not found"}, status_code=404)
+
+    status = task.get("status")
+    if status in ("failed", "cancelled"):
+        raise HTTPException(status_code=400, detail=task.get("error") or f"Backtest {status}")
+    if status != "done":
+        return JSONResponse({"detail": "Task still running", "status": status}, status_code=202)
+
+    return _result_response(
+        request, response, task["results"], response_format, task.get("cache"), view,
+        task.get("timings") if timings else None
+    )
 
 
 # === Launch asynchronous walk-forward backtest task ===
@@ -94,6 +387,7 @@ def run_backtest_multiple_portfolios(payload: List[Dict], db: Session = Depends(
 async def start_walkforward_backtest(
     payload: StrategyRequest,
     background_tasks: BackgroundTasks,
+    use_cache: bool = True,
 ):
     """
     Start a walk-forward backtest asynchronously.
@@ -101,9 +395,10 @@ async def start_walkforward_backtest(
     Steps:
     1. Prepare input data (symbols, parameters, lookback).
     2. Create rolling windows for walk-forward testing.
-    3. Register a new task in the walkforward task store with initial progress.
+    3. Register a new task in the walkforward task store with initial progress;
+       a cached result for an identical request completes it immediately.
     4. Launch the async backtest in the background.
-    5. Return task_id for tracking progress.
+    5. Return task_id (and result-cache metadata) for tracking progress.
     """
     print("Received walkforward start payload")
     try:
@@ -119,6 +414,21 @@ async def start_walkforward_backtest(
 
     window_length = 3
     task_id = str(uuid.uuid4())
+
+    cache_key = backtest_cache_key("walkforward", strategy_symbols, params, lookback, window_length=window_length)
+    cached, cache = get_cached_backtest(cache_key) if use_cache else (None, None)
+    if cached is not None:
+        tasks_store[task_id] = {
+            "progress": {seg_id: {"progress_pct": 100.0, "done": True} for seg_id in cached},
+            "results": cached,
+            "status": "done",
+            "overall_progress": 100.0,
+            "total_segments": len(windows),
+            "window_length": window_length,
+            "cache": cache
+        }
+        return {"task_id": task_id, "cache": cache}
+
     tasks_store[task_id] = {
         "progress": {},             # Track progress per segment
         "results": {},              # Store individual segment results
@@ -129,9 +439,25 @@ async def start_walkforward_backtest(
     }
 
     # Launch async walkforward execution in background
-    asyncio.create_task(run_walkforward_async(task_id, windows, all_symbols, strategy_symbols, params, lookback, window_length))
+    token = register_cancellation("walkforward", task_id)
+
+    async def run_task():
+        try:
+            version = get_price_data_version()
+            await run_walkforward_async(
+                task_id, windows, all_symbols, strategy_symbols, params, lookback, window_length, cancel_token=token
+            )
+            # Cache only complete runs: every segment produced a result
+            task = tasks_store.get(task_id)
+            if task and task.get("status") == "done" and len(task["results"]) == len(windows):
+                store_cached_backtest(cache_key, task["results"], all_symbols, params["endDate"], version)
+            tasks_store.publish(task_id, cache=cache)
+        finally:
+            release_cancellation("walkforward", task_id)
 
-    return {"task_id": task_id}
+    asyncio.create_task(run_task())
+
+    return {"task_id": task_id, "cache": cache}
 
 
 # === Stream walk-forward task progress via Server-Sent Events (SSE) ===
@@ -144,46 +470,67 @@ async def stream_walkforward_progress(task_id: str):
         SSE stream of JSON objects with:
         - segments progress
         - overall_progress (0–1)
-        - status (pending/running/done)
-        - done=True when finished
+        - status (pending/queued/running/done/failed/cancelled)
+        - queue: CPU scheduler position and estimated start while queued
+        - done=True when finished, with the error if the task failed
     """
     async def event_generator():
         last_state = {}
+        version = -1
 
         while True:
-            if not tasks_store or task_id not in tasks_store:
-                # Yield immediate placeholder event
+            task = tasks_store.snapshot(task_id, ["progress", "overall_progress", "status", "queue", "error"])
+            if task is None:
+                # Yield placeholder event until the task is registered
                 yield f"data: {json.dumps({'status': 'pending', 'overall_progress': 0.0})}\n\n"
-                await asyncio.sleep(0.3)
+                version = await tasks_store.wait_for_update(task_id, version, timeout=SSE_KEEPALIVE_SECONDS)
                 continue
-            task = tasks_store.get(task_id)
-            if not task:
-                yield f"data: {json.dumps({'error': 'Task not found'})}\n\n"
-                break
 
             progress_snapshot = {
-                "segments": task.get("progress", {}),
-                "overall_progress": task.get("overall_progress", 0.0),
-                "status": task.get("status", "unknown")
+                "segments": task.get("progress") or {},
+                "overall_progress": task.get("overall_progress") or 0.0,
+                "status": task.get("status") or "unknown",
+                "queue": task.get("queue")
             }
 
             # Yield update only if there is a change
             if progress_snapshot != last_state:
-                last_state = progress_snapshot.copy()
+                last_state = progress_snapshot
                 yield f"data: {json.dumps(progress_snapshot)}\n\n"
 
-            if task["status"] == "done":
-                yield f"data: {json.dumps({'done': True})}\n\n"
+            if progress_snapshot["status"] in ("done", "failed", "cancelled"):
+                yield f"data: {json.dumps({'done': True, 'status': progress_snapshot['status'], 'error': task.get('error')})}\n\n"
                 break
 
-            await asyncio.sleep(0.3)
+            # Sleep until the task publishes a change
+            new_version = await tasks_store.wait_for_update(task_id, version, timeout=SSE_KEEPALIVE_SECONDS)
+            if new_version == version:
+                yield ": keepalive\n\n"
+            version = new_version
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
+# === Cancel a running walk-forward backtest ===
+@router.post("/backtest/walkforward/cancel/{task_id}")
+def cancel_walkforward_backtest(task_id: str):
+    """
+    Cancel a running walk-forward backtest.
+
+    Queued segments are dropped and running segments stop at their next date,
+    freeing the pool's workers; the task ends with status "cancelled".
+    """
+    if not cancel_task("walkforward", task_id):
+        raise HTTPException(status_code=404, detail="Task not found or not running")
+    return {"task_id": task_id, "status": "cancelling"}
+
+
 # === Retrieve aggregated walk-forward results ===
 @router.get("/backtest/walkforward/results/{task_id}")
-def get_walkforward_aggregated_results(task_id: str):
+def get_walkforward_aggregated_results(
+    task_id: str, request: Request, response: Response, response_format: Optional[str] = FORMAT_QUERY,
+    view: dict = Depends(result_view_params), timings: bool = TIMINGS_QUERY
+):
     """
     Retrieve final aggregated results of a completed walk-forward backtest task.
     
@@ -191,7 +538,9 @@ def get_walkforward_aggregated_results(task_id: str):
     1. Validate task exists and is completed.
     2. Flatten results from all segments.
     3. Compute walk-forward metrics per symbol and overall.
-    4. Return aggregated results.
+    4. Return aggregated results (?format=columnar etc. for a compact encoding,
+       ?points / ?fields for a view with downsampled or without returns,
+       ?timings=1 for the run's per-stage timings summed over segments).
     """
     task = tasks_store.get(task_id)
     if not task or task["status"] != "done":
@@ -205,9 +554,13 @@ def get_walkforward_aggregated_results(task_id: str):
     walkforward_results = compute_walkforward_results(segments, window_length)
     aggregated = aggregate_walkforward_results(walkforward_results)
 
-    symbol_results = [r for r in aggregated if r["symbol"] != "overall"]
-    return {
+    symbol_results = shape_results([r for r in aggregated if r["symbol"] != "overall"], **view)
+    content = {
         "task_id": task_id,
         "status": task["status"],
-        "aggregated_results": symbol_results
+        "aggregated_results": symbol_results,
+        "cache": task.get("cache")
     }
+    if timings:
+        content["timings"] = task.get("timings")
+    return _result_response(request, response, content, response_format)
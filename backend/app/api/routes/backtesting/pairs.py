@@ -2,7 +2,7 @@ import asyncio
 import json
 import uuid
 from datetime import date, timedelta
-from multiprocessing import Manager, Process
+from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse, StreamingResponse
@@ -11,16 +11,24 @@ from sqlalchemy.orm import Session
 from app.crud import get_prices_light
 from app.database import get_db
 from app.schemas import PairSelectionRequest
-from app.services.backtesting.tasks.pairs_manager import run_pair_selection_task, monitor_pair_selection_progress
+from app.services.backtesting.tasks.pairs_manager import run_pair_selection_task
 from app.stores.task_stores import pairs_tasks_store as tasks_store
+from app.utils.cancellation import cancel_task, register_cancellation, release_cancellation
+from app.utils.profiling import ProfileSession, profiled, request_profile
 
 
 router = APIRouter()
 
+# Seconds an idle SSE stream waits before sending a keepalive comment
+SSE_KEEPALIVE_SECONDS = 15
+
 
 # === Start a new pair selection task ===
 @router.post("/select/start")
-async def start_pair_selection(req: PairSelectionRequest, db: Session = Depends(get_db)):
+async def start_pair_selection(
+    req: PairSelectionRequest, db: Session = Depends(get_db),
+    profile: Optional[ProfileSession] = Depends(request_profile("pairs"))
+):
     """
     Launch a new asynchronous pair selection task.
 
@@ -28,47 +36,48 @@ async def start_pair_selection(req: PairSelectionRequest, db: Session = Depends(
     1. Fetch historical price data for the requested symbols.
     2. Build a dictionary of prices grouped by symbol.
     3. Validate that at least 2 symbols have data.
-    4. Create a unique task_id and a shared progress_state using multiprocessing.Manager.
-    5. Start the pair selection computation in a separate process.
-    6. Launch an asyncio task to monitor progress updates.
-    7. Register the task in the tasks_store for tracking.
+    4. Create a unique task_id and register the task in the tasks_store.
+    5. Launch the pair selection as a background asyncio task; it runs the
+       analysis in a worker thread and publishes progress and results.
+
+    With an X-Profile header, the price fetch and the background task are
+    profiled on the event loop (the analysis worker thread and processes are not).
     """
-    # Define date range for 1-year historical data
-    end = req.end or date.today()
-    start = req.start or end - timedelta(days=365)
-    lookback = 0
-
-    # Fetch lightweight price data from DB
-    rows = get_prices_light(db, req.symbols, start, end, lookback)
-
-    # Organize data per symbol
-    prices_dict = {}
-    for r in rows:
-        prices_dict.setdefault(r["symbol"], []).append({
-            "date": r["date"],
-            "close": r["close"],
-        })
-
-    if len(prices_dict) < 2:
-        raise HTTPException(status_code=404, detail="Not enough price data for selected symbols")
-
-    # Initialize unique task ID and shared progress state
+    with profiled(profile, finish=False):
+        # Define date range for 1-year historical data
+        end = req.end or date.today()
+        start = req.start or end - timedelta(days=365)
+        lookback = 0
+
+        # Fetch lightweight price data from DB
+        rows = get_prices_light(db, req.symbols, start, end, lookback)
+
+        # Organize data per symbol
+        prices_dict = {}
+        for r in rows:
+            prices_dict.setdefault(r["symbol"], []).append({
+                "date": r["date"],
+                "close": r["close"],
+            })
+
+        if len(prices_dict) < 2:
+            raise HTTPException(status_code=404, detail="Not enough price data for selected symbols")
+
+    # Initialize unique task ID and register task in store
     task_id = str(uuid.uuid4())
-    manager = Manager()
-    progress_state = manager.dict(done=0, total=0, status="starting", results=None)
+    tasks_store[task_id] = {"status": "starting", "done": 0, "total": 0, "results": None}
 
-    # Launch asynchronous progress monitor
-    asyncio.create_task(monitor_pair_selection_progress(task_id, progress_state))
+    # Launch pair selection in the background
+    token = register_cancellation("pairs", task_id)
 
-    # Start pair selection in a separate process
-    p = Process(
-        target=run_pair_selection_task,
-        args=(task_id, req.symbols, prices_dict, req.w_corr, req.w_coint, progress_state)
-    )
-    p.start()
+    async def run_task():
+        try:
+            with profiled(profile):
+                await run_pair_selection_task(task_id, req.symbols, prices_dict, req.w_corr, req.w_coint, token)
+        finally:
+            release_cancellation("pairs", task_id)
 
-    # Register task in store
-    tasks_store[task_id] = {"status": "starting", "done": 0, "total": 0}
+    asyncio.create_task(run_task())
 
     return {"task_id": task_id, "status": "started"}
 
@@ -83,38 +92,59 @@ async def stream_pair_selection_progress(task_id: str):
     - done: number of completed symbols
     - total: total symbols to process
     - status: current status of the task
+    - queue: CPU scheduler position and estimated start while queued
     - done=True when task finishes or fails
     """
     async def event_generator():
         last_state = {}
+        version = -1
 
         while True:
-            task = tasks_store.get(task_id)
+            task = tasks_store.snapshot(task_id, ["done", "total", "status", "queue"])
             if not task:
                 yield f"data: {json.dumps({'error': 'Task not found'})}\n\n"
                 break
 
             snapshot = {
-                "done": task.get("done", 0),
-                "total": task.get("total", 0),
-                "status": task.get("status", "unknown"),
+                "done": task.get("done") or 0,
+                "total": task.get("total") or 0,
+                "status": task.get("status") or "unknown",
+                "queue": task.get("queue"),
             }
 
             # Yield update only if there is a change
             if snapshot != last_state:
-                last_state = snapshot.copy()
+                last_state = snapshot
                 yield f"data: {json.dumps(snapshot)}\n\n"
 
             # Stop streaming when task completes or fails
-            if task["status"] in ("done", "failed"):
-                yield f"data: {json.dumps({'done': True, 'status': task['status']})}\n\n"
+            if snapshot["status"] in ("done", "failed", "cancelled"):
+                yield f"data: {json.dumps({'done': True, 'status': snapshot['status']})}\n\n"
                 break
 
-            await asyncio.sleep(0.3)
+            # Sleep until the monitor publishes a change
+            new_version = await tasks_store.wait_for_update(task_id, version, timeout=SSE_KEEPALIVE_SECONDS)
+            if new_version == version:
+                yield ": keepalive\n\n"
+            version = new_version
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
+# === Cancel a running pair selection task ===
+@router.post("/select/cancel/{task_id}")
+def cancel_pair_selection(task_id: str):
+    """
+    Cancel a running pair selection task.
+
+    Queued chunks are dropped and running chunks stop at their next pair,
+    freeing the pool's workers; the task ends with status "cancelled".
+    """
+    if not cancel_task("pairs", task_id):
+        raise HTTPException(status_code=404, detail="Task not found or not running")
+    return {"task_id": task_id, "status": "cancelling"}
+
+
 # === Retrieve final pair selection results ===
 @router.get("/select/results/{task_id}")
 def get_pair_selection_results(task_id: str):
@@ -1,20 +1,33 @@
-import asyncio
 import json
+import uuid
+from typing import Optional
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.schemas import ParamOptimisationRequest
 from app.services.backtesting.engines.param_optimiser import optimise_parameters
 from app.stores.task_stores import param_optimisation_tasks_store as tasks_store
+from app.utils.cancellation import cancel_task, is_registered, register_cancellation, release_cancellation
+from app.utils.profiling import ProfileSession, profiled, request_profile
+from app.utils.timing import collect_timings, server_timing_header
 
 router = APIRouter()
 
+# Seconds an idle SSE stream waits before sending a keepalive comment
+SSE_KEEPALIVE_SECONDS = 15
+# Response header carrying the optimisation's run id
+RUN_ID_HEADER = "X-Run-Id"
+
 
 # === Run parameter optimisation for one or multiple strategies ===
 @router.post("/optimise")
-def optimise_strategy_parameters(payload: ParamOptimisationRequest):
+def optimise_strategy_parameters(
+    payload: ParamOptimisationRequest, response: Response,
+    timings: bool = Query(False, description="Return per-stage timings summed over all trials"),
+    profile: Optional[ProfileSession] = Depends(request_profile("param_optimisation"))
+):
     """
     Start a parameter optimisation for given strategies.
 
@@ -29,25 +42,64 @@ def optimise_strategy_parameters(payload: ParamOptimisationRequest):
         - cagr: 0.3
         - max_drawdown: 0.2
         - win_rate: 0.1
+
+    ?timings=1 adds a Server-Timing header with the time spent per stage
+    (trials, walk-forward segments, price fetches, backtest stages). An
+    X-Profile header runs the request under the profiler (trials run in
+    this thread; walk-forward segments in worker processes are not profiled).
+
+    The run can be stopped with `/optimisation/cancel/{run_id}`. As this
+    request only returns once the run ends, a client that wants to cancel
+    sends its own `runId`; otherwise one is generated. Either way it is
+    returned in the X-Run-Id header.
+    """
+    with profiled(profile):
+        strategies_config = payload.strategies
+        global_params = payload.globalParams
+        optimisation_params = payload.optimParams
+        scoring_params = payload.scoringParams or {
+            "sharpe": 0.5,
+            "cagr": 0.3,
+            "max_drawdown": 0.2,
+            "win_rate": 0.1
+        }
+        metric_ranges = payload.metricRanges or {
+            "sharpe": {"min": -1.0, "max": 3.0},         
+            "cagr": {"min": -20.0, "max": 20.0},            
+            "maxDrawdown": {"min": 10, "max": 60},     
+            "winRate": {"min": 25, "max": 75}          
+        }
+        run_id = payload.runId or str(uuid.uuid4())
+        if is_registered("param_optimisation", run_id):
+            raise HTTPException(status_code=409, detail=f"Optimisation {run_id} is already running")
+        tasks_store.clear()
+        token = register_cancellation("param_optimisation", run_id)
+        try:
+            with collect_timings() as stage_timings:
+                results = optimise_parameters(
+                    strategies_config, global_params, optimisation_params, scoring_params, metric_ranges, token
+                )
+        finally:
+            release_cancellation("param_optimisation", run_id)
+        response.headers[RUN_ID_HEADER] = run_id
+        if timings:
+            response.headers["Server-Timing"] = server_timing_header(stage_timings.as_dict())
+        return results
+
+
+# === Cancel a running parameter optimisation ===
+@router.post("/optimisation/cancel/{run_id}")
+def cancel_param_optimisation(run_id: str):
     """
-    strategies_config = payload.strategies
-    global_params = payload.globalParams
-    optimisation_params = payload.optimParams
-    scoring_params = payload.scoringParams or {
-        "sharpe": 0.5,
-        "cagr": 0.3,
-        "max_drawdown": 0.2,
-        "win_rate": 0.1
-    }
-    metric_ranges = payload.metricRanges or {
-        "sharpe": {"min": -1.0, "max": 3.0},         
-        "cagr": {"min": -20.0, "max": 20.0},            
-        "maxDrawdown": {"min": 10, "max": 60},     
-        "winRate": {"min": 25, "max": 75}          
-    }
-    tasks_store.clear()
-    results = optimise_parameters(strategies_config, global_params, optimisation_params, scoring_params, metric_ranges)
-    return results
+    Cancel a running parameter optimisation.
+
+    The current Optuna study is stopped and its in-flight trial's walk-forward
+    pool is shut down; remaining strategies are skipped and marked "cancelled".
+    `/optimise` then returns the best results found so far.
+    """
+    if not cancel_task("param_optimisation", run_id):
+        raise HTTPException(status_code=404, detail="Optimisation not found or not running")
+    return {"run_id": run_id, "status": "cancelling"}
 
 
 # === Stream real-time progress of parameter optimisation via SSE ===
@@ -62,41 +114,48 @@ async def stream_all_param_optimisation_progress():
         - status: current task status ("running", "done", etc.)
         - best_score: best scoring value so far
         - best_params: parameter combination achieving best score
+        - queue: the running trial's CPU scheduler state (position, estimated start)
 
     When all strategies are finished, yields {"done": True} and closes the stream.
     """
     async def event_generator():
         last_state = {}
+        version = -1
 
         while True:
-            if not tasks_store:
-                # Wait if no tasks have started yet
-                await asyncio.sleep(5)
-                continue
-
-            # Gather progress per strategy
-            all_strategies_progress = {
-                strategy_name: {
-                    "completed_trials": task["completed_trials"],
-                    "total_trials": task["total_trials"],
-                    "status": task["status"],
-                    "best_score": task["best_score"],
-                    "best_params": task["best_params"],
+            # Snapshot every strategy under the store lock
+            tasks = {name: tasks_store.snapshot(name) for name in list(tasks_store)}
+            tasks = {name: task for name, task in tasks.items() if task is not None}
+
+            if tasks:
+                # Gather progress per strategy
+                all_strategies_progress = {
+                    strategy_name: {
+                        "completed_trials": task["completed_trials"],
+                        "total_trials": task["total_trials"],
+                        "status": task["status"],
+                        "best_score": task["best_score"],
+                        "best_params": task["best_params"],
+                        "queue": task.get("queue"),
+                    }
+                    for strategy_name, task in tasks.items()
                 }
-                for strategy_name, task in tasks_store.items()
-            }
-
-            # Only send update if there is a change
-            if all_strategies_progress != last_state:
-                last_state = all_strategies_progress.copy()
-                yield f"data: {json.dumps(all_strategies_progress)}\n\n"
-
-            # Stop streaming once all strategies are done
-            if all(task["status"] == "done" for task in tasks_store.values()):
-                yield f"data: {json.dumps({'done': True})}\n\n"
-                tasks_store.clear()
-                break
 
-            await asyncio.sleep(0.3)
+                # Only send update if there is a change
+                if all_strategies_progress != last_state:
+                    last_state = all_strategies_progress
+                    yield f"data: {json.dumps(all_strategies_progress)}\n\n"
+
+                # Stop streaming once all strategies are done
+                if all(task["status"] in ("done", "cancelled") for task in tasks.values()):
+                    yield f"data: {json.dumps({'done': True})}\n\n"
+                    tasks_store.clear()
+                    break
+
+            # Sleep until any strategy's task state changes
+            new_version = await tasks_store.wait_for_update(None, version, timeout=SSE_KEEPALIVE_SECONDS)
+            if new_version == version:
+                yield ": keepalive\n\n"
+            version = new_version
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
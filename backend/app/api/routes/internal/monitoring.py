@@ -0,0 +1,254 @@
+import sys
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+
+from app.database import engine, pool_stats
+from app.services.scheduler import cpu_scheduler
+from app.stores.cache_stores import backtest_result_cache, portfolio_inputs_cache, portfolio_signal_cache
+from app.stores.task_stores import all_task_stores
+from app.utils.prometheus import (
+    CONTENT_TYPE, MetricFamily, db_query_duration, db_query_errors,
+    http_request_duration, http_requests_in_progress, render,
+)
+from app.utils.indicator_cache import indicator_cache
+from app.utils.profiling import collapsed_stacks, profile_store
+from app.utils.query_log import explain_query, query_log
+from app.utils.timing import timing_histograms
+
+router = APIRouter()
+
+# LRU caches living in modules that are imported on first use; they are only
+# reported once loaded, so a scrape never pulls in the optimisation stack.
+LAZY_CACHES = {
+    "portfolio_problems": ("app.services.portfolio.stages.portfolio_weight_allocation.helpers.optimisation_calcs", "_problem_cache"),
+    "hrp_linkage": ("app.services.portfolio.stages.portfolio_weight_allocation.helpers.hrp_calcs", "_linkage_cache"),
+}
+
+
+def _db_pool_families() -> list:
+    connections = MetricFamily("quantapp_db_pool_connections", "gauge", "Connections in the database pools by state")
+    pool = engine.pool
+    if hasattr(pool, "checkedout"):
+        connections.add(pool.checkedout(), pool="sync", state="checked_out")
+        connections.add(pool.checkedin(), pool="sync", state="idle")
+        connections.add(max(pool.overflow(), 0), pool="sync", state="overflow")
+    limit = MetricFamily("quantapp_db_pool_max_connections", "gauge", "Maximum connections per database pool")
+    if hasattr(pool, "size") and hasattr(pool, "_max_overflow"):
+        limit.add(pool.size() + max(pool._max_overflow, 0), pool="sync")
+
+    async_pool = pool_stats()
+    if async_pool is not None:
+        if async_pool["free"] is not None:
+            connections.add(async_pool["size"] - async_pool["free"], pool="async", state="checked_out")
+            connections.add(async_pool["free"], pool="async", state="idle")
+        else:
+            connections.add(async_pool["size"], pool="async", state="open")
+        limit.add(async_pool["maxsize"], pool="async")
+    return [connections, limit]
+
+
+def _scheduler_families() -> list:
+    stats = cpu_scheduler.stats()
+    busy = stats["max_slots"] - stats["free_slots"]
+    slots = MetricFamily("quantapp_cpu_slots", "gauge", "CPU job slots shared by process-pool jobs")
+    slots.add(stats["max_slots"], state="total").add(busy, state="busy").add(stats["free_slots"], state="free")
+    utilisation = MetricFamily("quantapp_cpu_slot_utilisation", "gauge", "Share of CPU job slots granted to running jobs")
+    utilisation.add(busy / stats["max_slots"])
+    by_label = MetricFamily("quantapp_cpu_slots_busy", "gauge", "CPU job slots granted to running jobs by job type")
+    for label, granted in sorted(stats["running_slots_by_label"].items()):
+        by_label.add(granted, job=label)
+    queued = MetricFamily("quantapp_scheduler_queued_jobs", "gauge", "Jobs waiting for a CPU slot by priority class")
+    for priority, name in ((0, "interactive"), (1, "batch")):
+        queued.add(stats["queued_by_priority"].get(priority, 0), priority=name)
+    jobs = MetricFamily("quantapp_scheduler_jobs", "counter", "Scheduler job outcomes")
+    for outcome in ("admitted", "completed", "withdrawn"):
+        jobs.add(stats[outcome], "_total", outcome=outcome)
+    wait = MetricFamily("quantapp_scheduler_wait_seconds", "counter", "Total time admitted jobs spent queued")
+    wait.add(stats["wait_seconds"], "_total")
+    return [slots, utilisation, by_label, queued, jobs, wait]
+
+
+def _task_store_families() -> list:
+    tasks = MetricFamily("quantapp_tasks", "gauge", "Tasks held per store by state")
+    resident = MetricFamily("quantapp_task_store_resident_bytes", "gauge", "Estimated bytes of results held in memory per store")
+    spilled = MetricFamily("quantapp_task_store_spilled_tasks", "gauge", "Finished tasks whose results are spilled to disk per store")
+    subscribers = MetricFamily("quantapp_task_store_subscribers", "gauge", "Open progress stream subscribers per store")
+    for store in all_task_stores:
+        stats = store.stats()
+        tasks.add(stats["running"], type=store.name, state="running")
+        tasks.add(stats["finished"], type=store.name, state="finished")
+        resident.add(stats["resident_result_bytes"], type=store.name)
+        spilled.add(stats["spilled_tasks"], type=store.name)
+        subscribers.add(stats["subscribers"], type=store.name)
+    return [tasks, resident, spilled, subscribers]
+
+
+def _lru_caches() -> dict:
+    caches = {"portfolio_inputs": portfolio_inputs_cache, "portfolio_signals": portfolio_signal_cache}
+    for name, (module_name, attribute) in LAZY_CACHES.items():
+        module = sys.modules.get(module_name)
+        if module is not None:
+            caches[name] = getattr(module, attribute)
+    return caches
+
+
+def _cache_families() -> list:
+    lookups = MetricFamily("quantapp_cache_lookups", "counter", "Cache lookups by cache and result")
+    ratio = MetricFamily("quantapp_cache_hit_ratio", "gauge", "Cache hits over lookups since start-up")
+    entries = MetricFamily("quantapp_cache_entries", "gauge", "Entries held per cache (and tier)")
+    size = MetricFamily("quantapp_cache_bytes", "gauge", "Bytes held per cache tier")
+    evictions = MetricFamily("quantapp_cache_evictions", "counter", "Entries evicted per cache")
+
+    result = backtest_result_cache.stats()
+    lookups.add(result["memory_hits"], "_total", cache="backtest_results", result="memory_hit")
+    lookups.add(result["disk_hits"], "_total", cache="backtest_results", result="disk_hit")
+    lookups.add(result["misses"], "_total", cache="backtest_results", result="miss")
+    ratio.add(result["hit_ratio"], cache="backtest_results")
+    for tier in ("memory", "disk"):
+        entries.add(result[f"{tier}_entries"], cache="backtest_results", tier=tier)
+        size.add(result[f"{tier}_bytes"], cache="backtest_results", tier=tier)
+    evictions.add(result["evictions"], "_total", cache="backtest_results")
+
+    # Indicators computed in this process (mostly workers report theirs as
+    # indicator_compute / indicator_reuse stage timings)
+    indicators = indicator_cache.stats()
+    lookups.add(indicators["memory_hits"], "_total", cache="indicators", result="memory_hit")
+    lookups.add(indicators["disk_hits"], "_total", cache="indicators", result="disk_hit")
+    lookups.add(indicators["misses"], "_total", cache="indicators", result="miss")
+    ratio.add(indicators["hit_ratio"], cache="indicators")
+    entries.add(indicators["memory_entries"], cache="indicators", tier="memory")
+    size.add(indicators["memory_bytes"], cache="indicators", tier="memory")
+    evictions.add(indicators["evictions"], "_total", cache="indicators")
+
+    for name, cache in _lru_caches().items():
+        stats = cache.stats()
+        lookups.add(stats["hits"], "_total", cache=name, result="hit")
+        lookups.add(stats["misses"], "_total", cache=name, result="miss")
+        ratio.add(stats["hit_ratio"], cache=name)
+        entries.add(stats["size"], cache=name, tier="memory")
+        if stats["max_bytes"] is not None:
+            size.add(stats["bytes"], cache=name, tier="memory")
+        evictions.add(stats["evictions"], "_total", cache=name)
+    return [lookups, ratio, entries, size, evictions]
+
+
+def _stage_family() -> MetricFamily:
+    stages = MetricFamily("quantapp_stage_duration_seconds", "histogram", "Duration of instrumented engine stages")
+    for name, stage in timing_histograms.snapshot().items():
+        stages.add_histogram(stage["buckets"], stage["sum"], stage["count"], stage=name)
+    return stages
+
+
+def collect_metrics() -> list:
+    """Every metric family, with gauges read from their owners now."""
+    in_progress = MetricFamily("quantapp_http_requests_in_progress", "gauge", "HTTP requests being handled by method")
+    for method, count in sorted(http_requests_in_progress.items()):
+        in_progress.add(count, method=method)
+    return [
+        http_request_duration.collect(),
+        in_progress,
+        db_query_duration.collect(),
+        db_query_errors.collect(),
+        *_db_pool_families(),
+        *_scheduler_families(),
+        *_task_store_families(),
+        *_cache_families(),
+        _stage_family(),
+    ]
+
+
+# === Prometheus scrape endpoint ===
+@router.get("/metrics")
+def get_metrics():
+    """
+    Report request latency per route, DB query counts and durations, pool
+    and CPU slot usage, tasks per store, cache hit ratios and stage timings
+    in the Prometheus text format.
+    """
+    return Response(render(collect_metrics()), media_type=CONTENT_TYPE)
+
+
+# === Indicator cache ===
+@router.get("/indicators")
+def get_indicator_cache_stats():
+    """
+    Report this process's indicator cache: entries and bytes held, memory /
+    disk hits and misses overall and per indicator, and compute time saved.
+    """
+    return indicator_cache.stats()
+
+
+# === Query stats by fingerprint ===
+@router.get("/queries")
+def get_query_stats(limit: int = Query(50, ge=1, le=500)):
+    """
+    Report SQL statements grouped by fingerprint (literals and IN lists
+    collapsed): calls, total / mean / max seconds, rows and parameter shape,
+    by total time spent.
+    """
+    return query_log.stats(limit)
+
+
+# === Recent slow queries ===
+@router.get("/queries/slow")
+def get_slow_queries(limit: int = Query(50, ge=1, le=200)):
+    """Report this process's most recent queries above SLOW_QUERY_MS (parameter values omitted)."""
+    return {"threshold_ms": query_log.slow_ms, "log_file": query_log.path, "queries": query_log.slow_queries(limit)}
+
+
+# === Execution plan for a recorded query ===
+@router.get("/queries/{fingerprint}/plan")
+def get_query_plan(fingerprint: str):
+    """
+    Fetch the estimated execution plan of a recorded SELECT fingerprint,
+    using its slowest recorded parameters. The query itself is not run.
+    """
+    sample = query_log.sample(fingerprint)
+    if sample is None:
+        raise HTTPException(status_code=404, detail=f"No recorded query with fingerprint {fingerprint}")
+    statement, parameters = sample
+    try:
+        plan = explain_query(engine, statement, parameters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"fingerprint": fingerprint, "statement": statement, **plan}
+
+
+# === Request profiles ===
+@router.get("/profiles")
+def list_profiles():
+    """List recent request profiles (X-Profile requests), newest first."""
+    return profile_store.list()
+
+
+def _finished_profile(request_id: str):
+    session = profile_store.get(request_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail=f"No profile for request {request_id}")
+    if session.status == "running":
+        raise HTTPException(status_code=409, detail="Profile is still running")
+    return session
+
+
+@router.get("/profiles/{request_id}")
+def get_profile(request_id: str):
+    """Report a profile's summary and its top allocation sites (tracemalloc)."""
+    session = _finished_profile(request_id)
+    return {**session.summary(), "memory": session.memory}
+
+
+@router.get("/profiles/{request_id}/download")
+def download_profile(request_id: str, profile_format: str = Query("pstats", alias="format", pattern="^(pstats|collapsed)$")):
+    """
+    Download a profile as a cProfile .pstats file (format=pstats, for
+    pstats / snakeviz) or as collapsed stacks (format=collapsed, for
+    flamegraph.pl / speedscope).
+    """
+    session = _finished_profile(request_id)
+    if profile_format == "collapsed":
+        return PlainTextResponse(
+            collapsed_stacks(session.path),
+            headers={"Content-Disposition": f'attachment; filename="{request_id}.folded"'},
+        )
+    return FileResponse(session.path, media_type="application/octet-stream", filename=f"{request_id}.pstats")
@@ -0,0 +1,63 @@
+from fastapi import APIRouter
+
+from app.services.scheduler import cpu_scheduler
+from app.stores.cache_stores import backtest_result_cache, bump_price_data_version
+from app.stores.task_stores import all_task_stores
+from app.utils.timing import timing_histograms
+
+router = APIRouter()
+
+
+# === Task store memory and eviction stats ===
+@router.get("/tasks/stats")
+def get_task_store_stats():
+    """
+    Report per-store task counts, estimated resident result bytes, spilled
+    tasks and files, and TTL eviction / spill / reload counters.
+    """
+    return {store.name: store.stats() for store in all_task_stores}
+
+
+# === Run TTL eviction and spill immediately ===
+@router.post("/tasks/maintain")
+def run_task_store_maintenance():
+    """Apply TTL eviction and memory-budget spill now instead of waiting for the background loop."""
+    return {store.name: store.maintain() for store in all_task_stores}
+
+
+# === CPU job scheduler stats ===
+@router.get("/scheduler/stats")
+def get_scheduler_stats():
+    """Report CPU slot usage, queue depth per priority class and admission counters."""
+    return cpu_scheduler.stats()
+
+
+# === Backtest result cache stats ===
+@router.get("/cache/stats")
+def get_result_cache_stats():
+    """Report entries and bytes per cache tier, budgets and hit / miss / eviction counters."""
+    return backtest_result_cache.stats()
+
+
+# === Drop every cached backtest result ===
+@router.post("/cache/clear")
+def clear_result_cache():
+    """
+    Empty both tiers of the backtest result cache and bump the price data
+    version for every symbol, so values derived from stored prices (portfolio
+    inputs, signal books) are rebuilt too. Call after prices were written by
+    another process, e.g. the seeder.
+    """
+    backtest_result_cache.clear()
+    bump_price_data_version()
+    return backtest_result_cache.stats()
+
+
+# === Stage timing histograms ===
+@router.get("/timings")
+def get_stage_timing_histograms():
+    """
+    Report cumulative duration histograms (seconds) per instrumented stage:
+    price fetches, backtest stages, walk-forward segments and Optuna trials.
+    """
+    return timing_histograms.snapshot()
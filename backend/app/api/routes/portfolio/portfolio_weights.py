@@ -1,13 +1,28 @@
+from typing import Optional
+
+import numpy as np
 import pandas as pd
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
 
-from app.schemas import HrpPayload, OptimisePayload, PortfolioInputsPayload
+from app.database import get_db
+from app.schemas import (
+    HrpPayload, OptimisePayload, OptimiseSweepPayload,
+    PortfolioInputsFromPricesPayload, PortfolioInputsPayload
+)
+from app.services.portfolio.stages.portfolio_weight_allocation.compute_inputs import (
+    compute_inputs_from_prices,
+    get_cached_inputs,
+)
 from app.services.portfolio.stages.portfolio_weight_allocation.helpers import (
+    MAX_SWEEP_POINTS,
     hrp_allocation,
     compute_expected_returns,
     compute_risk_matrix,
-    optimise_portfolio
+    optimise_portfolio,
+    sweep_portfolios
 )
+from app.utils.profiling import ProfileSession, profiled, request_profile
 
 router = APIRouter()
 
@@ -22,6 +37,8 @@ async def compute_portfolio_inputs(payload: PortfolioInputsPayload):
         payload: PortfolioInputsPayload containing:
             - returns: dict of historical returns per symbol
             - ewma_decay: decay factor for EWMA expected returns calculation
+            - cov_method: "sample" or "ewma" covariance
+            - shrinkage: shrinkage intensity towards the diagonal
 
     Returns:
         Dict containing:
@@ -36,7 +53,10 @@ async def compute_portfolio_inputs(payload: PortfolioInputsPayload):
         raise HTTPException(status_code=404, detail="No returns provided")
 
     expected_returns = compute_expected_returns(returns, payload.ewma_decay)
-    risk_matrix = compute_risk_matrix(returns)
+    try:
+        risk_matrix = compute_risk_matrix(returns, payload.ewma_decay, payload.cov_method, payload.shrinkage)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return {
         "expected_returns": expected_returns,
@@ -44,6 +64,65 @@ async def compute_portfolio_inputs(payload: PortfolioInputsPayload):
     }
 
 
+# === Compute expected returns and risk matrix server-side from stored prices ===
+@router.post("/inputs/fromPrices")
+def compute_portfolio_inputs_from_prices(payload: PortfolioInputsFromPricesPayload, db: Session = Depends(get_db)):
+    """
+    Compute expected returns and risk matrix from prices stored in the database,
+    instead of client-posted return histories.
+
+    Results are cached by (symbol set, date range, decay, price data version), and
+    the returned inputs_key can be passed to /hrp and /optimise in place of the
+    full matrices.
+
+    Args:
+        payload: PortfolioInputsFromPricesPayload containing:
+            - symbols, start, end: universe and date range
+            - ewma_decay: decay factor for EWMA expected returns
+            - cov_method: "sample" or "ewma" covariance
+            - shrinkage: shrinkage intensity towards the diagonal
+
+    Returns:
+        Dict containing expected_returns, risk_matrix, inputs_key and cache metadata
+
+    Raises:
+        HTTPException: if no symbols are given or no prices are stored for them.
+    """
+    if not payload.symbols:
+        raise HTTPException(status_code=400, detail="No symbols provided")
+
+    try:
+        inputs = compute_inputs_from_prices(
+            db, payload.symbols, payload.start, payload.end,
+            payload.ewma_decay, payload.cov_method, payload.shrinkage
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if inputs is None:
+        raise HTTPException(status_code=404, detail="No price data found for given symbols")
+
+    return inputs
+
+
+def _resolve_cached_inputs(inputs_key: str) -> dict:
+    """Fetch server-side inputs by key, raising 404 if they are no longer cached."""
+    inputs = get_cached_inputs(inputs_key)
+    if inputs is None:
+        raise HTTPException(status_code=404, detail="Portfolio inputs not found or expired")
+    return inputs
+
+
+def _resolve_optimise_inputs(payload: OptimisePayload):
+    """Return (expected_returns, risk_matrix), falling back to cached inputs by key."""
+    expected_returns, risk_matrix = payload.expected_returns, payload.risk_matrix
+    if (expected_returns is None or risk_matrix is None) and payload.inputs_key:
+        inputs = _resolve_cached_inputs(payload.inputs_key)
+        expected_returns = expected_returns or inputs["expected_returns"]
+        risk_matrix = risk_matrix or inputs["risk_matrix"]
+    return expected_returns, risk_matrix
+
+
 # === Hierarchical Risk Parity (HRP) allocation ===
 @router.post("/hrp")
 async def compute_hrp(payload: HrpPayload):
@@ -54,6 +133,7 @@ async def compute_hrp(payload: HrpPayload):
         payload: HrpPayload containing a risk_matrix dict:
             - symbols: list of symbols
             - cov_matrix: 2D list representing the covariance matrix
+            or an inputsKey from /inputs/fromPrices
 
     Returns:
         Dict of symbol -> HRP weight
@@ -62,6 +142,8 @@ async def compute_hrp(payload: HrpPayload):
         HTTPException: if risk_matrix is missing or invalid
     """
     risk_matrix_data = payload.riskMatrix
+    if not risk_matrix_data and payload.inputsKey:
+        risk_matrix_data = _resolve_cached_inputs(payload.inputsKey)["risk_matrix"]
     if not risk_matrix_data:
         raise HTTPException(status_code=404, detail="No risk_matrix provided")
 
@@ -79,7 +161,9 @@ async def compute_hrp(payload: HrpPayload):
 
 # === Optimized portfolio allocation ===
 @router.post("/optimise")
-async def compute_optimized_portfolio(payload: OptimisePayload):
+def compute_optimized_portfolio(
+    payload: OptimisePayload, profile: Optional[ProfileSession] = Depends(request_profile("portfolio_optimisation"))
+):
     """
     Compute an optimized portfolio allocation using mean-variance and baseline regularization.
 
@@ -89,23 +173,87 @@ async def compute_optimized_portfolio(payload: OptimisePayload):
             - risk_matrix: dict with covariance matrix
             - baseline_weights: dict of baseline weights
             - params: dict containing risk_aversion, baseline_reg, min_weight, max_weight
+            - inputs_key: optional key from /inputs/fromPrices replacing
+              expected_returns and risk_matrix
 
     Returns:
         Dict of symbol -> optimized weight
     
     Raises:
         HTTPException: if optimization fails
+
+    Runs in a worker thread: the solve holds the cached problem's lock,
+    which a concurrent sweep may hold for a while. An X-Profile header runs
+    the request under the profiler.
+    """
+    with profiled(profile):
+        expected_returns, risk_matrix = _resolve_optimise_inputs(payload)
+
+        try:
+            weights = optimise_portfolio(
+                mu_dict=expected_returns,
+                cov_dict=risk_matrix,
+                w_baseline_dict=payload.baseline_weights,
+                risk_aversion=payload.params["risk_aversion"]["value"],
+                baseline_reg=payload.params["baseline_reg"]["value"],
+                min_weight=payload.params["min_weight"]["value"],
+                max_weight=payload.params["max_weight"]["value"]
+            )
+            return {"weights": weights}
+        except Exception as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+
+# === Efficient frontier / parameter grid sweep ===
+@router.post("/optimise/sweep")
+def sweep_optimised_portfolios(payload: OptimiseSweepPayload):
+    """
+    Solve the optimised allocation over many parameter values in one request.
+
+    The problem is built once for the symbol set and each grid point is solved
+    by updating parameters, warm-starting from the previous point. Runs in a
+    worker thread, and at most MAX_SWEEP_POINTS grid points are solved.
+
+    Args:
+        payload: OptimiseSweepPayload containing the OptimisePayload fields plus:
+            - grid: dict of parameter name -> list of values to sweep
+              (risk_aversion, baseline_reg, min_weight, max_weight)
+            - frontier_points: optional number of log-spaced risk_aversion values
+              over risk_aversion_range, for an efficient frontier sweep
+
+    Returns:
+        Dict with "points": list of {params, weights, expected_return, volatility, status}
+
+    Raises:
+        HTTPException: 400 if the sweep is invalid, 500 if optimisation fails
     """
+    expected_returns, risk_matrix = _resolve_optimise_inputs(payload)
+
+    try:
+        base_params = {name: payload.params[name]["value"] for name in
+                       ("risk_aversion", "baseline_reg", "min_weight", "max_weight")}
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=f"Missing optimisation parameter: {e}")
+    grid = dict(payload.grid)
+    if payload.frontier_points:
+        if payload.frontier_points > MAX_SWEEP_POINTS:
+            raise HTTPException(status_code=400, detail=f"frontier_points must be at most {MAX_SWEEP_POINTS}")
+        low, high = payload.risk_aversion_range
+        grid["risk_aversion"] = np.logspace(np.log10(low), np.log10(high), payload.frontier_points).tolist()
+
+    if not grid:
+        raise HTTPException(status_code=400, detail="No sweep grid or frontier_points provided")
+
     try:
-        weights = optimise_portfolio(
-            mu_dict=payload.expected_returns,
-            cov_dict=payload.risk_matrix,
+        points = sweep_portfolios(
+            mu_dict=expected_returns,
+            cov_dict=risk_matrix,
             w_baseline_dict=payload.baseline_weights,
-            risk_aversion=payload.params["risk_aversion"]["value"],
-            baseline_reg=payload.params["baseline_reg"]["value"],
-            min_weight=payload.params["min_weight"]["value"],
-            max_weight=payload.params["max_weight"]["value"]
+            base_params=base_params,
+            grid=grid
         )
-        return {"weights": weights}
+        return {"points": points}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=f"Sweep failed: {e}")
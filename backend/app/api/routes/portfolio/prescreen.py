@@ -2,25 +2,33 @@ import asyncio
 import json
 import os
 import uuid
+from typing import Optional
 
-from fastapi import APIRouter, BackgroundTasks, Depends
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.database import get_db
 from app.schemas import PreScreenPayload
 from app.services.portfolio.stages.prescreen.run_prescreen import run_tests
+from app.services.scheduler import BATCH, cpu_scheduler
 from app.stores.task_stores import prescreen_tasks_store as tasks_store
+from app.utils.cancellation import TaskCancelled, cancel_task, register_cancellation, release_cancellation
+from app.utils.profiling import ProfileSession, profiled, request_profile
 
 router = APIRouter()
 
+# Seconds an idle SSE stream waits before sending a keepalive comment
+SSE_KEEPALIVE_SECONDS = 15
+
 
 # === 1. Start pre-screening ===
 @router.post("/runPreScreen/")
 async def run_prescreen_tests(
     payload: PreScreenPayload,
     background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    profile: Optional[ProfileSession] = Depends(request_profile("prescreen"))
 ):
     """
     Start a background pre-screening task for a list of symbols.
@@ -29,6 +37,9 @@ async def run_prescreen_tests(
         payload: PreScreenPayload containing symbols, date range, and filters
         background_tasks: FastAPI BackgroundTasks to schedule async execution
         db: SQLAlchemy session (dependency)
+        profile: set when an X-Profile header asks to profile the run; the
+            event loop is profiled while the task runs (symbol tests run in
+            worker processes and are not)
 
     Returns:
         dict: {task_id: <uuid>}
@@ -46,27 +57,46 @@ async def run_prescreen_tests(
     end = payload.end
     filters = payload.filters
 
-    # Callback to update progress in the task store
+    # Callback to publish each flushed progress snapshot to the task store
     def progress_cb(progress):
-        tasks_store[task_id]["progress"] = progress
+        tasks_store.publish(task_id, progress=progress)
 
     # Async background task to run pre-screen tests
+    token = register_cancellation("prescreen", task_id)
+
     async def background_task_async():
-        print(f"[TASK {task_id}] starting pre-screen tests")
-        try:
-            max_workers = min(len(symbols), os.cpu_count() or 4)
-            results, fails = await run_tests(
-                symbols,
-                start,
-                end,
-                filters,
-                max_workers=max_workers,
-                progress_callback=progress_cb,
-                task_id=task_id
-            )
-            print(f"[TASK {task_id}] finished successfully")
-        except Exception as e:
-            print(f"[TASK {task_id}] failed: {e}")
+        with profiled(profile):
+            print(f"[TASK {task_id}] starting pre-screen tests")
+            try:
+                # Wait for CPU slots; the test pool is sized by the slots granted.
+                # A full-universe batch job, so it queues behind interactive requests
+                async with cpu_scheduler.acquire_async(
+                    BATCH,
+                    slots=min(len(symbols), os.cpu_count() or 4),
+                    label="prescreen",
+                    on_queue=lambda info: tasks_store.publish(task_id, queue=info),
+                    cancel_token=token
+                ) as ticket:
+                    results, fails = await run_tests(
+                        symbols,
+                        start,
+                        end,
+                        filters,
+                        max_workers=ticket.granted,
+                        progress_callback=progress_cb,
+                        task_id=task_id,
+                        cancel_token=token
+                    )
+                print(f"[TASK {task_id}] finished successfully")
+            except TaskCancelled:
+                # Cancelled while queued: publish a final cancelled snapshot for the SSE stream
+                progress = dict(tasks_store.snapshot(task_id, ["progress"])["progress"], cancelled=True)
+                tasks_store.publish(task_id, progress=progress)
+                print(f"[TASK {task_id}] cancelled before starting")
+            except Exception as e:
+                print(f"[TASK {task_id}] failed: {e}")
+            finally:
+                release_cancellation("prescreen", task_id)
 
     asyncio.create_task(background_task_async())
 
@@ -83,34 +113,55 @@ async def stream_progress(task_id: str):
         task_id: UUID of the task to stream
 
     Returns:
-        StreamingResponse: text/event-stream of progress updates
+        StreamingResponse: text/event-stream of progress updates, including
+        the CPU scheduler "queue" state (position, estimated start) once known
     """
     async def event_generator():
-        last_progress = {"testing": -1, "completed": -1}
+        last_progress = last_queue = None
+        version = -1
         while True:
-            progress = tasks_store.get(task_id, {}).get(
-                "progress", {"testing": 0, "completed": 0, "total": 0}
-            )
-
-            # Yield only when progress changes
-            if (progress["completed"] != last_progress["completed"] or
-                progress["testing"] != last_progress["testing"]):
-                last_progress = progress.copy()
-                yield f"data: {json.dumps(progress)}\n\n"
-
-            # Task is complete
-            if progress["completed"] >= progress["total"]:
-                final_event = last_progress.copy()
+            # Each flush replaces the progress dict, so a new object is a new snapshot
+            task = tasks_store.snapshot(task_id, ["progress", "queue"]) or {}
+            progress = task.get("progress") or {"testing": 0, "completed": 0, "total": 0}
+            queue = task.get("queue")
+
+            if progress is not last_progress or queue is not last_queue:
+                last_progress, last_queue = progress, queue
+                event = dict(progress, queue=queue) if queue is not None else progress
+                yield f"data: {json.dumps(event)}\n\n"
+
+            # Task is complete or cancelled
+            if progress["completed"] >= progress["total"] or progress.get("cancelled"):
+                final_event = dict(progress)
                 final_event["done"] = True
                 yield f"data: {json.dumps(final_event)}\n\n"
                 break
 
-            await asyncio.sleep(0.1)
+            # Sleep until the task publishes a new snapshot
+            new_version = await tasks_store.wait_for_update(task_id, version, timeout=SSE_KEEPALIVE_SECONDS)
+            if new_version == version:
+                yield ": keepalive\n\n"
+            version = new_version
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
 
-# === 3. Retrieve final pre-screening results ===
+# === 3. Cancel a running pre-screen ===
+@router.post("/cancelPreScreen/{task_id}")
+def cancel_prescreen(task_id: str):
+    """
+    Cancel a running pre-screening task.
+
+    No further symbols are fetched or submitted and queued tests are dropped;
+    the final progress event carries "cancelled": true. Results for symbols
+    already tested remain available.
+    """
+    if not cancel_task("prescreen", task_id):
+        raise HTTPException(status_code=404, detail="Task not found or not running")
+    return {"task_id": task_id, "status": "cancelling"}
+
+
+# === 4. Retrieve final pre-screening results ===
 @router.get("/getPreScreenResults/{task_id}")
 def get_prescreen_results(task_id: str):
     """
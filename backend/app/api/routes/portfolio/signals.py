@@ -0,0 +1,61 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.services.portfolio.signal_refresh import refresh_portfolio_signals
+
+router = APIRouter()
+
+
+# === Refresh signals for saved portfolios ===
+@router.post("/signals/refresh")
+def refresh_signals(
+    portfolio_id: Optional[List[int]] = Query(None),
+    end: Optional[date] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Advance the streaming signals of saved portfolios to the latest stored
+    prices, e.g. after the daily ingestion.
+
+    Args:
+        portfolio_id: Optional portfolio ids to refresh (repeatable; default all)
+        end: Optional last date to apply (YYYY-MM-DD, default today)
+        db: SQLAlchemy session (dependency)
+
+    Returns:
+        dict: per portfolio signals and positions, signal count and elapsed_ms
+    """
+    try:
+        return refresh_portfolio_signals(db, portfolio_id, end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# === Current signals for one saved portfolio ===
+@router.get("/signals/{portfolio_id}")
+def get_signals(portfolio_id: int, db: Session = Depends(get_db)):
+    """
+    Latest signals and positions for one saved portfolio, refreshed
+    incrementally from stored prices.
+
+    Args:
+        portfolio_id: Saved portfolio id
+        db: SQLAlchemy session (dependency)
+
+    Returns:
+        dict: the portfolio's entry from the refresh
+
+    Raises:
+        HTTPException: If the portfolio does not exist
+    """
+    try:
+        result = refresh_portfolio_signals(db, [portfolio_id])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not result["portfolios"]:
+        raise HTTPException(status_code=404, detail=f"Portfolio {portfolio_id} not found")
+    return result["portfolios"][0]
@@ -1,4 +1,4 @@
-from .prices import get_prices, get_prices_light, upsert_prices, upsert_prices_with_retry
+from .prices import get_closes, get_prices, get_prices_light, upsert_prices, upsert_prices_with_retry
 from .symbols import get_all_symbols
 from .strategies import save_backtest_result, get_backtest_results
-from .missing_data import insert_missing_data
+from .missing_data import insert_missing_data, insert_missing_ranges
@@ -1,3 +1,5 @@
+from sqlalchemy import insert
+
 from app.models import MissingPriceRange
 
 def insert_missing_data(db, symbol, start_date, end_date, error_message):
@@ -11,3 +13,38 @@ def insert_missing_data(db, symbol, start_date, end_date, error_message):
     db.commit()
     db.refresh(record)
     return record
+
+
+def insert_missing_ranges(db, ranges, chunk_size=500):
+    """
+    Bulk insert missing price ranges, skipping ones already recorded.
+
+    Args:
+        db: SQLAlchemy session
+        ranges: iterable of (symbol, start_date, end_date, reason)
+        chunk_size: symbols per existence check (bounds the IN clause)
+
+    Returns:
+        int: number of ranges inserted
+    """
+    by_key = {(symbol, start, end): reason for symbol, start, end, reason in ranges}
+    symbols = sorted({key[0] for key in by_key})
+
+    existing = set()
+    for i in range(0, len(symbols), chunk_size):
+        rows = (
+            db.query(MissingPriceRange.symbol, MissingPriceRange.start_date, MissingPriceRange.end_date)
+            .filter(MissingPriceRange.symbol.in_(symbols[i:i + chunk_size]))
+            .all()
+        )
+        existing.update(tuple(row) for row in rows)
+
+    new_rows = [
+        {"symbol": symbol, "start_date": start, "end_date": end, "reason": reason}
+        for (symbol, start, end), reason in by_key.items()
+        if (symbol, start, end) not in existing
+    ]
+    if new_rows:
+        db.execute(insert(MissingPriceRange), new_rows)
+        db.commit()
+    return len(new_rows)
@@ -4,7 +4,6 @@ import uuid
 from datetime import date
 from typing import List, Optional
 
-import pyodbc
 from sqlalchemy import text
 from sqlalchemy.engine import Engine
 from sqlalchemy.exc import OperationalError
@@ -12,6 +11,7 @@ from sqlalchemy.orm import Session
 
 from app.models.prices import Price
 from app.schemas.data.prices import PriceIn
+from app.stores.cache_stores import bump_price_data_version
 
 
 # === Get historical OHLCV data for one or more symbols ===
@@ -59,6 +59,29 @@ def get_prices(
     return query.order_by(Price.date.asc()).all()
 
 
+# === Close prices only, for return-based calculations ===
+def get_closes(db: Session, symbols: List[str], start: Optional[date] = None, end: Optional[date] = None):
+    """
+    Retrieve (symbol, date, close) rows for a list of symbols without loading
+    full ORM objects.
+
+    Args:
+        db: SQLAlchemy session
+        symbols: List of symbols to fetch
+        start: Optional start date
+        end: Optional end date
+
+    Returns:
+        List of (symbol, date, close) rows ordered by date ascending
+    """
+    query = db.query(Price.symbol, Price.date, Price.close).filter(Price.symbol.in_(symbols))
+    if start:
+        query = query.filter(Price.date >= start)
+    if end:
+        query = query.filter(Price.date <= end)
+    return query.order_by(Price.date.asc()).all()
+
+
 # === Lightweight price fetch using raw SQL ===
 def get_prices_light(db, symbols, start, end, lookback=0):
     """
@@ -114,16 +137,48 @@ def get_prices_light(db, symbols, start, end, lookback=0):
 
 
 # === Upsert prices in bulk ===
+def _upsert_prices_sqlite(engine: Engine, price_list: list):
+    """
+    Atomic bulk upsert into the SQLite prices table with INSERT ... ON CONFLICT.
+    Later rows win for duplicate (symbol, date) entries.
+    """
+    upsert_sql = """
+        INSERT INTO prices (symbol, date, open, high, low, close, volume)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol, date) DO UPDATE SET
+            open = excluded.open,
+            high = excluded.high,
+            low = excluded.low,
+            close = excluded.close,
+            volume = excluded.volume
+    """
+    with engine.begin() as connection:
+        cursor = connection.connection.cursor()
+        cursor.executemany(
+            upsert_sql,
+            ((p.symbol, p.date.isoformat(), p.open, p.high, p.low, p.close, p.volume) for p in price_list)
+        )
+        cursor.close()
+
+
 def upsert_prices(db: Session, symbol: str, price_list: list, start=None, end=None, chunk_size: int = 500):
     """
-    Efficient, atomic bulk upsert into dbo.prices using SQL Server MERGE.
+    Efficient, atomic bulk upsert into dbo.prices using SQL Server MERGE
+    (INSERT ... ON CONFLICT on SQLite).
     Handles duplicate (symbol, date) entries gracefully.
+
+    `price_list` holds PriceIn objects or any rows with the same attributes.
     """
     if not price_list:
         return
 
     engine: Engine = db.get_bind()
 
+    if engine.dialect.name == "sqlite":
+        _upsert_prices_sqlite(engine, price_list)
+        bump_price_data_version(symbol, min(p.date for p in price_list))
+        return
+
     with engine.begin() as connection:
         raw_conn = connection.connection
         cursor = raw_conn.cursor()
@@ -230,6 +285,18 @@ def upsert_prices(db: Session, symbol: str, price_list: list, start=None, end=No
         cursor.execute(f"DROP TABLE {temp_table};")
         cursor.close()
 
+    # Invalidate caches derived from stored prices
+    bump_price_data_version(symbol, min(p.date for p in price_list))
+
+
+def _retryable_errors():
+    """Errors that may report a deadlock; raw pyodbc errors only exist when the ODBC driver is installed."""
+    try:
+        import pyodbc
+    except ImportError:
+        return (OperationalError,)
+    return (pyodbc.Error, OperationalError)
+
 
 def upsert_prices_with_retry(db, symbol, price_list, start, end, chunk_size=500, retries=5, delay=2):
     for attempt in range(retries):
@@ -243,7 +310,7 @@ def upsert_prices_with_retry(db, symbol, price_list, start, end, chunk_size=500,
                 time.sleep(delay)
                 continue
             break
-        except (pyodbc.Error, OperationalError) as e:
+        except _retryable_errors() as e:
             if "1205" in str(e):  # Deadlock victim
                 if attempt < retries - 1:
                     print(f"Deadlock detected, retrying {attempt+1}/{retries}...")
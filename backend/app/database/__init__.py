@@ -1,2 +1,2 @@
 from .database import Base, SessionLocal, engine, get_db
-from .database_async import init_db_pool, close_db_pool, get_connection, release_connection
\ No newline at end of file
+from .database_async import init_db_pool, close_db_pool, get_connection, release_connection, pool_stats
@@ -1,12 +1,13 @@
 import logging
 import os
-import pyodbc
 from typing import Generator
 
 from dotenv import load_dotenv
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 
+from app.utils.query_log import install_query_log
+
 # Reduce SQLAlchemy engine logging
 logging.getLogger('sqlalchemy.engine').setLevel(logging.WARNING)
 
@@ -15,6 +16,25 @@ load_dotenv()  # load .env file
 
 DB_ENGINE = os.getenv("DB_ENGINE", "mssql")
 
+
+def sql_server_odbc_driver() -> str:
+    """
+    Newest installed SQL Server ODBC driver.
+
+    pyodbc is imported here rather than at module level, so sqlite
+    deployments never load the ODBC driver manager.
+
+    Raises:
+        RuntimeError if no SQL Server ODBC driver is installed
+    """
+    import pyodbc
+
+    drivers = [driver for driver in pyodbc.drivers() if "SQL Server" in driver and "ODBC" in driver]
+    if not drivers:
+        raise RuntimeError("No SQL Server ODBC drivers found!")
+    return sorted(drivers)[-1]
+
+
 if DB_ENGINE == "sqlite":
     SQLALCHEMY_DATABASE_URL = "sqlite:///app/data/QuantApp.db"
 
@@ -33,10 +53,7 @@ else:
     DB_INSTANCE = os.getenv("DB_INSTANCE", "SQLEXPRESS")
     DB_NAME = os.getenv("DB_NAME")
 
-    drivers = [driver for driver in pyodbc.drivers() if "SQL Server" in driver and "ODBC" in driver]
-    if not drivers:
-        raise RuntimeError("No SQL Server ODBC drivers found!")
-    DB_DRIVER = sorted(drivers)[-1]
+    DB_DRIVER = sql_server_odbc_driver()
 
     server = f"{DB_HOST}\\{DB_INSTANCE}" if DB_ENV == "local" else f"{DB_HOST},{DB_PORT}"
 
@@ -55,6 +72,9 @@ else:
         echo=False               # set True for SQL debug logs
     )
 
+# Per-fingerprint query stats and slow-query log (see app.utils.query_log)
+install_query_log(engine)
+
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
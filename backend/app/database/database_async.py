@@ -1,19 +1,17 @@
 from dotenv import load_dotenv
 import os
-import pyodbc
 
-import aioodbc
-import aiosqlite
 import asyncio
 
-# === Database connection string ===
+from .database import sql_server_odbc_driver
+
+# === Database connection settings ===
 load_dotenv()  # load .env file
 
 DB_ENGINE = os.getenv("DB_ENGINE", "mssql")
 
-if DB_ENGINE == "sqlite":
-    DB_NAME = "QuantApp.db"
-    dsn = "sqlite:///app/data/QuantApp.db"
+# SQLite file shared with the sync engine
+SQLITE_PATH = "app/data/QuantApp.db"
 
 DB_ENV = os.getenv("APP_ENV", "local")
 DB_USER = os.getenv("DB_LOCAL_USER") if DB_ENV == "local" else os.getenv("DB_DOCKER_USER")
@@ -25,27 +23,27 @@ DB_NAME = os.getenv("DB_NAME")
 
 server = f"{DB_HOST}\\{DB_INSTANCE}" if DB_ENV == "local" else f"{DB_HOST},{DB_PORT}"
 
-drivers = [driver for driver in pyodbc.drivers() if "SQL Server" in driver and "ODBC" in driver]
-if not drivers:
-    raise RuntimeError("No SQL Server ODBC drivers found!")
-DB_DRIVER = sorted(drivers)[-1]
 
-dsn = (
-    f"Driver={DB_DRIVER};"
-    f"Server={server};"
-    f"Database={DB_NAME};"
-    f"UID={DB_USER};"
-    f"PWD={DB_PASSWORD};"
-    "TrustServerCertificate=yes;"
-)
+def mssql_dsn() -> str:
+    """ODBC connection string; enumerates drivers, so it is only built for mssql."""
+    return (
+        f"Driver={sql_server_odbc_driver()};"
+        f"Server={server};"
+        f"Database={DB_NAME};"
+        f"UID={DB_USER};"
+        f"PWD={DB_PASSWORD};"
+        "TrustServerCertificate=yes;"
+    )
 
 _pool = None
 _pool_lock = asyncio.Lock()
 
 
-async def init_db_pool(minsize: int = 1, maxsize: int = 10) -> aioodbc.Pool:
+async def init_db_pool(minsize: int = 1, maxsize: int = 10):
     """
-    Initialize the global aioodbc connection pool.
+    Initialize the global connection pool: an aioodbc pool for mssql, a
+    single aiosqlite connection for sqlite. The driver is imported here so
+    only the configured one is loaded.
 
     Returns:
         The initialized pool.
@@ -54,10 +52,14 @@ async def init_db_pool(minsize: int = 1, maxsize: int = 10) -> aioodbc.Pool:
     async with _pool_lock:
         if _pool is None:
             if DB_ENGINE == "sqlite":
-                _pool = await aiosqlite.connect(DB_NAME)
+                import aiosqlite
+
+                _pool = await aiosqlite.connect(SQLITE_PATH)
             else:
+                import aioodbc
+
                 _pool = await aioodbc.create_pool(
-                    dsn=dsn,
+                    dsn=mssql_dsn(),
                     minsize=minsize,
                     maxsize=maxsize,
                     autocommit=True
@@ -77,7 +79,19 @@ async def close_db_pool():
         _pool = None
 
 
-async def get_connection() -> aioodbc.Connection:
+def pool_stats():
+    """
+    Connection counts of the global pool: {"size", "free", "maxsize"} for
+    aioodbc, a single connection for sqlite, or None before initialisation.
+    """
+    if _pool is None:
+        return None
+    if DB_ENGINE == "sqlite":
+        return {"size": 1, "free": None, "maxsize": 1}
+    return {"size": _pool.size, "free": _pool.freesize, "maxsize": _pool.maxsize}
+
+
+async def get_connection():
     """
     Acquire a connection from the global pool.
 
@@ -91,7 +105,7 @@ async def get_connection() -> aioodbc.Connection:
     return await _pool.acquire()
 
 
-async def release_connection(conn: aioodbc.Connection):
+async def release_connection(conn):
     """Release a connection back to the global pool."""
     if _pool is not None and conn is not None and DB_ENGINE != "sqlite":
         await _pool.release(conn)
@@ -1,3 +1,4 @@
+import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -6,11 +7,15 @@ from sqlalchemy.orm import Session
 from app.api import (
     backtest, pairs, param_optimiser,
     data, symbols, metrics, 
-    portfolio_weights, save_portfolio, prescreen
+    portfolio_weights, save_portfolio, prescreen, signals,
+    tasks, monitoring
 )
 from app.data import portfolio_seed_data
 from app.models import Base, Portfolio
 from app.database import SessionLocal, engine, init_db_pool, close_db_pool
+from app.stores.cache_stores import backtest_result_cache
+from app.stores.task_stores import close_task_stores, maintain_task_stores
+from app.utils.prometheus import record_request_metrics
 
 def seed_portfolios(db: Session):
     # Only seed if table is empty
@@ -19,20 +24,25 @@ def seed_portfolios(db: Session):
             db.add(Portfolio(**portfolio))
         db.commit()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Seed portfolios on first creation
-with SessionLocal() as db:
-    seed_portfolios(db)
+def init_db():
+    """Create database tables and seed portfolios on first creation."""
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        seed_portfolios(db)
 
 # Lifespan context manager replaces on_event startup/shutdown
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: initialize DB pool
+    # Startup: create tables / seed data, then DB pool and task store eviction loop.
+    # Kept out of module import so importing the app (and spawned workers) stays cheap.
+    await asyncio.to_thread(init_db)
     await init_db_pool()
+    maintenance = asyncio.create_task(maintain_task_stores())
     yield
-    # Shutdown: close DB pool
+    # Shutdown: stop eviction loop, remove spill files and close DB pool
+    maintenance.cancel()
+    close_task_stores()
+    backtest_result_cache.close()
     await close_db_pool()
 
 # Initialize FastAPI with lifespan
@@ -57,6 +67,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency metrics, served by /api/internal/metrics (DB query metrics
+# are recorded by the query log installed on the engine)
+app.middleware("http")(record_request_metrics)
+
 # Include routers
 app.include_router(backtest.router, prefix="/api/strategies", tags=["Backtest"])
 app.include_router(data.router, prefix="/api/data", tags=["Data"])
@@ -67,6 +81,9 @@ app.include_router(param_optimiser.router, prefix="/api/params", tags=["Backtest
 app.include_router(prescreen.router, prefix="/api/portfolio", tags=["Portfolio"])
 app.include_router(portfolio_weights.router, prefix="/api/portfolio", tags=["Portfolio"])
 app.include_router(save_portfolio.router, prefix="/api/portfolio", tags=["Portfolio"])
+app.include_router(signals.router, prefix="/api/portfolio", tags=["Portfolio"])
+app.include_router(tasks.router, prefix="/api/internal", tags=["Internal"])
+app.include_router(monitoring.router, prefix="/api/internal", tags=["Internal"])
 
 # Database session dependency
 def get_db():
@@ -4,4 +4,4 @@ from .backtesting.backtest import StrategyRequest, StrategyResponse, BacktestRes
 from .backtesting.pairs import PairSelectionRequest	
 from .backtesting.param_optimisation import ParamOptimisationRequest
 from .data.symbols import SymbolsRequest
-from .portfolio.portfolio import PreScreenPayload, PortfolioInputsPayload, HrpPayload, OptimisePayload, SavePortfolioPayload, PortfolioOut
\ No newline at end of file
+from .portfolio.portfolio import PreScreenPayload, PortfolioInputsPayload, PortfolioInputsFromPricesPayload, HrpPayload, OptimisePayload, OptimiseSweepPayload, SavePortfolioPayload, PortfolioOut
\ No newline at end of file
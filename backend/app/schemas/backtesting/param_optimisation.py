@@ -17,6 +17,9 @@ class ParamOptimisationRequest(BaseModel):
     # Optional metric ranges for computing trial scores
     metricRanges: Optional[Dict[str, Any]]
 
+    # Optional client-chosen id for cancelling this run (default generated, returned as X-Run-Id)
+    runId: Optional[str] = None
+
     # Extra JSON schema for API documentation (FastAPI/OpenAPI)
     model_config = {
         "json_schema_extra": {
@@ -1,6 +1,6 @@
 from datetime import datetime, date
-from typing import List, Dict, Any, Optional
-from pydantic import BaseModel
+from typing import List, Dict, Any, Literal, Optional
+from pydantic import BaseModel, confloat, field_validator
 
 # Payload for pre-screening multiple symbols over a date range with optional filters
 class PreScreenPayload(BaseModel):
@@ -13,18 +13,51 @@ class PreScreenPayload(BaseModel):
 class PortfolioInputsPayload(BaseModel):
     returns: Dict[str, Any]             # Historical returns per symbol, e.g., {"AAPL": [...], "MSFT": [...]}
     ewma_decay: float = 0.94            # EWMA decay factor for risk calculations
+    cov_method: Literal["sample", "ewma"] = "sample"  # Covariance estimator
+    shrinkage: confloat(ge=0, le=1) = 0.0  # Shrinkage intensity towards the diagonal
+
+# Payload to compute portfolio inputs server-side from stored prices
+class PortfolioInputsFromPricesPayload(BaseModel):
+    symbols: List[str]                  # Symbols to include in the portfolio
+    start: date                         # Start of the price history used
+    end: date                           # End of the price history used
+    ewma_decay: float = 0.94            # EWMA decay factor for expected returns
+    cov_method: Literal["sample", "ewma"] = "sample"  # Covariance estimator
+    shrinkage: confloat(ge=0, le=1) = 0.0  # Shrinkage intensity towards the diagonal
 
 # Payload for computing Hierarchical Risk Parity (HRP) allocation
 class HrpPayload(BaseModel):
-    riskMatrix: Dict[str, Any]          # Covariance matrix and symbols, e.g., {"symbols": [...], "cov_matrix": [[...], ...]}
+    riskMatrix: Optional[Dict[str, Any]] = None  # Covariance matrix and symbols, e.g., {"symbols": [...], "cov_matrix": [[...], ...]}
+    inputsKey: Optional[str] = None     # Key of server-side inputs from /inputs/fromPrices, used if riskMatrix is omitted
 
 # Payload to optimise portfolio weights
 class OptimisePayload(BaseModel):
-    expected_returns: dict              # Expected returns per symbol, e.g., {"AAPL": 0.01, "MSFT": 0.008}
-    risk_matrix: dict                   # Covariance/risk matrix, e.g., {"symbols": [...], "cov_matrix": [[...], ...]}
+    expected_returns: Optional[dict] = None  # Expected returns per symbol, e.g., {"AAPL": 0.01, "MSFT": 0.008}
+    risk_matrix: Optional[dict] = None  # Covariance/risk matrix, e.g., {"symbols": [...], "cov_matrix": [[...], ...]}
+    inputs_key: Optional[str] = None    # Key of server-side inputs from /inputs/fromPrices, used if the above are omitted
     baseline_weights: dict              # Baseline portfolio weights, e.g., {"AAPL": 0.3, "MSFT": 0.25}
     params: Dict[str, Any] = {}        # Optional additional optimisation parameters (risk_aversion, baseline_reg, min/max weights)
 
+# Payload to sweep portfolio optimisations over a parameter grid or efficient frontier
+class OptimiseSweepPayload(OptimisePayload):
+    grid: Dict[str, List[float]] = {}   # Parameter name -> values to sweep, e.g., {"max_weight": [0.05, 0.1]}
+    frontier_points: Optional[int] = None  # Number of risk_aversion values for an efficient frontier sweep
+    risk_aversion_range: List[float] = [0.01, 100.0]  # [min, max] risk_aversion for the frontier (log-spaced)
+
+    # Ensure a frontier has at least two points
+    @field_validator("frontier_points")
+    def check_frontier_points(cls, v: Optional[int]) -> Optional[int]:
+        if v is not None and v < 2:
+            raise ValueError("frontier_points must be at least 2")
+        return v
+
+    # Ensure the frontier range is [low, high] with 0 < low < high (log-spaced)
+    @field_validator("risk_aversion_range")
+    def check_risk_aversion_range(cls, v: List[float]) -> List[float]:
+        if len(v) != 2 or not (0 < v[0] < v[1]):
+            raise ValueError("risk_aversion_range must be [low, high] with 0 < low < high")
+        return v
+
 # Payload to save an optimised portfolio
 class SavePortfolioPayload(BaseModel):
     portfolio: Dict[str, Any]           # Full portfolio data including weights and parameters per strategy
@@ -7,8 +7,9 @@ from ..helpers.backtest import (
     rebalance, prepare_price_matrix
 )
 from ..helpers.pairs import align_series
+from app.utils.timing import span
 
-def run_backtest(data, symbols, params, progress_callback=None):
+def run_backtest(data, symbols, params, progress_callback=None, cancel_token=None):
     """
     Run a backtest for single-stock and pairs trading strategies.
 
@@ -23,6 +24,8 @@ def run_backtest(data, symbols, params, progress_callback=None):
             Backtest parameters (initialCapital, slippage, transaction costs, etc.)
         progress_callback (callable): 
             Optional callback to report progress per date index
+        cancel_token (CancellationToken):
+            Optional token checked on every date; raises TaskCancelled once set
 
     Returns:
         list of dicts: equity curves, trades, and metrics per strategy_key
@@ -34,11 +37,13 @@ def run_backtest(data, symbols, params, progress_callback=None):
     initial_capital = params["initialCapital"]
 
     # --- 1. Convert raw OHLC lists to DataFrames for fast lookup ---
-    price_matrix = prepare_price_matrix(data, symbols)
+    with span("prepare_price_matrix"):
+        price_matrix = prepare_price_matrix(data, symbols)
 
     # --- 2. Generate signals ---
     start_date = pd.Timestamp(params["startDate"])
-    signal_matrix = pd.DataFrame(generate_signals(price_matrix, symbols, params))
+    with span("generate_signals"):
+        signal_matrix = pd.DataFrame(generate_signals(price_matrix, symbols, params))
     signal_matrix = signal_matrix.ffill()
     signal_matrix = signal_matrix.fillna(0)
     signal_matrix = signal_matrix.loc[signal_matrix.index >= start_date]
@@ -60,73 +65,79 @@ def run_backtest(data, symbols, params, progress_callback=None):
     equity_matrix = pd.DataFrame(0.0, index=trade_indicator.index, columns=trade_indicator.columns)
     
     # --- 3. Execute trades ---
-    idx = 0
-    
-    for symbol_key, info in symbols.items():
-        syms = info["symbols"]
-        strat = info["strategy"]
-        capital = initial_capital * info["weight"]
-        positions = [0] * len(syms)
-        all_trades[symbol_key] = []
-        for date in trade_indicator.index:
-            for sym in syms:
-                if price_matrix.at[date, sym] == 0:
-                    trade = 0
-                    break
+    with span("execution_loop"):
+        idx = 0
+
+        for symbol_key, info in symbols.items():
+            syms = info["symbols"]
+            strat = info["strategy"]
+            capital = initial_capital * info["weight"]
+            positions = [0] * len(syms)
+            all_trades[symbol_key] = []
+            for date in trade_indicator.index:
+                if cancel_token is not None:
+                    cancel_token.raise_if_cancelled()
+                for sym in syms:
+                    if price_matrix.at[date, sym] == 0:
+                        trade = 0
+                        break
+                    else:
+                        trade = trade_indicator.at[date, symbol_key]
+                pos = position_indicator.at[date, symbol_key]
+                if trade == 0:
+                    pass
+                elif pos == 0:
+                    capital, positions, trades = close_position(
+                        syms, price_matrix[syms], capital, positions, 
+                        entry_date_matrix.at[date, symbol_key], date,
+                        slippage_pct, transaction_pct, transaction_fixed
+                    )
+                    all_trades[symbol_key].extend([trade for trade in trades if trade["symbol"] in syms])
                 else:
-                    trade = trade_indicator.at[date, symbol_key]
-            pos = position_indicator.at[date, symbol_key]
-            if trade == 0:
-                pass
-            elif pos == 0:
-                capital, positions, trades = close_position(
-                    syms, price_matrix[syms], capital, positions, 
-                    entry_date_matrix.at[date, symbol_key], date,
-                    slippage_pct, transaction_pct, transaction_fixed
-                )
-                all_trades[symbol_key].extend([trade for trade in trades if trade["symbol"] in syms])
-            else:
-                positions, capital = open_position(
-                    strat, trade, price_matrix[syms],
-                    date, capital, positions,
-                    syms, slippage_pct, transaction_pct, transaction_fixed
-                )
+                    positions, capital = open_position(
+                        strat, trade, price_matrix[syms],
+                        date, capital, positions,
+                        syms, slippage_pct, transaction_pct, transaction_fixed
+                    )
             
-            equity_matrix.loc[date, symbol_key] = capital + sum(
-                position * price_matrix.at[date, sym] for position, sym in zip(positions, syms)
-            )
+                equity_matrix.loc[date, symbol_key] = capital + sum(
+                    position * price_matrix.at[date, sym] for position, sym in zip(positions, syms)
+                )
             
-        idx += 1
-        print(f"Progress: {idx}/{len(symbols.keys())}", end='\r')
-        if progress_callback:
-            try:
-                progress_callback(idx, len(symbols.keys()))
-            except Exception as e:
-                print(e)
-                pass
-
+            idx += 1
+            print(f"Progress: {idx}/{len(symbols.keys())}", end='\r')
+            if progress_callback:
+                try:
+                    progress_callback(idx, len(symbols.keys()))
+                except Exception as e:
+                    print(e)
+                    pass
 
     equity_matrix["overall"] = equity_matrix.sum(axis=1)
 
-    # --- 4. Build results ---
+    # --- 4. Build results (metrics added in a second pass, timed separately) ---
     results = []
-    for strategy_key in equity_matrix.columns:
-        curve = [
-            {"date": date.strftime("%Y-%m-%d"), "value": float(value)}
-            for date, value in equity_matrix[strategy_key].items()
-        ]
-        initial = initial_capital * symbols[strategy_key]["weight"] if strategy_key != "overall" else sum([initial_capital * symbols[strategy_key]["weight"] for strategy_key in symbols])
-        strategy_trades = all_trades[strategy_key] if strategy_key != "overall" else [trade for trade_list in all_trades.values() for trade in trade_list]
-        results.append({
-            "symbol": strategy_key if strategy_key != "overall" else "overall",
-            "strategy": symbols[strategy_key]["strategy"] if strategy_key != "overall" else "overall",
-            "initialCapital": initial,
-            "finalCapital": curve[-1]["value"] if curve else None,
-            "returnPct": ((curve[-1]["value"]/initial - 1)*100) if curve else None,
-            "equityCurve": curve,
-            "trades": strategy_trades,
-            "metrics": compute_metrics(curve),
-            "tradeStats": compute_trade_stats(strategy_trades)
-        })
-        
+    with span("build_results"):
+        for strategy_key in equity_matrix.columns:
+            curve = [
+                {"date": date.strftime("%Y-%m-%d"), "value": float(value)}
+                for date, value in equity_matrix[strategy_key].items()
+            ]
+            initial = initial_capital * symbols[strategy_key]["weight"] if strategy_key != "overall" else sum([initial_capital * symbols[strategy_key]["weight"] for strategy_key in symbols])
+            strategy_trades = all_trades[strategy_key] if strategy_key != "overall" else [trade for trade_list in all_trades.values() for trade in trade_list]
+            results.append({
+                "symbol": strategy_key if strategy_key != "overall" else "overall",
+                "strategy": symbols[strategy_key]["strategy"] if strategy_key != "overall" else "overall",
+                "initialCapital": initial,
+                "finalCapital": curve[-1]["value"] if curve else None,
+                "returnPct": ((curve[-1]["value"]/initial - 1)*100) if curve else None,
+                "equityCurve": curve,
+                "trades": strategy_trades,
+            })
+
+    with span("compute_metrics"):
+        for result in results:
+            result["metrics"] = compute_metrics(result["equityCurve"])
+            result["tradeStats"] = compute_trade_stats(result["trades"])
+
     return results
@@ -4,10 +4,9 @@ from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import numpy as np
 import pandas as pd
-import statsmodels.api as sm
-from statsmodels.tsa.stattools import adfuller
 
 from app.services.backtesting.helpers.pairs import compute_pair_score
+from app.utils.cancellation import CancellationToken, TaskCancelled, init_worker_cancellation, worker_token
 
 
 # === 1. Engle-Granger cointegration test ===
@@ -27,6 +26,8 @@ def engle_granger_test(y, x):
             cointegrated: True if p < 0.05
         }
     """
+    from statsmodels.tsa.stattools import adfuller  # heavy import, loaded on first use
+
     A = np.vstack([x, np.ones_like(x)]).T
     beta, alpha = np.linalg.lstsq(A, y, rcond=None)[0]
     residuals = y - (alpha + beta * x)
@@ -81,14 +82,32 @@ def process_pair(pair, df, w_corr, w_coint):
         "score": score,
     }
 
-def process_chunk(chunk, df, w_corr, w_coint):
+def process_chunk(chunk, df, w_corr, w_coint, cancel_token=None):
     chunk_results = []
     for pair in chunk:
+        # Abandon the rest of the chunk once the job is cancelled
+        if cancel_token is not None and cancel_token.cancelled:
+            break
         res = process_pair(pair, df, w_corr, w_coint)
         if res:
             chunk_results.append(res)
     return chunk_results
 
+
+# Aligned price frame, sent to each pool worker once by the initializer
+# instead of being pickled with every chunk
+_worker_df = None
+
+
+def _init_pairs_worker(df, cancel_token):
+    global _worker_df
+    _worker_df = df
+    init_worker_cancellation(cancel_token)
+
+
+def _process_chunk_shared(chunk, w_corr, w_coint):
+    return process_chunk(chunk, _worker_df, w_corr, w_coint, worker_token())
+
 # === 3. Main engine for parallel pair analysis ===
 def analyze_pairs(
     symbols,
@@ -97,8 +116,10 @@ def analyze_pairs(
     w_coint=0.5,
     max_workers=None,
     progress_callback=None,
-    chunk_size=100  # number of pairs per process
+    chunk_size=100,  # number of pairs per process
+    cancel_token=None
 ):
+    token = cancel_token or CancellationToken()
 
     # Convert price dicts to aligned DataFrame
     df = pd.DataFrame({
@@ -120,14 +141,20 @@ def analyze_pairs(
     chunks = [pairs_list[i:i+chunk_size] for i in range(0, total_pairs, chunk_size)]
 
     done = 0
-    with ProcessPoolExecutor(max_workers=max_workers) as executor:
-        futures = [executor.submit(process_chunk, chunk, df, w_corr, w_coint) for chunk in chunks]
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_pairs_worker, initargs=(df, token)) as executor:
+        futures = [executor.submit(_process_chunk_shared, chunk, w_corr, w_coint) for chunk in chunks]
+
+        # Drop queued chunks as soon as the job is cancelled; running chunks stop at their next pair
+        remove_callback = token.on_cancel(lambda: executor.shutdown(wait=False, cancel_futures=True))
         for future in as_completed(futures):
+            if token.cancelled:
+                raise TaskCancelled()
             chunk_result = future.result()
             results.extend(chunk_result)
             if progress_callback:
                 done += len(chunk_result)
                 progress_callback(done, total_pairs)
+        remove_callback()
 
     # Final callback
     if progress_callback:
@@ -0,0 +1,304 @@
+"""
+Event-driven paper trading over a replay of stored prices.
+
+Each bar from a ReplayFeed advances one streaming signal per strategy and
+executes the resulting trades through the backtest's cost model
+(`open_position` / `close_position`: slippage, percentage and fixed
+commissions), with the same per-key bookkeeping as `run_backtest`. Per-bar
+latency and throughput are reported, to check the engine keeps up with a
+full-universe bar rate.
+
+Usage (from backend/):
+    python -m app.services.backtesting.engines.paper_trader --portfolio 3
+    python -m app.services.backtesting.engines.paper_trader --strategy sma_crossover --speed 250
+
+Differences from a backtest over the same dates: prices are forward-filled
+as they arrive but never back-filled, positions are not force-closed on
+the final bar, and the minimum holding period is not applied.
+"""
+import argparse
+import json
+import time
+from datetime import date
+
+import numpy as np
+
+from ..helpers.backtest import open_position, close_position
+from app.database import SessionLocal
+from app.models import Portfolio
+from app.services.data.replay_feed import ReplayFeed
+from app.strategies.signal_registry import streaming_generators
+
+
+class _Quotes:
+    """The `.at[date, symbol]` lookup open_position / close_position read prices through."""
+
+    def __init__(self, rows: dict):
+        self.rows = rows
+
+    @property
+    def at(self):
+        return self
+
+    def __getitem__(self, item):
+        day, symbol = item
+        return self.rows[day][symbol]
+
+
+class _StrategyBook:
+    """One streaming signal and its slice of the trader's per-key arrays."""
+
+    def __init__(self, strategy, signal, offset, columns):
+        self.strategy = strategy
+        self.signal = signal
+        self.offset = offset
+        self.columns = columns
+
+
+class PaperTrader:
+    """
+    Paper trading engine for a set of symbol-strategy keys.
+
+    Args:
+        strategy_symbols: {key: {"symbols", "strategy", "weight"}}, as built
+            by prepare_backtest_inputs (key = "AAPL_momentum", "A-B_pairs_trading")
+        strategy_params: {strategy: params} passed to the streaming signals
+        params: cost parameters as for run_backtest (initialCapital,
+            slippage, transactionCostPct, fixedTransactionCost)
+        feed_symbols: symbol order of the feed's bars
+    """
+
+    def __init__(self, strategy_symbols: dict, strategy_params: dict, params: dict, feed_symbols: list):
+        self.slippage_pct = params.get("slippage", 0) / 100
+        self.transaction_pct = params.get("transactionCostPct", 0) / 100
+        self.transaction_fixed = params.get("fixedTransactionCost", 0)
+        self.initial_capital = params.get("initialCapital", 100_000)
+
+        self.feed_symbols = list(feed_symbols)
+        columns = {s: i for i, s in enumerate(self.feed_symbols)}
+        missing = len(self.feed_symbols)   # extra slot, always NaN, for symbols the feed lacks
+        # Last price per feed symbol, forward-filled
+        self.last = np.full(missing + 1, np.nan)
+
+        by_strategy = {}
+        for key, info in strategy_symbols.items():
+            by_strategy.setdefault(info["strategy"], []).append(key)
+
+        self.keys, self.legs, self.books = [], [], []
+        weights = []
+        for strategy, keys in by_strategy.items():
+            cls = streaming_generators.get(strategy)
+            if cls is None:
+                raise ValueError(f"Strategy '{strategy}' is not registered.")
+            signal = cls(["-".join(strategy_symbols[k]["symbols"]) for k in keys], strategy_params.get(strategy))
+            signal_columns = np.array([columns.get(s, missing) for s in signal.symbols], dtype=int)
+            self.books.append(_StrategyBook(strategy, signal, len(self.keys), signal_columns))
+            for key in keys:
+                self.keys.append(key)
+                self.legs.append(list(strategy_symbols[key]["symbols"]))
+                weights.append(strategy_symbols[key].get("weight", 1))
+
+        n_keys = len(self.keys)
+        self.leg_columns = np.full((n_keys, 2), missing, dtype=int)
+        for k, legs in enumerate(self.legs):
+            self.leg_columns[k, :len(legs)] = [columns.get(s, missing) for s in legs]
+        self.capital = self.initial_capital * np.asarray(weights, dtype=float)
+        self.starting_equity = float(self.capital.sum())
+        self.quantities = np.zeros((n_keys, 2))
+        self.entry_dates = [None] * n_keys
+        self.entry_prices = np.full((n_keys, 2), np.nan)
+
+        self.trades = []
+        self.equity_curve = []
+        self.latencies = []
+
+    @property
+    def symbols(self) -> list:
+        """Every symbol the keys trade, in first-seen order."""
+        return list(dict.fromkeys(s for legs in self.legs for s in legs))
+
+    # -----------------------------------------
+    # Per-bar processing
+    # -----------------------------------------
+    def on_bar(self, bar) -> float:
+        """Apply one ReplayBar: update signals, execute trades, mark equity. Returns the equity."""
+        started = time.perf_counter()
+        self.last[:-1] = np.where(np.isnan(bar.closes), self.last[:-1], bar.closes)
+
+        for book in self.books:
+            previous = book.signal.positions
+            book.signal.update(self.last[book.columns])
+            changes = book.signal.positions - previous
+            for i in np.flatnonzero(changes):
+                self._execute(book, book.offset + i, int(changes[i]), book.signal.positions[i], bar.date)
+
+        prices = self.last[self.leg_columns]
+        equity = float(self.capital.sum() + np.where(self.quantities != 0, self.quantities * prices, 0.0).sum())
+        self.equity_curve.append((bar.date, equity))
+        self.latencies.append(time.perf_counter() - started)
+        return equity
+
+    def _execute(self, book: _StrategyBook, k: int, trade: int, position: float, day):
+        """Trade key `k` as run_backtest does for a change in its forward-filled signal."""
+        legs = self.legs[k]
+        prices = self.last[self.leg_columns[k, :len(legs)]]
+        # Keys whose symbols have no price yet do not trade (the backtest's zero prices)
+        if np.all(prices > 0):
+            quantities = list(self.quantities[k, :len(legs)])
+            if position == 0:
+                quotes = _Quotes({self.entry_dates[k]: dict(zip(legs, self.entry_prices[k])), day: dict(zip(legs, prices))})
+                capital, quantities, trades = close_position(
+                    legs, quotes, self.capital[k], quantities, self.entry_dates[k], day,
+                    self.slippage_pct, self.transaction_pct, self.transaction_fixed
+                )
+                self.trades.extend({**t, "key": self.keys[k]} for t in trades)
+            else:
+                quotes = _Quotes({day: dict(zip(legs, prices))})
+                quantities, capital = open_position(
+                    book.strategy, trade, quotes, day, self.capital[k], quantities,
+                    legs, self.slippage_pct, self.transaction_pct, self.transaction_fixed
+                )
+            self.capital[k] = capital
+            self.quantities[k, :len(legs)] = quantities
+        self.entry_dates[k] = day
+        self.entry_prices[k, :len(legs)] = prices
+
+    # -----------------------------------------
+    # Event loop
+    # -----------------------------------------
+    def run(self, feed, progress_every: int = 0) -> dict:
+        """Consume `feed` bar by bar; return the summary."""
+        started = time.perf_counter()
+        for bar in feed:
+            equity = self.on_bar(bar)
+            if progress_every and (bar.index + 1) % progress_every == 0:
+                print(f"{bar.index + 1} bars ({bar.date}): equity {equity:,.2f}, "
+                      f"last bar {self.latencies[-1] * 1000:.3f} ms")
+        return self.summary(time.perf_counter() - started, feed)
+
+    def summary(self, elapsed: float = None, feed=None) -> dict:
+        """Final equity, trades, per-bar latency percentiles and throughput."""
+        latencies = np.asarray(self.latencies) * 1000
+        n_bars = len(latencies)
+        busy = latencies.sum() / 1000
+        start_equity = self.starting_equity
+        final = self.equity_curve[-1][1] if self.equity_curve else start_equity
+        summary = {
+            "bars": n_bars,
+            "keys": len(self.keys),
+            "symbols": len(self.symbols),
+            "trades": len(self.trades),
+            "initialCapital": start_equity,
+            "finalEquity": final,
+            "returnPct": (final / start_equity - 1) * 100 if start_equity else None,
+            "latency_ms": {
+                "mean": float(latencies.mean()) if n_bars else None,
+                **{f"p{q}": float(np.percentile(latencies, q)) if n_bars else None for q in (50, 95, 99)},
+                "max": float(latencies.max()) if n_bars else None,
+            },
+            "throughput": {
+                "bars_per_second": n_bars / busy if busy else None,
+                "key_updates_per_second": n_bars * len(self.keys) / busy if busy else None,
+            },
+        }
+        if elapsed is not None:
+            summary["elapsed_seconds"] = round(elapsed, 6)
+        if feed is not None:
+            summary["feed"] = feed.stats()
+            if feed.bars_per_second and n_bars:
+                # Keeping up: bars are processed within the interval they arrive at
+                summary["keeps_up"] = bool(np.percentile(latencies, 99) < 1000 / feed.bars_per_second)
+        return summary
+
+
+# -----------------------------------------
+# Command line
+# -----------------------------------------
+def _portfolio_inputs(db, portfolio_id: int):
+    """(strategy_symbols, strategy_params, start, end) for a saved portfolio."""
+    portfolio = db.query(Portfolio).filter(Portfolio.id == portfolio_id).first()
+    if portfolio is None:
+        raise ValueError(f"Portfolio {portfolio_id} not found")
+    strategy_symbols, strategy_params = {}, {}
+    for strategy, info in portfolio.data.items():
+        strategy_params[strategy] = info.get("params") or {}
+        for item in info["symbols"]:
+            legs = item["symbol"].split("-")
+            strategy_symbols[f"{'-'.join(legs)}_{strategy}"] = {
+                "symbols": legs, "strategy": strategy, "weight": item["weight"],
+            }
+    meta = portfolio.meta or {}
+    return strategy_symbols, strategy_params, meta.get("start"), meta.get("end")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paper trade a portfolio or strategy over replayed stored prices.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--portfolio", type=int, help="saved portfolio id")
+    source.add_argument("--strategy", help="run one strategy over every stored symbol, equally weighted")
+    parser.add_argument("--params", default="{}", help="strategy parameters as JSON (with --strategy)")
+    parser.add_argument("--start", help="first date (default: the portfolio's start)")
+    parser.add_argument("--end", help="last date (default: the portfolio's end)")
+    parser.add_argument("--speed", type=float, default=0.0, help="bars per second (0 = as fast as possible)")
+    parser.add_argument("--capital", type=float, default=100_000)
+    parser.add_argument("--slippage", type=float, default=0.1, help="percent per trade")
+    parser.add_argument("--transaction-pct", type=float, default=0.1, help="percent commission")
+    parser.add_argument("--fixed-cost", type=float, default=0.0, help="fixed commission per trade")
+    parser.add_argument("--progress-every", type=int, default=0, help="print every this many bars (0 = silent)")
+    args = parser.parse_args(argv)
+
+    params = {
+        "initialCapital": args.capital,
+        "slippage": args.slippage,
+        "transactionCostPct": args.transaction_pct,
+        "fixedTransactionCost": args.fixed_cost,
+    }
+    start = date.fromisoformat(args.start) if args.start else None
+    end = date.fromisoformat(args.end) if args.end else None
+
+    with SessionLocal() as db:
+        if args.portfolio is not None:
+            strategy_symbols, strategy_params, meta_start, meta_end = _portfolio_inputs(db, args.portfolio)
+            start = start or (date.fromisoformat(meta_start[:10]) if meta_start else None)
+            end = end or (date.fromisoformat(meta_end[:10]) if meta_end else None)
+            feed_symbols = list({s for info in strategy_symbols.values() for s in info["symbols"]})
+        else:
+            if args.strategy == "pairs_trading":
+                parser.error("--strategy runs single-symbol strategies; use --portfolio for pairs")
+            feed_symbols = None
+            strategy_params = {args.strategy: json.loads(args.params)}
+
+        feed = ReplayFeed(db, feed_symbols, start, end, bars_per_second=args.speed)
+        if args.portfolio is None:
+            weight = 1 / max(len(feed.symbols), 1)
+            strategy_symbols = {
+                f"{s}_{args.strategy}": {"symbols": [s], "strategy": args.strategy, "weight": weight}
+                for s in feed.symbols
+            }
+        trader = PaperTrader(strategy_symbols, strategy_params, params, feed.symbols)
+        summary = trader.run(feed, progress_every=args.progress_every)
+
+    latency = summary["latency_ms"]
+    throughput = summary["throughput"]
+    print(
+        f"{summary['bars']} bars x {summary['keys']} keys ({summary['symbols']} symbols), "
+        f"{summary['trades']} closed trades, equity {summary['initialCapital']:,.2f} -> "
+        f"{summary['finalEquity']:,.2f} ({summary['returnPct'] or 0:+.2f}%)"
+    )
+    if summary["bars"]:
+        print(
+            f"Per-bar latency: mean {latency['mean']:.3f} ms, p50 {latency['p50']:.3f} ms, "
+            f"p95 {latency['p95']:.3f} ms, p99 {latency['p99']:.3f} ms, max {latency['max']:.3f} ms"
+        )
+        print(
+            f"Throughput: {throughput['bars_per_second']:,.0f} bars/s, "
+            f"{throughput['key_updates_per_second']:,.0f} key updates/s; "
+            f"feed {summary['feed']['rows']:,} rows, {summary['feed']['fetch_seconds']:.2f}s in queries, "
+            f"wall {summary['elapsed_seconds']:.2f}s"
+        )
+    if "keeps_up" in summary:
+        print(f"Keeps up with {args.speed:g} bars/s: {'yes' if summary['keeps_up'] else 'no'}")
+
+
+if __name__ == "__main__":
+    main()
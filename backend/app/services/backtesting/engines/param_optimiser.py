@@ -1,12 +1,13 @@
 import asyncio
 import nest_asyncio
-import optuna
 
 from app.services.backtesting.helpers.optimisation import make_single_strategy_objective
 from app.stores.task_stores import param_optimisation_tasks_store as tasks_store
+from app.utils.cancellation import CancellationToken, TaskCancelled
+from app.utils.timing import collect_timings, span
 
 
-def _run_single_study(strategy_name, cfg, global_params, scoring_params, metric_ranges, window_length, n_trials):
+def _run_single_study(strategy_name, cfg, global_params, scoring_params, metric_ranges, window_length, n_trials, cancel_token=None):
     """
     Run a single Optuna study for one strategy.
 
@@ -17,10 +18,14 @@ def _run_single_study(strategy_name, cfg, global_params, scoring_params, metric_
         scoring_params (dict): Metrics for scoring trials
         window_length (int): Lookback window for evaluation
         n_trials (int): Number of Optuna trials
+        cancel_token (CancellationToken): Optional token; stops the study and the running trial
 
     Returns:
-        dict: Best params, best score, and aggregated results
+        dict: Best params, best score, and aggregated results (None if cancelled before any trial completed)
     """
+    import optuna  # heavy import, loaded on first use
+
+    token = cancel_token or CancellationToken()
 
     # Needed to allow nested event loops (e.g., when running in Jupyter / FastAPI background task)
     nest_asyncio.apply()
@@ -29,34 +34,52 @@ def _run_single_study(strategy_name, cfg, global_params, scoring_params, metric_
     study = optuna.create_study(direction="maximize")
 
     # Wrap the trial function with your custom objective
-    objective = make_single_strategy_objective(strategy_name, cfg, global_params, scoring_params, metric_ranges, window_length)
+    objective = make_single_strategy_objective(strategy_name, cfg, global_params, scoring_params, metric_ranges, window_length, token)
     
     def trial_callback(study, trial):
         """
         Called after each trial completes.
         Updates tasks_store with progress and best results.
         """
-        store_entry = tasks_store[strategy_name]
         completed_trials = len([t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE])
-        store_entry["completed_trials"] = completed_trials
+        with tasks_store.mutate(strategy_name) as store_entry:
+            store_entry["completed_trials"] = completed_trials
+
+            if completed_trials > 0:
+                store_entry["best_score"] = study.best_value
+                store_entry["best_params"] = study.best_params
 
-        if completed_trials > 0:
-            store_entry["best_score"] = study.best_value
-            store_entry["best_params"] = study.best_params
+        if token.cancelled:
+            study.stop()
 
     def wrapped_objective(trial):
         """
-        Wrap the original objective to store aggregated results in user_attrs.
+        Wrap the original objective to store aggregated results and the
+        trial's stage timings (incl. its walk-forward segments) in user_attrs.
         """
-        score, aggregated_results = objective(trial)
+        if token.cancelled:
+            study.stop()
+            raise optuna.TrialPruned()
+        try:
+            with collect_timings() as timings, span("optuna_trial"):
+                score, aggregated_results = objective(trial)
+        except TaskCancelled:
+            # The trial's backtest was stopped mid-run; record it as pruned
+            study.stop()
+            raise optuna.TrialPruned()
         trial.set_user_attr("aggregated_results", aggregated_results)
+        trial.set_user_attr("timings", timings.as_dict())
         return score
     
     # Run the optimisation
     study.optimize(wrapped_objective, n_trials=n_trials, n_jobs=1, callbacks=[trial_callback])
 
-    # Mark strategy as done in task store
-    tasks_store[strategy_name]["status"] = "done"
+    # Mark strategy as done (or cancelled) in task store
+    tasks_store.publish(strategy_name, status="cancelled" if token.cancelled else "done")
+
+    completed = [t for t in study.trials if t.state == optuna.trial.TrialState.COMPLETE]
+    if not completed:
+        return {"strategy": strategy_name, "best_params": None, "best_score": None, "aggregated_results": None}
 
     best_trial = study.best_trial
     best_aggregated_results = best_trial.user_attrs.get("aggregated_results")
@@ -69,7 +92,7 @@ def _run_single_study(strategy_name, cfg, global_params, scoring_params, metric_
     }
 
 
-async def optimise_multiple_strategies_async(strategies_config, global_params, scoring_params, metric_ranges, n_trials=50, window_length=3):
+async def optimise_multiple_strategies_async(strategies_config, global_params, scoring_params, metric_ranges, n_trials=50, window_length=3, cancel_token=None):
     """
     Run multiple strategies sequentially using asyncio.
 
@@ -79,6 +102,7 @@ async def optimise_multiple_strategies_async(strategies_config, global_params, s
         scoring_params (dict): Metrics to score trials
         n_trials (int): Number of trials per strategy
         window_length (int): Lookback window for evaluation
+        cancel_token (CancellationToken): Optional token; remaining strategies are skipped once set
 
     Returns:
         dict: {strategy_name: {best_params, aggregated_results}}
@@ -86,6 +110,10 @@ async def optimise_multiple_strategies_async(strategies_config, global_params, s
 
     results = {}
     for strategy_name, cfg in strategies_config.items():
+        if cancel_token is not None and cancel_token.cancelled:
+            tasks_store.publish(strategy_name, status="cancelled")
+            continue
+
         result = _run_single_study(
             strategy_name,
             cfg,
@@ -93,7 +121,8 @@ async def optimise_multiple_strategies_async(strategies_config, global_params, s
             scoring_params,
             metric_ranges, 
             window_length,
-            n_trials
+            n_trials,
+            cancel_token
         )
         results[result["strategy"]] = {
             "best_params": result["best_params"],
@@ -103,7 +132,7 @@ async def optimise_multiple_strategies_async(strategies_config, global_params, s
     return results
 
 
-def optimise_parameters(strategies_config, global_params, optimisation_params, scoring_params, metric_ranges):
+def optimise_parameters(strategies_config, global_params, optimisation_params, scoring_params, metric_ranges, cancel_token=None):
     """
     FastAPI synchronous entrypoint for parameter optimisation.
 
@@ -114,6 +143,7 @@ def optimise_parameters(strategies_config, global_params, optimisation_params, s
         global_params (dict)
         optimisation_params (dict): e.g., {"iterations": 50, "window_length": 3}
         scoring_params (dict)
+        cancel_token (CancellationToken): Optional token to stop the optimisation early
 
     Returns:
         dict: results per strategy
@@ -134,5 +164,7 @@ def optimise_parameters(strategies_config, global_params, optimisation_params, s
 
     # Run the async optimisation loop synchronously
     return asyncio.run(
-        optimise_multiple_strategies_async(strategies_config, global_params, scoring_params, metric_ranges, n_trials, window_length)
+        optimise_multiple_strategies_async(
+            strategies_config, global_params, scoring_params, metric_ranges, n_trials, window_length, cancel_token
+        )
     )
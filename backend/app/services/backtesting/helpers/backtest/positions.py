@@ -3,6 +3,7 @@ import pandas as pd
 from .advanced_params import apply_min_hold
 from .pricing import calc_effective_price, commission
 from app.strategies.signal_registry import generators
+from app.utils.indicators import prime_rolling_indicators
 
 # --- 1. Check trading signal ---
 def generate_signals(price_matrix: pd.DataFrame, symbols: dict, params=None):
@@ -42,6 +43,10 @@ def generate_signals(price_matrix: pd.DataFrame, symbols: dict, params=None):
         if generator is None:
             raise ValueError(f"Strategy '{strat}' is not registered.")
         sub_prices = price_matrix[[sym for symbols in items.values() for sym in symbols]]
+        sweep = params.get("indicatorSweep", {}).get(strat)
+        if sweep:
+            # Optimisation trial: compute the study's swept windows as one bank
+            prime_rolling_indicators(sub_prices, sweep["windows"], tuple(sweep["stats"]))
         signals_db = pd.DataFrame(index=sub_prices.index)
         if strat == "pairs_trading":
             for key, pair in items.items():
@@ -1,2 +1,3 @@
 from .data_aggregation import compute_walkforward_results, aggregate_walkforward_results
 from .data_preparation import create_walkforward_windows, prepare_backtest_inputs
+from .result_caching import backtest_cache_key, get_cached_backtest, store_cached_backtest
@@ -0,0 +1,90 @@
+import hashlib
+import json
+from datetime import date, datetime
+
+from app.stores.cache_stores import backtest_result_cache as cache, get_price_data_version, prices_unchanged_since
+
+
+def _canonical_value(value):
+    """Normalise values so equivalent requests serialise identically (e.g. 20 and 20.0)."""
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, dict):
+        return {str(k): _canonical_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_canonical_value(v) for v in value]
+    return str(value)
+
+
+def backtest_cache_key(kind: str, strategy_symbols: dict, params: dict, lookback: int, **extra) -> str:
+    """
+    Canonical hash of a backtest request.
+
+    Built from the outputs of `prepare_backtest_inputs`, so the order of
+    symbol items and parameters in the payload does not matter.
+
+    Args:
+        kind: request type, e.g. "backtest" or "walkforward"
+        strategy_symbols: mapping of symbol-strategy keys to their info
+        params: flattened parameter values, including startDate / endDate
+        lookback: maximum lookback across parameters
+        **extra: further settings that change the result (e.g. window_length)
+
+    Returns:
+        str: hex digest
+    """
+    items = sorted(
+        (info["strategy"], tuple(info["symbols"]), _canonical_value(info.get("weight", 1)))
+        for info in strategy_symbols.values()
+    )
+    canonical = {
+        "kind": kind,
+        "items": items,
+        "params": _canonical_value(params),
+        "lookback": int(lookback or 0),
+        "extra": _canonical_value(extra),
+    }
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def _as_date(value):
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], "%Y-%m-%d").date()
+
+
+def get_cached_backtest(key: str):
+    """
+    Look up a cached backtest result.
+
+    An entry is only served while no price write since it was computed has
+    touched its symbols on or before its end date.
+
+    Returns:
+        (value, cache_info) on a hit, (None, cache_info) on a miss
+    """
+    entry = cache.get(
+        key, is_valid=lambda meta: prices_unchanged_since(meta["version"], meta["symbols"], meta["end"])
+    )
+    if entry is None:
+        return None, {"hit": False, "key": key}
+    return entry.value, {"hit": True, "key": key, "tier": entry.tier, "cached_at": entry.created_at}
+
+
+def store_cached_backtest(key: str, value, symbols, end, version: int = None):
+    """
+    Cache a finished backtest result.
+
+    Args:
+        key: from `backtest_cache_key`
+        value: result to cache
+        symbols: symbols whose prices the result depends on
+        end: last date of the backtest
+        version: price data version read before the prices were fetched
+    """
+    if version is None:
+        version = get_price_data_version()
+    cache.set(key, value, {"version": version, "symbols": sorted(set(symbols)), "end": _as_date(end)})
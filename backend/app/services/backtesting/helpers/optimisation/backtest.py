@@ -4,6 +4,7 @@ from sqlalchemy.orm import Session
 
 from app.schemas import StrategyRequest
 from app.services.backtesting.tasks.walkforward_manager import run_walkforward_async
+from app.services.scheduler import BATCH
 from app.services.backtesting.helpers.data import (
     aggregate_walkforward_results,
     compute_walkforward_results,
@@ -11,9 +12,11 @@ from app.services.backtesting.helpers.data import (
     prepare_backtest_inputs,
 )
 from app.stores.task_stores import walkforward_tasks_store as tasks_store
+from app.strategies.signal_registry import indicator_sweep
+from app.utils.cancellation import TaskCancelled
 
 
-async def run_strategy_backtest(cfg, global_params, window_length=3):
+async def run_strategy_backtest(cfg, global_params, window_length=3, cancel_token=None, on_queue=None):
     """
     Run a full strategy backtest using a walk-forward approach.
 
@@ -30,7 +33,8 @@ async def run_strategy_backtest(cfg, global_params, window_length=3):
         cfg (dict): Backtest configuration including 'symbolItems' and 'trial_params'.
         global_params (dict): Global backtest parameters like capital, slippage, etc.
         window_length (int): Number of years per walk-forward segment.
-        db (Session): SQLAlchemy session dependency.
+        cancel_token (CancellationToken): Optional token stopping the walk-forward run.
+        on_queue (callable): Optional callback receiving scheduler queue info while waiting for CPU slots.
 
     Returns:
         aggregated (list[dict]): Aggregated performance metrics for each symbol-strategy pair.
@@ -51,6 +55,20 @@ async def run_strategy_backtest(cfg, global_params, window_length=3):
         params=params
     ))
 
+    # --- Share swept rolling indicators across the study's trials ---
+    # Swept window parameters are primed as one rolling bank per segment
+    # panel. Every trial fetches the study's largest lookback, so the panels
+    # are identical across trials and later trials find the bank cached
+    param_space = cfg.get("param_space") or {}
+    sweeps = {}
+    for strategy in {item["strategy"] for item in symbol_items}:
+        sweep = indicator_sweep(strategy, param_space)
+        if sweep:
+            sweeps[strategy] = sweep
+    if sweeps:
+        params["indicatorSweep"] = sweeps
+        lookback = max([lookback] + [int(p["max"]) for p in param_space.values() if p.get("lookback") and "max" in p])
+
     # --- Generate rolling walk-forward windows ---
     # Here, window_length=1 for yearly rolling windows
     windows = create_walkforward_windows(params["startDate"], params["endDate"], window_length=1)
@@ -59,13 +77,20 @@ async def run_strategy_backtest(cfg, global_params, window_length=3):
     task_id = str(uuid.uuid4())
 
     # --- Run asynchronous walk-forward backtest ---
-    # Await the async task directly instead of creating a separate task
+    # Await the async task directly instead of creating a separate task;
+    # optimisation trials queue for CPU slots behind interactive jobs
     await run_walkforward_async(
-        task_id, windows, all_symbols, strategy_symbols, params, lookback, window_length=window_length
+        task_id, windows, all_symbols, strategy_symbols, params, lookback,
+        window_length=window_length, cancel_token=cancel_token, priority=BATCH, on_queue=on_queue
     )
 
-    # Retrieve results from the in-memory task store
-    task = tasks_store[task_id]
+    # Retrieve results from the in-memory task store; the trial's task is
+    # internal, so remove it rather than leaving it for TTL eviction
+    task = tasks_store.pop(task_id)
+    if task["status"] == "cancelled":
+        raise TaskCancelled()
+    if task["status"] == "failed":
+        raise RuntimeError(f"Walk-forward backtest failed: {task.get('error')}")
     segments = [r for r in task["results"].values()]
 
     # Use walkforward window length from task metadata if available
@@ -5,7 +5,7 @@ from .scoring import composite_score
 from app.stores.task_stores import param_optimisation_tasks_store as tasks_store
 
 
-def make_single_strategy_objective(strategy_name, cfg, global_params, scoring_params, metric_ranges, window_length=3):
+def make_single_strategy_objective(strategy_name, cfg, global_params, scoring_params, metric_ranges, window_length=3, cancel_token=None):
     """
     Create an Optuna-compatible objective function for a single strategy.
 
@@ -18,11 +18,17 @@ def make_single_strategy_objective(strategy_name, cfg, global_params, scoring_pa
         global_params (dict): Global parameters for the backtest (capital, slippage, etc.).
         scoring_params (dict): Weights and metrics for composite scoring.
         window_length (int): Number of years per walk-forward segment.
+        cancel_token (CancellationToken): Optional token stopping the trial's backtest.
     
     Returns:
         objective (callable): Function that takes a trial and returns a score for Optuna.
     """
 
+    def publish_queue(info):
+        """Expose the trial's place in the CPU scheduler queue on the strategy's progress."""
+        if strategy_name in tasks_store:
+            tasks_store.publish(strategy_name, queue=info)
+
     async def async_objective(trial):
         """
         Asynchronous objective function to generate trial parameters and run backtest.
@@ -52,7 +58,9 @@ def make_single_strategy_objective(strategy_name, cfg, global_params, scoring_pa
         }
 
         # --- Run walk-forward backtest asynchronously ---
-        backtest_result = await run_strategy_backtest(backtest_cfg, global_params, window_length)
+        backtest_result = await run_strategy_backtest(
+            backtest_cfg, global_params, window_length, cancel_token, on_queue=publish_queue
+        )
 
         # Separate overall portfolio results vs individual symbol-strategy results
         overall_results = [r for r in backtest_result if r["symbol"] == "overall"]
@@ -63,10 +71,10 @@ def make_single_strategy_objective(strategy_name, cfg, global_params, scoring_pa
 
         # --- Update shared task store for progress tracking ---
         if strategy_name in tasks_store:
-            store_entry = tasks_store[strategy_name]
-            store_entry["completed_trials"] += 1
-            store_entry["best_params"] = trial_params
-            store_entry["best_score"] = score
+            with tasks_store.mutate(strategy_name) as store_entry:
+                store_entry["completed_trials"] += 1
+                store_entry["best_params"] = trial_params
+                store_entry["best_score"] = score
 
         return score, symbol_results
 
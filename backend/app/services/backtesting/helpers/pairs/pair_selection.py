@@ -1,5 +1,3 @@
-import networkx as nx
-
 def select_pairs_max_weight(pairs, weight_key="score"):
     """
     Select pairs of stocks using maximum weight matching on a graph.
@@ -13,6 +11,8 @@ def select_pairs_max_weight(pairs, weight_key="score"):
         list: Selected pairs (subset of input pairs) representing maximum weighted matching.
     """
 
+    import networkx as nx  # heavy import, loaded on first use
+
     # Create an undirected graph
     G = nx.Graph()
 
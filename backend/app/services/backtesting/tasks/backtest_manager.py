@@ -0,0 +1,203 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from app.database import SessionLocal
+from app.services.backtesting.helpers.data import compute_walkforward_results
+from app.services.backtesting.tasks.progress_channel import ProgressChannel, ProgressReporter
+from app.services.backtesting.tasks.segment_executor import init_segment_worker, run_segment
+from app.services.scheduler import INTERACTIVE, cpu_scheduler
+from app.stores.task_stores import backtest_tasks_store as tasks_store
+from app.utils.cancellation import CancellationToken, TaskCancelled, worker_token
+from app.utils.data_helpers import fetch_price_data, slice_price_data
+from app.utils.timing import collect_timings, timing_histograms
+
+# === Asynchronous backtest jobs ===
+# A job is one or more backtest runs over price data fetched once up front.
+# Runs execute in parallel in a process pool sized by the CPU scheduler's
+# grant; progress arrives over a ProgressChannel, results through the futures.
+# Stage timings (the fetch here, the runs' from the workers) are published
+# with the final status as "timings".
+
+
+async def run_backtest_job(task_id, all_symbols, strategy_symbols, params, lookback, cancel_token=None):
+    """
+    Run a standard full-period backtest as a background job.
+
+    Args:
+        task_id: unique task identifier
+        all_symbols: list of all symbols used in the backtest
+        strategy_symbols: dict mapping symbol-strategy keys to configs
+        params: global and strategy-specific parameters (incl. startDate / endDate)
+        lookback: rows of history needed before startDate
+        cancel_token: optional CancellationToken for this job
+    """
+    async def fetch():
+        return await asyncio.to_thread(
+            _fetch_price_data, all_symbols, params["startDate"], params["endDate"], lookback
+        )
+
+    def build_runs(data):
+        return [(data, strategy_symbols, params)] if data else []
+
+    await _run_job(task_id, fetch, build_runs, lambda results: results[0], cancel_token)
+
+
+async def run_portfolios_backtest_job(task_id, portfolios, cancel_token=None):
+    """
+    Backtest several portfolios in parallel and combine them into one result.
+
+    Prices for the union of all portfolios' symbols are fetched once, from
+    the earliest start (with the longest lookback) to the latest end, and
+    sliced per portfolio before running.
+
+    Args:
+        task_id: unique task identifier
+        portfolios: list of (all_symbols, strategy_symbols, params, lookback)
+            tuples, ordered by test end date
+        cancel_token: optional CancellationToken for this job
+    """
+    async def fetch():
+        symbols = sorted({symbol for all_symbols, _, _, _ in portfolios for symbol in all_symbols})
+        start = min(params["startDate"] for _, _, params, _ in portfolios)
+        end = max(params["endDate"] for _, _, params, _ in portfolios)
+        lookback = max(lookback for _, _, _, lookback in portfolios)
+        return await asyncio.to_thread(_fetch_price_data, symbols, start, end, lookback)
+
+    def build_runs(data):
+        runs = []
+        for all_symbols, strategy_symbols, params, lookback in portfolios:
+            subset = {symbol: data[symbol] for symbol in all_symbols if symbol in data}
+            portfolio_data = slice_price_data(subset, params["startDate"], params["endDate"], lookback)
+            if not portfolio_data:
+                return []
+            runs.append((portfolio_data, strategy_symbols, params))
+        return runs
+
+    def combine(results):
+        return compute_walkforward_results(results, len(results))[0]
+
+    await _run_job(task_id, fetch, build_runs, combine, cancel_token)
+
+
+async def _run_job(task_id, fetch, build_runs, combine, cancel_token=None, priority=INTERACTIVE):
+    """
+    Shared job lifecycle: fetching -> queued -> running -> done / failed / cancelled.
+
+    Args:
+        task_id: unique task identifier
+        fetch: coroutine function returning the price data
+        build_runs: callable(data) -> list of (data, strategy_symbols, params); empty if there is nothing to run
+        combine: callable(list of run results) -> final result published as "results"
+        cancel_token: optional CancellationToken for this job
+        priority: scheduler priority class
+    """
+    token = cancel_token or CancellationToken()
+    tasks_store.publish(task_id, status="fetching")
+
+    with collect_timings() as timings:
+        try:
+            data = await fetch()
+        except Exception as e:
+            print(f"Backtest job {task_id} failed to fetch prices: {e}")
+            tasks_store.publish(task_id, status="failed", error=str(e), timings=timings.as_dict())
+            return
+
+    runs = build_runs(data)
+    if not runs:
+        tasks_store.publish(
+            task_id, status="failed", error="No price data available for the given symbols", timings=timings.as_dict()
+        )
+        return
+
+    progress = {run_id: 0.0 for run_id in range(len(runs))}
+
+    def publish_progress():
+        tasks_store.publish(task_id, progress=dict(progress), overall_progress=sum(progress.values()) / len(progress))
+
+    def on_message(kind, run_id, payload):
+        if kind == "timings":
+            timings.merge(payload)
+            timing_histograms.observe_totals(payload)
+        elif kind == "progress" and progress[run_id] < 100.0:
+            progress[run_id] = payload
+            publish_progress()
+
+    async def run_one(run_id, run):
+        try:
+            result = await loop.run_in_executor(pool, run_backtest_in_worker, run_id, *run)
+        except (asyncio.CancelledError, RuntimeError):
+            # Run dropped (or refused) by the pool after the job was cancelled
+            if not token.cancelled:
+                raise
+            result = None
+        return run_id, result
+
+    loop = asyncio.get_running_loop()
+    channel = ProgressChannel(on_message, loop)
+    results = [None] * len(runs)
+    error = None
+    tasks_store.publish(task_id, status="queued", total_runs=len(runs))
+    try:
+        # --- Wait for CPU slots; the pool is sized by the slots granted ---
+        async with cpu_scheduler.acquire_async(
+            priority, slots=len(runs), label="backtest",
+            on_queue=lambda info: tasks_store.publish(task_id, queue=info), cancel_token=token
+        ) as ticket:
+            tasks_store.publish(task_id, status="running")
+
+            with ProcessPoolExecutor(
+                max_workers=ticket.granted, initializer=init_segment_worker, initargs=(channel.queue, token)
+            ) as pool:
+                remove_callback = token.on_cancel(lambda: pool.shutdown(wait=False, cancel_futures=True))
+
+                for completed in asyncio.as_completed([run_one(i, run) for i, run in enumerate(runs)]):
+                    run_id, result = await completed
+                    results[run_id] = result
+                    progress[run_id] = 100.0
+                    publish_progress()
+                remove_callback()
+    except TaskCancelled:
+        # Cancelled while still queued for CPU slots
+        pass
+    except Exception as e:
+        print(f"Backtest job {task_id} failed: {e}")
+        error = str(e)
+    finally:
+        # Workers have exited, so every queued message has been flushed
+        channel.close()
+
+    if token.cancelled:
+        tasks_store.publish(task_id, status="cancelled", ipc=channel.stats(), timings=timings.as_dict())
+    elif error is not None or any(not result for result in results):
+        tasks_store.publish(
+            task_id, status="failed", error=error or "No price data found for given symbols", timings=timings.as_dict()
+        )
+    else:
+        final = await asyncio.to_thread(combine, results)
+        tasks_store.publish(task_id, status="done", results=final, ipc=channel.stats(), timings=timings.as_dict())
+
+
+def run_backtest_in_worker(run_id, data, strategy_symbols, params):
+    """Worker: run one backtest inside the job's pool, reporting progress under `run_id`."""
+    token = worker_token()
+    if token is not None and token.cancelled:
+        return None
+
+    reporter = ProgressReporter(run_id)
+    with collect_timings() as timings:
+        try:
+            return run_segment(run_id, data, strategy_symbols, params, reporter, token)
+        except TaskCancelled:
+            return None
+        finally:
+            reporter.send_timings(timings.as_dict())
+            reporter.close()
+
+
+def _fetch_price_data(symbols, start, end, lookback):
+    """Fetch OHLCV data with a session of its own, off the event loop."""
+    db = SessionLocal()
+    try:
+        return fetch_price_data(db, symbols, start, end, lookback)
+    finally:
+        db.close()
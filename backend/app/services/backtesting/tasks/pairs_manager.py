@@ -1,16 +1,48 @@
 import asyncio
-
-from fastapi import HTTPException
+import math
 
 from app.services.backtesting.engines.pairs_selection import analyze_pairs
+from app.services.scheduler import INTERACTIVE, cpu_scheduler
 from app.stores.task_stores import pairs_tasks_store as tasks_store
+from app.utils.cancellation import TaskCancelled
 from app.services.backtesting.helpers.pairs.pair_selection import select_pairs_max_weight
 
 
-# === Background worker ===
-def run_pair_selection_task(task_id, symbols, prices_dict, w_corr, w_coint, progress_state):
+# === Pair analysis and selection (runs in a worker thread) ===
+def select_pairs(symbols, prices_dict, w_corr, w_coint, progress_callback=None, cancel_token=None, max_workers=None):
+    """
+    Analyze all pairs and select the best ones with max-weight matching.
+
+    `analyze_pairs` fans the heavy work out to its own process pool and calls
+    `progress_callback` from this thread as chunks complete, so progress
+    needs no cross-process channel.
+
+    Returns:
+        dict: {"all_pairs": [...], "selected_pairs": [...]}
+    """
+    # --- 1. Analyze all possible pairs ---
+    pairs = analyze_pairs(
+        symbols,
+        prices_dict,
+        w_corr=w_corr,
+        w_coint=w_coint,
+        max_workers=max_workers,
+        progress_callback=progress_callback,
+        cancel_token=cancel_token,
+    )
+
+    # --- 2. Select best pairs using max-weight matching ---
+    selected = select_pairs_max_weight(pairs, weight_key="score")
+    return {"all_pairs": pairs, "selected_pairs": selected}
+
+
+# === Background task ===
+async def run_pair_selection_task(task_id, symbols, prices_dict, w_corr, w_coint, cancel_token=None):
     """
-    Run a pair selection task in the background.
+    Run a pair selection task in the background, publishing progress and
+    results to the pairs tasks_store. The analysis waits for CPU slots from
+    the shared scheduler (status "queued", with "queue" info) and its process
+    pool is sized by the slots granted.
 
     Args:
         task_id (str): Unique ID for this task.
@@ -18,65 +50,33 @@ def run_pair_selection_task(task_id, symbols, prices_dict, w_corr, w_coint, prog
         prices_dict (dict): Historical price data for each symbol.
         w_corr (float): Weight for correlation in pair scoring.
         w_coint (float): Weight for cointegration in pair scoring.
-        progress_state (dict): Shared dict to track task progress and results.
+        cancel_token (CancellationToken): Optional token to stop the analysis.
     """
 
-    # Callback to update progress during pair analysis
+    # Callback to update progress during pair analysis (called from the worker thread)
     def progress_callback(done, total):
-        progress_state["done"] = done
-        progress_state["total"] = total
-        progress_state["status"] = "running"
+        tasks_store.publish(task_id, done=done, total=total, status="running")
 
-    try:
-        # --- 1. Analyze all possible pairs ---
-        pairs = analyze_pairs(
-            symbols,
-            prices_dict,
-            w_corr=w_corr,
-            w_coint=w_coint,
-            progress_callback=progress_callback,
-        )
+    def publish_queue(info):
+        tasks_store.publish(task_id, queue=info, status="queued" if info["status"] == "queued" else "running")
 
-        # --- 2. Select best pairs using max-weight matching ---
-        selected = select_pairs_max_weight(pairs, weight_key="score")
+    # One slot per chunk of 100 pairs, as split by analyze_pairs
+    n_chunks = math.ceil(len(symbols) * (len(symbols) - 1) / 2 / 100)
 
-        # --- 3. Update progress state with results ---
-        progress_state.update({
-            "done": len(pairs),
-            "total": len(pairs),
-            "status": "done",
-            "results": {"all_pairs": pairs, "selected_pairs": selected},
-            "error": ""
-        })
+    try:
+        async with cpu_scheduler.acquire_async(
+            INTERACTIVE, slots=max(1, n_chunks), label="pairs", on_queue=publish_queue, cancel_token=cancel_token
+        ) as ticket:
+            # Results come back through the thread's future
+            results = await asyncio.to_thread(
+                select_pairs, symbols, prices_dict, w_corr, w_coint, progress_callback, cancel_token, ticket.granted
+            )
+
+        # --- Publish final results ---
+        total = len(results["all_pairs"])
+        tasks_store.publish(task_id, done=total, total=total, status="done", results=results, error="")
+    except TaskCancelled:
+        tasks_store.publish(task_id, status="cancelled", error="")
     except Exception as e:
         # Mark failure and store error message
-        progress_state.update({"status": "failed", "error": str(e)})
-
-
-# === Async listener for progress ===
-async def monitor_pair_selection_progress(task_id: str, progress_state):
-    """
-    Asynchronous monitor that periodically copies the shared progress
-    into the global tasks_store for frontend/API visibility.
-
-    Args:
-        task_id (str): Unique ID for the task being monitored.
-        progress_state (dict): Shared dict updated by the worker.
-    """
-    # Initialize store entry
-    tasks_store[task_id] = dict(progress_state)
-
-    while True:
-        # Mirror the latest progress to the store
-        tasks_store[task_id] = dict(progress_state)
-
-        # Exit once task completes or fails
-        if progress_state.get("status") == "done":
-            break
-
-        if progress_state.get("status") == "failed":
-            err_msg = progress_state.get("error")
-            raise HTTPException(status_code=400, detail=str(err_msg))
-
-        # Poll every 0.2 seconds
-        await asyncio.sleep(0.2)
+        tasks_store.publish(task_id, status="failed", error=str(e))
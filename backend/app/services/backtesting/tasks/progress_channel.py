@@ -0,0 +1,137 @@
+import asyncio
+import multiprocessing as mp
+import threading
+import time
+
+# === Worker -> parent progress channel ===
+# Worker processes put small (kind, key, payload) tuples on a multiprocessing
+# queue and a drain thread in the parent forwards them onto the event loop.
+# Results never travel through the channel: they come back through the
+# executor futures, pickled once.
+
+_worker_queue = None    # set in each pool worker by init_worker_channel
+
+
+def init_worker_channel(queue):
+    """ProcessPoolExecutor initializer: hand the channel queue to the worker."""
+    global _worker_queue
+    _worker_queue = queue
+
+
+class ProgressReporter:
+    """
+    Worker-side throttled progress sender for one unit of work.
+
+    Sends at most one update per `min_interval` seconds and records how many
+    updates were sent or dropped and how long the sends took.
+
+    Args:
+        key: identifier of the unit of work (e.g. segment id)
+        min_interval: minimum seconds between two sent updates
+        queue: channel queue; defaults to the one set by init_worker_channel
+    """
+
+    def __init__(self, key, min_interval: float = 0.1, queue=None):
+        self.key = key
+        self.min_interval = min_interval
+        self.queue = queue if queue is not None else _worker_queue
+        self.sent = 0
+        self.throttled = 0
+        self.put_seconds = 0.0
+        self._last_sent = float("-inf")
+
+    def report(self, payload, force: bool = False):
+        """Send a progress update unless one was sent less than min_interval ago."""
+        if self.queue is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._last_sent < self.min_interval:
+            self.throttled += 1
+            return
+        self._put(("progress", self.key, payload))
+        self._last_sent = now
+
+    def send_timings(self, timings: dict):
+        """Send this unit of work's stage timings (StageTimings.as_dict) to the parent."""
+        if self.queue is None:
+            return
+        self._put(("timings", self.key, timings))
+
+    def send_error(self, error: str):
+        """Report that this unit of work failed, with a description of the error."""
+        if self.queue is None:
+            return
+        self._put(("error", self.key, error))
+
+    def close(self):
+        """Send this reporter's IPC stats; the parent aggregates them per channel."""
+        if self.queue is None:
+            return
+        self._put(("stats", self.key, {
+            "sent": self.sent,
+            "throttled": self.throttled,
+            "put_seconds": self.put_seconds,
+        }))
+
+    def _put(self, message):
+        start = time.perf_counter()
+        self.queue.put(message)
+        self.put_seconds += time.perf_counter() - start
+        self.sent += 1
+
+
+class ProgressChannel:
+    """
+    Parent side of the progress channel.
+
+    Owns the multiprocessing queue handed to workers and a daemon thread
+    that drains it, calling `handler(kind, key, payload)` on the event loop
+    for each progress message. Close it only after the worker pool has shut
+    down, so every message the workers put has been flushed.
+
+    Args:
+        handler: callable(kind, key, payload) run on `loop`
+        loop: event loop to deliver messages on (defaults to the running loop)
+    """
+
+    def __init__(self, handler, loop=None):
+        self.handler = handler
+        self.loop = loop or asyncio.get_running_loop()
+        self.queue = mp.Queue()
+        self._stats = {"messages": 0, "sent": 0, "throttled": 0, "put_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._drain, name="progress-channel", daemon=True)
+        self._thread.start()
+
+    def _drain(self):
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            kind, key, payload = message
+            with self._stats_lock:
+                self._stats["messages"] += 1
+                if kind == "stats":
+                    for name in ("sent", "throttled", "put_seconds"):
+                        self._stats[name] += payload[name]
+                    continue
+            if not self.loop.is_closed():
+                self.loop.call_soon_threadsafe(self.handler, kind, key, payload)
+
+    def stats(self) -> dict:
+        """Messages received plus workers' sent / throttled counts and time spent sending."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def close(self):
+        """Stop the drain thread and release the queue."""
+        self.queue.put(None)
+        self._thread.join()
+        self.queue.close()
+        self.queue.join_thread()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,42 +1,42 @@
 from app.services.backtesting.engines.backtest_engine import run_backtest
+from app.services.backtesting.tasks.progress_channel import ProgressReporter, init_worker_channel
+from app.utils.cancellation import CancellationToken, init_worker_cancellation
 
-def run_segment(segment_id, data, strategy_symbols, params, progress_state):
+
+def init_segment_worker(queue, token):
+    """Pool initializer: progress channel and cancellation token for backtest workers."""
+    init_worker_channel(queue)
+    init_worker_cancellation(token)
+
+
+def run_segment(segment_id, data, strategy_symbols, params, reporter: ProgressReporter = None, cancel_token: CancellationToken = None):
     """
-    Run a single backtest segment and update a shared progress state.
+    Run a single backtest segment, reporting progress through the progress channel.
 
     Args:
         segment_id (int or str): Unique identifier for this segment.
         data (dict): Historical price data for all symbols.
         strategy_symbols (dict): Mapping of symbol-strategy keys to their info.
         params (dict): Global and strategy-specific parameters.
-        lookback (int): Number of initial bars to skip in the backtest.
-        progress_state (dict): Shared dict to track segment progress and results.
+        reporter (ProgressReporter): Optional throttled progress sender for this segment.
+        cancel_token (CancellationToken): Optional token stopping the backtest's date loop.
 
     Returns:
-        list: Backtest results for this segment.
+        list: Backtest results for this segment (returned through the executor future).
     """
 
     # --- Callback for progress updates during backtest ---
     def progress_callback(current_idx, total):
-        # Calculate percentage complete
-        pct = round(current_idx / total * 100, 2)
-        # Update shared progress state for this segment
-        progress_state["segments"][segment_id]["progress_pct"] = pct
+        # Calculate percentage complete; the reporter drops updates sent too close together
+        reporter.report(round(current_idx / total * 100, 2))
 
     # --- Run the actual backtest ---
     result = run_backtest(
         data,
         strategy_symbols,
         params,
-        progress_callback  # Pass callback to track progress per date
+        progress_callback if reporter is not None else None,  # Track progress per date
+        cancel_token
     )
 
-    # --- Update segment state after completion ---
-    seg_state = progress_state["segments"][segment_id]
-    seg_state["progress_pct"] = 100.0
-    seg_state["done"] = True
-
-    # --- Store the backtest result in the shared results dict ---
-    progress_state["results"][segment_id] = result
-
     return result
@@ -1,20 +1,37 @@
 import asyncio
-import os
 from concurrent.futures import ProcessPoolExecutor
-from multiprocessing import Manager
 
 from app.database import SessionLocal
-from app.services.backtesting.tasks.segment_executor import run_segment
+from app.services.backtesting.tasks.progress_channel import ProgressChannel, ProgressReporter
+from app.services.backtesting.tasks.segment_executor import init_segment_worker, run_segment
+from app.services.scheduler import INTERACTIVE, cpu_scheduler
 from app.stores.task_stores import walkforward_tasks_store as tasks_store
+from app.utils.cancellation import CancellationToken, TaskCancelled, worker_token
 from app.utils.data_helpers import fetch_price_data_light
+from app.utils.timing import StageTimings, collect_timings, record_timings, span, timing_histograms
 
 # === Walkforward async engine ===
 async def run_walkforward_async(
-    task_id, windows, all_symbols, strategy_symbols, params, lookback, window_length=3
+    task_id, windows, all_symbols, strategy_symbols, params, lookback, window_length=3, cancel_token=None,
+    priority=INTERACTIVE, on_queue=None
 ):
     """
     Run a walk-forward backtest across multiple time windows in parallel.
-    Progress is tracked in a shared dictionary and mirrored to tasks_store for monitoring.
+
+    Workers send throttled progress over a ProgressChannel, which is published
+    to tasks_store on the event loop; segment results come back through the
+    executor futures and are published as each segment completes.
+
+    Cancelling `cancel_token` stops queued segments immediately and running
+    ones at their next date; the task then ends with status "cancelled". Any
+    other error (a broken pool, the scheduler) ends it with status "failed"
+    and the error. A segment that raises is flagged with its error in
+    "progress" and "segment_errors"; the other segments still run, and the
+    task ends "failed".
+
+    Workers send their stage timings when a segment ends; the job's totals
+    are published as "timings" and added to any enclosing timing collector
+    (e.g. an Optuna trial's).
 
     Args:
         task_id: unique task identifier
@@ -24,92 +41,141 @@ async def run_walkforward_async(
         params: global and strategy-specific parameters
         lookback: initial bars to skip
         window_length: number of years in each window
+        cancel_token: optional CancellationToken for this job
+        priority: scheduler priority class (INTERACTIVE or BATCH)
+        on_queue: optional callable(queue_info); defaults to publishing it on the task
     """
+    token = cancel_token or CancellationToken()
 
-    # --- Create shared state with multiprocessing Manager ---
-    manager = Manager()
-    progress_state = manager.dict()
-    progress_state["segments"] = manager.dict()       # per-segment progress
-    progress_state["results"] = manager.dict()        # per-segment results
-    progress_state["overall_progress"] = 0.0
-    progress_state["done_segments"] = 0
+    # --- Initialize per-segment progress ---
+    segments = {seg_id: {"progress_pct": 0.0, "done": False} for seg_id in range(1, len(windows) + 1)}
+    results = {}
+    segment_errors = {}
+    timings = StageTimings()
 
     # --- Initialize task entry in the global store ---
     tasks_store[task_id] = {
-        "status": "running",
-        "progress": {},
+        "status": "queued",
+        "progress": dict(segments),
         "overall_progress": 0.0,
         "results": {},
         "total_segments": len(windows),
         "window_length": window_length
     }
 
-    # --- Initialize per-segment progress ---
-    for seg_id, window in enumerate(windows, start=1):
-        progress_state["segments"][seg_id] = manager.dict(progress_pct=0.0, done=False)
-
-    # --- Start async listener to mirror progress_state into tasks_store ---
-    asyncio.create_task(sync_progress_state_to_store(task_id, progress_state))
-
-    # --- Run backtest segments in parallel using process pool ---
-    max_workers = max(1, (os.cpu_count() or 4) - 1)
-    with ProcessPoolExecutor(max_workers=max_workers) as pool:
-        loop = asyncio.get_running_loop()
-        tasks = []
-
-        for seg_id, window in enumerate(windows, start=1):
-            # Submit segment execution to process pool
-            tasks.append(loop.run_in_executor(
+    def publish_progress():
+        overall = sum(seg["progress_pct"] for seg in segments.values()) / len(segments)
+        tasks_store.publish(task_id, progress=dict(segments), overall_progress=overall)
+
+    # --- Progress and timing messages from workers, delivered on the event loop ---
+    def on_message(kind, seg_id, payload):
+        if kind == "timings":
+            timings.merge(payload)
+            timing_histograms.observe_totals(payload)
+            return
+        if kind == "error":
+            segment_errors[seg_id] = payload
+            segments[seg_id] = {**segments[seg_id], "done": True, "error": payload}
+            tasks_store.publish(task_id, segment_errors=dict(segment_errors))
+            publish_progress()
+            return
+        if kind != "progress" or segments[seg_id]["done"]:
+            return
+        segments[seg_id] = {"progress_pct": payload, "done": False}
+        publish_progress()
+
+    async def run_one(seg_id, window):
+        try:
+            result = await loop.run_in_executor(
                 pool,
                 run_segment_with_data_fetch,
-                seg_id, all_symbols, strategy_symbols, params, lookback, progress_state, window["start"], window["end"]
-            ))
-
-        # Await completion of all segment backtests
-        await asyncio.gather(*tasks)
-
-    # --- Finalize task state after all segments complete ---
-    progress_state["done_segments"] = len(windows)
-    progress_state["overall_progress"] = 100.0
-    tasks_store[task_id]["status"] = "done"
-
-def run_segment_with_data_fetch(segment_id, all_symbols, strategy_symbols, params, lookback, progress_state, start, end):
-    """Worker: fetch data and run one segment inside its own process."""
-    db = SessionLocal()
+                seg_id, all_symbols, strategy_symbols, params, lookback, window["start"], window["end"]
+            )
+        except (asyncio.CancelledError, RuntimeError):
+            # Segment dropped (or refused) by the pool after the job was cancelled
+            if not token.cancelled:
+                raise
+            result = None
+        return seg_id, result
+
+    def publish_queue(info):
+        tasks_store.publish(task_id, queue=info)
+        if on_queue is not None:
+            on_queue(info)
+
+    loop = asyncio.get_running_loop()
+    channel = ProgressChannel(on_message, loop)
+    error = None
     try:
-        data = fetch_price_data_light(db, all_symbols, start, end, lookback)
-        result = run_segment(segment_id, data, strategy_symbols, params, progress_state)
+        # --- Wait for CPU slots; the pool is sized by the slots granted ---
+        async with cpu_scheduler.acquire_async(
+            priority, slots=len(windows), label="walkforward", on_queue=publish_queue, cancel_token=token
+        ) as ticket:
+            tasks_store.publish(task_id, status="running")
+
+            # --- Run backtest segments in parallel using process pool ---
+            with ProcessPoolExecutor(
+                max_workers=ticket.granted, initializer=init_segment_worker, initargs=(channel.queue, token)
+            ) as pool:
+                # Drop queued segments as soon as the job is cancelled
+                remove_callback = token.on_cancel(lambda: pool.shutdown(wait=False, cancel_futures=True))
+
+                for completed in asyncio.as_completed([run_one(seg_id, w) for seg_id, w in enumerate(windows, start=1)]):
+                    seg_id, result = await completed
+
+                    # --- Publish each segment's result as soon as it completes ---
+                    segments[seg_id] = {**segments[seg_id], "progress_pct": 100.0, "done": True}
+                    if result is not None:
+                        results[seg_id] = result
+                        tasks_store.publish(task_id, results=dict(results))
+                    publish_progress()
+                remove_callback()
+    except TaskCancelled:
+        # Cancelled while still queued for CPU slots
+        pass
     except Exception as e:
-        print(e)
+        print(f"Walk-forward job {task_id} failed: {e}")
+        error = str(e)
     finally:
-        db.close()
+        # Workers have exited, so every queued message has been flushed
+        channel.close()
 
-
-async def sync_progress_state_to_store(task_id, progress_state):
+    # --- Finalize task state after all segments complete ---
+    if error is None and segment_errors:
+        error = "; ".join(f"Segment {seg_id} failed: {segment_errors[seg_id]}" for seg_id in sorted(segment_errors))
+    if token.cancelled:
+        status = "cancelled"
+    elif error is not None:
+        status = "failed"
+    else:
+        status = "done"
+    tasks_store.publish(task_id, status=status, error=error, ipc=channel.stats(), timings=timings.as_dict())
+    record_timings(timings.as_dict(), observe=False)
+
+def run_segment_with_data_fetch(segment_id, all_symbols, strategy_symbols, params, lookback, start, end):
     """
-    Continuously mirror the Manager dictionary into tasks_store.
+    Worker: fetch data and run one segment inside its own process.
 
-    Allows external APIs or UIs to monitor backtest progress in near real-time.
+    A failure is sent to the parent over the progress channel and the
+    segment returns None.
     """
-    while tasks_store[task_id]["status"] == "running":
-        total_segments = len(progress_state["segments"])
-        if total_segments == 0:
-            await asyncio.sleep(0.2)
-            continue
-
-        # --- Compute aggregate progress across all segments ---
-        overall = sum(seg["progress_pct"] for seg in progress_state["segments"].values()) / total_segments
-        tasks_store[task_id]["overall_progress"] = overall
-
-        # --- Mirror per-segment progress ---
-        for seg_id, seg_data in progress_state["segments"].items():
-            tasks_store[task_id]["progress"][seg_id] = {
-                "progress_pct": seg_data["progress_pct"],
-                "done": seg_data["done"],
-            }
-
-        # --- Mirror segment results as they arrive ---
-        for seg_id, result in progress_state["results"].items():
-            tasks_store[task_id]["results"][seg_id] = result
-
-        await asyncio.sleep(0.3)
+    token = worker_token()
+    if token is not None and token.cancelled:
+        return None
+
+    reporter = ProgressReporter(segment_id)
+    db = SessionLocal()
+    with collect_timings() as timings:
+        try:
+            with span("walkforward_segment"):
+                data = fetch_price_data_light(db, all_symbols, start, end, lookback)
+                return run_segment(segment_id, data, strategy_symbols, params, reporter, token)
+        except TaskCancelled:
+            return None
+        except Exception as e:
+            reporter.send_error(f"{type(e).__name__}: {e}")
+            return None
+        finally:
+            reporter.send_timings(timings.as_dict())
+            reporter.close()
+            db.close()
@@ -6,7 +6,6 @@ from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import pandas as pd
-import yfinance as yf
 
 from app.crud import upsert_prices_with_retry, insert_missing_data, get_prices_light
 from app.database import SessionLocal
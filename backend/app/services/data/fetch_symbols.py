@@ -1,5 +1,4 @@
 import time
-from yfinance import EquityQuery, screen
 
 # === Yahoo Finance Symbol Fetch Engine ===
 def fetch_symbols(
@@ -32,6 +31,8 @@ def fetch_symbols(
     Returns:
         Sorted list of symbols meeting the criteria
     """
+    from yfinance import EquityQuery, screen  # heavy import, loaded on first use
+
     all_symbols = []
     offset = 0
 
@@ -0,0 +1,124 @@
+"""
+Replay stored daily closes as a live-style bar feed, for paper trading
+without a broker or market data service.
+
+Rows are read from the prices table (dbo.prices on SQL Server, the SQLite
+DB otherwise) in date order, a bounded number at a time, and emitted as
+one bar per date: an array of closes aligned to the feed's symbol list,
+NaN where a symbol has no row that day. `bars_per_second` paces emission
+against the wall clock (0 replays as fast as the consumer keeps up).
+"""
+import time
+
+import numpy as np
+
+from app.models.prices import Price
+
+# Rows fetched per round trip while streaming
+FETCH_ROWS = 50_000
+
+
+class ReplayBar:
+    """One date of closes, aligned to the feed's `symbols`."""
+
+    __slots__ = ("index", "date", "closes", "emitted_at")
+
+    def __init__(self, index: int, date, closes: np.ndarray, emitted_at: float):
+        self.index = index
+        self.date = date
+        self.closes = closes
+        self.emitted_at = emitted_at
+
+
+class ReplayFeed:
+    """
+    Iterable of ReplayBar over stored prices.
+
+    Args:
+        db: SQLAlchemy session
+        symbols: symbols to replay (default every symbol with prices in range)
+        start, end: optional datetime.date range
+        bars_per_second: emission rate (0 = unthrottled)
+        fetch_rows: rows read per round trip
+    """
+
+    def __init__(self, db, symbols=None, start=None, end=None, bars_per_second: float = 0.0,
+                 fetch_rows: int = FETCH_ROWS):
+        if bars_per_second < 0:
+            raise ValueError("bars_per_second must be >= 0")
+        self.db = db
+        self.start = start
+        self.end = end
+        self.bars_per_second = bars_per_second
+        self.fetch_rows = fetch_rows
+        self._filter_symbols = symbols is not None
+        self.symbols = sorted(set(symbols)) if symbols is not None else self._stored_symbols()
+        self._columns = {s: i for i, s in enumerate(self.symbols)}
+
+        self.bars = 0
+        self.rows = 0
+        self.fetch_seconds = 0.0     # waiting on the database
+        self.wait_seconds = 0.0      # sleeping to hold the requested rate
+
+    def _filtered(self, query):
+        if self._filter_symbols:
+            query = query.filter(Price.symbol.in_(self.symbols))
+        if self.start:
+            query = query.filter(Price.date >= self.start)
+        if self.end:
+            query = query.filter(Price.date <= self.end)
+        return query
+
+    def _stored_symbols(self) -> list:
+        query = self._filtered(self.db.query(Price.symbol).distinct())
+        return sorted(symbol for (symbol,) in query.all())
+
+    def _rows(self):
+        query = self._filtered(self.db.query(Price.symbol, Price.date, Price.close))
+        result = query.order_by(Price.date.asc()).yield_per(self.fetch_rows)
+        rows = iter(result)
+        while True:
+            fetched = time.perf_counter()
+            row = next(rows, None)
+            self.fetch_seconds += time.perf_counter() - fetched
+            if row is None:
+                return
+            yield row
+
+    def _pace(self, started: float):
+        if not self.bars_per_second:
+            return
+        due = started + self.bars / self.bars_per_second
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+            self.wait_seconds += delay
+
+    def __iter__(self):
+        started = time.perf_counter()
+        columns = self._columns
+        current, closes = None, None
+        for symbol, day, close in self._rows():
+            self.rows += 1
+            if day != current:
+                if current is not None:
+                    self._pace(started)
+                    yield ReplayBar(self.bars, current, closes, time.perf_counter())
+                    self.bars += 1
+                current, closes = day, np.full(len(self.symbols), np.nan)
+            column = columns.get(symbol)
+            if column is not None and close is not None:
+                closes[column] = close
+        if current is not None:
+            self._pace(started)
+            yield ReplayBar(self.bars, current, closes, time.perf_counter())
+            self.bars += 1
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self.symbols),
+            "bars": self.bars,
+            "rows": self.rows,
+            "fetch_seconds": round(self.fetch_seconds, 6),
+            "wait_seconds": round(self.wait_seconds, 6),
+        }
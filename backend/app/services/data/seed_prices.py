@@ -0,0 +1,124 @@
+"""
+Seed the prices database with synthetic OHLCV data, for load tests that
+need production-scale volumes without calling Yahoo Finance.
+
+Usage (from backend/):
+    DB_ENGINE=sqlite python -m app.services.data.seed_prices --symbols 3000 --years 20
+
+Rows go through the ingestion layer (`upsert_prices`, `insert_missing_ranges`),
+so reruns with the same arguments overwrite rather than duplicate. A running
+server only sees its own price writes; clear its caches (POST
+/api/internal/cache/clear) after seeding symbols it has already served.
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from app.crud import insert_missing_ranges, upsert_prices
+from app.database import Base, SessionLocal, engine
+from app.services.data.synthetic_market import generate_universe, iter_price_rows, missing_ranges, plan_coverage
+
+
+def _upsert_symbol(symbol, rows):
+    with SessionLocal() as db:
+        upsert_prices(db, symbol, rows)
+    return len(rows)
+
+
+def seed_synthetic_prices(
+    n_symbols: int,
+    years: float,
+    seed: int = 0,
+    start: str = "2005-01-03",
+    prefix: str = "SYN",
+    listing_rate: float = 0.1,
+    delisting_rate: float = 0.05,
+    gaps_per_year: float = 0.05,
+    workers: int = None,
+    progress_every: int = 100,
+) -> dict:
+    """
+    Generate a synthetic universe and bulk-load it into prices / missing_price_ranges.
+
+    SQLite takes one writer at a time, so symbols are upserted sequentially
+    there; on SQL Server, `workers` threads upsert symbols concurrently
+    while the next ones are generated.
+
+    Args:
+        n_symbols, years, seed, start, prefix: passed to `generate_universe`
+        listing_rate, delisting_rate, gaps_per_year: passed to `plan_coverage`
+        workers: upsert threads (default 1 on SQLite, 8 otherwise)
+        progress_every: print progress every this many symbols (0 = silent)
+
+    Returns:
+        dict: symbols, rows and missing_ranges written, and elapsed seconds
+    """
+    Base.metadata.create_all(bind=engine)
+    if workers is None:
+        workers = 1 if engine.dialect.name == "sqlite" else 8
+
+    started = time.perf_counter()
+    universe = generate_universe(n_symbols, years, seed=seed, start=start, prefix=prefix)
+    coverage = plan_coverage(universe, listing_rate, delisting_rate, gaps_per_year)
+
+    with SessionLocal() as db:
+        n_missing = insert_missing_ranges(db, missing_ranges(universe, coverage))
+
+    n_rows = 0
+    n_done = 0
+    reported = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        for symbol, rows in iter_price_rows(universe, coverage):
+            # Bound the rows held in memory to a few symbols per worker
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    n_rows += future.result()
+                    n_done += 1
+            pending.add(executor.submit(_upsert_symbol, symbol, rows))
+
+            if progress_every and n_done // progress_every > reported:
+                reported = n_done // progress_every
+                elapsed = time.perf_counter() - started
+                print(f"{n_done}/{n_symbols} symbols, {n_rows} rows ({n_rows / elapsed:,.0f} rows/s)")
+
+        for future in pending:
+            n_rows += future.result()
+
+    elapsed = time.perf_counter() - started
+    return {
+        "symbols": n_symbols,
+        "rows": n_rows,
+        "missing_ranges": n_missing,
+        "seconds": round(elapsed, 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed the prices database with synthetic OHLCV data.")
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2005-01-03", help="first business day")
+    parser.add_argument("--prefix", default="SYN", help="symbol name prefix")
+    parser.add_argument("--listing-rate", type=float, default=0.1, help="share of symbols listing late")
+    parser.add_argument("--delisting-rate", type=float, default=0.05, help="share of symbols delisting early")
+    parser.add_argument("--gaps-per-year", type=float, default=0.05, help="trading halts per symbol per year")
+    parser.add_argument("--workers", type=int, help="upsert threads (default 1 on SQLite, 8 otherwise)")
+    args = parser.parse_args(argv)
+
+    summary = seed_synthetic_prices(
+        args.symbols, args.years, seed=args.seed, start=args.start, prefix=args.prefix,
+        listing_rate=args.listing_rate, delisting_rate=args.delisting_rate,
+        gaps_per_year=args.gaps_per_year, workers=args.workers,
+    )
+    print(
+        f"Seeded {summary['symbols']} symbols: {summary['rows']} price rows, "
+        f"{summary['missing_ranges']} missing ranges in {summary['seconds']}s "
+        f"({summary['rows'] / max(summary['seconds'], 1e-9):,.0f} rows/s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
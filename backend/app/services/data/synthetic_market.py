@@ -0,0 +1,332 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# === Synthetic market data ===
+# Reproducible price universes for benchmarks and load tests, generated
+# offline: a regime-switching market factor drives correlated GBM prices,
+# with some symbols replaced by planted cointegrated partners of others.
+
+TRADING_DAYS_PER_YEAR = 252
+# prices.volume is a 32-bit INT column
+MAX_VOLUME = 2_147_483_647
+
+# One OHLCV row, attribute-compatible with PriceIn for the upsert path
+PriceRow = namedtuple("PriceRow", "symbol date open high low close volume")
+
+# Reasons recorded in missing_price_ranges for the planted coverage holes
+LISTING_REASON = "synthetic: not yet listed"
+DELISTING_REASON = "synthetic: delisted"
+GAP_REASON = "synthetic: trading halt"
+
+
+class SyntheticUniverse:
+    """
+    Generated closes for a symbol universe, plus the structure planted in it.
+
+    Attributes:
+        symbols: list of symbol names
+        dates: pd.DatetimeIndex of business days
+        closes: np.ndarray (dates x symbols) of close prices
+        pairs: list of (symbol_x, symbol_y, beta) cointegrated pairs, where
+            log(y) = alpha + beta * log(x) + stationary noise
+        regimes: list of (first date index, annual drift, annual volatility)
+            of the market factor
+        seed: seed the universe was generated from
+    """
+
+    def __init__(self, symbols, dates, closes, pairs, regimes, seed):
+        self.symbols = symbols
+        self.dates = dates
+        self.closes = closes
+        self.pairs = pairs
+        self.regimes = regimes
+        self.seed = seed
+
+    def close_frame(self) -> pd.DataFrame:
+        """Closes as a (date x symbol) DataFrame."""
+        return pd.DataFrame(self.closes, index=self.dates, columns=self.symbols)
+
+    def ohlcv(self, columns=None) -> dict:
+        """
+        Derive open / high / low / volume arrays consistent with the closes.
+
+        Opens gap from the previous close, highs and lows extend beyond the
+        open-close range by a random intraday excursion, and volume rises
+        with the size of the day's move. Each symbol draws from its own
+        seeded generator, so any subset of columns reproduces the same values.
+
+        Args:
+            columns: symbol column indices to derive (default all)
+
+        Returns:
+            dict of (dates x columns) arrays: open, high, low, close, volume
+        """
+        columns = range(len(self.symbols)) if columns is None else columns
+        closes = self.closes[:, columns]
+        fields = {name: np.empty_like(closes) for name in ("open", "high", "low")}
+        volume = np.empty(closes.shape, dtype=np.int64)
+
+        for k, j in enumerate(columns):
+            rng = np.random.default_rng([self.seed, 1, j])
+            close = closes[:, k]
+            previous = np.concatenate([close[:1], close[:-1]])
+            log_moves = np.log(close / previous)
+            daily_vol = max(float(np.std(log_moves[1:])) if len(close) > 2 else 0.01, 1e-4)
+
+            opens = previous * np.exp(rng.normal(0.0, 0.25, len(close)) * daily_vol)
+            excursion = np.abs(rng.normal(0.0, 0.5, (2, len(close)))) * daily_vol
+            fields["open"][:, k] = opens
+            fields["high"][:, k] = np.maximum(opens, close) * np.exp(excursion[0])
+            fields["low"][:, k] = np.minimum(opens, close) * np.exp(-excursion[1])
+
+            # Volume: per-symbol base level, scaled up on large moves
+            base_volume = np.exp(rng.normal(13.0, 1.2))
+            raw = base_volume * (0.6 + 0.4 * np.abs(log_moves) / daily_vol) * np.exp(rng.normal(0.0, 0.3, len(close)))
+            volume[:, k] = np.minimum(np.round(raw), MAX_VOLUME)
+
+        return {**fields, "close": closes, "volume": volume}
+
+    def price_rows(self, symbols=None, start=None, end=None, date_format: str = "iso") -> dict:
+        """
+        Prices in the shape returned by `fetch_price_data`.
+
+        Args:
+            symbols: subset of symbols (default all)
+            start, end: optional date bounds (inclusive)
+            date_format: "iso" for 'YYYY-MM-DD' strings (backtest data),
+                "date" for datetime.date objects (rows read straight from the DB)
+
+        Returns:
+            dict: { symbol: list of dicts with date, open, high, low, close, volume, symbol }
+        """
+        symbols = list(self.symbols if symbols is None else symbols)
+        columns = [self.symbols.index(s) for s in symbols]
+        mask = np.ones(len(self.dates), dtype=bool)
+        if start is not None:
+            mask &= self.dates >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.dates <= pd.Timestamp(end)
+
+        dates = self.dates[mask]
+        dates = list(dates.strftime("%Y-%m-%d")) if date_format == "iso" else [d.date() for d in dates]
+        fields = {name: values[mask] for name, values in self.ohlcv(columns).items()}
+
+        rows = {}
+        for j, symbol in enumerate(symbols):
+            o, h, l, c, v = (fields[name][:, j].tolist() for name in ("open", "high", "low", "close", "volume"))
+            rows[symbol] = [
+                {"date": d, "open": o[i], "high": h[i], "low": l[i], "close": c[i], "volume": v[i], "symbol": symbol}
+                for i, d in enumerate(dates)
+            ]
+        return rows
+
+
+def synthetic_symbols(n: int, prefix: str = "SYN") -> list:
+    """Deterministic symbol names that fit the prices.symbol column (10 chars)."""
+    width = max(4, len(str(n - 1)))
+    return [f"{prefix}{i:0{width}d}" for i in range(n)]
+
+
+def generate_universe(
+    n_symbols: int = 100,
+    years: float = 5,
+    seed: int = 0,
+    start: str = "2005-01-03",
+    n_pairs: int = None,
+    n_regimes: int = None,
+    prefix: str = "SYN",
+) -> SyntheticUniverse:
+    """
+    Generate a reproducible universe of daily closes.
+
+    Each symbol follows a GBM whose log returns load on a shared market
+    factor (beta in [0.5, 1.5]) plus idiosyncratic noise. The market factor
+    switches between regimes of different drift and volatility at random
+    dates. For the first `n_pairs` symbol pairs, the second symbol is
+    replaced by a cointegrated partner of the first.
+
+    Args:
+        n_symbols: number of symbols
+        years: length of history in years (252 business days each)
+        seed: random seed; equal arguments give identical universes
+        start: first business day
+        n_pairs: planted cointegrated pairs (default n_symbols // 10)
+        n_regimes: market regimes (default one per ~3 years, at least 1)
+        prefix: symbol name prefix
+
+    Returns:
+        SyntheticUniverse
+    """
+    rng = np.random.default_rng(seed)
+    n_dates = max(2, int(round(years * TRADING_DAYS_PER_YEAR)))
+    dates = pd.bdate_range(start, periods=n_dates)
+    symbols = synthetic_symbols(n_symbols, prefix)
+
+    # --- Market factor with regime shifts ---
+    if n_regimes is None:
+        n_regimes = max(1, int(years // 3))
+    cuts = np.sort(rng.choice(np.arange(1, n_dates), size=min(n_regimes - 1, n_dates - 1), replace=False))
+    starts = np.concatenate([[0], cuts]).astype(int)
+    regimes = []
+    market = np.empty(n_dates)
+    for k, first in enumerate(starts):
+        last = starts[k + 1] if k + 1 < len(starts) else n_dates
+        drift = rng.uniform(-0.20, 0.25)
+        vol = rng.uniform(0.10, 0.45)
+        regimes.append((int(first), float(drift), float(vol)))
+        mu = drift / TRADING_DAYS_PER_YEAR - 0.5 * (vol ** 2) / TRADING_DAYS_PER_YEAR
+        market[first:last] = rng.normal(mu, vol / np.sqrt(TRADING_DAYS_PER_YEAR), last - first)
+
+    # --- Correlated GBM log returns ---
+    betas = rng.uniform(0.5, 1.5, n_symbols)
+    idio_vol = rng.uniform(0.10, 0.40, n_symbols) / np.sqrt(TRADING_DAYS_PER_YEAR)
+    idio_drift = rng.normal(0.0, 0.05, n_symbols) / TRADING_DAYS_PER_YEAR
+    log_returns = market[:, None] * betas + idio_drift + rng.standard_normal((n_dates, n_symbols)) * idio_vol
+    log_returns[0] = 0.0
+
+    log_prices = np.log(rng.uniform(10, 300, n_symbols)) + np.cumsum(log_returns, axis=0)
+
+    # --- Planted cointegrated pairs: log(y) = alpha + beta * log(x) + AR(1) noise ---
+    if n_pairs is None:
+        n_pairs = n_symbols // 10
+    n_pairs = min(n_pairs, n_symbols // 2)
+    pairs = []
+    for p in range(n_pairs):
+        x, y = 2 * p, 2 * p + 1
+        beta = rng.uniform(0.6, 1.4)
+        alpha = rng.uniform(-0.5, 0.5)
+        shocks = rng.normal(0.0, 0.01, n_dates)
+        spread = np.empty(n_dates)
+        spread[0] = shocks[0]
+        for t in range(1, n_dates):
+            spread[t] = 0.95 * spread[t - 1] + shocks[t]
+        log_prices[:, y] = alpha + beta * log_prices[:, x] + spread
+        pairs.append((symbols[x], symbols[y], float(beta)))
+
+    closes = np.exp(log_prices)
+    return SyntheticUniverse(symbols, dates, closes, pairs, regimes, seed)
+
+
+class SymbolCoverage:
+    """
+    Rows a symbol actually trades: listed from date index `first` to `last`
+    (inclusive), minus the (start, end) index ranges in `gaps`.
+    """
+
+    def __init__(self, first: int, last: int, gaps: list):
+        self.first = first
+        self.last = last
+        self.gaps = gaps
+
+    def mask(self, n_dates: int) -> np.ndarray:
+        """Boolean mask of the dates with a price row."""
+        mask = np.zeros(n_dates, dtype=bool)
+        mask[self.first:self.last + 1] = True
+        for start, end in self.gaps:
+            mask[start:end + 1] = False
+        return mask
+
+
+def plan_coverage(
+    universe: SyntheticUniverse,
+    listing_rate: float = 0.1,
+    delisting_rate: float = 0.05,
+    gaps_per_year: float = 0.05,
+    max_gap_days: int = 15,
+    seed: int = None,
+) -> dict:
+    """
+    Decide which dates each symbol has prices for.
+
+    A share of symbols list after the first date or delist before the
+    last one, and trading halts drop short runs of rows. Symbols in
+    planted pairs keep full coverage so the pair structure stays testable.
+
+    Args:
+        universe: generated universe
+        listing_rate: share of symbols listing after the first date
+        delisting_rate: share of symbols delisting before the last date
+        gaps_per_year: expected trading halts per symbol per year
+        max_gap_days: longest halt, in business days
+        seed: random seed (default derived from the universe seed)
+
+    Returns:
+        dict: { symbol: SymbolCoverage }
+    """
+    rng = np.random.default_rng([universe.seed, 2] if seed is None else seed)
+    n_dates = len(universe.dates)
+    paired = {s for x, y, _beta in universe.pairs for s in (x, y)}
+    years = n_dates / TRADING_DAYS_PER_YEAR
+
+    coverage = {}
+    for symbol in universe.symbols:
+        first, last, gaps = 0, n_dates - 1, []
+        if symbol not in paired and n_dates > 4:
+            if rng.random() < listing_rate:
+                first = int(rng.integers(1, n_dates // 2))
+            if rng.random() < delisting_rate:
+                last = int(rng.integers(max(first + 1, n_dates // 2), n_dates - 1))
+            for _ in range(rng.poisson(gaps_per_year * years)):
+                start = int(rng.integers(first + 1, max(first + 2, last)))
+                end = min(start + int(rng.integers(0, max_gap_days)), last - 1)
+                if end >= start:
+                    gaps.append((start, end))
+        coverage[symbol] = SymbolCoverage(first, last, _merge_ranges(gaps))
+    return coverage
+
+
+def _merge_ranges(ranges: list) -> list:
+    """Merge overlapping or adjacent inclusive (start, end) index ranges."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def missing_ranges(universe: SyntheticUniverse, coverage: dict) -> list:
+    """
+    Coverage holes as missing_price_ranges rows.
+
+    Returns:
+        list of (symbol, start_date, end_date, reason) with datetime.date bounds
+    """
+    dates = universe.dates
+    last_index = len(dates) - 1
+    ranges = []
+    for symbol, cov in coverage.items():
+        if cov.first > 0:
+            ranges.append((symbol, dates[0].date(), dates[cov.first - 1].date(), LISTING_REASON))
+        for start, end in cov.gaps:
+            ranges.append((symbol, dates[start].date(), dates[end].date(), GAP_REASON))
+        if cov.last < last_index:
+            ranges.append((symbol, dates[cov.last + 1].date(), dates[-1].date(), DELISTING_REASON))
+    return ranges
+
+
+def iter_price_rows(universe: SyntheticUniverse, coverage: dict = None, batch_symbols: int = 100):
+    """
+    Yield each symbol's covered OHLCV rows, deriving OHLCV a batch of
+    symbols at a time so memory stays bounded for large universes.
+
+    Yields:
+        tuple: (symbol, list of PriceRow)
+    """
+    dates = [d.date() for d in universe.dates]
+    n_dates = len(dates)
+    for first in range(0, len(universe.symbols), batch_symbols):
+        columns = list(range(first, min(first + batch_symbols, len(universe.symbols))))
+        fields = universe.ohlcv(columns)
+        for k, j in enumerate(columns):
+            symbol = universe.symbols[j]
+            mask = coverage[symbol].mask(n_dates) if coverage is not None else np.ones(n_dates, dtype=bool)
+            idx = np.flatnonzero(mask)
+            o, h, l, c, v = (fields[name][idx, k].tolist() for name in ("open", "high", "low", "close", "volume"))
+            yield symbol, [
+                PriceRow(symbol, dates[i], o[n], h[n], l[n], c[n], v[n])
+                for n, i in enumerate(idx.tolist())
+            ]
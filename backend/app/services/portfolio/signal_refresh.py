@@ -0,0 +1,209 @@
+import threading
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.crud import get_closes
+from app.models import Portfolio
+from app.stores.cache_stores import (
+    get_price_data_version,
+    portfolio_signal_cache as cache,
+    prices_unchanged_since,
+)
+from app.strategies.signal_registry import streaming_generators
+
+# === Incremental Portfolio Signal Refresh ===
+# Each saved portfolio keeps one streaming signal per strategy over its
+# symbols, warmed up once from the portfolio's start date. Later refreshes
+# fetch only the bars after the last one applied, in a single query across
+# all portfolios, and advance every signal by those bars. A book's `end` is
+# the date of the last bar it applied, never the requested date, so bars
+# ingested later for dates it already asked about are still picked up. A
+# book is rebuilt from scratch when ingestion rewrote any of its symbols on
+# or before that date.
+#
+# Prices are forward-filled per symbol as they stream in. Unlike the
+# backtest's price matrix they are not back-filled, so a symbol has no
+# signal before its first stored price; the minimum holding period is not
+# applied either.
+
+# Serialises book updates so concurrent refreshes never advance the same signals twice
+_book_lock = threading.Lock()
+
+
+class PortfolioSignalEntry:
+    """
+    Streaming signals for one saved portfolio, valid up to `end` (the date
+    of the last bar applied, None before the first).
+
+    Holds the last close per symbol so missing bars can be forward-filled,
+    and the column indices each strategy's signal reads from a price row.
+    """
+
+    def __init__(self, signals: dict, symbols: list):
+        self.signals = signals
+        self.symbols = symbols
+        index = {s: i for i, s in enumerate(symbols)}
+        self.columns = {strategy: np.array([index[s] for s in signal.symbols], dtype=int)
+                        for strategy, signal in signals.items()}
+        self.last_closes = np.full(len(symbols), np.nan)
+        self.last_date = None
+        self.bars = 0
+        self.end = None
+        self.version = None
+
+    def apply(self, closes: pd.DataFrame) -> int:
+        """Advance every signal by the rows of `closes` (dates x self.symbols); return the bars applied."""
+        values = closes.reindex(columns=self.symbols).to_numpy(dtype=float)
+        # Dates where none of the portfolio's symbols traded are not bars for it
+        traded = ~np.isnan(values).all(axis=1)
+        values, dates = values[traded], closes.index[traded]
+        for row in values:
+            row = np.where(np.isnan(row), self.last_closes, row)
+            self.last_closes = row
+            for strategy, signal in self.signals.items():
+                signal.update(row[self.columns[strategy]])
+        if len(dates):
+            self.last_date = dates[-1]
+            self.bars += len(dates)
+        return len(dates)
+
+
+def _portfolio_signals(portfolio: Portfolio) -> dict:
+    """One fresh streaming signal per strategy in a saved portfolio."""
+    signals = {}
+    for strategy, info in (portfolio.data or {}).items():
+        cls = streaming_generators.get(strategy)
+        if cls is None:
+            raise ValueError(f"Strategy '{strategy}' is not registered.")
+        keys = [item["symbol"] for item in info.get("symbols", [])]
+        if keys:
+            signals[strategy] = cls(keys, info.get("params"))
+    return signals
+
+
+def _portfolio_start(portfolio: Portfolio):
+    start = (portfolio.meta or {}).get("start")
+    return date.fromisoformat(str(start)[:10]) if start else None
+
+
+def _closes_matrix(rows) -> pd.DataFrame:
+    """Pivot (symbol, date, close) rows into a (date x symbol) DataFrame."""
+    df = pd.DataFrame(rows, columns=["symbol", "date", "close"])
+    return df.pivot_table(index="date", columns="symbol", values="close", aggfunc="last").sort_index()
+
+
+def _build_entry(db, portfolio: Portfolio, end, version) -> PortfolioSignalEntry:
+    """Warm a portfolio's signals up over its full history."""
+    signals = _portfolio_signals(portfolio)
+    symbols = list(dict.fromkeys(s for signal in signals.values() for s in signal.symbols))
+    entry = PortfolioSignalEntry(signals, symbols)
+    rows = get_closes(db, symbols, _portfolio_start(portfolio), end) if symbols else []
+    if rows:
+        entry.apply(_closes_matrix(rows))
+    entry.end = entry.last_date
+    entry.version = version
+    return entry
+
+
+def _extend_entries(db, entries: dict, end, version) -> dict:
+    """Apply the bars after each entry's end up to `end`, fetched in one query; return bars applied per id."""
+    applied = {pid: 0 for pid in entries}
+    pending = {pid: entry for pid, entry in entries.items() if entry.end < end}
+    if pending:
+        symbols = sorted({s for entry in pending.values() for s in entry.symbols})
+        first = min(entry.end for entry in pending.values()) + timedelta(days=1)
+        rows = get_closes(db, symbols, first, end) if symbols else []
+        closes = _closes_matrix(rows) if rows else None
+        for pid, entry in pending.items():
+            if closes is not None:
+                applied[pid] = entry.apply(closes[closes.index > entry.end])
+                entry.end = entry.last_date
+    for entry in entries.values():
+        entry.version = version
+    return applied
+
+
+def _summary(portfolio_id, entry: PortfolioSignalEntry, refresh: str, new_bars: int) -> dict:
+    def _num(value):
+        return None if np.isnan(value) else float(value)
+
+    return {
+        "portfolio_id": portfolio_id,
+        "date": str(pd.Timestamp(entry.last_date).date()) if entry.last_date is not None else None,
+        "bars": entry.bars,
+        "new_bars": new_bars,
+        "refresh": refresh,
+        "strategies": {
+            strategy: {
+                key: {"signal": _num(signal.last_signals[i]), "position": float(signal.positions[i])}
+                for i, key in enumerate(signal.keys)
+            }
+            for strategy, signal in entry.signals.items()
+        },
+    }
+
+
+def refresh_portfolio_signals(db, portfolio_ids=None, end=None) -> dict:
+    """
+    Bring the streaming signals of saved portfolios up to date with stored prices.
+
+    A portfolio's book is reused as long as no price write since it was
+    last refreshed touched its symbols on or before its last applied bar;
+    the bars after that bar are then applied incrementally. Otherwise (or
+    if it has no bars yet, or `end` is before its last bar) the book is
+    rebuilt from the portfolio's start date.
+
+    Args:
+        db: SQLAlchemy session
+        portfolio_ids: ids of portfolios to refresh (None = all saved portfolios)
+        end: last date to apply (default today)
+
+    Returns:
+        dict with:
+            portfolios: per portfolio, the last bar's date, bars applied,
+                        how it was refreshed ("cached", "incremental" or
+                        "rebuilt") and per strategy and key the last bar's
+                        signal and the current position
+            signals: number of symbol-strategy signals refreshed
+            elapsed_ms: time spent, including the price queries
+    """
+    started = time.perf_counter()
+    end = end or date.today()
+    version = get_price_data_version()
+
+    query = db.query(Portfolio)
+    if portfolio_ids is not None:
+        query = query.filter(Portfolio.id.in_(list(portfolio_ids)))
+    portfolios = query.order_by(Portfolio.id).all()
+
+    results = []
+    with _book_lock:
+        reused, rebuilt = {}, {}
+        for portfolio in portfolios:
+            entry = cache.get(portfolio.id)
+            if (entry is not None and entry.end is not None and entry.end <= end
+                    and prices_unchanged_since(entry.version, entry.symbols, entry.end)):
+                reused[portfolio.id] = entry
+            else:
+                entry = _build_entry(db, portfolio, end, version)
+                cache.set(portfolio.id, entry)
+                rebuilt[portfolio.id] = entry
+
+        applied = _extend_entries(db, reused, end, version)
+        for portfolio in portfolios:
+            if portfolio.id in rebuilt:
+                entry = rebuilt[portfolio.id]
+                results.append(_summary(portfolio.id, entry, "rebuilt", entry.bars))
+            else:
+                new_bars = applied[portfolio.id]
+                results.append(_summary(portfolio.id, reused[portfolio.id],
+                                        "incremental" if new_bars else "cached", new_bars))
+
+    return {
+        "portfolios": results,
+        "signals": sum(len(keys) for r in results for keys in r["strategies"].values()),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+    }
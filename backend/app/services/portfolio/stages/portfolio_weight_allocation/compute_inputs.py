@@ -0,0 +1,197 @@
+import hashlib
+import json
+import threading
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from app.crud import get_closes
+from app.stores.cache_stores import (
+    get_price_data_version,
+    portfolio_inputs_cache as cache,
+    prices_unchanged_since,
+)
+from .helpers import EwmaInputEngine
+
+# === Server-side Portfolio Inputs Engine ===
+
+# Serialises engine reuse/extension so concurrent requests never update the same engine
+_engine_lock = threading.Lock()
+
+
+class PortfolioInputsEntry:
+    """
+    Cached input engine for one (symbol set, start, decay), valid up to `end`.
+
+    Holds each symbol's last known close so the engine can be extended with
+    newly ingested days without refetching the full history.
+    """
+
+    def __init__(self, engine: EwmaInputEngine, last_closes: pd.Series, end, version: int):
+        self.engine = engine
+        self.last_closes = last_closes
+        self.end = end
+        self.version = version
+
+
+def _closes_matrix(rows, symbols: list) -> pd.DataFrame:
+    """Pivot (symbol, date, close) rows into a (date x symbol) DataFrame."""
+    df = pd.DataFrame(rows, columns=["symbol", "date", "close"])
+    closes = df.pivot_table(index="date", columns="symbol", values="close", aggfunc="last")
+    return closes.reindex(columns=symbols).sort_index()
+
+
+def _fill_closes(closes: pd.DataFrame, previous: pd.Series = None) -> pd.DataFrame:
+    """
+    Carry each symbol's last close forward over missing days.
+
+    Args:
+        closes: (date x symbol) close prices
+        previous: optional last close row preceding `closes`, prepended so
+                  the first rows of an incremental update can be filled
+    """
+    if previous is not None:
+        closes = pd.concat([previous.to_frame().T, closes])
+    return closes.ffill()
+
+
+def _returns_from_closes(closes: pd.DataFrame, previous: pd.Series = None) -> pd.DataFrame:
+    """
+    Daily returns from close prices.
+
+    Missing closes are forward-filled first, so a gap yields 0 while the
+    price is missing and the full move across the gap on the day it
+    resumes. Only days before a symbol's first close (and undefined
+    returns) are set to 0.
+
+    Args:
+        closes: (date x symbol) close prices
+        previous: optional last close row preceding `closes`, used to compute
+                  the first return of an incremental update
+    """
+    returns = _fill_closes(closes, previous).pct_change(fill_method=None).iloc[1:]
+    return returns.replace([np.inf, -np.inf], np.nan).fillna(0)
+
+
+def _build_entry(db, symbols, start, end, decay, version):
+    """Compute an input engine over the full range from stored prices."""
+    rows = get_closes(db, symbols, start, end)
+    if not rows:
+        return None
+    closes = _closes_matrix(rows, symbols)
+    returns = _returns_from_closes(closes)
+    engine = EwmaInputEngine.from_returns(returns.to_numpy(), symbols, list(returns.index), decay)
+    return PortfolioInputsEntry(engine, _fill_closes(closes).iloc[-1], end, version)
+
+
+def _extend_entry(db, entry: PortfolioInputsEntry, symbols, end, version):
+    """Fold days after entry.end up to `end` into a cached engine."""
+    rows = get_closes(db, symbols, entry.end + timedelta(days=1), end)
+    if rows:
+        closes = _closes_matrix(rows, symbols)
+        returns = _returns_from_closes(closes, entry.last_closes)
+        entry.engine.update(returns.to_numpy(), list(returns.index))
+        entry.last_closes = _fill_closes(closes, entry.last_closes).iloc[-1]
+    entry.end = end
+    entry.version = version
+    return entry
+
+
+def _find_extendable(symbols, start, end, decay):
+    """Find a still-valid cached entry for the same inputs over an earlier end date."""
+    best_key, best = None, None
+    for key, entry in cache.items():
+        if not isinstance(entry, PortfolioInputsEntry):
+            continue
+        if key[0] != symbols or key[1] != start or key[3] != decay or entry.end > end:
+            continue
+        if not prices_unchanged_since(entry.version, symbols, entry.end):
+            continue
+        if best is None or entry.end > best.end:
+            best_key, best = key, entry
+    return best_key, best
+
+
+def make_inputs_key(symbols, start, end, decay, cov_method, shrinkage, version) -> str:
+    """Stable identifier for a computed set of portfolio inputs."""
+    raw = json.dumps([list(symbols), str(start), str(end), decay, cov_method, shrinkage, version])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def compute_inputs_from_prices(db, symbols, start, end, decay=0.94, cov_method="sample", shrinkage=0.0):
+    """
+    Compute expected returns and covariance server-side from stored close prices.
+
+    Engines are cached per (symbol set, start, end, decay). A cached engine is
+    reused as long as no price write since it was built touched its symbols on
+    or before its end date, and an engine over an earlier end date is extended
+    incrementally with only the new days.
+
+    Args:
+        db: SQLAlchemy session
+        symbols: list of symbols
+        start, end: datetime.date range of prices to use
+        decay: float, EWMA decay factor for expected returns (and "ewma" covariance)
+        cov_method: "sample" or "ewma"
+        shrinkage: float in [0, 1], shrinkage intensity towards the diagonal
+
+    Returns:
+        dict with:
+            expected_returns: dict of symbol -> expected return
+            risk_matrix: dict with "symbols" and "cov_matrix"
+            inputs_key: identifier the HRP and optimise steps can reuse
+            cache: {"hit": bool, "incremental": bool}
+        or None if no prices are stored for the symbols
+    """
+    symbols = tuple(sorted(set(symbols)))
+    version = get_price_data_version()
+    key = (symbols, start, end, decay)
+    hit = incremental = False
+
+    # --- 1. Reuse, extend or build the input engine ---
+    with _engine_lock:
+        entry = cache.get(key)
+        if entry is not None and prices_unchanged_since(entry.version, symbols, end):
+            entry.version = version
+            hit = True
+        else:
+            old_key, entry = _find_extendable(symbols, start, end, decay)
+            if entry is not None:
+                cache.pop(old_key)
+                entry = _extend_entry(db, entry, list(symbols), end, version)
+                incremental = True
+            else:
+                entry = _build_entry(db, list(symbols), start, end, decay, version)
+                if entry is None:
+                    return None
+            cache.set(key, entry)
+
+    # --- 2. Derive outputs, memoised per estimator ---
+    inputs_key = make_inputs_key(symbols, start, end, decay, cov_method, shrinkage, version)
+    outputs = cache.get(inputs_key)
+    if outputs is None:
+        engine = entry.engine
+        mu = engine.expected_returns()
+        cov = engine.covariance(cov_method, shrinkage)
+        outputs = {
+            "expected_returns": dict(zip(engine.symbols, mu.tolist())),
+            "risk_matrix": {"symbols": list(engine.symbols), "cov_matrix": cov.tolist()},
+        }
+        cache.set(inputs_key, outputs)
+
+    return {
+        **outputs,
+        "inputs_key": inputs_key,
+        "cache": {"hit": hit, "incremental": incremental},
+    }
+
+
+def get_cached_inputs(inputs_key: str):
+    """
+    Look up previously computed portfolio inputs.
+
+    Returns:
+        dict with expected_returns and risk_matrix, or None if evicted/unknown
+    """
+    return cache.get(inputs_key)
@@ -1,3 +1,4 @@
 from .hrp_calcs import hrp_allocation
-from .input_calcs import compute_expected_returns, compute_risk_matrix
-from .optimisation_calcs import optimise_portfolio
\ No newline at end of file
+from .ewma_engine import EwmaInputEngine, ewma_weights
+from .input_calcs import build_returns_matrix, compute_expected_returns, compute_risk_matrix
+from .optimisation_calcs import MAX_SWEEP_POINTS, optimise_portfolio, sweep_portfolios
\ No newline at end of file
@@ -0,0 +1,184 @@
+import numpy as np
+
+# === Incremental EWMA Input Engine ===
+
+def ewma_weights(n: int, decay: float) -> np.ndarray:
+    """
+    Normalised exponentially decaying weights, oldest observation first.
+
+    Args:
+        n: number of observations
+        decay: float, exponential decay factor
+
+    Returns:
+        np.ndarray of shape (n,) summing to 1
+    """
+    weights = np.power(decay, np.arange(n - 1, -1, -1, dtype=float))
+    return weights / weights.sum()
+
+
+def _merge_moments(weight_a, mean_a, comoment_a, weight_b, mean_b, comoment_b):
+    """
+    Combine the (weight, mean, co-moment) of two blocks of observations
+    (Chan et al. pairwise update, weighted).
+
+    Returns:
+        tuple: (weight, mean, co-moment) of the union
+    """
+    weight = weight_a + weight_b
+    if weight_a == 0:
+        return weight, mean_b, comoment_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (weight_b / weight)
+    comoment = comoment_a + comoment_b + np.outer(delta, delta) * (weight_a * weight_b / weight)
+    return weight, mean, comoment
+
+
+class EwmaInputEngine:
+    """
+    Array-based engine for expected returns and covariance across all symbols.
+
+    Keeps decayed and equally weighted running means and co-moments
+    (sums of products of deviations from the mean) of a (date x symbol)
+    returns matrix, so a full history is processed in one pass and each new
+    block of days is merged in instead of recomputing from scratch.
+    Accumulating deviations rather than raw r r^T sums avoids the
+    cancellation of sum(r r^T) - n mean mean^T when returns are small
+    relative to their mean.
+
+    Moments held:
+        - EWMA: total weight sum of decay^i, weighted mean and weighted co-moment
+        - Sample: observation count, mean and co-moment
+    """
+
+    def __init__(self, symbols: list, decay: float = 0.94, shrinkage: float = 0.0):
+        """
+        Args:
+            symbols: list of symbols, defining the column order of all arrays
+            decay: float, exponential decay factor for EWMA moments
+            shrinkage: float in [0, 1], default intensity of shrinkage towards
+                the diagonal applied by `covariance`
+        """
+        n = len(symbols)
+        self.symbols = list(symbols)
+        self.decay = decay
+        self.shrinkage = shrinkage
+        self.last_date = None
+
+        # --- EWMA moments ---
+        self._ew_weight = 0.0
+        self._ew_mean = np.zeros(n)
+        self._ew_comoment = np.zeros((n, n))
+
+        # --- Equally weighted moments ---
+        self._count = 0
+        self._mean = np.zeros(n)
+        self._comoment = np.zeros((n, n))
+
+    @classmethod
+    def from_returns(cls, returns: np.ndarray, symbols: list, dates: list = None, decay: float = 0.94, shrinkage: float = 0.0):
+        """
+        Build an engine from a full (date x symbol) returns matrix in one pass.
+
+        Args:
+            returns: np.ndarray of shape (T, N), oldest row first, missing returns as 0
+            symbols: list of N symbols
+            dates: optional list of T dates aligned with the rows
+            decay: float, exponential decay factor
+            shrinkage: float, default shrinkage intensity
+
+        Returns:
+            EwmaInputEngine
+        """
+        engine = cls(symbols, decay, shrinkage)
+        engine.update(returns, dates)
+        return engine
+
+    @property
+    def n_observations(self) -> int:
+        return self._count
+
+    def update(self, returns: np.ndarray, dates: list = None):
+        """
+        Fold new days of returns into the running moments.
+
+        Rows dated on or before the last processed date are skipped, so
+        re-sending an overlapping window is harmless.
+
+        Args:
+            returns: np.ndarray of shape (k, N) or (N,), oldest row first
+            dates: optional list of k dates aligned with the rows
+        """
+        rows = np.atleast_2d(np.asarray(returns, dtype=float))
+        if rows.size == 0:
+            return
+
+        if dates is not None:
+            dates = list(dates)
+            if self.last_date is not None:
+                keep = [i for i, d in enumerate(dates) if d > self.last_date]
+                rows = rows[keep]
+                dates = [dates[i] for i in keep]
+            if not dates:
+                return
+            self.last_date = dates[-1]
+
+        k = rows.shape[0]
+
+        # --- EWMA: decay existing state by decay^k, merge the weighted block ---
+        w = np.power(self.decay, np.arange(k - 1, -1, -1, dtype=float))
+        old_weight = self.decay ** k * self._ew_weight
+        block_weight = w.sum()
+        block_mean = w @ rows / block_weight
+        deviations = rows - block_mean
+        block_comoment = (deviations * w[:, None]).T @ deviations
+        self._ew_weight, self._ew_mean, self._ew_comoment = _merge_moments(
+            old_weight, self._ew_mean, self.decay ** k * self._ew_comoment,
+            block_weight, block_mean, block_comoment,
+        )
+
+        # --- Equally weighted: merge the block's mean and co-moment ---
+        block_mean = rows.mean(axis=0)
+        deviations = rows - block_mean
+        count, self._mean, self._comoment = _merge_moments(
+            self._count, self._mean, self._comoment,
+            k, block_mean, deviations.T @ deviations,
+        )
+        self._count = int(count)
+
+    def expected_returns(self) -> np.ndarray:
+        """EWMA expected return per symbol."""
+        if self._ew_weight == 0:
+            return np.zeros(len(self.symbols))
+        return self._ew_mean.copy()
+
+    def covariance(self, method: str = "sample", shrinkage: float = None) -> np.ndarray:
+        """
+        Covariance matrix of returns.
+
+        Args:
+            method: "sample" for the unbiased equally weighted covariance,
+                "ewma" for the exponentially weighted covariance
+            shrinkage: float in [0, 1], intensity of shrinkage towards the
+                diagonal; defaults to the engine's shrinkage
+
+        Returns:
+            np.ndarray of shape (N, N)
+        """
+        n = len(self.symbols)
+        if method == "ewma":
+            if self._ew_weight == 0:
+                return np.zeros((n, n))
+            cov = self._ew_comoment / self._ew_weight
+        elif method == "sample":
+            if self._count < 2:
+                return np.zeros((n, n))
+            cov = self._comoment / (self._count - 1)
+        else:
+            raise ValueError(f"Unknown covariance method '{method}'")
+
+        delta = self.shrinkage if shrinkage is None else shrinkage
+        if delta:
+            cov = (1 - delta) * cov + delta * np.diag(np.diag(cov))
+
+        return cov
@@ -1,98 +1,172 @@
+import hashlib
+import threading
+
 import numpy as np
 import pandas as pd
-from scipy.cluster.hierarchy import dendrogram, linkage
+
+from app.utils.lru_cache import LRUCache
 
 # === Hierarchical Risk Parity (HRP) Allocation Engine ===
 
-def correl_dist(corr: pd.DataFrame) -> pd.DataFrame:
+# Dendrogram leaf orderings keyed by (symbols, method, correlation fingerprint)
+_linkage_cache = LRUCache(maxsize=32)
+_linkage_cache_lock = threading.Lock()
+
+
+def cov_to_corr(cov: np.ndarray) -> np.ndarray:
+    """
+    Convert a covariance matrix to a correlation matrix.
+
+    Args:
+        cov: np.ndarray, covariance matrix
+
+    Returns:
+        np.ndarray, correlation matrix (assets with zero variance get zero correlation)
+    """
+    std = np.sqrt(np.clip(np.diag(cov), 0, None))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        corr = cov / np.outer(std, std)
+    corr = np.nan_to_num(corr, nan=0.0, posinf=0.0, neginf=0.0)
+    np.fill_diagonal(corr, 1.0)
+    return np.clip(corr, -1.0, 1.0)
+
+
+def correl_dist(corr: np.ndarray) -> np.ndarray:
     """
     Convert a correlation matrix to a distance matrix suitable for clustering.
 
     Args:
-        corr: pd.DataFrame, correlation matrix
+        corr: np.ndarray or pd.DataFrame, correlation matrix
 
     Returns:
-        pd.DataFrame, distance matrix
+        distance matrix of the same type
     """
     dist = np.sqrt(0.5 * (1 - corr))
     return dist
 
 
-def get_cluster_var(cov: pd.DataFrame, cluster_items: list) -> float:
+def corr_fingerprint(corr: np.ndarray, decimals: int = 2) -> str:
+    """
+    Fingerprint a correlation matrix after rounding, so small perturbations
+    (e.g. one more day of returns) map to the same key.
+    """
+    rounded = np.round(corr, decimals) + 0.0  # normalise -0.0
+    return hashlib.blake2b(rounded.tobytes(), digest_size=16).hexdigest()
+
+
+def get_quasi_diag_order(corr: np.ndarray, symbols: list = None, method: str = "single", use_cache: bool = True) -> np.ndarray:
+    """
+    Cluster assets and return the dendrogram leaf order (quasi-diagonalisation).
+
+    Linkage runs on the condensed distance vector. The resulting order is
+    cached by correlation fingerprint, so rebalancing with a slightly changed
+    covariance matrix reuses the tree ordering.
+
+    Args:
+        corr: np.ndarray, correlation matrix
+        symbols: optional list of asset names, part of the cache key
+        method: linkage method
+        use_cache: whether to look up / store the ordering
+
+    Returns:
+        np.ndarray of asset indices in leaf order
+    """
+    key = None
+    if use_cache:
+        key = (tuple(symbols) if symbols is not None else len(corr), method, corr_fingerprint(corr))
+        with _linkage_cache_lock:
+            order = _linkage_cache.get(key)
+        if order is not None:
+            return order
+
+    # Heavy imports, loaded on first use
+    from scipy.cluster.hierarchy import leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    # --- Condensed distance vector for linkage ---
+    dist = correl_dist(corr)
+    np.fill_diagonal(dist, 0.0)
+    condensed = squareform(dist, checks=False)
+
+    link = linkage(condensed, method=method)
+    order = leaves_list(link)
+
+    if use_cache:
+        with _linkage_cache_lock:
+            _linkage_cache.set(key, order)
+    return order
+
+
+def get_cluster_var(cov: np.ndarray, cluster_idx: np.ndarray) -> float:
     """
     Compute the variance of a cluster of assets using inverse-variance weighting.
 
     Args:
-        cov: pd.DataFrame, covariance matrix
-        cluster_items: list of asset names in the cluster
+        cov: np.ndarray, covariance matrix
+        cluster_idx: np.ndarray of asset indices in the cluster
 
     Returns:
         float, cluster variance
     """
-    sub_cov = cov.loc[cluster_items, cluster_items]
-    w = 1 / np.diag(sub_cov)         # inverse-variance weights
-    w /= w.sum()                     # normalize weights
-    var = np.dot(w, np.dot(sub_cov, w))
-    return var
+    sub_cov = cov[np.ix_(cluster_idx, cluster_idx)]
+    w = 1 / np.clip(np.diag(sub_cov), 1e-18, None)  # inverse-variance weights
+    w /= w.sum()                                     # normalize weights
+    return float(w @ sub_cov @ w)
 
 
-def hrp_allocation(cov: pd.DataFrame) -> pd.Series:
+def hrp_allocation(cov: pd.DataFrame, method: str = "single", use_cache: bool = True) -> pd.Series:
     """
     Perform Hierarchical Risk Parity (HRP) allocation.
 
     Steps:
-        1. Compute correlation matrix
-        2. Convert to distance matrix
-        3. Perform hierarchical clustering
-        4. Quasi-diagonalize assets based on dendrogram
-        5. Allocate weights recursively via bisection
+        1. Compute correlation matrix from the covariance matrix
+        2. Convert to condensed distance vector
+        3. Perform hierarchical clustering (cached by correlation fingerprint)
+        4. Quasi-diagonalize assets based on dendrogram leaf order
+        5. Allocate weights recursively via bisection on index arrays
 
     Args:
         cov: pd.DataFrame, covariance matrix with symbols as index and columns
+        method: linkage method
+        use_cache: whether to reuse cached dendrogram orderings
 
     Returns:
         pd.Series of normalized HRP weights
     """
-    # --- 1. Correlation matrix ---
-    corr = cov.corr()
-    
-    # --- 2. Distance matrix for clustering ---
-    dist = correl_dist(corr)
-    
-    # --- 3. Hierarchical clustering using linkage ---
-    link = linkage(dist, method='single')
-    
-    # --- 4. Quasi-diagonalization via dendrogram ---
-    dendro = dendrogram(link, no_plot=True)
-    ordered_indices = dendro['leaves']
-    ordered_assets = cov.columns[ordered_indices]
-    
+    cov_np = cov.to_numpy(dtype=float)
+    symbols = list(cov.columns)
+
+    # --- 1-4. Correlation, clustering and quasi-diagonal ordering ---
+    corr = cov_to_corr(cov_np)
+    order = get_quasi_diag_order(corr, symbols, method, use_cache)
+
     # --- 5. Recursive bisection allocation ---
-    weights = pd.Series(1.0, index=ordered_assets)
-    clusters = [ordered_assets.tolist()]
-    
-    while clusters:
-        cluster = clusters.pop(0)
+    weights = np.ones(len(symbols))
+    stack = [order]
+
+    while stack:
+        cluster = stack.pop()
         if len(cluster) <= 1:
             continue
-        
+
         # Split cluster into two halves
         split = len(cluster) // 2
         cluster_1 = cluster[:split]
         cluster_2 = cluster[split:]
-        
+
         # Compute cluster variances
-        var_1 = get_cluster_var(cov, cluster_1)
-        var_2 = get_cluster_var(cov, cluster_2)
-        
+        var_1 = get_cluster_var(cov_np, cluster_1)
+        var_2 = get_cluster_var(cov_np, cluster_2)
+
         # Allocate weights proportionally to inverse risk
         alpha = 1 - var_1 / (var_1 + var_2)
         weights[cluster_1] *= alpha
         weights[cluster_2] *= 1 - alpha
-        
+
         # Recurse on sub-clusters
-        clusters.append(cluster_1)
-        clusters.append(cluster_2)
-    
+        stack.append(cluster_1)
+        stack.append(cluster_2)
+
     # --- Normalize weights to sum to 1 ---
+    weights = pd.Series(weights[order], index=cov.columns[order])
     return weights / weights.sum()
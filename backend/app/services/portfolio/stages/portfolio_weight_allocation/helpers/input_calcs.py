@@ -1,75 +1,92 @@
 import numpy as np
-import pandas as pd
+
+from .ewma_engine import EwmaInputEngine, ewma_weights
 
 # === Expected Returns & Risk Matrix Computation Engine ===
 
 def compute_expected_returns(symbol_returns: dict, decay: float = 0.94) -> dict:
     """
     Compute exponentially weighted expected returns for each symbol.
-    
+
     Args:
         symbol_returns: dict mapping symbol -> list of dicts with 'date' and 'return'
         decay: float, exponential decay factor (default 0.94)
-    
+
     Returns:
         dict mapping symbol -> expected return (float)
     """
     expected = {}
 
     for symbol, returns in symbol_returns.items():
-        # --- Handle missing or None returns ---
-        if not returns:
+        # --- Drop missing or None returns ---
+        values = [r["return"] for r in returns if r.get("return") is not None]
+        if not values:
             expected[symbol] = 0.0
             continue
 
         # --- Convert returns to NumPy array ---
-        returns_array = np.array([r["return"] for r in returns], dtype=float)
+        returns_array = np.fromiter(values, dtype=float, count=len(values))
 
-        # --- Compute exponentially decaying weights ---
-        weights = np.array([(1 - decay) * decay**i for i in reversed(range(len(returns_array)))])
-        weights /= weights.sum()
-
-        # --- Compute expected return ---
-        expected[symbol] = float(np.sum(returns_array * weights))
+        # --- Compute expected return with exponentially decaying weights ---
+        expected[symbol] = float(returns_array @ ewma_weights(len(returns_array), decay))
 
     return expected
 
 
-def compute_risk_matrix(symbol_returns: dict) -> dict:
+def build_returns_matrix(symbol_returns: dict):
     """
-    Compute the covariance matrix of returns across all symbols.
+    Align per-symbol return lists into a single (date x symbol) array.
 
     Args:
         symbol_returns: dict mapping symbol -> list of dicts with 'date' and 'return'
 
     Returns:
-        dict with:
-            symbols: list of symbols included
-            cov_matrix: covariance matrix as a nested list
+        tuple: (returns matrix as np.ndarray, list of symbols, sorted list of dates);
+               missing returns are filled with 0
     """
-    dfs = []
-
+    series = {}
     for symbol, data in symbol_returns.items():
         # --- Skip missing or empty data ---
         if not data:
             print(f"No data for {symbol}, skipping...")
             continue
-
-        # --- Convert list of dicts to DataFrame ---
-        df = pd.DataFrame(data)
-        if df.empty or "date" not in df or "return" not in df:
+        if any("date" not in r or "return" not in r for r in data):
             print(f"Invalid or empty data for {symbol}, skipping...")
             continue
+        series[symbol] = data
+
+    symbols = list(series.keys())
+    dates = sorted({r["date"] for data in series.values() for r in data})
+    date_idx = {d: i for i, d in enumerate(dates)}
+
+    matrix = np.zeros((len(dates), len(symbols)))
+    for j, data in enumerate(series.values()):
+        rows = [date_idx[r["date"]] for r in data]
+        matrix[rows, j] = [r["return"] if r["return"] is not None else 0.0 for r in data]
 
-        df = df[["date", "return"]].set_index("date")
-        df.rename(columns={"return": symbol}, inplace=True)
-        dfs.append(df)
+    return matrix, symbols, dates
 
+
+def compute_risk_matrix(symbol_returns: dict, decay: float = 0.94, method: str = "sample", shrinkage: float = 0.0) -> dict:
+    """
+    Compute the covariance matrix of returns across all symbols.
+
+    Args:
+        symbol_returns: dict mapping symbol -> list of dicts with 'date' and 'return'
+        decay: float, exponential decay factor used when method is "ewma"
+        method: "sample" (equally weighted) or "ewma" covariance
+        shrinkage: float in [0, 1], shrinkage intensity towards the diagonal
+
+    Returns:
+        dict with:
+            symbols: list of symbols included
+            cov_matrix: covariance matrix as a nested list
+    """
     # --- Merge all symbols by date, filling missing returns with 0 ---
-    df_all = pd.concat(dfs, axis=1).fillna(0)
+    matrix, symbols, dates = build_returns_matrix(symbol_returns)
 
-    # --- Compute covariance matrix ---
-    cov = df_all.cov().values
-    symbols = df_all.columns.tolist()
+    # --- Compute covariance matrix in one pass ---
+    engine = EwmaInputEngine.from_returns(matrix, symbols, dates, decay=decay, shrinkage=shrinkage)
+    cov = engine.covariance(method)
 
     return {"symbols": symbols, "cov_matrix": cov.tolist()}
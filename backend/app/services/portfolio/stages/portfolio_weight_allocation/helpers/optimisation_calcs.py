@@ -1,9 +1,137 @@
-import cvxpy as cp
+import itertools
+import math
+import os
+import threading
+
 import numpy as np
 import pandas as pd
 
+from app.utils.lru_cache import LRUCache
+
 # === Constrained Portfolio Optimisation Engine ===
 
+# Parameterised problems per (symbol set, constraint shape), reused across calls
+_problem_cache = LRUCache(maxsize=16)
+_problem_cache_lock = threading.Lock()
+
+SWEEPABLE_PARAMS = ("risk_aversion", "baseline_reg", "min_weight", "max_weight")
+
+# Most grid points one sweep may solve (each point is a full solve under the problem's lock)
+MAX_SWEEP_POINTS = int(os.getenv("MAX_SWEEP_POINTS", "500"))
+
+
+class ParametrisedPortfolioProblem:
+    """
+    Mean-variance problem with baseline deviation penalty, built once per
+    symbol set and covariance matrix and re-solved by updating cp.Parameter
+    values.
+
+    The covariance enters as a constant (an n x n parameter would exceed
+    cvxpy's DPP parameter budget and make canonicalisation far slower than
+    a rebuild), so the problem is rebuilt only when the matrix changes.
+    Everything else is a low-dimensional parameter in DPP form, so later
+    solves only refill the data and warm-start from the previous solution:
+        max  mu^T w - lambda * w^T Sigma w - ||g w - g w_baseline||^2
+        s.t. sum(w) == 1, min_weight <= w <= max_weight
+    where g = sqrt(baseline_reg).
+    """
+
+    def __init__(self, n: int):
+        import cvxpy as cp  # heavy import, loaded on first use
+
+        self.n = n
+        self.w = cp.Variable(n)
+        self.mu = cp.Parameter(n)
+        self.risk_aversion = cp.Parameter(nonneg=True)
+        self.baseline_scale = cp.Parameter(nonneg=True)
+        self.scaled_baseline = cp.Parameter(n)
+        self.min_weight = cp.Parameter()
+        self.max_weight = cp.Parameter()
+        self.problem = None
+        self.lock = threading.Lock()
+
+        self._cov_id = None
+
+    def set_covariance(self, cov_matrix: np.ndarray):
+        """Build the problem around the covariance matrix, skipping unchanged inputs."""
+        import cvxpy as cp
+        from cvxpy.atoms.affine.wraps import psd_wrap
+
+        cov_id = hash(cov_matrix.tobytes())
+        if cov_id == self._cov_id:
+            return
+        sigma = psd_wrap((cov_matrix + cov_matrix.T) / 2)
+
+        objective = cp.Maximize(
+            self.mu @ self.w
+            - self.risk_aversion * cp.quad_form(self.w, sigma)
+            - cp.sum_squares(self.baseline_scale * self.w - self.scaled_baseline)
+        )
+        constraints = [
+            cp.sum(self.w) == 1,          # weights sum to 1
+            self.w >= self.min_weight,    # long-only lower bound
+            self.w <= self.max_weight     # max weight per asset
+        ]
+        self.problem = cp.Problem(objective, constraints)
+        self._cov_id = cov_id
+
+    def solve(self, mu, w_baseline, risk_aversion, baseline_reg, min_weight, max_weight) -> np.ndarray:
+        """
+        Fill parameters and solve, warm-starting from the previous solution.
+
+        Returns:
+            np.ndarray of raw weights, or None if the solver found no solution
+        """
+        gamma = np.sqrt(max(baseline_reg, 0.0))
+        self.mu.value = mu
+        self.risk_aversion.value = max(risk_aversion, 0.0)
+        self.baseline_scale.value = gamma
+        self.scaled_baseline.value = gamma * w_baseline
+        self.min_weight.value = min_weight
+        self.max_weight.value = max_weight
+
+        self.problem.solve(solver="SCS", warm_start=True)
+        return self.w.value
+
+
+def get_portfolio_problem(symbols: list) -> ParametrisedPortfolioProblem:
+    """Fetch or build the cached parameterised problem for a symbol set."""
+    key = (tuple(symbols), "long_only_box")
+    with _problem_cache_lock:
+        problem = _problem_cache.get(key)
+        if problem is None:
+            problem = ParametrisedPortfolioProblem(len(symbols))
+            _problem_cache.set(key, problem)
+    return problem
+
+
+def _prepare_inputs(mu_dict: dict, cov_dict: dict, w_baseline_dict: dict):
+    """Convert dict inputs into arrays ordered by the covariance symbols."""
+    symbols = cov_dict["symbols"]
+    cov_matrix = np.asarray(cov_dict["cov_matrix"], dtype=float)
+    mu = np.array([mu_dict[s] for s in symbols], dtype=float)
+    w_baseline = np.array([w_baseline_dict[s] for s in symbols], dtype=float)
+    return symbols, mu, cov_matrix, w_baseline
+
+
+def _clean_weights(raw: np.ndarray, symbols: list, cleanup_threshold: float) -> pd.Series:
+    """Clip negatives, zero tiny weights, renormalise and drop zero-weight assets."""
+    # --- Convert solution to pandas Series ---
+    weights = pd.Series(raw, index=symbols, dtype=float)
+
+    # --- Post-processing cleanup ---
+    weights[weights < 0] = np.maximum(weights[weights < 0], 0)  # clip negatives
+    weights[weights.abs() < cleanup_threshold] = 0              # zero tiny weights
+
+    # --- Renormalise to sum to 1 ---
+    total = weights.sum()
+    if total > 0:
+        weights /= total
+
+    # --- Optionally remove zero-weight assets ---
+    return weights[weights > 0]
+
+
 def optimise_portfolio(
     mu_dict: dict,
     cov_dict: dict,
@@ -27,6 +155,10 @@ def optimise_portfolio(
         - Long-only (weights >= min_weight)
         - Maximum weight per asset <= max_weight
 
+    The problem is cached per symbol set and warm-started from the previous
+    solution, so repeated calls on the same covariance only refill
+    parameter data.
+
     Args:
         mu_dict: dict mapping symbol -> expected return
         cov_dict: dict with keys:
@@ -42,47 +174,88 @@ def optimise_portfolio(
     Returns:
         dict mapping symbol -> optimized weight (non-zero only)
     """
-    symbols = cov_dict["symbols"]
-    cov_matrix = np.array(cov_dict["cov_matrix"])
+    symbols, mu, cov_matrix, w_baseline = _prepare_inputs(mu_dict, cov_dict, w_baseline_dict)
 
-    # --- Convert inputs to NumPy arrays ---
-    mu = np.array([mu_dict[s] for s in symbols])
-    w_baseline = np.array([w_baseline_dict[s] for s in symbols])
-    n = len(symbols)
+    # --- Solve the cached parameterised problem ---
+    problem = get_portfolio_problem(symbols)
+    with problem.lock:
+        problem.set_covariance(cov_matrix)
+        raw = problem.solve(mu, w_baseline, risk_aversion, baseline_reg, min_weight, max_weight)
 
-    # --- Define optimisation variable ---
-    w = cp.Variable(n)
+    if raw is None:
+        raise ValueError(f"Optimisation failed: {problem.problem.status}")
 
-    # --- Define objective ---
-    ret_term = mu.T @ w
-    risk_term = risk_aversion * cp.quad_form(w, cov_matrix)
-    baseline_penalty = baseline_reg * cp.sum_squares(w - w_baseline)
-    objective = cp.Maximize(ret_term - risk_term - baseline_penalty)
+    return _clean_weights(raw, symbols, cleanup_threshold).to_dict()
 
-    # --- Define constraints ---
-    constraints = [
-        cp.sum(w) == 1,   # weights sum to 1
-        w >= min_weight,  # long-only lower bound
-        w <= max_weight   # max weight per asset
-    ]
 
-    # --- Solve optimisation problem ---
-    prob = cp.Problem(objective, constraints)
-    prob.solve(solver=cp.SCS)
+def sweep_portfolios(
+    mu_dict: dict,
+    cov_dict: dict,
+    w_baseline_dict: dict,
+    base_params: dict,
+    grid: dict,
+    cleanup_threshold: float = 1e-4
+) -> list:
+    """
+    Solve the portfolio problem over a grid of parameter values in one pass.
 
-    # --- Convert solution to pandas Series ---
-    weights = pd.Series(w.value, index=symbols, dtype=float)
+    The grid is swept in sorted order on a single cached problem, so each
+    solve warm-starts from its neighbour. An efficient frontier is a grid
+    over risk_aversion alone.
 
-    # --- Post-processing cleanup ---
-    weights[weights < 0] = np.maximum(weights[weights < 0], 0)  # clip negatives
-    weights[weights.abs() < cleanup_threshold] = 0              # zero tiny weights
+    Args:
+        mu_dict, cov_dict, w_baseline_dict: as for `optimise_portfolio`
+        base_params: dict of fixed values for risk_aversion, baseline_reg,
+                     min_weight and max_weight
+        grid: dict mapping any of those parameter names -> list of values
+        cleanup_threshold: small weights below this are zeroed
 
-    # --- Renormalise to sum to 1 ---
-    total = weights.sum()
-    if total > 0:
-        weights /= total
+    Returns:
+        list of dicts with params, weights, expected_return, volatility and status
 
-    # --- Optionally remove zero-weight assets ---
-    weights = weights[weights > 0]
+    Raises:
+        ValueError: for unknown parameters, empty value lists or a grid of
+                    more than MAX_SWEEP_POINTS points
+    """
+    unknown = set(grid) - set(SWEEPABLE_PARAMS)
+    if unknown:
+        raise ValueError(f"Cannot sweep parameters: {sorted(unknown)}")
+    if any(len(v) == 0 for v in grid.values()):
+        raise ValueError("Sweep grid values must not be empty")
+    n_points = math.prod(len(v) for v in grid.values())
+    if n_points > MAX_SWEEP_POINTS:
+        raise ValueError(f"Sweep grid has {n_points} points; at most {MAX_SWEEP_POINTS} are allowed")
+
+    symbols, mu, cov_matrix, w_baseline = _prepare_inputs(mu_dict, cov_dict, w_baseline_dict)
+    names = list(grid.keys())
+    values = [sorted(grid[name]) for name in names]
+
+    problem = get_portfolio_problem(symbols)
+    points = []
+    with problem.lock:
+        problem.set_covariance(cov_matrix)
+
+        for combo in itertools.product(*values):
+            params = {**base_params, **dict(zip(names, combo))}
+            raw = problem.solve(
+                mu, w_baseline,
+                params["risk_aversion"], params["baseline_reg"],
+                params["min_weight"], params["max_weight"]
+            )
+
+            if raw is None:
+                points.append({"params": params, "weights": {}, "expected_return": None,
+                               "volatility": None, "status": problem.problem.status})
+                continue
+
+            weights = _clean_weights(raw, symbols, cleanup_threshold)
+            w_full = weights.reindex(symbols, fill_value=0.0).to_numpy()
+            points.append({
+                "params": params,
+                "weights": weights.to_dict(),
+                "expected_return": float(mu @ w_full),
+                "volatility": float(np.sqrt(max(w_full @ cov_matrix @ w_full, 0.0))),
+                "status": problem.problem.status
+            })
 
-    return weights.to_dict()
+    return points
@@ -14,6 +14,8 @@ import numpy as np
 
 from app.database import get_connection, release_connection
 from app.stores.task_stores import prescreen_tasks_store as tasks_store
+from app.utils.cancellation import CancellationToken
+from app.utils.query_log import query_log
 from .tests.run_tests import (
     run_breakout_tests,
     run_global_tests,
@@ -79,18 +81,117 @@ def test_symbol(symbol, symbol_data, end, filters):
     return symbol, symbol_results, fails, start_time, datetime.now().isoformat()
 
 
+# ---------------------------------------------
+# Progress Aggregate
+# ---------------------------------------------
+class ProgressAggregate:
+    """
+    Lock-free local aggregate of prescreen progress, results and fail counts.
+
+    Fetcher and runner coroutines share one event loop, so counters are plain
+    attributes mutated without awaits. Pending results and fail counts are merged
+    into tasks_store and a fresh progress snapshot is emitted only on flush, which
+    happens every `flush_every` completions or `flush_interval` seconds.
+    """
+
+    def __init__(self, total, progress_callback=None, task_id=None, flush_every=50, flush_interval=0.5):
+        self.total = total
+        self.testing = 0
+        self.completed = 0
+        self.progress_callback = progress_callback
+        self.task_id = task_id
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.cancelled = False
+
+        self._pending_results = {}
+        self._pending_fails = {"global": {}, "momentum": {}, "mean_reversion": {}, "breakout": {}}
+        self._since_flush = 0
+        self._last_flush = time.monotonic()
+
+    def started(self, n=1):
+        """Record `n` symbols submitted for testing."""
+        self.testing += n
+        self._tick(0)
+
+    def finished(self, sym, res, fails):
+        """Record a completed symbol with its results and failed test names."""
+        self.testing -= 1
+        self.completed += 1
+        self._pending_results[sym] = res
+        for group_name, fail_list in fails.items():
+            counts = self._pending_fails.setdefault(group_name, {})
+            for fail in fail_list:
+                counts[fail] = counts.get(fail, 0) + 1
+        self._tick(1)
+
+    def dropped(self, n=1):
+        """Record `n` submitted symbols whose tests were cancelled before running."""
+        self.testing -= n
+        self._tick(0)
+
+    def missing(self, symbols):
+        """Record symbols with no recent data as failing the global tests."""
+        counts = self._pending_fails["global"]
+        for sym in symbols:
+            self._pending_results[sym] = {
+                "global": False,
+                "momentum": True,
+                "mean_reversion": True,
+                "breakout": True
+            }
+            counts["no data"] = counts.get("no data", 0) + 1
+            self.completed += 1
+        self._tick(len(symbols))
+
+    def _tick(self, n_completed):
+        self._since_flush += n_completed
+        if (self._since_flush >= self.flush_every
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self.flush()
+
+    def flush(self):
+        """Merge pending results into tasks_store, then publish a new progress snapshot."""
+        if self.task_id is not None:
+            with tasks_store.mutate(self.task_id) as task:
+                task["results"].update(self._pending_results)
+                for group_name, counts in self._pending_fails.items():
+                    stored = task["fails"].setdefault(group_name, {})
+                    for fail, count in counts.items():
+                        stored[fail] = stored.get(fail, 0) + count
+
+        self._pending_results = {}
+        self._pending_fails = {"global": {}, "momentum": {}, "mean_reversion": {}, "breakout": {}}
+        self._since_flush = 0
+        self._last_flush = time.monotonic()
+
+        # Results are merged before progress so a snapshot never reports
+        # completions whose results are not yet visible
+        if self.progress_callback:
+            progress = {
+                "testing": self.testing,
+                "completed": self.completed,
+                "total": self.total,
+            }
+            if self.cancelled:
+                progress["cancelled"] = True
+            self.progress_callback(progress)
+
+
 # ---------------------------------------------
 # Async Price Fetcher
 # ---------------------------------------------
-async def fetch_prices(symbols, start, end, queue: asyncio.Queue, stop_signal, lock, completed_count, testing_count, progress_callback, batch_size=25, task_id=None):
+async def fetch_prices(symbols, start, end, queue: asyncio.Queue, stop_signal, aggregate: ProgressAggregate, batch_size=25, cancel_token=None):
     """
     Fetch price data from SQL Server in batches and stream into an asyncio queue.
     Dynamically adjusts batch size based on fetch speed.
+    Symbols with no recent data are recorded as missing on the progress aggregate.
+    Stops fetching once `cancel_token` is cancelled.
     """
     symbols_iter = iter(symbols)
     consecutive_fast = consecutive_slow = 0
 
-    while True:
+    while cancel_token is None or not cancel_token.cancelled:
         batch = list(itertools.islice(symbols_iter, batch_size))
         if not batch:
             break
@@ -111,10 +212,12 @@ async def fetch_prices(symbols, start, end, queue: asyncio.Queue, stop_signal, l
                 ORDER BY symbol, [date];
             """
 
+            params = (*batch, start, end)
             t0 = time.perf_counter()
-            await cursor.execute(sql, (*batch, start, end))
+            await cursor.execute(sql, params)
             rows = await cursor.fetchall()
             t1 = time.perf_counter()
+            query_log.record(sql, params, len(rows), t1 - t0)
 
             # Filter out missing and delisted symbols
             batch_symbols = set(batch)
@@ -122,26 +225,9 @@ async def fetch_prices(symbols, start, end, queue: asyncio.Queue, stop_signal, l
             returned_symbols = set(r[0] for r in rows if r[1] >= recent_cutoff)
             missing_symbols = batch_symbols - returned_symbols
 
-            # Update missing symbol results in tasks_store
-            if task_id is not None and missing_symbols:
-                async with lock:
-                    for sym in missing_symbols:
-                        tasks_store[task_id]["results"][sym] = {
-                            "global": False,
-                            "momentum": True,
-                            "mean_reversion": True,
-                            "breakout": True
-                        }
-                        tasks_store[task_id]["fails"]["global"]["no data"] = \
-                            tasks_store[task_id]["fails"]["global"].get("no data", 0) + 1
-                        completed_count["value"] += 1
-
-                    if progress_callback:
-                        progress_callback({
-                            "testing": testing_count["value"],
-                            "completed": completed_count["value"],
-                            "total": len(symbols),
-                        })
+            # Record missing symbols locally; flushed to tasks_store in batches
+            if missing_symbols:
+                aggregate.missing(missing_symbols)
 
             await queue.put(rows)
 
@@ -176,57 +262,43 @@ async def fetch_prices(symbols, start, end, queue: asyncio.Queue, stop_signal, l
 # ---------------------------------------------
 # Async Test Runner
 # ---------------------------------------------
-async def run_tests_async(symbols, start, end, filters, max_workers=5, progress_callback=None, task_id=None):
+async def run_tests_async(symbols, start, end, filters, max_workers=5, progress_callback=None, task_id=None, cancel_token=None):
     """
     Orchestrates streaming price fetches and parallel execution of symbol tests using ProcessPoolExecutor.
-    Updates progress and results in tasks_store if task_id is provided.
+    Progress, results and fail counts are aggregated locally and flushed to tasks_store
+    in batches if task_id is provided.
+    Once `cancel_token` is cancelled no further symbols are fetched or submitted,
+    pending tests are dropped and the final progress snapshot is marked cancelled.
     """
+    token = cancel_token or CancellationToken()
     queue = asyncio.Queue(maxsize=50)
     stop_signal = object()
     results = {}
-    testing_count = {"value": 0}
-    completed_count = {"value": 0}
-    lock = asyncio.Lock()
-
-    async def update_progress():
-        if progress_callback:
-            progress_callback({
-                "testing": testing_count["value"],
-                "completed": completed_count["value"],
-                "total": len(symbols),
-            })
+    aggregate = ProgressAggregate(len(symbols), progress_callback, task_id)
 
-    fetch_task = asyncio.create_task(fetch_prices(symbols, start, end, queue, stop_signal, lock, completed_count, testing_count, progress_callback, batch_size=25, task_id=task_id))
+    fetch_task = asyncio.create_task(fetch_prices(symbols, start, end, queue, stop_signal, aggregate, batch_size=25, cancel_token=token))
 
-    loop = asyncio.get_running_loop()
     with ProcessPoolExecutor(max_workers=max_workers) as executor:
         in_flight = {}
 
-        async def check_done():
-            """Check completed futures and update results."""
-            nonlocal testing_count, completed_count
+        def check_done():
+            """Check completed futures and record results."""
             finished = [f for f in in_flight if f.done()]
             for f in finished:
                 sym = in_flight.pop(f)
+                if f.cancelled():
+                    aggregate.dropped()
+                    continue
                 try:
                     sym, res, fails, _, _ = f.result()
                 except Exception as e:
                     res = {"error": str(e)}
                     fails = {"global": [str(e)], "momentum": [], "mean_reversion": [], "breakout": []}
 
-                async with lock:
-                    testing_count["value"] -= 1
-                    completed_count["value"] += 1
-                    results[sym] = res
-                    if task_id:
-                        tasks_store[task_id]["results"][sym] = res
-                        for group_name, fail_list in fails.items():
-                            for fail in fail_list:
-                                d = tasks_store[task_id]["fails"][group_name]
-                                d[fail] = d.get(fail, 0) + 1
-                    await update_progress()
-
-        while True:
+                results[sym] = res
+                aggregate.finished(sym, res, fails)
+
+        while not token.cancelled:
             batch = await queue.get()
             if batch is stop_signal:
                 break
@@ -243,30 +315,42 @@ async def run_tests_async(symbols, start, end, filters, max_workers=5, progress_
                 })
 
             for sym, data in grouped.items():
-                while len(in_flight) >= max_workers * 2:
+                while len(in_flight) >= max_workers * 2 and not token.cancelled:
                     await asyncio.sleep(0.1)
-                    await check_done()
+                    check_done()
 
+                if token.cancelled:
+                    break
                 fut = executor.submit(test_symbol, sym, data, end, filters)
                 in_flight[fut] = sym
-                async with lock:
-                    testing_count["value"] += 1
-                    await update_progress()
+                aggregate.started()
+
+            check_done()
 
-            await check_done()
+        if token.cancelled:
+            # Drop queued tests and stop the fetcher; running tests finish on their own
+            executor.shutdown(wait=False, cancel_futures=True)
+            fetch_task.cancel()
 
         # Wait for remaining tasks
         while in_flight:
-            await check_done()
+            check_done()
             await asyncio.sleep(0.05)
 
+    # Final flush so the last snapshot reflects every completed symbol
+    try:
+        await fetch_task
+    except asyncio.CancelledError:
+        if not token.cancelled:
+            raise
+    aggregate.cancelled = token.cancelled
+    aggregate.flush()
     print("All tasks completed.")
-    await fetch_task
     return results, None
 
 
 # ---------------------------------------------
 # Public API
 # ---------------------------------------------
-async def run_tests(symbols, start, end, filters, max_workers=5, progress_callback=None, task_id=None):
-    return await run_tests_async(symbols, start, end, filters, max_workers, progress_callback, task_id)
+async def run_tests(symbols, start, end, filters, max_workers=5, progress_callback=None, task_id=None, cancel_token=None):
+    return await run_tests_async(symbols, start, end, filters, max_workers, progress_callback, task_id, cancel_token)
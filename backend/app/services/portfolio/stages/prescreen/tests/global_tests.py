@@ -1,5 +1,4 @@
 import numpy as np
-from scipy.stats import skew, kurtosis
 
 # === Global Heuristic Tests Engine ===
 
@@ -84,6 +83,8 @@ def skewness_test(short_returns, long_returns, threshold=0) -> bool:
     Returns:
         bool: True if skewness >= threshold for short or long period
     """
+    from scipy.stats import skew  # heavy import, loaded on first use
+
     def safe_skew(x):
         return float(skew(x, bias=False)) if len(x) > 2 else np.nan
 
@@ -105,6 +106,8 @@ def kurtosis_test(short_returns, long_returns, threshold=3) -> bool:
     Returns:
         bool: True if kurtosis <= threshold for short or long period
     """
+    from scipy.stats import kurtosis  # heavy import, loaded on first use
+
     def safe_kurt(x):
         return float(kurtosis(x, fisher=False, bias=False)) if len(x) > 3 else np.nan
 
@@ -0,0 +1 @@
+from .job_scheduler import BATCH, INTERACTIVE, MAX_CPU_JOBS, JobScheduler, JobTicket, cpu_scheduler
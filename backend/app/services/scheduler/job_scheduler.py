@@ -0,0 +1,260 @@
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from app.utils.cancellation import TaskCancelled
+
+# === Central CPU job scheduler ===
+
+# Priority classes: lower value is admitted first
+INTERACTIVE = 0     # user-facing backtests, walk-forwards, pair selection
+BATCH = 1           # parameter optimisation trials, prescreen
+
+MAX_CPU_JOBS = int(os.getenv("MAX_CPU_JOBS", max(1, (os.cpu_count() or 2) - 1)))
+
+
+class JobTicket:
+    """
+    A job's place in the scheduler: queued until admitted, then running with
+    `granted` CPU slots until released.
+    """
+
+    def __init__(self, priority: int, slots: int, label: str, seq: int):
+        self.priority = priority
+        self.slots = slots
+        self.label = label
+        self.seq = seq
+        self.granted = 0
+        self.enqueued_at = time.time()
+        self.started_at = None
+        self._event = threading.Event()
+        self._waiters = []          # (loop, asyncio.Future) of async waiters
+
+    @property
+    def admitted(self) -> bool:
+        return self._event.is_set()
+
+    def _grant(self, slots: int):
+        """Admit the ticket with `slots` CPU slots; caller holds the scheduler lock."""
+        self.granted = slots
+        self.started_at = time.time()
+        self._event.set()
+        for loop, future in self._waiters:
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(_resolve, future)
+        self._waiters = []
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(True)
+
+
+class JobScheduler:
+    """
+    Admission control for CPU-heavy jobs.
+
+    The machine is modelled as `max_slots` CPU slots. Jobs ask for up to
+    `slots` and are admitted in (priority, arrival) order as soon as one slot
+    is free, receiving min(requested, free) slots; callers size their process
+    pools by the granted count. Running jobs are never preempted.
+
+    Queued jobs get their position and an estimated start time, derived from
+    the observed average duration of each job label.
+
+    Args:
+        max_slots: total CPU slots shared by all jobs
+    """
+
+    def __init__(self, max_slots: int = MAX_CPU_JOBS):
+        self.max_slots = max(1, int(max_slots))
+        self._free = self.max_slots
+        self._queue = []                    # heap of (priority, seq, ticket)
+        self._running = set()
+        self._seq = itertools.count()
+        self._durations = {}                # label -> EWMA of job duration in seconds
+        self._lock = threading.Lock()
+        self._counters = {"admitted": 0, "completed": 0, "withdrawn": 0, "wait_seconds": 0.0}
+
+    # -----------------------------------------
+    # Queue management
+    # -----------------------------------------
+    def submit(self, priority: int = INTERACTIVE, slots: int = 1, label: str = "job") -> JobTicket:
+        """Queue a job and admit it immediately if a slot is free."""
+        slots = max(1, min(int(slots), self.max_slots))
+        with self._lock:
+            ticket = JobTicket(priority, slots, label, next(self._seq))
+            heapq.heappush(self._queue, (priority, ticket.seq, ticket))
+            self._dispatch()
+        return ticket
+
+    def release(self, ticket: JobTicket):
+        """Return a running job's slots, or withdraw it if it is still queued."""
+        with self._lock:
+            if ticket in self._running:
+                self._running.discard(ticket)
+                self._free += ticket.granted
+                self._counters["completed"] += 1
+                self._record_duration(ticket.label, time.time() - ticket.started_at)
+            else:
+                entries = [e for e in self._queue if e[2] is not ticket]
+                if len(entries) != len(self._queue):
+                    self._queue = entries
+                    heapq.heapify(self._queue)
+                    self._counters["withdrawn"] += 1
+            self._dispatch()
+
+    def _dispatch(self):
+        """Admit queued jobs while slots are free; caller holds the lock."""
+        while self._queue and self._free > 0:
+            _, _, ticket = heapq.heappop(self._queue)
+            granted = min(ticket.slots, self._free)
+            self._free -= granted
+            self._running.add(ticket)
+            self._counters["admitted"] += 1
+            ticket._grant(granted)
+            self._counters["wait_seconds"] += ticket.started_at - ticket.enqueued_at
+
+    def _record_duration(self, label: str, seconds: float, alpha: float = 0.3):
+        previous = self._durations.get(label)
+        self._durations[label] = seconds if previous is None else (1 - alpha) * previous + alpha * seconds
+
+    # -----------------------------------------
+    # Queue visibility
+    # -----------------------------------------
+    def queue_info(self, ticket: JobTicket) -> dict:
+        """
+        Queue state of a ticket, as published into SSE task state.
+
+        Returns:
+            dict with status ("queued" / "running"), position (1-based, None
+            once running), estimated_start (epoch seconds) and, while queued,
+            estimated_wait_seconds (None until a duration history exists),
+            plus granted_slots
+        """
+        with self._lock:
+            if ticket.admitted:
+                return {"status": "running", "position": None,
+                        "estimated_start": ticket.started_at, "granted_slots": ticket.granted}
+
+            ordered = sorted(self._queue)
+            ahead = [t for _, _, t in ordered if (t.priority, t.seq) < (ticket.priority, ticket.seq)]
+            estimated_start = self._estimate_start(ahead)
+            return {
+                "status": "queued",
+                "position": len(ahead) + 1,
+                "estimated_start": estimated_start,
+                "estimated_wait_seconds": None if estimated_start is None else max(0.0, estimated_start - time.time()),
+                "granted_slots": 0,
+            }
+
+    def _estimate_start(self, ahead: list):
+        """
+        Simulate slot availability: running jobs free their slots after their
+        label's average duration, then each job ahead takes the earliest free
+        slot for its average duration. Caller holds the lock.
+        """
+        now = time.time()
+        default = (sum(self._durations.values()) / len(self._durations)) if self._durations else None
+
+        free_at = [now] * self._free
+        for ticket in self._running:
+            duration = self._durations.get(ticket.label, default)
+            if duration is None:
+                return None
+            free_at.extend([max(now, ticket.started_at + duration)] * ticket.granted)
+        heapq.heapify(free_at)
+
+        for ticket in ahead:
+            duration = self._durations.get(ticket.label, default)
+            if duration is None:
+                return None
+            start = heapq.heappop(free_at)
+            heapq.heappush(free_at, start + duration)
+        return free_at[0]
+
+    def stats(self) -> dict:
+        """Slot usage, queue depth per priority and admission counters."""
+        with self._lock:
+            queued = {}
+            for priority, _, _ in self._queue:
+                queued[priority] = queued.get(priority, 0) + 1
+            slots_by_label = {}
+            for ticket in self._running:
+                slots_by_label[ticket.label] = slots_by_label.get(ticket.label, 0) + ticket.granted
+            return {
+                "max_slots": self.max_slots,
+                "free_slots": self._free,
+                "running_jobs": len(self._running),
+                "running_slots_by_label": slots_by_label,
+                "queued_jobs": len(self._queue),
+                "queued_by_priority": queued,
+                "avg_duration_seconds": dict(self._durations),
+                **self._counters,
+            }
+
+    # -----------------------------------------
+    # Acquire helpers
+    # -----------------------------------------
+    @contextmanager
+    def acquire(self, priority: int = INTERACTIVE, slots: int = 1, label: str = "job",
+                on_queue=None, cancel_token=None, refresh: float = 1.0):
+        """
+        Blocking acquire for sync code (threadpool routes).
+
+        Yields the admitted JobTicket; `ticket.granted` is the number of CPU
+        slots the job may use. `on_queue(info)` is called while queued (every
+        `refresh` seconds) and once on admission. Raises TaskCancelled if
+        `cancel_token` is cancelled while queued.
+        """
+        ticket = self.submit(priority, slots, label)
+        try:
+            while not ticket.admitted:
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise TaskCancelled()
+                if on_queue is not None:
+                    on_queue(self.queue_info(ticket))
+                ticket._event.wait(refresh)
+
+            if on_queue is not None:
+                on_queue(self.queue_info(ticket))
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    @asynccontextmanager
+    async def acquire_async(self, priority: int = INTERACTIVE, slots: int = 1, label: str = "job",
+                            on_queue=None, cancel_token=None, refresh: float = 1.0):
+        """Non-blocking counterpart of `acquire` for coroutines."""
+        ticket = self.submit(priority, slots, label)
+        try:
+            loop = asyncio.get_running_loop()
+            while not ticket.admitted:
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise TaskCancelled()
+                if on_queue is not None:
+                    on_queue(self.queue_info(ticket))
+
+                future = loop.create_future()
+                with self._lock:
+                    if ticket.admitted:
+                        break
+                    ticket._waiters.append((loop, future))
+                try:
+                    await asyncio.wait_for(future, refresh)
+                except asyncio.TimeoutError:
+                    pass
+
+            if on_queue is not None:
+                on_queue(self.queue_info(ticket))
+            yield ticket
+        finally:
+            self.release(ticket)
+
+
+# Shared scheduler for every CPU-heavy endpoint
+cpu_scheduler = JobScheduler(MAX_CPU_JOBS)
@@ -0,0 +1,107 @@
+import os
+import threading
+from collections import deque
+
+from app.utils.cache_dirs import default_cache_dir
+from app.utils.lru_cache import LRUCache
+from app.utils.result_cache import TieredResultCache
+
+# =============================================
+# Price Data Version
+# =============================================
+# Monotonic counter bumped whenever ingestion writes prices to the DB.
+# Caches of values derived from stored prices include it in their keys,
+# so stale entries are never served after new data lands.
+# Each bump also records which symbols were written from which date, so a
+# cached value over an earlier date range can tell whether it is still valid.
+#
+# The version is process-local: these caches assume the server runs as a
+# single process and is the only writer of prices. Writes from another
+# process (the seeder CLI, a second worker) are not seen; after such writes,
+# POST /api/internal/cache/clear bumps the version for every symbol.
+_price_data_version = 0
+_price_writes = deque(maxlen=10_000)   # (version, symbol or None, first date written or None)
+_price_data_version_lock = threading.Lock()
+
+
+def get_price_data_version() -> int:
+    return _price_data_version
+
+
+def bump_price_data_version(symbol=None, start=None) -> int:
+    """
+    Record a price write and return the new data version.
+
+    Args:
+        symbol: symbol written, or None if unknown / many
+        start: earliest date written, or None if unknown
+    """
+    global _price_data_version
+    with _price_data_version_lock:
+        _price_data_version += 1
+        _price_writes.append((_price_data_version, symbol, start))
+        return _price_data_version
+
+
+def prices_unchanged_since(version: int, symbols, end) -> bool:
+    """
+    Check that no price write after `version` touched `symbols` on or before `end`.
+
+    Returns False if the write history no longer reaches back to `version`.
+    """
+    with _price_data_version_lock:
+        if version == _price_data_version:
+            return True
+        if not _price_writes or _price_writes[0][0] > version + 1:
+            return False
+        symbols = set(symbols)
+        for v, symbol, start in _price_writes:
+            if v <= version:
+                continue
+            if symbol is not None and symbol not in symbols:
+                continue
+            if start is None or start <= end:
+                return False
+        return True
+
+
+# =============================================
+# Portfolio Inputs Cache
+# =============================================
+# Server-side expected returns / covariance inputs.
+# Keys:
+#   - (symbols, start, end, decay) -> PortfolioInputsEntry holding the input engine
+#   - inputs_key (str) -> dict with symbols, expected_returns and risk_matrix
+# Both grow with the square of the symbol count, so the cache is bounded by
+# estimated bytes as well as entries.
+PORTFOLIO_INPUTS_CACHE_MB = float(os.getenv("PORTFOLIO_INPUTS_CACHE_MB", "256"))
+
+portfolio_inputs_cache = LRUCache(maxsize=64, max_bytes=int(PORTFOLIO_INPUTS_CACHE_MB * 1024 * 1024))
+
+
+# =============================================
+# Portfolio Signal Cache
+# =============================================
+# Streaming signal state per saved portfolio, advanced bar by bar as new
+# prices are ingested.
+# Keys:
+#   - portfolio id -> PortfolioSignalEntry holding one streaming signal per strategy
+portfolio_signal_cache = LRUCache(maxsize=int(os.getenv("PORTFOLIO_SIGNAL_CACHE_SIZE", "256")))
+
+
+# =============================================
+# Backtest Result Cache
+# =============================================
+# Finished backtest and walk-forward results keyed by a canonical hash of
+# the request. Entries record the price data version they were computed at
+# and are dropped once a later price write touches their symbols / range.
+BACKTEST_CACHE_MEMORY_MB = float(os.getenv("BACKTEST_CACHE_MEMORY_MB", "128"))
+BACKTEST_CACHE_DISK_MB = float(os.getenv("BACKTEST_CACHE_DISK_MB", "1024"))
+BACKTEST_CACHE_DIR = os.getenv("BACKTEST_CACHE_DIR", default_cache_dir("result_cache"))
+
+backtest_result_cache = TieredResultCache(
+    "backtest",
+    memory_budget_bytes=int(BACKTEST_CACHE_MEMORY_MB * 1024 * 1024),
+    disk_budget_bytes=int(BACKTEST_CACHE_DISK_MB * 1024 * 1024),
+    disk_dir=BACKTEST_CACHE_DIR,
+)
@@ -1,4 +1,34 @@
-from collections import defaultdict
+import asyncio
+import os
+
+from app.utils.cache_dirs import default_cache_dir
+
+from .versioned_store import VersionedTaskStore
+
+# All stores are VersionedTaskStores: producers publish changes, which bump
+# a per-task version and wake SSE handlers waiting on that task.
+#
+# Finished tasks are evicted after TASK_STORE_TTL_SECONDS idle, and large
+# result fields beyond TASK_STORE_MEMORY_BUDGET_MB (per store) are spilled
+# to gzip files under TASK_STORE_SPILL_DIR until the results are requested.
+TASK_STORE_TTL_SECONDS = float(os.getenv("TASK_STORE_TTL_SECONDS", "3600"))
+TASK_STORE_MEMORY_BUDGET_BYTES = int(float(os.getenv("TASK_STORE_MEMORY_BUDGET_MB", "256")) * 1024 * 1024)
+TASK_STORE_SPILL_DIR = os.getenv("TASK_STORE_SPILL_DIR", default_cache_dir("task_spill"))
+TASK_STORE_MAINTENANCE_INTERVAL = float(os.getenv("TASK_STORE_MAINTENANCE_INTERVAL", "30"))
+
+_bounded = dict(
+    ttl_seconds=TASK_STORE_TTL_SECONDS,
+    memory_budget_bytes=TASK_STORE_MEMORY_BUDGET_BYTES,
+    spill_dir=TASK_STORE_SPILL_DIR,
+)
+
+
+def _prescreen_finished(state) -> bool:
+    """Prescreen tasks have no status; they finish when every symbol is tested or when cancelled."""
+    progress = state.get("progress") or {}
+    if progress.get("cancelled"):
+        return True
+    return progress.get("total", 0) > 0 and progress.get("completed", 0) >= progress["total"]
 
 # =============================================
 # Prescreen Tasks Store
@@ -8,8 +38,9 @@ from collections import defaultdict
 #   - progress: dict with testing, completed, and total counts
 #   - results: dict mapping symbol -> test results
 #   - fails: dict of fail counts per test group
-prescreen_tasks_store = defaultdict(
-    lambda: {
+prescreen_tasks_store = VersionedTaskStore(
+    "prescreen",
+    default_factory=lambda: {
         "progress": {"testing": 0, "completed": 0, "total": 0},
         "results": {},
         "fails": {
@@ -18,7 +49,10 @@ prescreen_tasks_store = defaultdict(
             "mean_reversion": {},
             "breakout": {}
         }
-    }
+    },
+    spill_keys=("results",),
+    is_finished=_prescreen_finished,
+    **_bounded
 )
 
 
@@ -27,18 +61,52 @@ prescreen_tasks_store = defaultdict(
 # =============================================
 # Tracks walkforward backtesting tasks.
 # Key: task_id -> value: dict with backtest progress, results, window info, etc.
-walkforward_tasks_store = {}
+walkforward_tasks_store = VersionedTaskStore("walkforward", spill_keys=("results",), **_bounded)
+
+
+# =============================================
+# Backtest Jobs Store
+# =============================================
+# Tracks asynchronous standard and multi-portfolio backtests.
+# Key: task_id -> value: dict with status, per-run progress and final results.
+backtest_tasks_store = VersionedTaskStore("backtest", spill_keys=("results",), **_bounded)
 
 
 # =============================================
 # Pairs Trading Tasks Store
 # =============================================
 # Stores progress and results for pairs trading strategy tasks.
-pairs_tasks_store = {}
+pairs_tasks_store = VersionedTaskStore("pairs", spill_keys=("results",), **_bounded)
 
 
 # =============================================
 # Parameter Optimisation Tasks Store
 # =============================================
 # Tracks parameter optimisation tasks for strategies.
-param_optimisation_tasks_store = {}
+param_optimisation_tasks_store = VersionedTaskStore("param_optimisation", ttl_seconds=TASK_STORE_TTL_SECONDS)
+
+
+all_task_stores = (
+    prescreen_tasks_store,
+    walkforward_tasks_store,
+    backtest_tasks_store,
+    pairs_tasks_store,
+    param_optimisation_tasks_store,
+)
+
+
+async def maintain_task_stores(interval: float = TASK_STORE_MAINTENANCE_INTERVAL):
+    """Background loop applying TTL eviction and result spill to every store."""
+    while True:
+        await asyncio.sleep(interval)
+        for store in all_task_stores:
+            try:
+                await asyncio.to_thread(store.maintain)
+            except Exception as e:
+                print(f"Task store maintenance failed for {store.name}: {e}")
+
+
+def close_task_stores():
+    """Remove spill files on shutdown; task state does not outlive the process."""
+    for store in all_task_stores:
+        store.close()
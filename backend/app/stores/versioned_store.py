@@ -0,0 +1,399 @@
+import asyncio
+import gzip
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections.abc import MutableMapping
+from contextlib import contextmanager
+
+from app.utils.cache_dirs import ensure_private_dir
+
+
+def _status_finished(state) -> bool:
+    """Default finished check: the task reports a terminal status."""
+    return state.get("status") in ("done", "failed", "cancelled")
+
+
+class VersionedTaskStore(MutableMapping):
+    """
+    Task state store with per-task versions and push-based change notification.
+
+    Behaves like a dict of task_id -> state dict, so existing readers keep
+    working, but producers change state through `publish` / `mutate`, which
+    bump the task's version and wake any coroutines waiting in
+    `wait_for_update`. SSE handlers therefore sleep until something changes
+    instead of polling and diffing snapshots.
+
+    Producers may run on the event loop, in threadpool threads or on other
+    event loops; waiters are always woken on their own loop.
+
+    Convention: values read by SSE snapshots are replaced, not mutated in
+    place, so a shallow `snapshot` taken under the lock is consistent.
+
+    Finished tasks are bounded by `maintain`: tasks idle for longer than
+    `ttl_seconds` are evicted, and when the finished tasks' `spill_keys`
+    fields exceed `memory_budget_bytes`, the least recently used are written
+    to gzip-compressed pickles in `spill_dir` and loaded back transparently
+    the next time the task is read. Spill files are unpickled, so nothing is
+    spilled unless `spill_dir` is private to this user.
+
+    Args:
+        name: store name, used for stats and the spill directory
+        default_factory: optional callable creating state for unknown task ids
+        ttl_seconds: evict finished tasks idle for this long (None = never)
+        memory_budget_bytes: spill finished tasks' large fields beyond this (None = never)
+        spill_keys: state fields that may be spilled to disk
+        spill_dir: base directory for spill files
+        is_finished: callable(state) -> bool, whether a task may be evicted or spilled
+    """
+
+    def __init__(
+        self,
+        name: str,
+        default_factory=None,
+        ttl_seconds: float = None,
+        memory_budget_bytes: int = None,
+        spill_keys=(),
+        spill_dir: str = None,
+        is_finished=None
+    ):
+        self.name = name
+        self.default_factory = default_factory
+        self.ttl_seconds = ttl_seconds
+        self.memory_budget_bytes = memory_budget_bytes
+        self.spill_keys = tuple(spill_keys)
+        self.spill_dir = os.path.join(spill_dir, f"{name}-{os.getpid()}") if spill_dir else None
+        self._spill_dir_checked = False
+        self.is_finished = is_finished or _status_finished
+
+        self._tasks = {}
+        self._versions = {}
+        self._global_version = 0
+        self._waiters = {}          # task_id (None = any task) -> set of (loop, asyncio.Event)
+        self._lock = threading.RLock()
+
+        self._touched = {}          # task_id -> monotonic time of last change or full read
+        self._sizes = {}            # task_id -> (version, pickled bytes of spill_keys fields)
+        self._spill_files = {}      # task_id -> (path, version, compressed bytes) written to disk
+        self._spilled = set()       # task_ids whose spill_keys fields are currently on disk only
+        self._counters = {"ttl_evictions": 0, "spills": 0, "spill_loads": 0}
+
+    # -----------------------------------------
+    # Mapping protocol
+    # -----------------------------------------
+    def __getitem__(self, task_id):
+        with self._lock:
+            if task_id not in self._tasks:
+                if self.default_factory is None:
+                    raise KeyError(task_id)
+                self._tasks[task_id] = self.default_factory()
+                self._bump(task_id)
+            if task_id in self._spilled:
+                self._load_spilled(task_id)
+            self._touched[task_id] = time.monotonic()
+            return self._tasks[task_id]
+
+    def get(self, task_id, default=None):
+        """Like dict.get: never creates state through default_factory."""
+        with self._lock:
+            if task_id not in self._tasks:
+                return default
+            return self[task_id]
+
+    def __setitem__(self, task_id, state):
+        with self._lock:
+            self._tasks[task_id] = state
+            self._spilled.discard(task_id)
+            self._bump(task_id)
+
+    def __delitem__(self, task_id):
+        with self._lock:
+            del self._tasks[task_id]
+            self._bump(task_id)
+            self._forget(task_id)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._tasks.keys()))
+
+    def __len__(self):
+        return len(self._tasks)
+
+    def __contains__(self, task_id):
+        return task_id in self._tasks
+
+    def clear(self):
+        with self._lock:
+            task_ids = list(self._tasks.keys())
+            self._tasks.clear()
+            for task_id in task_ids:
+                self._bump(task_id)
+                self._forget(task_id)
+
+    # -----------------------------------------
+    # Producers
+    # -----------------------------------------
+    def publish(self, task_id, **fields) -> int:
+        """
+        Replace top-level fields of a task's state and notify subscribers.
+
+        Creates the task state if it does not exist yet.
+
+        Returns:
+            int: the task's new version
+        """
+        with self._lock:
+            if task_id in self._spilled:
+                self._load_spilled(task_id)
+            state = self._tasks.setdefault(task_id, {})
+            state.update(fields)
+            return self._bump(task_id)
+
+    @contextmanager
+    def mutate(self, task_id):
+        """
+        Context manager yielding a task's live state for in-place changes;
+        the version is bumped and subscribers notified on exit.
+        """
+        with self._lock:
+            state = self[task_id]
+            try:
+                yield state
+            finally:
+                self._bump(task_id)
+
+    # -----------------------------------------
+    # Consumers
+    # -----------------------------------------
+    def version(self, task_id=None) -> int:
+        """Current version of a task, or of the whole store if task_id is None."""
+        if task_id is None:
+            return self._global_version
+        return self._versions.get(task_id, 0)
+
+    def snapshot(self, task_id, keys=None) -> dict:
+        """
+        Shallow copy of a task's state (optionally restricted to `keys`),
+        taken under the lock. Returns None if the task does not exist.
+        """
+        with self._lock:
+            state = self._tasks.get(task_id)
+            if state is None:
+                return None
+            if task_id in self._spilled and (keys is None or set(keys) & set(self.spill_keys)):
+                self._load_spilled(task_id)
+            if keys is None:
+                return dict(state)
+            return {k: state.get(k) for k in keys}
+
+    async def wait_for_update(self, task_id=None, last_version: int = -1, timeout: float = None) -> int:
+        """
+        Wait until the version of `task_id` (or of the whole store if None)
+        moves past `last_version`.
+
+        Args:
+            task_id: task to watch, or None for any change in the store
+            last_version: version the caller has already seen
+            timeout: optional seconds to wait before returning unchanged
+
+        Returns:
+            int: the current version (equal to last_version on timeout)
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter = (loop, event)
+
+        with self._lock:
+            current = self.version(task_id)
+            if current != last_version:
+                return current
+            self._waiters.setdefault(task_id, set()).add(waiter)
+
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            with self._lock:
+                waiters = self._waiters.get(task_id)
+                if waiters is not None:
+                    waiters.discard(waiter)
+                    if not waiters:
+                        del self._waiters[task_id]
+
+        return self.version(task_id)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(w) for w in self._waiters.values())
+
+    # -----------------------------------------
+    # Eviction and spill
+    # -----------------------------------------
+    def maintain(self) -> dict:
+        """
+        Apply TTL eviction, then spill finished tasks until resident spill
+        fields fit the memory budget. Safe to call from a worker thread;
+        pickling and compression happen outside the lock.
+
+        Returns:
+            dict: {"evicted": n, "spilled": n}
+        """
+        now = time.monotonic()
+        evicted = spilled = 0
+
+        # --- 1. TTL eviction of idle finished tasks ---
+        if self.ttl_seconds is not None:
+            with self._lock:
+                expired = [
+                    task_id for task_id, state in self._tasks.items()
+                    if now - self._touched.get(task_id, now) > self.ttl_seconds
+                    and self.is_finished(state)
+                ]
+                for task_id in expired:
+                    del self[task_id]
+                self._counters["ttl_evictions"] += len(expired)
+                evicted = len(expired)
+
+        if self.memory_budget_bytes is None or not self.spill_keys or not self._spill_dir_ready():
+            return {"evicted": evicted, "spilled": spilled}
+
+        # --- 2. Size resident finished tasks, least recently used first ---
+        candidates = []
+        with self._lock:
+            for task_id, state in self._tasks.items():
+                if task_id in self._spilled or not self.is_finished(state):
+                    continue
+                fields = {k: state[k] for k in self.spill_keys if k in state}
+                if not fields:
+                    continue
+                candidates.append((self._touched.get(task_id, now), task_id, self._versions.get(task_id, 0), fields))
+        candidates.sort(key=lambda c: c[0])
+
+        payloads = {}
+        for _, task_id, version, fields in candidates:
+            cached = self._sizes.get(task_id)
+            if cached is None or cached[0] != version:
+                payloads[task_id] = pickle.dumps(fields, protocol=pickle.HIGHEST_PROTOCOL)
+                self._sizes[task_id] = (version, len(payloads[task_id]))
+
+        resident = sum(self._sizes[task_id][1] for _, task_id, _, _ in candidates)
+
+        # --- 3. Spill until under budget ---
+        for _, task_id, version, fields in candidates:
+            if resident <= self.memory_budget_bytes:
+                break
+            if self._spill(task_id, version, fields, payloads.get(task_id)):
+                resident -= self._sizes[task_id][1]
+                spilled += 1
+
+        return {"evicted": evicted, "spilled": spilled}
+
+    def stats(self) -> dict:
+        """Task counts, estimated resident bytes, spill usage and eviction counters."""
+        with self._lock:
+            finished = sum(1 for state in self._tasks.values() if self.is_finished(state))
+            resident = sum(
+                size for task_id, (_, size) in self._sizes.items()
+                if task_id in self._tasks and task_id not in self._spilled
+            )
+            return {
+                "name": self.name,
+                "tasks": len(self._tasks),
+                "running": len(self._tasks) - finished,
+                "finished": finished,
+                "resident_result_bytes": resident,
+                "spilled_tasks": len(self._spilled),
+                "spill_file_bytes": sum(entry[2] for entry in self._spill_files.values()),
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "subscribers": sum(len(w) for w in self._waiters.values()),
+                **self._counters,
+            }
+
+    def close(self):
+        """Remove this store's spill directory (on shutdown)."""
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+    def _spill_dir_ready(self) -> bool:
+        """Whether spilling is enabled, creating the private spill directory on first use."""
+        if self.spill_dir is not None and not self._spill_dir_checked:
+            if not (ensure_private_dir(os.path.dirname(self.spill_dir)) and ensure_private_dir(self.spill_dir)):
+                self.spill_dir = None
+            self._spill_dir_checked = True
+        return self.spill_dir is not None
+
+    def _spill(self, task_id, version, fields, payload=None) -> bool:
+        """Write a finished task's spill fields to disk and drop them from memory."""
+        existing = self._spill_files.get(task_id)
+        if existing is None or existing[1] != version:
+            if payload is None:
+                payload = pickle.dumps(fields, protocol=pickle.HIGHEST_PROTOCOL)
+            path = os.path.join(self.spill_dir, f"{task_id}.pkl.gz")
+            with gzip.open(path, "wb", compresslevel=3) as f:
+                f.write(payload)
+            existing = (path, version, os.path.getsize(path))
+
+        with self._lock:
+            # Skip if the task changed or was removed while writing
+            if task_id not in self._tasks or self._versions.get(task_id, 0) != version:
+                return False
+            self._spill_files[task_id] = existing
+            state = self._tasks[task_id]
+            for key in fields:
+                state.pop(key, None)
+            self._spilled.add(task_id)
+            self._counters["spills"] += 1
+            return True
+
+    def _load_spilled(self, task_id):
+        """Read spilled fields back into the task state; caller holds the lock."""
+        path = self._spill_files[task_id][0]
+        with gzip.open(path, "rb") as f:
+            fields = pickle.loads(f.read())
+        self._tasks[task_id].update(fields)
+        self._spilled.discard(task_id)
+        self._counters["spill_loads"] += 1
+
+    def _forget(self, task_id):
+        """Drop bookkeeping and spill file for a removed task; caller holds the lock."""
+        self._versions.pop(task_id, None)
+        self._touched.pop(task_id, None)
+        self._sizes.pop(task_id, None)
+        self._spilled.discard(task_id)
+        entry = self._spill_files.pop(task_id, None)
+        if entry is not None:
+            try:
+                os.remove(entry[0])
+            except OSError:
+                pass
+
+    # -----------------------------------------
+    # Internals
+    # -----------------------------------------
+    def _bump(self, task_id) -> int:
+        """Increment versions and wake waiters; caller holds the lock."""
+        version = self._versions.get(task_id, 0) + 1
+        self._versions[task_id] = version
+        self._global_version += 1
+        if task_id in self._tasks:
+            self._touched[task_id] = time.monotonic()
+
+        for key in (task_id, None):
+            for loop, event in self._waiters.get(key, ()):
+                self._wake(loop, event)
+        return version
+
+    @staticmethod
+    def _wake(loop, event):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            event.set()
+        elif not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
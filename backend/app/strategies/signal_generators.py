@@ -1,7 +1,10 @@
 import numpy as np
 import pandas as pd
 
-from app.utils.indicators import compute_sma_matrix, compute_bollinger_bands_matrix, compute_rsi_matrix, compute_ema_matrix
+from app.utils.indicators import (
+    compute_sma_matrix, compute_bollinger_bands_matrix, compute_rsi_matrix,
+    compute_rolling_max_matrix, compute_rolling_min_matrix, compute_spread_zscore,
+)
 
 # ===============================
 # Simple Moving Average (SMA)
@@ -61,10 +64,7 @@ def rsi_signal_generator(price_matrix: pd.DataFrame, params: dict) -> pd.DataFra
     overbought = params.get("overbought", 70)
     smoothing = params.get("signalSmoothing", 1)
 
-    rsi = compute_rsi_matrix(price_matrix, period)
-    
-    if smoothing > 1:
-        rsi = compute_ema_matrix(rsi, smoothing)
+    rsi = compute_rsi_matrix(price_matrix, period, smoothing)
     
     signals = pd.DataFrame(np.nan, index=price_matrix.index, columns=price_matrix.columns)
     signals[rsi < oversold] = 1   # buy
@@ -106,8 +106,8 @@ def breakout_signal_generator(price_matrix: pd.DataFrame, params: dict) -> pd.Da
     lookback = params.get("lookback", 20)
     multiplier = params.get("breakoutMultiplier", 0.0)
 
-    rolling_max = price_matrix.rolling(window=lookback).max()
-    rolling_min = price_matrix.rolling(window=lookback).min()
+    rolling_max = compute_rolling_max_matrix(price_matrix, lookback)
+    rolling_min = compute_rolling_min_matrix(price_matrix, lookback)
     range_ = rolling_max - rolling_min
     
     signals = pd.DataFrame(np.nan, index=price_matrix.index, columns=price_matrix.columns)
@@ -145,15 +145,8 @@ def pairs_signal_generator(price_matrix: pd.DataFrame, stock1: str, stock2: str,
     exit_z = params.get("exitZ", 0.5)
     hedge_ratio = params.get("hedgeRatio", 1.0)
 
-    # Compute rolling spread
-    spread = price_matrix[stock1] - price_matrix[stock2]
-    
-    # Rolling mean and std
-    spread_mean = spread.rolling(lookback).mean()
-    spread_std = spread.rolling(lookback).std()
-    
-    # Z-score
-    zscore = (spread - spread_mean) / spread_std
+    # Z-score of the spread over its rolling mean and std
+    zscore = compute_spread_zscore(price_matrix, stock1, stock2, lookback)
     
     # Initialize signals
     signals = pd.Series(np.nan, index=price_matrix.index, dtype=int)
@@ -1,4 +1,5 @@
 from . import signal_generators as sg
+from . import streaming_signals as ss
 
 # Strategy registry
 generators = {
@@ -9,4 +10,48 @@ generators = {
     "breakout": sg.breakout_signal_generator,
     "pairs_trading": sg.pairs_signal_generator,
     "equal_weight": sg.equal_weight_signal_generator,
-}
\ No newline at end of file
+}
+
+# Streaming (bar-by-bar) counterparts, for incremental signal refresh
+streaming_generators = {
+    "sma_crossover": ss.StreamingSMASignal,
+    "bollinger_reversion": ss.StreamingBollingerSignal,
+    "rsi_reversion": ss.StreamingRSISignal,
+    "momentum": ss.StreamingMomentumSignal,
+    "breakout": ss.StreamingBreakoutSignal,
+    "pairs_trading": ss.StreamingPairsSignal,
+    "equal_weight": ss.StreamingEqualWeightSignal,
+}
+
+# Window parameters whose rolling statistics are computed together when an
+# optimisation study sweeps them (see indicator_sweep)
+# strategy -> {param: rolling statistics of the price the window feeds}
+window_params = {
+    "sma_crossover": {"shortPeriod": ("mean",), "longPeriod": ("mean",)},
+    "bollinger_reversion": {"period": ("mean", "std")},
+    "breakout": {"lookback": ("max", "min")},
+}
+
+
+def indicator_sweep(strategy: str, param_space: dict):
+    """
+    Windows and statistics a study over `param_space` can evaluate, for
+    priming the indicator cache with a rolling bank before a trial's signals.
+
+    Args:
+        strategy: strategy name
+        param_space: {param: {"type", "min", "max", ...}} as given to the optimiser
+
+    Returns:
+        dict {"windows": [...], "stats": [...]}, or None if no window parameter is swept
+    """
+    windows, stats = set(), []
+    for param, param_stats in window_params.get(strategy, {}).items():
+        spec = (param_space or {}).get(param)
+        if not spec or spec.get("type") != "int":
+            continue
+        windows.update(w for w in range(int(spec["min"]), int(spec["max"]) + 1) if w >= 1)
+        stats.extend(s for s in param_stats if s not in stats)
+    if not windows:
+        return None
+    return {"windows": sorted(windows), "stats": stats}
@@ -0,0 +1,209 @@
+import numpy as np
+
+from app.utils.streaming_indicators import (
+    StreamingBollinger, StreamingLag, StreamingRSI, StreamingRollingMax,
+    StreamingRollingMin, StreamingSMA, StreamingSpreadZScore, restore_indicator,
+)
+
+# === Streaming signal generators ===
+# Bar-by-bar counterparts of app.strategies.signal_generators, built on the
+# streaming indicators: `update(prices)` takes one bar of prices (aligned to
+# `symbols`) and returns that bar's raw signals for every key, 1 = buy,
+# 0 = exit, NaN = hold (-1 / 1 for pairs), exactly as the batch generator
+# would for the same row. `positions` carries the last non-hold signal per
+# key, as the backtest forward-fills signals. The batch generators' forced
+# exit on the final date is a backtest convention and is not applied.
+
+
+class StreamingSignal:
+    """
+    Base class for one strategy over a set of symbol keys.
+
+    Args:
+        keys: symbols, or "A-B" pair keys for pairs trading
+        params: strategy parameters (same names and defaults as the batch generator)
+    """
+
+    strategy = None
+    _indicators = ()
+
+    def __init__(self, keys, params: dict = None):
+        self.keys = list(keys)
+        self.params = dict(params or {})
+        self.symbols = self._symbols()
+        self.bars = 0
+        self.last_signals = np.full(len(self.keys), np.nan)
+        self.positions = np.zeros(len(self.keys))
+        self._build()
+
+    def _symbols(self) -> list:
+        return list(self.keys)
+
+    def _build(self):
+        pass
+
+    def _signals(self, prices: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def update(self, prices) -> np.ndarray:
+        """Apply one bar of prices (aligned to `symbols`); return its signals per key."""
+        prices = np.asarray(prices, dtype=float)
+        signals = self._signals(prices)
+        self.bars += 1
+        self.last_signals = signals
+        self.positions = np.where(np.isnan(signals), self.positions, signals)
+        return signals
+
+    def warm_up(self, matrix) -> np.ndarray:
+        """Feed a (bars x symbols) history; return the stacked signals."""
+        outputs = [self.update(row) for row in np.asarray(matrix, dtype=float)]
+        return np.stack(outputs) if outputs else np.empty((0, len(self.keys)))
+
+    def snapshot(self) -> dict:
+        return {
+            "strategy": self.strategy,
+            "keys": self.keys,
+            "params": self.params,
+            "bars": self.bars,
+            "last_signals": self.last_signals.copy(),
+            "positions": self.positions.copy(),
+            "indicators": {name: getattr(self, name).snapshot() for name in self._indicators},
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict):
+        signal = cls(snapshot["keys"], snapshot["params"])
+        signal.bars = snapshot["bars"]
+        signal.last_signals = snapshot["last_signals"].copy()
+        signal.positions = snapshot["positions"].copy()
+        for name, state in snapshot["indicators"].items():
+            setattr(signal, name, restore_indicator(state))
+        return signal
+
+
+def _where(buy, sell) -> np.ndarray:
+    """1 where `buy`, 0 where `sell` (applied last, as in the batch generators), NaN elsewhere."""
+    return np.where(sell, 0.0, np.where(buy, 1.0, np.nan))
+
+
+# ===============================
+# Simple Moving Average (SMA)
+# ===============================
+class StreamingSMASignal(StreamingSignal):
+    strategy = "sma_crossover"
+    _indicators = ("short", "long")
+
+    def _build(self):
+        n = len(self.symbols)
+        self.short = StreamingSMA(n, self.params.get("shortPeriod", 20))
+        self.long = StreamingSMA(n, self.params.get("longPeriod", 50))
+
+    def _signals(self, prices):
+        short, long = self.short.update(prices), self.long.update(prices)
+        return _where(short > long, short < long)
+
+
+# ===============================
+# Bollinger Bands
+# ===============================
+class StreamingBollingerSignal(StreamingSignal):
+    strategy = "bollinger_reversion"
+    _indicators = ("bands",)
+
+    def _build(self):
+        self.bands = StreamingBollinger(len(self.symbols), self.params.get("period", 20), self.params.get("bandMultiplier", 2))
+
+    def _signals(self, prices):
+        lower = self.bands.update(prices)["lower"]
+        return _where(prices < lower, prices >= lower)
+
+
+# ===============================
+# Relative Strength Index (RSI)
+# ===============================
+class StreamingRSISignal(StreamingSignal):
+    strategy = "rsi_reversion"
+    _indicators = ("rsi",)
+
+    def _build(self):
+        self.rsi = StreamingRSI(len(self.symbols), self.params.get("period", 14), self.params.get("signalSmoothing", 1))
+
+    def _signals(self, prices):
+        rsi = self.rsi.update(prices)
+        oversold = self.params.get("oversold", 30)
+        return _where(rsi < oversold, rsi >= oversold)
+
+
+# ===============================
+# Momentum
+# ===============================
+class StreamingMomentumSignal(StreamingSignal):
+    strategy = "momentum"
+    _indicators = ("lagged",)
+
+    def _build(self):
+        self.lagged = StreamingLag(len(self.symbols), self.params.get("lookback", 126))
+
+    def _signals(self, prices):
+        shifted = self.lagged.update(prices)
+        return _where(prices > shifted, prices < shifted)
+
+
+# ===============================
+# Breakout
+# ===============================
+class StreamingBreakoutSignal(StreamingSignal):
+    strategy = "breakout"
+    _indicators = ("high", "low")
+
+    def _build(self):
+        n, lookback = len(self.symbols), self.params.get("lookback", 20)
+        self.high = StreamingRollingMax(n, lookback)
+        self.low = StreamingRollingMin(n, lookback)
+
+    def _signals(self, prices):
+        high, low = self.high.update(prices), self.low.update(prices)
+        threshold = high + self.params.get("breakoutMultiplier", 0.0) * (high - low)
+        return _where(prices > threshold, prices <= threshold)
+
+
+# ===============================
+# Pairs Trading
+# ===============================
+class StreamingPairsSignal(StreamingSignal):
+    """Keys are "A-B" pairs; `symbols` lists every leg once, in first-seen order."""
+
+    strategy = "pairs_trading"
+    _indicators = ("zscore",)
+
+    def _symbols(self):
+        legs = [key.split("-") for key in self.keys]
+        if any(len(pair) != 2 for pair in legs):
+            raise ValueError("Pairs keys must be of the form 'A-B'")
+        symbols = list(dict.fromkeys(s for pair in legs for s in pair))
+        index = {s: i for i, s in enumerate(symbols)}
+        self._first = np.array([index[a] for a, _ in legs], dtype=int)
+        self._second = np.array([index[b] for _, b in legs], dtype=int)
+        return symbols
+
+    def _build(self):
+        self.zscore = StreamingSpreadZScore(len(self.keys), self.params.get("lookback", 20))
+
+    def _signals(self, prices):
+        z = self.zscore.update(prices[self._first], prices[self._second])
+        entry_z, exit_z = self.params.get("entryZ", 2.0), self.params.get("exitZ", 0.5)
+        signals = np.where(z > entry_z, -1.0, np.where(z < -entry_z, 1.0, np.nan))
+        signals = np.where(np.abs(z) < exit_z, 0.0, signals)
+        if self.bars < self.zscore.lookback:
+            signals[:] = 0.0   # first `lookback` bars cannot have valid signals
+        return signals
+
+
+# ===============================
+# Equal Weight
+# ===============================
+class StreamingEqualWeightSignal(StreamingSignal):
+    strategy = "equal_weight"
+
+    def _signals(self, prices):
+        return np.ones(len(self.keys))
@@ -0,0 +1,37 @@
+import os
+import stat
+
+# === On-disk cache directories ===
+# Disk tiers hold files that are loaded back into the process (pickles,
+# .npy arrays), so they live under the user's cache directory rather than a
+# shared temp dir, and are only used if they are private to this user: a
+# directory other users can write to would let them plant entries.
+
+
+def default_cache_dir(name: str) -> str:
+    """`name` under $XDG_CACHE_HOME/quantapp (default ~/.cache/quantapp)."""
+    base = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "quantapp", name)
+
+
+def ensure_private_dir(path: str) -> bool:
+    """
+    Create `path` (mode 0700) if missing and check it is safe to cache in.
+
+    Returns:
+        bool: True if `path` is a real directory owned by this user that no
+              one else can write to
+    """
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        info = os.lstat(path)
+    except OSError as e:
+        print(f"Cache directory {path} unavailable: {e}")
+        return False
+    if not stat.S_ISDIR(info.st_mode):
+        print(f"Cache directory {path} is not a directory, disk cache disabled")
+        return False
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+        print(f"Cache directory {path} is writable by other users, disk cache disabled")
+        return False
+    return True
@@ -0,0 +1,135 @@
+import multiprocessing as mp
+import threading
+
+
+class TaskCancelled(Exception):
+    """Raised inside a job once its cancellation token has been set."""
+
+
+class CancellationToken:
+    """
+    Cancellation flag shared between the API process and worker processes.
+
+    Backed by a multiprocessing.Event, so it can be handed to pool workers
+    through an initializer (or Process args) and checked inside their loops.
+    Callbacks registered in the parent run once when the token is cancelled,
+    e.g. to stop pending futures.
+    """
+
+    def __init__(self, event=None):
+        self._event = event if event is not None else mp.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Only the event crosses process boundaries; callbacks stay in the parent
+        return CancellationToken, (self._event,)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TaskCancelled()
+
+    def on_cancel(self, callback):
+        """
+        Run `callback()` when the token is cancelled (immediately if it already is).
+
+        Returns:
+            callable: removes the callback again, for tokens outliving the resource
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove_callback(callback)
+        callback()
+        return lambda: None
+
+    def _remove_callback(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def cancel(self) -> bool:
+        """
+        Set the token and run registered callbacks.
+
+        Returns:
+            bool: False if the token was already cancelled
+        """
+        with self._lock:
+            if self._event.is_set():
+                return False
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Cancellation callback failed: {e}")
+        return True
+
+
+# =============================================
+# Worker-side token
+# =============================================
+# Set in each pool worker by init_worker_cancellation, so functions running
+# in the pool can check the job's token without it being passed per call.
+_worker_token = None
+
+
+def init_worker_cancellation(token: CancellationToken):
+    """ProcessPoolExecutor initializer: hand the job's token to the worker."""
+    global _worker_token
+    _worker_token = token
+
+
+def worker_token() -> CancellationToken:
+    """The token set by init_worker_cancellation, or None outside a cancellable pool."""
+    return _worker_token
+
+
+# =============================================
+# Active job registry
+# =============================================
+# (task type, task_id) -> token of a running job, used by the cancel endpoints.
+_active_tokens = {}
+_active_tokens_lock = threading.Lock()
+
+
+def register_cancellation(kind: str, task_id) -> CancellationToken:
+    """Create and register the cancellation token for a new job."""
+    token = CancellationToken()
+    with _active_tokens_lock:
+        _active_tokens[(kind, task_id)] = token
+    return token
+
+
+def release_cancellation(kind: str, task_id):
+    """Forget a finished job's token."""
+    with _active_tokens_lock:
+        _active_tokens.pop((kind, task_id), None)
+
+
+def is_registered(kind: str, task_id) -> bool:
+    """Whether a job with this id currently holds a cancellation token."""
+    with _active_tokens_lock:
+        return (kind, task_id) in _active_tokens
+
+
+def cancel_task(kind: str, task_id) -> bool:
+    """
+    Cancel a running job.
+
+    Returns:
+        bool: True if a running job was found and signalled
+    """
+    with _active_tokens_lock:
+        token = _active_tokens.get((kind, task_id))
+    if token is None:
+        return False
+    token.cancel()
+    return True
@@ -1,3 +1,4 @@
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
 from typing import List, Optional
 
@@ -7,6 +8,7 @@ from sqlalchemy.orm import Session
 
 from app.crud import get_prices, get_prices_light
 from app.models import Price, MissingPriceRange
+from app.utils.timing import span
 
 
 def fetch_price_data(db: Session, symbols: list[str], start: Optional[str] = None, end: Optional[str] = None, lookback: Optional[int] = 0):
@@ -23,23 +25,24 @@ def fetch_price_data(db: Session, symbols: list[str], start: Optional[str] = Non
     Returns:
         dict: { symbol: list of dicts with keys ['date', 'open', 'high', 'low', 'close', 'volume', 'symbol'] }
     """
-    data_dict = {}
-    for symbol in symbols:
-        data_rows = get_prices(db, [symbol], start, end, lookback)
-        if not data_rows:
-            continue  # skip symbols with no data
-        data_dict[symbol] = [
-            {
-                "date": r.date.isoformat(),
-                "open": r.open,
-                "high": r.high,
-                "low": r.low,
-                "close": r.close,
-                "volume": r.volume,
-                "symbol": r.symbol,
-            }
-            for r in data_rows
-        ]
+    with span("fetch_price_data"):
+        data_dict = {}
+        for symbol in symbols:
+            data_rows = get_prices(db, [symbol], start, end, lookback)
+            if not data_rows:
+                continue  # skip symbols with no data
+            data_dict[symbol] = [
+                {
+                    "date": r.date.isoformat(),
+                    "open": r.open,
+                    "high": r.high,
+                    "low": r.low,
+                    "close": r.close,
+                    "volume": r.volume,
+                    "symbol": r.symbol,
+                }
+                for r in data_rows
+            ]
     return data_dict
 
 
@@ -59,24 +62,61 @@ def fetch_price_data_light(db: Session, symbols: list[str], start: Optional[str]
         dict: { symbol: list of dicts with keys ['date', 'high', 'low', 'close'] }
               Empty list if no data is available for symbol
     """
-    data_dict = {}
-    for symbol in symbols:
-        data_rows = get_prices_light(db, [symbol], start, end, lookback)
-        if not data_rows:
-            data_dict[symbol] = []
-        else:
-            data_dict[symbol] = [
-                {
-                    "date": r["date"].isoformat(),
-                    "high": r["high"],
-                    "low": r["low"],
-                    "close": r["close"],
-                }
-                for r in data_rows
-            ]
+    with span("fetch_price_data_light"):
+        data_dict = {}
+        for symbol in symbols:
+            data_rows = get_prices_light(db, [symbol], start, end, lookback)
+            if not data_rows:
+                data_dict[symbol] = []
+            else:
+                data_dict[symbol] = [
+                    {
+                        "date": r["date"].isoformat(),
+                        "high": r["high"],
+                        "low": r["low"],
+                        "close": r["close"],
+                    }
+                    for r in data_rows
+                ]
     return data_dict
 
 
+def slice_price_data(data: dict, start: Optional[str] = None, end: Optional[str] = None, lookback: Optional[int] = 0):
+    """
+    Cut a per-symbol window out of price data fetched once for a wider range.
+
+    Mirrors the filtering of `fetch_price_data` for each symbol: rows up to
+    `end`, starting `lookback` rows before `start` (rows dated on `start`
+    count towards the lookback). The wider fetch must start at or before the
+    window's own cutoff.
+
+    Parameters:
+        data (dict): { symbol: list of row dicts with ISO 'date' }, ascending by date
+        start (str, optional): Start date in 'YYYY-MM-DD' format
+        end (str, optional): End date in 'YYYY-MM-DD' format
+        lookback (int, optional): Number of rows to include before start (default 0)
+
+    Returns:
+        dict: { symbol: list of row dicts }, symbols without rows in the window omitted
+    """
+    start = str(start)[:10] if start else None
+    end = str(end)[:10] if end else None
+
+    sliced = {}
+    for symbol, rows in data.items():
+        dates = [r["date"][:10] for r in rows]
+        first = 0
+        if start:
+            # index of the first row after start, then step back `lookback` rows
+            after_start = bisect_right(dates, start)
+            first = max(0, after_start - lookback) if lookback and lookback > 0 else bisect_left(dates, start)
+        last = bisect_right(dates, end) if end else len(rows)
+
+        if first < last:
+            sliced[symbol] = rows[first:last]
+    return sliced
+
+
 def convert_numpy(obj):
     """
     Recursively convert numpy data types to native Python types.
@@ -0,0 +1,209 @@
+import numpy as np
+import pandas as pd
+
+# === Multi-window indicator bank ===
+# Rolling mean / std / min / max for many window lengths in one pass over
+# the panel, instead of one pandas `rolling` per window:
+#   - mean and std come from prefix sums of the values and their squares,
+#     so each extra window costs a few vector operations per cell. Sums
+#     restart every block of rows (a power of two several times the window,
+#     shared by windows of similar length), centred on the block's mean, so
+#     a window spans at most two blocks and rounding stays proportional to
+#     the values' spread over a few windows rather than growing with the
+#     length of the history
+#   - min and max come from a sparse table built by doubling: a level
+#     covering 2^k rows answers every window in [2^k, 2^(k+1)) with two
+#     lookups, and only the current level is kept in memory
+#
+# Results match pandas rolling(window).mean()/.std()/.min()/.max() with its
+# default min_periods=window (NaN unless the whole window is present).
+# Mean and std agree to floating-point rounding, min and max exactly;
+# windows of a constant value are snapped to that value and a zero std, as
+# pandas does, so flat (forward-filled) stretches compare exactly equal.
+#
+# The output is a (window x date x symbol) float64 array per statistic:
+# 50 windows over 2,500 dates x 500 symbols is 500 MB per statistic.
+
+BANK_STATS = ("mean", "std", "min", "max")
+
+# Prefix-sum blocks span at least this many times their windows: windows
+# crossing a block boundary need a slower correction, longer blocks round more
+BLOCK_WINDOWS = 8
+
+
+def _run_lengths(values: np.ndarray) -> np.ndarray:
+    """Per cell, the number of consecutive equal values ending at that row."""
+    rows = np.arange(values.shape[0])[:, None]
+    starts = np.ones(values.shape, dtype=bool)
+    starts[1:] = values[1:] != values[:-1]
+    last_start = np.maximum.accumulate(np.where(starts, rows, 0), axis=0)
+    return rows - last_start + 1
+
+
+class _BlockSums:
+    """Prefix sums of block-centred values and their squares, restarting every `block` rows."""
+
+    def __init__(self, values: np.ndarray, missing: np.ndarray, block: int):
+        n_rows, n_cols = values.shape
+        n_blocks = -(-n_rows // block)
+        shape = (n_blocks, block, n_cols)
+        filled = np.zeros(shape)
+        filled.reshape(-1, n_cols)[:n_rows] = np.where(missing, 0.0, values)
+        present = np.zeros(shape, dtype=bool)
+        present.reshape(-1, n_cols)[:n_rows] = ~missing
+
+        self.block = block
+        self.centres = filled.sum(axis=1) / np.maximum(present.sum(axis=1), 1)
+        centred = np.where(present, filled - self.centres[:, None, :], 0.0)
+        # Inclusive sums up to each row, and exclusive sums before it (zero
+        # on a block's first row), both within the row's block
+        self.sums = np.cumsum(centred, axis=1)
+        self.squares = np.cumsum(centred * centred, axis=1)
+        self.sums_before = np.zeros(shape)
+        self.sums_before[:, 1:] = self.sums[:, :-1]
+        self.squares_before = np.zeros(shape)
+        self.squares_before[:, 1:] = self.squares[:, :-1]
+        self.row_centres = np.repeat(self.centres, block, axis=0)[:n_rows]
+        for name in ("sums", "squares", "sums_before", "squares_before"):
+            setattr(self, name, getattr(self, name).reshape(-1, n_cols)[:n_rows])
+
+    def window(self, window: int, n_rows: int, squares: bool = True):
+        """
+        (sum, sum of squares, centre) of the `window` rows ending at each row
+        from window - 1 on, centred on the ending row's block mean. The sum of
+        squares is None unless `squares`.
+        """
+        block = self.block
+        total = self.sums[window - 1:] - self.sums_before[:n_rows - window + 1]
+        total_sq = self.squares[window - 1:] - self.squares_before[:n_rows - window + 1] if squares else None
+
+        # Windows starting in the previous block: the difference above mixed
+        # two blocks' sums. Rebuild them as the start block's remainder,
+        # re-centred on the ending block's mean, plus the ending block's
+        # sums up to the end
+        starts = np.arange(n_rows - window + 1)
+        starts = starts[starts % block > block - window]
+        if len(starts):
+            ends = starts + window - 1
+            last = (starts // block + 1) * block - 1
+            head = self.sums[last] - self.sums_before[starts]
+            head_rows = (last - starts + 1)[:, None]
+            shift = self.row_centres[starts] - self.row_centres[ends]
+            total[starts] = head + head_rows * shift + self.sums[ends]
+            if squares:
+                head_sq = self.squares[last] - self.squares_before[starts]
+                total_sq[starts] = head_sq + 2 * shift * head + head_rows * shift * shift + self.squares[ends]
+        return total, total_sq, self.row_centres[window - 1:]
+
+
+def _rolling_extrema(values: np.ndarray, windows, reduce, fill: float):
+    """Yield (window, rolling extremum) via a doubling sparse table, smallest windows first."""
+    level = np.where(np.isnan(values), fill, values)
+    span = 1
+    for window in sorted(set(windows)):
+        # Level covering `span` rows ending at each row, with span <= window < 2 * span
+        while span * 2 <= window:
+            nxt = level.copy()
+            reduce(level[span:], level[:-span], out=nxt[span:])
+            level, span = nxt, span * 2
+        result = level.copy()
+        offset = window - span
+        if offset:
+            reduce(level[offset:], level[:-offset], out=result[offset:])
+        yield window, result
+
+
+def rolling_bank(price_matrix, windows, stats=BANK_STATS) -> dict:
+    """
+    Rolling statistics of every column for a set of window lengths at once.
+
+    Args:
+        price_matrix: DataFrame (dates x symbols) or 2-D array of prices
+        windows: window lengths in rows (positive ints)
+        stats: any of "mean", "std" (sample, ddof=1), "min", "max"
+
+    Returns:
+        dict: {stat: ndarray of shape (len(windows), dates, symbols)}, in
+        the order of `windows`
+    """
+    windows = [int(w) for w in windows]
+    if not windows or min(windows) < 1:
+        raise ValueError("Windows must be positive integers")
+    unknown = set(stats) - set(BANK_STATS)
+    if unknown:
+        raise ValueError(f"Unknown bank statistics: {sorted(unknown)}")
+
+    values = np.asarray(price_matrix, dtype=float)
+    if values.ndim != 2:
+        raise ValueError("Expected a 2-D (dates x symbols) price matrix")
+    n_rows = values.shape[0]
+    missing = np.isnan(values)
+
+    # Windows are valid only when complete (pandas min_periods=window)
+    present = np.zeros((n_rows + 1, values.shape[1]), dtype=np.int64)
+    np.cumsum(~missing, axis=0, out=present[1:])
+
+    has_missing = bool(missing.any())
+
+    def complete(window):
+        """Rows from window - 1 on whose window is complete (None: all of them)."""
+        return present[window:] - present[:-window] == window if has_missing else None
+
+    bank = {stat: np.full((len(windows),) + values.shape, np.nan) for stat in stats}
+    usable = [(i, w) for i, w in enumerate(windows) if w <= n_rows]
+
+    # Windows share prefix sums with the others of the same block size: a
+    # block sized to the window keeps its centre close to the window's
+    # values, so a short window's std does not cancel against the spread of
+    # a long block
+    by_block = {}
+    if "mean" in stats or "std" in stats:
+        for i, window in usable:
+            by_block.setdefault(1 << (BLOCK_WINDOWS * window - 1).bit_length(), []).append((i, window))
+    run_lengths = _run_lengths(values) if by_block else None
+
+    for block, block_windows in by_block.items():
+        sums = _BlockSums(values, missing, block)
+        for i, window in block_windows:
+            ok = complete(window)
+            constant = run_lengths[window - 1:] >= window
+            if ok is not None:
+                constant &= ok
+            total, total_sq, centre = sums.window(window, n_rows, squares="std" in stats)
+            if "mean" in stats:
+                mean = bank["mean"][i, window - 1:]
+                np.divide(total, window, out=mean)
+                mean += centre
+                mean[constant] = values[window - 1:][constant]
+                if ok is not None:
+                    mean[~ok] = np.nan
+            if "std" in stats and window > 1:
+                std = bank["std"][i, window - 1:]
+                total *= total
+                total /= window
+                np.subtract(total_sq, total, out=std)
+                std /= window - 1
+                np.maximum(std, 0.0, out=std)
+                np.sqrt(std, out=std)
+                std[constant] = 0.0
+                if ok is not None:
+                    std[~ok] = np.nan
+
+    for stat, reduce, fill in (("max", np.maximum, -np.inf), ("min", np.minimum, np.inf)):
+        if stat not in stats or not usable:
+            continue
+        for window, result in _rolling_extrema(values, [w for _, w in usable], reduce, fill):
+            result = result[window - 1:]
+            ok = complete(window)
+            if ok is not None:
+                result[~ok] = np.nan
+            for i, w in usable:
+                if w == window:
+                    bank[stat][i, window - 1:] = result
+
+    return bank
+
+
+def bank_frame(bank: dict, stat: str, windows, window: int, like: pd.DataFrame) -> pd.DataFrame:
+    """One window of a bank statistic as a DataFrame shaped like `like`."""
+    return pd.DataFrame(bank[stat][list(windows).index(window)], index=like.index, columns=like.columns)
@@ -0,0 +1,315 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from app.utils.cache_dirs import default_cache_dir, ensure_private_dir
+from app.utils.timing import record_timings, span
+
+# === Indicator cache ===
+# Indicators are pure functions of a price panel and their parameters, so
+# they are cached under (panel fingerprint, indicator, parameters). The
+# fingerprint hashes the panel's values, index and columns: frames rebuilt
+# from the same prices (every optimiser trial rebuilds its segments) share
+# entries, and a changed price can never be served a stale indicator.
+#
+# Two tiers: an LRU memory tier per process, bounded in bytes, and a
+# directory of .npy files shared by all processes of this user (created
+# private to them; the disk tier is skipped if it is writable by others). Walk-forward segments run
+# in a fresh process pool per trial, so trials that only change thresholds
+# (oversold, entryZ, ...) reuse the RSI / spread z-score their predecessors
+# wrote to disk.
+#
+# Cached frames are shared between callers and must not be modified.
+# Bump INDICATOR_CACHE_VERSION when an indicator's definition changes, so
+# files written by older code are ignored.
+
+INDICATOR_CACHE_VERSION = 1
+INDICATOR_CACHE_MEMORY_MB = float(os.getenv("INDICATOR_CACHE_MEMORY_MB", "64"))
+INDICATOR_CACHE_DISK_MB = float(os.getenv("INDICATOR_CACHE_DISK_MB", "512"))
+INDICATOR_CACHE_DIR = os.getenv("INDICATOR_CACHE_DIR", default_cache_dir("indicator_cache"))
+
+# Writes between scans of the disk tier for its budget
+DISK_TRIM_EVERY = 50
+
+# Stage names reported through app.utils.timing: computed indicators, and
+# reused ones with the compute time they saved
+COMPUTE_STAGE = "indicator_compute"
+REUSE_STAGE = "indicator_reuse"
+
+
+def _values_digest(values: np.ndarray) -> bytes:
+    if values.dtype == object:
+        values = values.astype(float)
+    # Hashed column by column: pandas keeps a single-dtype frame's values as
+    # a (columns, rows) block, so this is usually copy-free, and equal frames
+    # hash equally whatever their memory layout
+    columns = np.ascontiguousarray(values.T)
+    digest = hashlib.sha256(str(columns.shape).encode() + columns.dtype.str.encode())
+    digest.update(memoryview(columns).cast("B"))
+    return digest.digest()
+
+
+def panel_fingerprint(panel) -> str:
+    """Content hash of a price DataFrame / Series: values, index and column names."""
+    digest = hashlib.sha256(_values_digest(panel.to_numpy()))
+    index = panel.index.to_numpy()
+    digest.update(index.dtype.str.encode())
+    digest.update(repr(index.tolist()).encode() if index.dtype == object else index.tobytes())
+    if isinstance(panel, pd.DataFrame):
+        digest.update(repr(list(panel.columns)).encode())
+    return digest.hexdigest()[:32]
+
+
+class IndicatorCache:
+    """
+    Memory- and disk-bounded cache of indicator frames keyed by panel content.
+
+    Args:
+        memory_budget_bytes: bytes of indicator values kept in this process
+        disk_budget_bytes: bytes of .npy files kept in `disk_dir` (0 disables the disk tier)
+        disk_dir: directory shared by every process using the cache
+    """
+
+    def __init__(self, memory_budget_bytes: int, disk_budget_bytes: int = 0, disk_dir: str = None):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes or 0
+        self.disk_dir = disk_dir if disk_dir and self.disk_budget_bytes else None
+
+        self._memory = OrderedDict()    # key -> (value, nbytes, compute seconds)
+        self._memory_bytes = 0
+        self._fingerprints = {}         # id(panel) -> (weakref to panel, fingerprint)
+        self._indicators = {}           # indicator name -> {"hits", "misses"}
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0,
+                          "compute_seconds": 0.0, "saved_seconds": 0.0}
+        self._writes = 0
+        self._disk_checked = False
+        self._computing = threading.local()   # depth of nested computes on this thread
+        self._lock = threading.RLock()
+
+    # -----------------------------------------
+    # Lookup
+    # -----------------------------------------
+    def fingerprint(self, panel) -> str:
+        """Fingerprint of `panel`, hashed once per frame object."""
+        entry = self._fingerprints.get(id(panel))
+        if entry is not None and entry[0]() is panel:
+            return entry[1]
+        fp = panel_fingerprint(panel)
+        panel_id = id(panel)
+        try:
+            ref = weakref.ref(panel, lambda _, panel_id=panel_id: self._fingerprints.pop(panel_id, None))
+        except TypeError:
+            return fp
+        self._fingerprints[panel_id] = (ref, fp)
+        return fp
+
+    def _key(self, panel, indicator: str, params: tuple) -> str:
+        return f"v{INDICATOR_CACHE_VERSION}-{indicator}-{self.fingerprint(panel)}-" + hashlib.sha256(
+            repr(params).encode()
+        ).hexdigest()[:16]
+
+    def contains(self, panel, indicator: str, params: tuple) -> bool:
+        """Whether `indicator` of `panel` for `params` is cached in either tier, without loading it."""
+        key = self._key(panel, indicator, params)
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self._disk_ready() and os.path.exists(self._path(key))
+
+    def get_or_compute(self, panel, indicator: str, params: tuple, compute):
+        """
+        Return the cached `indicator` of `panel` for `params`, computing and
+        storing it on a miss.
+
+        Args:
+            panel: price DataFrame the indicator is derived from
+            indicator: indicator name
+            params: hashable parameters (everything the result depends on besides `panel`)
+            compute: zero-argument callable returning a DataFrame shaped like
+                `panel` or a Series on its index
+        """
+        key = self._key(panel, indicator, params)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._hit(indicator, "memory_hits", entry[2])
+                return entry[0]
+
+        cached = self._load(key, panel)
+        if cached is not None:
+            value, seconds = cached
+            with self._lock:
+                self._insert_memory(key, value, seconds)
+                self._hit(indicator, "disk_hits", seconds)
+            return value
+
+        # Indicators built from other cached indicators (smoothed RSI) compute
+        # them inside their own compute: only the outermost one is timed as a
+        # stage, so the inner seconds are not counted twice
+        depth = getattr(self._computing, "depth", 0)
+        self._computing.depth = depth + 1
+        start = time.perf_counter()
+        try:
+            if depth:
+                value = compute()
+            else:
+                with span(COMPUTE_STAGE):
+                    value = compute()
+        finally:
+            self._computing.depth = depth
+        seconds = time.perf_counter() - start
+        with self._lock:
+            self._counters["misses"] += 1
+            if not depth:
+                self._counters["compute_seconds"] += seconds
+            self._indicators.setdefault(indicator, {"hits": 0, "misses": 0})["misses"] += 1
+            self._insert_memory(key, value, seconds)
+        self._store(key, value, seconds)
+        return value
+
+    def _hit(self, indicator, tier, seconds):
+        """Count a hit; caller holds the lock."""
+        self._counters[tier] += 1
+        self._counters["saved_seconds"] += seconds
+        self._indicators.setdefault(indicator, {"hits": 0, "misses": 0})["hits"] += 1
+        record_timings({REUSE_STAGE: {"seconds": seconds, "count": 1}}, observe=False)
+
+    # -----------------------------------------
+    # Memory tier
+    # -----------------------------------------
+    def _insert_memory(self, key, value, seconds):
+        """Caller holds the lock."""
+        nbytes = int(value.to_numpy().nbytes)
+        if nbytes > self.memory_budget_bytes:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous[1]
+        self._memory[key] = (value, nbytes, seconds)
+        self._memory_bytes += nbytes
+        while self._memory_bytes > self.memory_budget_bytes and self._memory:
+            _, (_, dropped, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= dropped
+            self._counters["evictions"] += 1
+
+    # -----------------------------------------
+    # Disk tier
+    # -----------------------------------------
+    def _path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npy")
+
+    def _disk_ready(self) -> bool:
+        """Whether the disk tier is enabled, creating its directory on first use."""
+        if self.disk_dir is None:
+            return False
+        if not self._disk_checked:
+            with self._lock:
+                if not self._disk_checked and not ensure_private_dir(self.disk_dir):
+                    self.disk_dir = None
+                self._disk_checked = True
+        return self.disk_dir is not None
+
+    def _load(self, key, panel):
+        """(value, compute seconds) from the disk tier, or None."""
+        if not self._disk_ready():
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                seconds = float(np.load(f))
+                values = np.load(f)
+            os.utime(path)  # recency for the disk budget
+        except (OSError, ValueError, EOFError):
+            return None
+        if values.ndim == 1:
+            value = pd.Series(values, index=panel.index)
+        else:
+            value = pd.DataFrame(values, index=panel.index, columns=panel.columns)
+        return value, seconds
+
+    def _store(self, key, value, seconds):
+        if not self._disk_ready():
+            return
+        values = value.to_numpy()
+        if values.nbytes > self.disk_budget_bytes:
+            return
+        try:
+            # Written under a unique name then renamed, so concurrent writers
+            # and readers in other processes never see a partial file
+            tmp = os.path.join(self.disk_dir, f".{uuid.uuid4().hex}.tmp")
+            with open(tmp, "wb") as f:
+                np.save(f, np.float64(seconds))
+                np.save(f, values, allow_pickle=False)
+            os.replace(tmp, self._path(key))
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._writes += 1
+            trim = self._writes % DISK_TRIM_EVERY == 0
+        if trim:
+            self.trim_disk()
+
+    def trim_disk(self):
+        """Delete the least recently used files until the disk tier fits its budget."""
+        if self.disk_dir is None:
+            return
+        try:
+            files = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in os.scandir(self.disk_dir) if e.name.endswith(".npy")]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_budget_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self._counters["evictions"] += 1
+            except OSError:
+                pass
+
+    # -----------------------------------------
+    # Management
+    # -----------------------------------------
+    def clear(self, disk: bool = False):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if disk and self.disk_dir is not None and os.path.isdir(self.disk_dir):
+            for entry in os.scandir(self.disk_dir):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+    def stats(self) -> dict:
+        """Entries, bytes, hit / miss counters (overall and per indicator) and compute time saved."""
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "disk_budget_bytes": self.disk_budget_bytes,
+                **{k: round(v, 6) if isinstance(v, float) else v for k, v in self._counters.items()},
+                "hit_ratio": hits / lookups if lookups else 0.0,
+                "indicators": {name: dict(counts) for name, counts in self._indicators.items()},
+            }
+
+
+indicator_cache = IndicatorCache(
+    memory_budget_bytes=int(INDICATOR_CACHE_MEMORY_MB * 1024 * 1024),
+    disk_budget_bytes=int(INDICATOR_CACHE_DISK_MB * 1024 * 1024),
+    disk_dir=INDICATOR_CACHE_DIR,
+)
@@ -1,6 +1,15 @@
+import os
 from math import sqrt
 import pandas as pd
 
+from app.utils.indicator_bank import BANK_STATS, bank_frame, rolling_bank
+from app.utils.indicator_cache import indicator_cache
+
+# Matrix indicators are served from `indicator_cache`, keyed by the price
+# panel's content and the indicator parameters, so strategies and trials
+# sharing a panel compute each indicator once. Returned frames are shared:
+# derive new frames from them rather than modifying them in place.
+
 # ================================
 # Simple Moving Average (SMA)
 # ================================
@@ -8,7 +17,20 @@ def compute_sma_matrix(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
     """
     Vectorized SMA for all symbols.
     """
-    return price_matrix.rolling(window=period, min_periods=period).mean()
+    return indicator_cache.get_or_compute(
+        price_matrix, "sma", (period,),
+        lambda: price_matrix.rolling(window=period, min_periods=period).mean(),
+    )
+
+
+def compute_rolling_std_matrix(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
+    """
+    Vectorized rolling (sample) standard deviation for all symbols.
+    """
+    return indicator_cache.get_or_compute(
+        price_matrix, "rolling_std", (period,),
+        lambda: price_matrix.rolling(window=period, min_periods=period).std(),
+    )
 
 
 def compute_sma(data, period):
@@ -48,7 +70,7 @@ def compute_bollinger_bands_matrix(price_matrix: pd.DataFrame, period: int, std_
     Returns a dict of DataFrames: {'upper', 'middle', 'lower'}
     """
     middle = compute_sma_matrix(price_matrix, period)
-    rolling_std = price_matrix.rolling(window=period, min_periods=period).std()
+    rolling_std = compute_rolling_std_matrix(price_matrix, period)
     
     upper = middle + std_dev * rolling_std
     lower = middle - std_dev * rolling_std
@@ -63,16 +85,16 @@ def compute_ema_matrix(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
     """
     Vectorized EMA for all symbols.
     """
-    return price_matrix.ewm(span=period, adjust=False).mean()
+    return indicator_cache.get_or_compute(
+        price_matrix, "ema", (period,),
+        lambda: price_matrix.ewm(span=period, adjust=False).mean(),
+    )
 
 
 # ================================
 # Relative Strength Index (RSI)
 # ================================
-def compute_rsi_matrix(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
-    """
-    Vectorized RSI using Wilder's smoothing for all symbols.
-    """
+def _rsi(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
     delta = price_matrix.diff()
     gain = delta.clip(lower=0)
     loss = -delta.clip(upper=0)
@@ -83,3 +105,111 @@ def compute_rsi_matrix(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
     rs = avg_gain / avg_loss.replace(0, pd.NA)
     rsi = 100 - (100 / (1 + rs))
     return rsi.fillna(0)
+
+
+def compute_rsi_matrix(price_matrix: pd.DataFrame, period: int, smoothing: int = 1) -> pd.DataFrame:
+    """
+    Vectorized RSI using Wilder's smoothing for all symbols.
+
+    With smoothing > 1 the RSI is further smoothed by an EMA of that span.
+    """
+    if smoothing > 1:
+        return indicator_cache.get_or_compute(
+            price_matrix, "rsi", (period, smoothing),
+            lambda: compute_rsi_matrix(price_matrix, period).ewm(span=smoothing, adjust=False).mean(),
+        )
+    return indicator_cache.get_or_compute(price_matrix, "rsi", (period, 1), lambda: _rsi(price_matrix, period))
+
+
+# ================================
+# Rolling Max / Min
+# ================================
+def compute_rolling_max_matrix(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
+    """
+    Vectorized rolling maximum over `period` rows for all symbols.
+    """
+    return indicator_cache.get_or_compute(
+        price_matrix, "rolling_max", (period,),
+        lambda: price_matrix.rolling(window=period).max(),
+    )
+
+
+def compute_rolling_min_matrix(price_matrix: pd.DataFrame, period: int) -> pd.DataFrame:
+    """
+    Vectorized rolling minimum over `period` rows for all symbols.
+    """
+    return indicator_cache.get_or_compute(
+        price_matrix, "rolling_min", (period,),
+        lambda: price_matrix.rolling(window=period).min(),
+    )
+
+
+# ================================
+# Window Sweeps
+# ================================
+# Cache entry names of the rolling statistics the bank computes
+_BANK_INDICATORS = {"mean": "sma", "std": "rolling_std", "max": "rolling_max", "min": "rolling_min"}
+
+# Largest bank computed at once; longer window lists are primed in chunks
+INDICATOR_BANK_MAX_MB = float(os.getenv("INDICATOR_BANK_MAX_MB", "256"))
+
+
+def prime_rolling_indicators(price_matrix: pd.DataFrame, windows, stats=BANK_STATS) -> int:
+    """
+    Fill the indicator cache with SMA / rolling std / rolling max / rolling min
+    for every window in `windows`, computed together by `rolling_bank`.
+
+    Called before sweeping a window parameter (SMA periods, Bollinger period,
+    breakout lookback) over a fixed panel: the generators then hit the cache,
+    so the sweep costs about one bank rather than one rolling pass per window.
+    Only missing entries are computed (nothing is loaded for entries already
+    cached); entries beyond the memory budget are served from the cache's
+    disk tier.
+
+    Returns:
+        int: number of entries computed
+    """
+    windows = sorted({int(w) for w in windows})
+    missing = [
+        (stat, window) for stat in stats for window in windows
+        if not indicator_cache.contains(price_matrix, _BANK_INDICATORS[stat], (window,))
+    ]
+    if not missing:
+        return 0
+
+    todo = sorted({window for _, window in missing})
+    todo_stats = [stat for stat in stats if any(s == stat for s, _ in missing)]
+    bank_bytes = max(price_matrix.to_numpy().nbytes * len(todo_stats), 1)
+    chunk = max(1, int(INDICATOR_BANK_MAX_MB * 1024 * 1024 // bank_bytes))
+
+    for i in range(0, len(todo), chunk):
+        chunk_windows = todo[i:i + chunk]
+        bank = rolling_bank(price_matrix, chunk_windows, todo_stats)
+        for stat, window in missing:
+            if window in chunk_windows:
+                indicator_cache.get_or_compute(
+                    price_matrix, _BANK_INDICATORS[stat], (window,),
+                    lambda stat=stat, window=window: bank_frame(bank, stat, chunk_windows, window, price_matrix),
+                )
+    return len(missing)
+
+
+# ================================
+# Pairs Spread Z-Score
+# ================================
+def compute_spread_zscore(price_matrix: pd.DataFrame, stock1: str, stock2: str, lookback: int) -> pd.Series:
+    """
+    Rolling z-score of the spread stock1 - stock2 over `lookback` rows.
+
+    Keyed on the pair's own two columns, so it is reused whichever other
+    symbols share the panel.
+    """
+    pair = price_matrix[[stock1, stock2]]
+
+    def compute():
+        spread = pair[stock1] - pair[stock2]
+        spread_mean = spread.rolling(lookback).mean()
+        spread_std = spread.rolling(lookback).std()
+        return (spread - spread_mean) / spread_std
+
+    return indicator_cache.get_or_compute(pair, "spread_zscore", (lookback,), compute)
@@ -0,0 +1,128 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+def estimate_nbytes(value, _seen=None) -> int:
+    """
+    Rough in-memory size of a cached value.
+
+    Arrays, Series and DataFrames report their own `nbytes`; dicts, lists
+    and plain objects are walked recursively. Lists of scalars are sized
+    from their first element rather than element by element.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            estimate_nbytes(k, _seen) + estimate_nbytes(v, _seen) for k, v in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], (int, float, str, bool)):
+            return sys.getsizeof(value) + len(value) * sys.getsizeof(value[0])
+        return sys.getsizeof(value) + sum(estimate_nbytes(v, _seen) for v in value)
+    if hasattr(value, "__dict__") and not isinstance(value, type):
+        return sys.getsizeof(value) + estimate_nbytes(vars(value), _seen)
+    return sys.getsizeof(value)
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with hit/miss counters.
+
+    Args:
+        maxsize (int): maximum number of entries kept before the least
+            recently used entry is evicted
+        max_bytes (int): optional budget on the estimated size of all
+            entries; least recently used entries are evicted beyond it,
+            but the newest entry is always kept
+        sizeof (callable): size estimate for one value when max_bytes is
+            set (default `estimate_nbytes`)
+    """
+
+    def __init__(self, maxsize: int = 128, max_bytes: int = None, sizeof=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or estimate_nbytes
+        self._data = OrderedDict()
+        self._sizes = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for `key`, marking it most recently used."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """Return the cached value without touching recency or counters."""
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key, value):
+        """Insert or replace `key`, evicting the oldest entries beyond maxsize / max_bytes."""
+        # Sized outside the lock: walking a large value can take a while
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self.bytes += size - self._sizes.get(key, 0)
+            self._sizes[key] = size
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self.bytes > self.max_bytes and len(self._data) > 1
+            ):
+                oldest, _ = self._data.popitem(last=False)
+                self.bytes -= self._sizes.pop(oldest)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            self.bytes -= self._sizes.pop(key, 0)
+            return self._data.pop(key, default)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def items(self):
+        """Snapshot of (key, value) pairs, least recently used first."""
+        with self._lock:
+            return list(self._data.items())
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        """Size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
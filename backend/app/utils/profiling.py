@@ -0,0 +1,301 @@
+import cProfile
+import hmac
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import HTTPException, Request
+
+from app.utils.cache_dirs import default_cache_dir, ensure_private_dir
+
+# === On-demand request profiling ===
+# Heavy routes take a `request_profile(route)` dependency. A request carrying
+# the X-Profile header (or ?profile=) equal to PROFILING_TOKEN runs its
+# handler under cProfile and tracemalloc; without PROFILING_TOKEN set,
+# profiling is disabled and such requests are rejected.
+#
+# Profiles are keyed by the request's X-Request-ID header (or a generated
+# id, returned as X-Profile-Id) and kept on disk as .pstats files, the most
+# recent MAX_PROFILES of them. The files are loaded back for export, so
+# profiling is disabled unless PROFILE_DIR is private to this user. cProfile follows the thread it is enabled on:
+# sync handlers are profiled in their worker thread; for handlers that hand
+# work to a background task the event loop is profiled while that task runs
+# (so other coroutines running meanwhile appear too). Worker processes are
+# never profiled.
+
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR") or default_cache_dir("profiles")
+PROFILE_HEADER = "X-Profile"
+
+# Profiles kept on disk, oldest removed first
+MAX_PROFILES = 20
+# Profiles allowed to run at once (each slows its request down noticeably)
+MAX_CONCURRENT_PROFILES = 1
+# Allocation sites reported per profile
+TOP_ALLOCATIONS = 25
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class ProfileSession:
+    """
+    cProfile and tracemalloc results of one profiled request.
+
+    The profile can be enabled for several segments (e.g. the handler and
+    its background task); `finish` writes it out and frees the slot.
+    """
+
+    def __init__(self, store, request_id: str, route: str):
+        self.store = store
+        self.request_id = request_id
+        self.route = route
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.status = "running"
+        self.error = None
+        self.profiled_seconds = 0.0
+        self.memory = None
+        self.claimed = False            # set once any segment has run
+        self._profiler = cProfile.Profile()
+        self._started_tracemalloc = False
+        self._finished = False
+        self._lock = threading.Lock()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        tracemalloc.reset_peak()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.store.directory, f"{self.request_id}.pstats")
+
+    @contextmanager
+    def segment(self):
+        """Profile the enclosed block on the current thread."""
+        self.claimed = True
+        start = time.perf_counter()
+        self._profiler.enable()
+        try:
+            yield
+        finally:
+            self._profiler.disable()
+            self.profiled_seconds += time.perf_counter() - start
+
+    def finish(self, error: Exception = None):
+        """Write the profile and memory statistics; later calls are ignored."""
+        with self._lock:
+            if self._finished:
+                return
+            self._finished = True
+
+        current, peak = tracemalloc.get_traced_memory()
+        top = tracemalloc.take_snapshot().statistics("lineno")[:TOP_ALLOCATIONS]
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+        self.memory = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top_allocations": [
+                {"location": f"{s.traceback[0].filename}:{s.traceback[0].lineno}", "bytes": s.size, "count": s.count}
+                for s in top
+            ],
+        }
+
+        self._profiler.dump_stats(self.path)
+        self.status = "failed" if error is not None else "finished"
+        self.error = str(error) if error is not None else None
+        self.store._release(self)
+
+    def summary(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "route": self.route,
+            "started_at": self.started_at,
+            "status": self.status,
+            "error": self.error,
+            "profiled_seconds": round(self.profiled_seconds, 6),
+            "peak_memory_bytes": self.memory["peak_bytes"] if self.memory else None,
+        }
+
+
+class ProfileStore:
+    """Profile sessions by request id, with their .pstats files in `directory`."""
+
+    def __init__(self, directory: str = PROFILE_DIR, max_profiles: int = MAX_PROFILES,
+                 max_concurrent: int = MAX_CONCURRENT_PROFILES):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.max_concurrent = max_concurrent
+        self._sessions = OrderedDict()
+        self._running = 0
+        self._lock = threading.Lock()
+        self._directory_checked = False
+        self._directory_ok = False
+
+    def directory_ready(self) -> bool:
+        """Whether `directory` is private to this user, creating it on first use."""
+        if not self._directory_checked:
+            with self._lock:
+                if not self._directory_checked:
+                    self._directory_ok = ensure_private_dir(self.directory)
+                    self._directory_checked = True
+        return self._directory_ok
+
+    def start(self, route: str, request_id: str = None) -> ProfileSession:
+        """
+        Open a profile session.
+
+        Raises:
+            RuntimeError if MAX_CONCURRENT_PROFILES sessions are already running
+        """
+        if not request_id or not _REQUEST_ID_RE.match(request_id) or request_id in self._sessions:
+            request_id = uuid.uuid4().hex
+        with self._lock:
+            if self._running >= self.max_concurrent:
+                raise RuntimeError("Another request is being profiled")
+            self._running += 1
+        try:
+            session = ProfileSession(self, request_id, route)
+        except Exception:
+            with self._lock:
+                self._running -= 1
+            raise
+        with self._lock:
+            self._sessions[request_id] = session
+            while len(self._sessions) > self.max_profiles:
+                _, dropped = self._sessions.popitem(last=False)
+                try:
+                    os.remove(dropped.path)
+                except OSError:
+                    pass
+        return session
+
+    def _release(self, session: ProfileSession):
+        with self._lock:
+            self._running -= 1
+
+    def get(self, request_id: str) -> Optional[ProfileSession]:
+        with self._lock:
+            return self._sessions.get(request_id)
+
+    def list(self) -> list:
+        """Session summaries, newest first."""
+        with self._lock:
+            sessions = list(self._sessions.values())
+        return [s.summary() for s in reversed(sessions)]
+
+
+profile_store = ProfileStore()
+
+
+def request_profile(route: str):
+    """
+    Dependency yielding a ProfileSession when the request asks to be
+    profiled with the right token, else None.
+
+    A session no handler segment ever ran under (the body failed validation,
+    or the handler raised first) is finished when the request ends, so its
+    slot and tracemalloc are released.
+    """
+    def dependency(request: Request):
+        token = request.headers.get(PROFILE_HEADER) or request.query_params.get("profile")
+        if not token:
+            yield None
+            return
+        if not PROFILING_TOKEN or not hmac.compare_digest(token, PROFILING_TOKEN):
+            raise HTTPException(status_code=403, detail="Profiling is disabled or the token is invalid")
+        if not profile_store.directory_ready():
+            raise HTTPException(status_code=403, detail="Profiling is disabled: the profile directory is not private")
+        try:
+            session = profile_store.start(route, request.headers.get("X-Request-ID"))
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        request.state.profile_id = session.request_id
+        try:
+            yield session
+        except Exception as e:
+            if not session.claimed:
+                session.finish(None if isinstance(e, HTTPException) else e)
+            raise
+        finally:
+            if not session.claimed:
+                session.finish()
+
+    return dependency
+
+
+@contextmanager
+def profiled(session: Optional[ProfileSession], finish: bool = True):
+    """
+    Profile the enclosed block if `session` is set (no-op otherwise).
+
+    With finish=False the session stays open for a later segment, e.g. a
+    background task started by the handler, unless the block raises.
+    """
+    if session is None:
+        yield
+        return
+    try:
+        with session.segment():
+            yield
+    except BaseException as e:
+        # HTTPExceptions are outcomes of the handler, not profiling failures
+        session.finish(None if isinstance(e, HTTPException) else e)
+        raise
+    if finish:
+        session.finish()
+
+
+# =============================================
+# Export
+# =============================================
+def _label(func) -> str:
+    filename, line, name = func
+    if filename == "~":
+        return name.replace(";", ",")
+    return f"{name} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def collapsed_stacks(path: str, max_depth: int = 64, min_seconds: float = 1e-6) -> str:
+    """
+    Approximate collapsed stacks ("root;caller;callee <microseconds>" lines,
+    as read by flamegraph.pl / speedscope) from a .pstats file.
+
+    cProfile keeps caller -> callee edges, not full stacks, so a function's
+    time is split across its callers in proportion to each edge's
+    cumulative time. Recursive edges are cut.
+    """
+    stats = pstats.Stats(path).stats
+    callees = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    lines = {}
+
+    def walk(func, stack, scale):
+        _, _, tt, ct, _ = stats[func]
+        stack = stack + (func,)
+        own = tt * scale
+        if own >= min_seconds:
+            key = ";".join(_label(f) for f in stack)
+            lines[key] = lines.get(key, 0.0) + own
+        if len(stack) >= max_depth:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            callee_ct = stats[callee][3]
+            if callee in stack or callee_ct <= 0 or edge_ct * scale < min_seconds:
+                continue
+            walk(callee, stack, scale * edge_ct / callee_ct)
+
+    roots = [func for func, entry in stats.items() if not entry[4]]
+    for root in roots:
+        walk(root, (), 1.0)
+    return "".join(f"{stack} {round(seconds * 1e6)}\n" for stack, seconds in sorted(lines.items()) if round(seconds * 1e6) > 0)
@@ -0,0 +1,233 @@
+import math
+import re
+import threading
+import time
+
+# === Prometheus text exposition ===
+# A minimal in-process registry: counters and histograms updated by the HTTP
+# middleware and SQLAlchemy engine events, rendered in the Prometheus text
+# format (version 0.0.4) by GET /api/internal/metrics. Point-in-time values
+# (pool usage, queue depth, cache ratios) are gauges read from the owning
+# objects at scrape time, so nothing here polls in the background.
+#
+# Metrics are per process: worker processes do not report, and stage
+# timings from workers reach `timing_histograms` through their jobs.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latency bucket upper bounds in seconds (a final +Inf bucket is implied)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# DB query duration bucket upper bounds in seconds
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return "NaN"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+class MetricFamily:
+    """
+    One metric name with its HELP / TYPE lines and labelled samples, for
+    gauges and counters read from elsewhere at scrape time.
+
+    Args:
+        name: metric name
+        kind: "gauge", "counter" or "histogram"
+        documentation: HELP text
+    """
+
+    def __init__(self, name: str, kind: str, documentation: str):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self.samples = []       # (suffix, labels, value)
+
+    def add(self, value, suffix: str = "", **labels):
+        self.samples.append((suffix, labels, value))
+        return self
+
+    def add_histogram(self, buckets, total: float, count: int, **labels):
+        """
+        Add one labelled histogram from [[upper bound, cumulative count], ...]
+        ending in a "+Inf" bucket (the `TimingHistograms.snapshot` format).
+        """
+        for bound, cumulative in buckets:
+            le = bound if bound == "+Inf" else _format_value(float(bound))
+            self.add(cumulative, "_bucket", **labels, le=le)
+        self.add(total, "_sum", **labels)
+        self.add(count, "_count", **labels)
+        return self
+
+    def render(self) -> list:
+        lines = [
+            f"# HELP {self.name} {_escape(self.documentation)}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, labels, value in self.samples:
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter:
+    """Thread-safe counter per label values."""
+
+    def __init__(self, name: str, documentation: str, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount: float = 1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, "counter", self.documentation)
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                family.add(value, "_total", **dict(zip(self.label_names, label_values)))
+        return family
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Thread-safe cumulative histogram per label values."""
+
+    def __init__(self, name: str, documentation: str, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}       # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            else:
+                series[0][-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, "histogram", self.documentation)
+        with self._lock:
+            for label_values, (counts, total, count) in sorted(self._series.items()):
+                cumulative, buckets = 0, []
+                for bound, n in zip(self.buckets + ("+Inf",), counts):
+                    cumulative += n
+                    buckets.append([bound, cumulative])
+                family.add_histogram(buckets, total, count, **dict(zip(self.label_names, label_values)))
+        return family
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def render(families) -> str:
+    """Render metric families as a Prometheus text exposition body."""
+    lines = []
+    for family in families:
+        lines.extend(family.render())
+    return "\n".join(lines) + "\n"
+
+
+# =============================================
+# HTTP request metrics
+# =============================================
+http_request_duration = Histogram(
+    "quantapp_http_request_duration_seconds",
+    "HTTP request latency until the response starts, by route template",
+    ("method", "route", "status"),
+    LATENCY_BUCKETS,
+)
+http_requests_in_progress = {}
+_in_progress_lock = threading.Lock()
+
+
+def _route_template(request) -> str:
+    """Matched route path (e.g. /api/strategies/backtest/results/{task_id}); raw paths would explode cardinality."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+async def record_request_metrics(request, call_next):
+    """
+    HTTP middleware observing request latency per method, route and status.
+
+    For streaming (SSE) responses the latency is the time until headers are
+    sent, not the lifetime of the stream.
+    """
+    method = request.method
+    with _in_progress_lock:
+        http_requests_in_progress[method] = http_requests_in_progress.get(method, 0) + 1
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        http_request_duration.observe(time.perf_counter() - start, method, _route_template(request), str(status))
+        with _in_progress_lock:
+            http_requests_in_progress[method] -= 1
+
+
+# =============================================
+# Database query metrics
+# =============================================
+# Observed by the query log's cursor events (app.utils.query_log.install_query_log)
+db_query_duration = Histogram(
+    "quantapp_db_query_duration_seconds",
+    "Duration of SQL statements run through the SQLAlchemy engine, by statement type",
+    ("statement",),
+    QUERY_BUCKETS,
+)
+db_query_errors = Counter(
+    "quantapp_db_query_errors",
+    "SQL statements that raised, by statement type",
+    ("statement",),
+)
+
+_STATEMENT_RE = re.compile(r"^\s*(?:--[^\n]*\n\s*)*(\w+)")
+_STATEMENT_TYPES = {"SELECT", "INSERT", "UPDATE", "DELETE", "MERGE", "WITH", "CREATE", "DROP", "ALTER", "PRAGMA", "EXEC"}
+
+
+def statement_type(statement: str) -> str:
+    """Leading SQL keyword (SELECT, INSERT, ...), or OTHER."""
+    match = _STATEMENT_RE.match(statement or "")
+    keyword = match.group(1).upper() if match else ""
+    return keyword if keyword in _STATEMENT_TYPES else "OTHER"
@@ -0,0 +1,368 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+
+from app.utils.cache_dirs import default_cache_dir, ensure_private_dir
+from app.utils.prometheus import db_query_duration, db_query_errors, statement_type
+
+# === Query log ===
+# SQLAlchemy cursor events time every statement run through an engine and
+# aggregate it by fingerprint: the SQL with literals, parameters and IN /
+# VALUES lists collapsed, so `IN (?, ?, ?)` over 3 or 300 symbols is one
+# entry. Statements slower than SLOW_QUERY_MS are appended to a JSON-lines
+# file with their parameters, so their plan can be fetched later
+# (`explain_query`) even after a restart. The file holds statement text and
+# parameter values, so it lives in a directory private to this user and is
+# rotated once it reaches SLOW_QUERY_LOG_MB (one previous file is kept).
+#
+# The same cursor events feed the Prometheus query duration / error metrics,
+# so each statement is timed once.
+#
+# Row counts of result-returning statements are counted as rows are fetched
+# (durations then include fetch time spent in the driver); for other
+# statements the driver's rowcount is used. Queries on the raw async pool
+# (prescreen) are recorded by the caller via `query_log.record`.
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", os.path.join(default_cache_dir("logs"), "slow_queries.jsonl"))
+SLOW_QUERY_LOG_MB = float(os.getenv("SLOW_QUERY_LOG_MB", "10"))
+
+# Fingerprints kept in memory, least recently seen dropped first
+MAX_FINGERPRINTS = 500
+# Recent slow queries kept in memory for the admin endpoint
+RECENT_SLOW = 200
+# Bytes read from the end of the persisted log when looking up a sample
+SAMPLE_TAIL_BYTES = 1024 * 1024
+
+_COMMENT_RE = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w\]])-?\d+(?:\.\d+)?\b")
+_NAMED_PARAM_RE = re.compile(r":\w+|%\(\w+\)s|@\w+|\$\d+")
+_IN_LIST_RE = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.I)
+_PLACEHOLDER_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROW_LIST_RE = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """SQL text with comments, literals and parameter lists collapsed, for grouping."""
+    sql = _COMMENT_RE.sub(" ", statement or "")
+    sql = _STRING_RE.sub("?", sql)
+    sql = _NAMED_PARAM_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (?, ...)", sql)
+    sql = _PLACEHOLDER_LIST_RE.sub("(?, ...)", sql)
+    sql = _ROW_LIST_RE.sub("(?), ...", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_sql(statement).encode()).hexdigest()[:16]
+
+
+def _type_runs(values) -> str:
+    """Type names run-length encoded, e.g. "str x25, date x2"."""
+    runs = []
+    for value in values:
+        name = type(value).__name__
+        if runs and runs[-1][0] == name:
+            runs[-1][1] += 1
+        else:
+            runs.append([name, 1])
+    return ", ".join(name if n == 1 else f"{name} x{n}" for name, n in runs)
+
+
+def params_shape(parameters, executemany: bool = False) -> str:
+    """Short description of bound parameters: names / types and counts, never values."""
+    if executemany:
+        parameters = list(parameters or ())
+        first = params_shape(parameters[0]) if parameters else "()"
+        return f"{len(parameters)} x {first}"
+    if not parameters:
+        return "()"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{k}: {type(v).__name__}" for k, v in sorted(parameters.items())) + "}"
+    return f"({_type_runs(parameters)})"
+
+
+def statement_kind(statement: str) -> str:
+    match = re.match(r"\s*(\w+)", _COMMENT_RE.sub(" ", statement or ""))
+    return match.group(1).upper() if match else ""
+
+
+class QueryLog:
+    """
+    Per-fingerprint query statistics and a persisted slow-query log.
+
+    Args:
+        slow_ms: statements at or above this duration are persisted (<= 0 disables)
+        path: JSON-lines file slow queries are appended to
+        max_bytes: size at which the file is rotated to `path`.1
+    """
+
+    def __init__(self, slow_ms: float = SLOW_QUERY_MS, path: str = SLOW_QUERY_LOG,
+                 max_bytes: int = int(SLOW_QUERY_LOG_MB * 1024 * 1024)):
+        self.slow_ms = slow_ms
+        self.path = path
+        self.max_bytes = max_bytes
+        self._dir_checked = False
+        self._stats = OrderedDict()         # fingerprint -> aggregate dict
+        self._samples = {}                  # fingerprint -> (statement, parameters) of the slowest run
+        self._recent_slow = deque(maxlen=RECENT_SLOW)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, parameters, rows, seconds: float, executemany: bool = False):
+        """Add one execution; persist it if it is slow."""
+        key = fingerprint(statement)
+        shape = params_shape(parameters, executemany)
+        with self._lock:
+            stats = self._stats.pop(key, None)
+            if stats is None:
+                stats = {
+                    "fingerprint": key, "query": normalize_sql(statement)[:2000], "calls": 0,
+                    "total_seconds": 0.0, "max_seconds": 0.0, "rows": 0, "slow_calls": 0,
+                    "params_shape": shape,
+                }
+            self._stats[key] = stats
+            while len(self._stats) > MAX_FINGERPRINTS:
+                dropped, _ = self._stats.popitem(last=False)
+                self._samples.pop(dropped, None)
+
+            stats["calls"] += 1
+            stats["total_seconds"] += seconds
+            stats["rows"] += rows or 0
+            stats["params_shape"] = shape
+            if seconds >= stats["max_seconds"]:
+                stats["max_seconds"] = seconds
+                if not executemany:
+                    self._samples[key] = (statement, parameters)
+
+            slow = self.slow_ms > 0 and seconds * 1000 >= self.slow_ms
+            if not slow:
+                return
+            stats["slow_calls"] += 1
+            entry = {
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+                "fingerprint": key,
+                "seconds": round(seconds, 6),
+                "rows": rows,
+                "params_shape": shape,
+                "statement": statement,
+                "parameters": None if executemany else parameters,
+            }
+            self._recent_slow.append(entry)
+            self._persist(entry)
+
+    def _persist(self, entry: dict):
+        """Append `entry`, rotating the file past max_bytes; caller holds the lock."""
+        if self.path is None:
+            return
+        if not self._dir_checked:
+            self._dir_checked = True
+            if not ensure_private_dir(os.path.dirname(os.path.abspath(self.path))):
+                self.path = None
+                return
+        line = json.dumps(entry, default=str) + "\n"
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) + len(line) > self.max_bytes:
+                os.replace(self.path, self.path + ".1")
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            with open(fd, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError:
+            pass  # the log is diagnostic; never fail the query over it
+
+    def _tail(self) -> list:
+        """Complete lines in the last SAMPLE_TAIL_BYTES of the persisted log, oldest first."""
+        if self.path is None:
+            return []
+        try:
+            with open(self.path, "rb") as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(max(0, size - SAMPLE_TAIL_BYTES))
+                data = f.read()
+        except OSError:
+            return []
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        return lines[1:] if size > SAMPLE_TAIL_BYTES else lines   # first line may be partial
+
+    def stats(self, limit: int = 50) -> list:
+        """Fingerprints by total time spent, slowest first."""
+        with self._lock:
+            entries = [dict(s) for s in self._stats.values()]
+        for entry in entries:
+            entry["mean_seconds"] = entry["total_seconds"] / entry["calls"]
+            for field in ("total_seconds", "max_seconds", "mean_seconds"):
+                entry[field] = round(entry[field], 6)
+        entries.sort(key=lambda e: e["total_seconds"], reverse=True)
+        return entries[:limit]
+
+    def slow_queries(self, limit: int = 50) -> list:
+        """Most recent slow queries in this process, newest first, without parameter values."""
+        with self._lock:
+            recent = list(self._recent_slow)[-limit:]
+        return [{k: v for k, v in entry.items() if k != "parameters"} for entry in reversed(recent)]
+
+    def sample(self, key: str):
+        """
+        (statement, parameters) recorded for a fingerprint: the slowest run in
+        this process, else the latest slow run in the tail of the persisted
+        log. None if unknown.
+        """
+        with self._lock:
+            sample = self._samples.get(key)
+        if sample is not None:
+            return sample
+        for line in reversed(self._tail()):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("fingerprint") == key and entry.get("parameters") is not None:
+                return entry["statement"], entry["parameters"]
+        return None
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._samples.clear()
+            self._recent_slow.clear()
+
+
+query_log = QueryLog()
+
+
+class _CountingCursor:
+    """DBAPI cursor proxy counting fetched rows and fetch time; records the query once exhausted or closed."""
+
+    def __init__(self, cursor, on_done):
+        self._cursor = cursor
+        self._on_done = on_done
+        self._rows = 0
+        self._seconds = 0.0
+        self._done = False
+
+    def _finish(self):
+        if not self._done:
+            self._done = True
+            self._on_done(self._rows, self._seconds)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._seconds += time.perf_counter() - start
+        if row is None:
+            self._finish()
+        else:
+            self._rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._seconds += time.perf_counter() - start
+        self._rows += len(rows)
+        self._finish()
+        return rows
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def install_query_log(engine, log: QueryLog = query_log):
+    """
+    Time every statement executed by `engine` with one pair of cursor
+    events, recording it in `log` and in the Prometheus query metrics.
+    Idempotent per engine. Connections with the execution option
+    query_log=False are left out of `log` (but still counted in the metrics).
+    """
+    from sqlalchemy import event
+
+    if getattr(engine, "_quantapp_query_log", False):
+        return
+    engine._quantapp_query_log = True
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        db_query_duration.observe(elapsed, statement_type(statement))
+        if context is not None and not context.execution_options.get("query_log", True):
+            return
+
+        returns_rows = cursor.description is not None and not executemany and statement_kind(statement) != "INSERT"
+        if returns_rows and context is not None and context.cursor is cursor:
+            # Rows are fetched after this event: count them through a proxy
+            # that records the query when the result is exhausted or closed
+            context.cursor = _CountingCursor(
+                cursor, lambda rows, fetch: log.record(statement, parameters, rows, elapsed + fetch)
+            )
+            return
+        rowcount = getattr(cursor, "rowcount", -1)
+        log.record(statement, parameters, rowcount if rowcount >= 0 else None, elapsed, executemany)
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get("query_start") if conn is not None else None
+        if starts:
+            starts.pop()
+        db_query_errors.inc(statement_type(exception_context.statement))
+
+
+def explain_query(engine, statement: str, parameters) -> dict:
+    """
+    Estimated execution plan of a read-only statement, without running it:
+    EXPLAIN QUERY PLAN on SQLite, SHOWPLAN_XML on SQL Server.
+
+    Raises:
+        ValueError if the statement is not a SELECT / WITH query
+    """
+    if statement_kind(statement) not in ("SELECT", "WITH"):
+        raise ValueError("Plans are only captured for SELECT queries")
+    if isinstance(parameters, list):
+        parameters = tuple(parameters)
+    parameters = parameters or ()
+
+    with engine.connect() as conn:
+        conn = conn.execution_options(query_log=False)
+        if engine.dialect.name == "sqlite":
+            rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            return {
+                "dialect": "sqlite",
+                "plan": [{"id": r[0], "parent": r[1], "detail": r[3]} for r in rows],
+            }
+
+        conn.exec_driver_sql("SET SHOWPLAN_XML ON")
+        try:
+            plan = conn.exec_driver_sql(statement, parameters).scalar()
+        finally:
+            conn.exec_driver_sql("SET SHOWPLAN_XML OFF")
+        return {"dialect": engine.dialect.name, "plan": plan}
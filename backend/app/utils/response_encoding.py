@@ -0,0 +1,148 @@
+import gzip
+from datetime import date, datetime
+
+import numpy as np
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+# Optional encoders: MessagePack and zstd are offered only when installed
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# === Compact result encoding ===
+# Result endpoints keep their default JSON shape. Clients opt in to:
+#   - ?format=columnar: record lists (equity curves, trades, returns) become
+#     parallel arrays, e.g. equityCurve -> {"date": [...], "value": [...]}
+#   - Accept: application/msgpack: MessagePack body instead of JSON
+#   - Accept-Encoding: zstd / gzip: compressed body above COMPRESS_MIN_BYTES
+# Opted-in responses are serialised with orjson and carry an
+# X-Result-Format header naming the shape.
+
+COLUMNAR_KEYS = ("equityCurve", "trades", "returns")
+COMPRESS_MIN_BYTES = 1024
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _default(obj):
+    """Fallback serialiser for values orjson / msgpack do not handle natively."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj != obj:
+        # NaT / NaN-like scalars (checked first: NaT is a datetime subclass)
+        return None
+    if isinstance(obj, (datetime, date)):
+        # Covers pd.Timestamp, a datetime subclass
+        return obj.isoformat()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Type is not serializable: {type(obj).__name__}")
+
+
+def records_to_columns(records: list) -> dict:
+    """
+    Convert a list of dicts into a dict of parallel lists.
+
+    Keys are taken in first-seen order; records missing a key get None.
+    """
+    keys = {}
+    for record in records:
+        for key in record:
+            keys.setdefault(key, None)
+    return {key: [record.get(key) for record in records] for key in keys}
+
+
+def to_columnar(obj):
+    """Recursively convert the record lists under COLUMNAR_KEYS to parallel arrays."""
+    if isinstance(obj, list):
+        return [to_columnar(v) for v in obj]
+    if isinstance(obj, dict):
+        converted = {}
+        for key, value in obj.items():
+            if key in COLUMNAR_KEYS and isinstance(value, list) and all(isinstance(v, dict) for v in value):
+                converted[key] = records_to_columns(value)
+            else:
+                converted[key] = to_columnar(value)
+        return converted
+    return obj
+
+
+def dumps_json(content) -> bytes:
+    """Serialise to JSON bytes with orjson (numpy aware, NaN -> null)."""
+    return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def _accepts(header: str, token: str) -> bool:
+    """Whether a comma-separated Accept / Accept-Encoding header lists `token` with a non-zero q."""
+    for part in (header or "").split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if name.lower() != token:
+            continue
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    return float(param[2:]) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def wants_encoded(request: Request, response_format: str = None) -> bool:
+    """Whether the client opted in to the compact encoding path."""
+    accept = request.headers.get("accept", "")
+    return response_format is not None or (msgpack is not None and any(_accepts(accept, t) for t in MSGPACK_MEDIA_TYPES))
+
+
+def encode_response(request: Request, content, response_format: str = None, headers: dict = None) -> Response:
+    """
+    Build a response for `content` following the client's opt-ins.
+
+    Args:
+        request: incoming request, for Accept / Accept-Encoding negotiation
+        content: JSON-compatible result (numpy scalars and timestamps allowed)
+        response_format: "json" (row shape) or "columnar"
+        headers: extra headers to set on the response
+
+    Returns:
+        Response with the encoded (and possibly compressed) body
+
+    Raises:
+        ValueError: on an unknown response_format
+    """
+    response_format = (response_format or "json").lower()
+    if response_format not in ("json", "columnar"):
+        raise ValueError(f"Unknown response format '{response_format}', expected 'json' or 'columnar'")
+    if response_format == "columnar":
+        content = to_columnar(content)
+
+    accept = request.headers.get("accept", "")
+    if msgpack is not None and any(_accepts(accept, t) for t in MSGPACK_MEDIA_TYPES):
+        body = msgpack.packb(content, default=_default, use_bin_type=True)
+        media_type = "application/msgpack"
+    else:
+        body = dumps_json(content)
+        media_type = "application/json"
+
+    out_headers = dict(headers or {})
+    out_headers["X-Result-Format"] = response_format
+    out_headers["Vary"] = "Accept, Accept-Encoding"
+
+    # --- Optional compression, zstd preferred ---
+    if len(body) >= COMPRESS_MIN_BYTES:
+        accept_encoding = request.headers.get("accept-encoding", "")
+        if zstandard is not None and _accepts(accept_encoding, "zstd"):
+            body = zstandard.ZstdCompressor(level=3).compress(body)
+            out_headers["Content-Encoding"] = "zstd"
+        elif _accepts(accept_encoding, "gzip"):
+            body = gzip.compress(body, compresslevel=5)
+            out_headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type=media_type, headers=out_headers)
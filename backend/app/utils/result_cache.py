@@ -0,0 +1,210 @@
+import gzip
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+from app.utils.cache_dirs import ensure_private_dir
+
+
+class CachedResult:
+    """
+    A cached value with the metadata needed to validate and report it.
+
+    `value` is read from the pickled payload on every hit, so callers can
+    modify what they get back without corrupting the cache.
+    """
+
+    def __init__(self, key: str, payload: bytes, meta: dict, created_at: float, tier: str):
+        self.key = key
+        self.payload = payload
+        self.meta = meta
+        self.created_at = created_at
+        self.tier = tier
+
+    @property
+    def value(self):
+        return pickle.loads(self.payload)
+
+
+class TieredResultCache:
+    """
+    Two-tier LRU cache of pickled results: memory, then gzip files on disk.
+
+    Entries are pickled once on insertion and sized by their pickled bytes.
+    When the memory tier exceeds `memory_budget_bytes`, its least recently
+    used entries are demoted to disk; when the disk tier exceeds
+    `disk_budget_bytes`, its least recently used files are deleted. A disk
+    hit is promoted back to memory.
+
+    Files live in a per-process directory, because the keys they are
+    validated against (e.g. the price data version) do not survive a restart.
+    Files are unpickled on a disk hit, so the disk tier is only used when
+    `disk_dir` is private to this user (see app.utils.cache_dirs).
+
+    Args:
+        name: cache name, used for stats and the disk directory
+        memory_budget_bytes: pickled bytes kept in memory
+        disk_budget_bytes: compressed bytes kept on disk (0 or None disables the disk tier)
+        disk_dir: base directory for cache files
+    """
+
+    def __init__(self, name: str, memory_budget_bytes: int, disk_budget_bytes: int = None, disk_dir: str = None):
+        self.name = name
+        self.memory_budget_bytes = memory_budget_bytes
+        self.disk_budget_bytes = disk_budget_bytes or 0
+        self.disk_dir = os.path.join(disk_dir, f"{name}-{os.getpid()}") if disk_dir and self.disk_budget_bytes else None
+        self._disk_checked = False
+
+        self._memory = OrderedDict()    # key -> (payload, meta, created_at)
+        self._disk = OrderedDict()      # key -> (path, compressed bytes, meta, created_at)
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.RLock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "invalidations": 0,
+                          "demotions": 0, "evictions": 0}
+
+    # -----------------------------------------
+    # Lookup / insert
+    # -----------------------------------------
+    def get(self, key: str, is_valid=None):
+        """
+        Look up `key` in memory, then on disk.
+
+        Args:
+            key: cache key
+            is_valid: optional callable(meta) -> bool; invalid entries are dropped
+
+        Returns:
+            CachedResult, or None on a miss
+        """
+        with self._lock:
+            if key in self._memory:
+                payload, meta, created_at = self._memory[key]
+                tier = "memory"
+            elif key in self._disk:
+                path, _, meta, created_at = self._disk[key]
+                payload, tier = None, "disk"
+            else:
+                self._counters["misses"] += 1
+                return None
+
+            if is_valid is not None and not is_valid(meta):
+                self._discard(key)
+                self._counters["invalidations"] += 1
+                self._counters["misses"] += 1
+                return None
+
+            if tier == "memory":
+                self._memory.move_to_end(key)
+            else:
+                try:
+                    with gzip.open(path, "rb") as f:
+                        payload = f.read()
+                except OSError as e:
+                    print(f"Result cache {self.name}: failed to read {path}: {e}")
+                    self._discard(key)
+                    self._counters["misses"] += 1
+                    return None
+                # Promote to memory
+                self._discard(key)
+                self._insert_memory(key, payload, meta, created_at)
+
+            self._counters[f"{tier}_hits"] += 1
+            return CachedResult(key, payload, dict(meta), created_at, tier)
+
+    def set(self, key: str, value, meta: dict = None):
+        """Cache `value` under `key` with optional metadata used for validation."""
+        payload = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._discard(key)
+            self._insert_memory(key, payload, dict(meta or {}), time.time())
+
+    def pop(self, key: str):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._memory) + list(self._disk):
+                self._discard(key)
+
+    def close(self):
+        """Drop every entry and remove the disk directory."""
+        self.clear()
+        if self.disk_dir is not None:
+            shutil.rmtree(self.disk_dir, ignore_errors=True)
+
+    # -----------------------------------------
+    # Tier management (caller holds the lock)
+    # -----------------------------------------
+    def _insert_memory(self, key, payload, meta, created_at):
+        self._memory[key] = (payload, meta, created_at)
+        self._memory_bytes += len(payload)
+
+        # Demote least recently used entries, but always keep the newest one
+        while self._memory_bytes > self.memory_budget_bytes and len(self._memory) > 1:
+            old_key, (old_payload, old_meta, old_created) = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old_payload)
+            if self._disk_ready():
+                self._insert_disk(old_key, old_payload, old_meta, old_created)
+                self._counters["demotions"] += 1
+            else:
+                self._counters["evictions"] += 1
+
+    def _disk_ready(self) -> bool:
+        """Whether the disk tier is enabled, creating its private directory on first use."""
+        if self.disk_dir is not None and not self._disk_checked:
+            if not (ensure_private_dir(os.path.dirname(self.disk_dir)) and ensure_private_dir(self.disk_dir)):
+                self.disk_dir = None
+            self._disk_checked = True
+        return self.disk_dir is not None
+
+    def _insert_disk(self, key, payload, meta, created_at):
+        path = os.path.join(self.disk_dir, f"{key}.pkl.gz")
+        try:
+            with gzip.open(path, "wb", compresslevel=1) as f:
+                f.write(payload)
+            size = os.path.getsize(path)
+        except OSError as e:
+            print(f"Result cache {self.name}: failed to write {path}: {e}")
+            self._counters["evictions"] += 1
+            return
+
+        self._disk[key] = (path, size, meta, created_at)
+        self._disk_bytes += size
+        while self._disk_bytes > self.disk_budget_bytes and self._disk:
+            old_key = next(iter(self._disk))
+            self._discard(old_key)
+            self._counters["evictions"] += 1
+
+    def _discard(self, key):
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= len(entry[0])
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            path, size, _, _ = entry
+            self._disk_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        """Entries and bytes per tier, budgets and hit / miss / eviction counters."""
+        with self._lock:
+            hits = self._counters["memory_hits"] + self._counters["disk_hits"]
+            lookups = hits + self._counters["misses"]
+            return {
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget_bytes": self.memory_budget_bytes,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_budget_bytes": self.disk_budget_bytes,
+                **self._counters,
+                "hit_ratio": hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,137 @@
+import numpy as np
+
+# === Result views: downsampling, pagination and projection ===
+# Result endpoints return a view of the stored result; the full data stays
+# in the task store / result cache and is never modified.
+
+# Record lists downsampled by value, and the key holding the plotted value
+SERIES_KEYS = {"equityCurve": "value", "returns": "value"}
+# Series whose records also carry a period return, recomputed between kept points
+RETURN_KEYS = {"returns": "return"}
+# Keys always kept by a field projection, so results stay identifiable
+IDENTITY_KEYS = ("symbol", "strategy")
+
+
+def lttb_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-triangle-three-buckets downsampling over evenly spaced points.
+
+    Keeps the first and last points and, from each of `threshold - 2`
+    buckets in between, the point forming the largest triangle with the
+    previously kept point and the average of the next bucket.
+
+    Args:
+        y: series values
+        threshold: number of points to keep
+
+    Returns:
+        np.ndarray of kept indices, ascending
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    x = np.arange(n, dtype=float)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+
+    # Bucket edges over the interior points 1 .. n-2
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+
+        # Average of the next bucket (the last point for the final bucket)
+        if i + 2 < len(edges):
+            next_start, next_end = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        # Triangle areas (up to a constant factor) for every candidate in the bucket
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        kept[i + 1] = a
+
+    return kept
+
+
+def downsample_records(records: list, threshold: int, value_key: str = "value", return_key: str = None) -> list:
+    """
+    Downsample a list of {"date", value_key, ...} records with LTTB.
+
+    With `return_key`, kept records are copied and their return is recomputed
+    as the change in `value_key` since the previous kept record, so returns
+    still compound to the curve (0 where the previous value is missing or 0).
+    """
+    if not records or threshold is None or len(records) <= threshold:
+        return records
+    values = np.array([r.get(value_key) if r.get(value_key) is not None else np.nan for r in records], dtype=float)
+    kept = [records[i] for i in lttb_indices(values, threshold)]
+    if return_key is None:
+        return kept
+
+    rebased = [dict(kept[0])]
+    for prev, record in zip(kept, kept[1:]):
+        record = dict(record)
+        before, after = prev.get(value_key), record.get(value_key)
+        record[return_key] = after / before - 1 if before and after is not None else 0.0
+        rebased.append(record)
+    return rebased
+
+
+def shape_result(result: dict, points: int = None, trades_offset: int = 0, trades_limit: int = None,
+                 fields: list = None) -> dict:
+    """
+    View of one result dict (one symbol-strategy entry).
+
+    Args:
+        result: stored result, left untouched
+        points: downsample equity curves / returns to this many points (None = all)
+        trades_offset: first trade to include
+        trades_limit: maximum number of trades to include (None = all from offset)
+        fields: top-level keys to keep besides IDENTITY_KEYS (None = all)
+
+    Returns:
+        dict: shallow copy with the view applied; a paginated trade list adds
+        "tradesTotal", a downsampled series adds "<key>Points" with the
+        original number of points
+    """
+    if fields is not None:
+        keep = set(fields) | set(IDENTITY_KEYS)
+        view = {k: v for k, v in result.items() if k in keep}
+    else:
+        view = dict(result)
+
+    for key, value_key in SERIES_KEYS.items():
+        series = view.get(key)
+        if points is not None and isinstance(series, list) and len(series) > points:
+            view[key] = downsample_records(series, points, value_key, RETURN_KEYS.get(key))
+            view[f"{key}Points"] = len(series)
+
+    trades = view.get("trades")
+    if isinstance(trades, list) and (trades_offset or trades_limit is not None):
+        stop = None if trades_limit is None else trades_offset + trades_limit
+        view["trades"] = trades[trades_offset:stop]
+        view["tradesTotal"] = len(trades)
+
+    return view
+
+
+def shape_results(results: list, **view) -> list:
+    """Apply `shape_result` to every dict in a list of results."""
+    if not results:
+        return results
+    return [shape_result(r, **view) if isinstance(r, dict) else r for r in results]
+
+
+def parse_fields(fields: str = None):
+    """Split a comma-separated field list; None / empty means all fields."""
+    if not fields:
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
@@ -0,0 +1,443 @@
+import copy
+
+import numpy as np
+
+# === Streaming indicators ===
+# Stateful counterparts of app.utils.indicators for appending bars one at a
+# time: each indicator tracks n series (symbols, or pairs for the spread
+# z-score) and `update` takes one bar as an array of n values, in O(1) work
+# per series (vectorised across series; O(period) work once every `period`
+# bars for rolling extrema, amortised O(1)).
+#
+# Outputs follow the batch functions: rolling statistics are NaN until a
+# full window without missing values is available (pandas min_periods =
+# window), EMAs follow pandas ewm(adjust=False), and constant windows give
+# the constant as their mean and a zero std, as pandas does. Rolling
+# mean / std use pandas' own add/remove recurrences, so a stream started on
+# the same first bar reproduces the batch values exactly.
+#
+# `snapshot()` returns a picklable dict of the indicator's parameters and
+# state; `restore_indicator(snapshot)` rebuilds it, so a day's state can be
+# stored and the next bar applied without replaying history.
+
+class StreamingIndicator:
+    """
+    Base class: subclasses list their constructor parameters in `_params`
+    and their state attributes in `_state`.
+    """
+
+    _params = ()
+    _state = ()
+
+    def update(self, values) -> np.ndarray:
+        raise NotImplementedError
+
+    def warm_up(self, matrix) -> np.ndarray:
+        """Feed a (bars x series) history row by row; return the stacked outputs."""
+        matrix = np.asarray(matrix, dtype=float)
+        outputs = [self.update(row) for row in matrix]
+        return np.stack(outputs) if outputs else np.empty((0, self.n))
+
+    def snapshot(self) -> dict:
+        state = {}
+        for name in self._state:
+            value = getattr(self, name)
+            state[name] = value.snapshot() if isinstance(value, StreamingIndicator) else copy.deepcopy(value)
+        return {
+            "type": type(self).__name__,
+            "params": {name: getattr(self, name) for name in self._params},
+            "state": state,
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict):
+        indicator = cls(**snapshot["params"])
+        for name, value in snapshot["state"].items():
+            if isinstance(value, dict) and "type" in value:
+                value = restore_indicator(value)
+            else:
+                value = copy.deepcopy(value)
+            setattr(indicator, name, value)
+        return indicator
+
+
+def _as_row(values, n: int) -> np.ndarray:
+    row = np.asarray(values, dtype=float).reshape(-1)
+    if row.shape[0] != n:
+        raise ValueError(f"Expected {n} values per bar, got {row.shape[0]}")
+    return row
+
+
+# ================================
+# Rolling Mean / Variance
+# ================================
+class RollingMoments(StreamingIndicator):
+    """
+    Rolling mean and sample variance over `period` bars for n series, with
+    pandas' rolling mean / var recurrences (Kahan-compensated running sum,
+    Welford variance, consecutive-equal-value tracking), so results equal
+    DataFrame.rolling(period).mean() / .std() bar for bar.
+
+    `update` returns the mean; `std()` gives the standard deviation of the
+    same window.
+    """
+
+    _params = ("n", "period")
+    _state = (
+        "bars", "buffer", "nobs", "neg_count", "sum", "sum_add_comp", "sum_remove_comp",
+        "mean", "ssqdm", "mean_add_comp", "mean_remove_comp", "same_run", "prev_value",
+    )
+
+    def __init__(self, n: int, period: int):
+        if period < 1:
+            raise ValueError("Period must be a positive integer")
+        self.n = n
+        self.period = period
+        self.bars = 0
+        self.buffer = np.full((period, n), np.nan)     # ring of the window's values
+        self._reset(np.full(n, np.nan))
+
+    def _reset(self, first: np.ndarray):
+        n = self.n
+        self.nobs = np.zeros(n)             # non-missing values in the window
+        self.neg_count = np.zeros(n)        # negative values in the window
+        self.sum = np.zeros(n)
+        self.sum_add_comp = np.zeros(n)
+        self.sum_remove_comp = np.zeros(n)
+        self.mean = np.zeros(n)             # Welford mean, for the variance
+        self.ssqdm = np.zeros(n)            # sum of squared deviations from it
+        self.mean_add_comp = np.zeros(n)
+        self.mean_remove_comp = np.zeros(n)
+        self.same_run = np.zeros(n)         # consecutive equal non-missing values
+        self.prev_value = first.copy()
+
+    def update(self, values) -> np.ndarray:
+        row = _as_row(values, self.n)
+        slot = self.bars % self.period
+        if self.bars == 0 or self.period == 1:
+            # pandas starts over whenever consecutive windows do not overlap
+            self._reset(row)
+        elif self.bars >= self.period:
+            self._remove(self.buffer[slot])
+        self._add(row)
+        self.buffer[slot] = row
+        self.bars += 1
+        return self.value()
+
+    def _remove(self, leaving: np.ndarray):
+        out = ~np.isnan(leaving)
+        if not out.any():
+            return
+        x = np.where(out, leaving, 0.0)
+        self.nobs -= out
+        self.neg_count -= out & np.signbit(leaving)
+
+        y = -x - self.sum_remove_comp
+        t = self.sum + y
+        self.sum_remove_comp = np.where(out, t - self.sum - y, self.sum_remove_comp)
+        self.sum = np.where(out, t, self.sum)
+
+        remaining = out & (self.nobs > 0)
+        prev_mean = self.mean - self.mean_remove_comp
+        y = x - self.mean_remove_comp
+        t = y - self.mean
+        mean = self.mean - t / np.where(remaining, self.nobs, 1.0)
+        ssqdm = self.ssqdm - (x - prev_mean) * (x - mean)
+        self.mean_remove_comp = np.where(remaining, t + self.mean - y, self.mean_remove_comp)
+        emptied = out & ~remaining
+        self.mean = np.where(remaining, mean, np.where(emptied, 0.0, self.mean))
+        self.ssqdm = np.where(remaining, ssqdm, np.where(emptied, 0.0, self.ssqdm))
+
+    def _add(self, row: np.ndarray):
+        entering = ~np.isnan(row)
+        x = np.where(entering, row, 0.0)
+        self.nobs += entering
+        self.neg_count += entering & np.signbit(row)
+
+        y = x - self.sum_add_comp
+        t = self.sum + y
+        self.sum_add_comp = np.where(entering, t - self.sum - y, self.sum_add_comp)
+        self.sum = np.where(entering, t, self.sum)
+
+        self.same_run = np.where(entering, np.where(row == self.prev_value, self.same_run + 1, 1.0), self.same_run)
+        self.prev_value = np.where(entering, row, self.prev_value)
+
+        prev_mean = self.mean - self.mean_add_comp
+        y = x - self.mean_add_comp
+        t = y - self.mean
+        mean = self.mean + t / np.where(entering, self.nobs, 1.0)
+        ssqdm = self.ssqdm + (x - prev_mean) * (x - mean)
+        self.mean_add_comp = np.where(entering, t + self.mean - y, self.mean_add_comp)
+        self.mean = np.where(entering, mean, self.mean)
+        self.ssqdm = np.where(entering, ssqdm, self.ssqdm)
+
+    def _complete(self) -> np.ndarray:
+        return self.nobs >= self.period
+
+    def value(self) -> np.ndarray:
+        """Rolling mean of the current window."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self.sum / self.nobs
+        mean = np.where(self.same_run >= self.nobs, self.prev_value, mean)
+        mean = np.where((self.same_run < self.nobs) & (self.neg_count == 0) & (mean < 0), 0.0, mean)
+        mean = np.where((self.same_run < self.nobs) & (self.neg_count == self.nobs) & (mean > 0), 0.0, mean)
+        return np.where(self._complete(), mean, np.nan)
+
+    def std(self) -> np.ndarray:
+        """Rolling sample standard deviation of the current window."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = self.ssqdm / (self.nobs - 1)
+        var = np.where((self.nobs == 1) | (self.same_run >= self.nobs), 0.0, var)
+        var = np.where(self._complete() & (self.nobs > 1), var, np.nan)
+        with np.errstate(invalid="ignore"):
+            return np.where(var < 0, 0.0, np.sqrt(np.maximum(var, 0.0)))
+
+
+class StreamingSMA(RollingMoments):
+    """Simple moving average over `period` bars (compute_sma_matrix)."""
+
+
+class StreamingBollinger(StreamingIndicator):
+    """
+    Bollinger bands (compute_bollinger_bands_matrix): `update` returns
+    {"upper", "middle", "lower"}.
+    """
+
+    _params = ("n", "period", "std_dev")
+    _state = ("moments",)
+
+    def __init__(self, n: int, period: int, std_dev: float):
+        self.n = n
+        self.period = period
+        self.std_dev = std_dev
+        self.moments = RollingMoments(n, period)
+
+    def update(self, values) -> dict:
+        middle = self.moments.update(values)
+        band = self.std_dev * self.moments.std()
+        return {"upper": middle + band, "middle": middle, "lower": middle - band}
+
+    def warm_up(self, matrix) -> dict:
+        outputs = [self.update(row) for row in np.asarray(matrix, dtype=float)]
+        return {k: np.stack([o[k] for o in outputs]) if outputs else np.empty((0, self.n))
+                for k in ("upper", "middle", "lower")}
+
+
+# ================================
+# Exponential Moving Average
+# ================================
+class StreamingEMA(StreamingIndicator):
+    """
+    Exponential moving average as pandas ewm(adjust=False): pass `span`
+    (compute_ema_matrix) or `alpha`. Missing values keep the last average
+    and decay its weight, as pandas does with ignore_na=False.
+    """
+
+    _params = ("n", "span", "alpha")
+    _state = ("weighted", "old_weight")
+
+    def __init__(self, n: int, span: float = None, alpha: float = None):
+        if (span is None) == (alpha is None):
+            raise ValueError("Pass exactly one of span and alpha")
+        self.n = n
+        self.span = span
+        self.alpha = alpha
+        self.weight = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.weighted = np.full(n, np.nan)
+        self.old_weight = np.ones(n)
+
+    def update(self, values) -> np.ndarray:
+        row = _as_row(values, self.n)
+        observed = ~np.isnan(row)
+        started = ~np.isnan(self.weighted)
+
+        self.old_weight = np.where(started, self.old_weight * (1.0 - self.weight), self.old_weight)
+        blend = started & observed
+        with np.errstate(invalid="ignore"):
+            blended = (self.old_weight * self.weighted + self.weight * row) / (self.old_weight + self.weight)
+        self.weighted = np.where(blend & (self.weighted != row), blended, self.weighted)
+        self.old_weight = np.where(blend, 1.0, self.old_weight)
+        self.weighted = np.where(~started & observed, row, self.weighted)
+        return self.weighted.copy()
+
+
+# ================================
+# Relative Strength Index
+# ================================
+class StreamingRSI(StreamingIndicator):
+    """
+    Wilder RSI (compute_rsi_matrix), optionally smoothed by an EMA of span
+    `smoothing`. Undefined values are 0, as in the batch version.
+    """
+
+    _params = ("n", "period", "smoothing")
+    _state = ("previous", "gain", "loss", "smoother")
+
+    def __init__(self, n: int, period: int, smoothing: int = 1):
+        self.n = n
+        self.period = period
+        self.smoothing = smoothing
+        self.previous = np.full(n, np.nan)
+        self.gain = StreamingEMA(n, alpha=1.0 / period)
+        self.loss = StreamingEMA(n, alpha=1.0 / period)
+        self.smoother = StreamingEMA(n, span=smoothing) if smoothing > 1 else None
+
+    def update(self, values) -> np.ndarray:
+        row = _as_row(values, self.n)
+        delta = row - self.previous
+        self.previous = row
+        avg_gain = self.gain.update(np.where(np.isnan(delta), np.nan, np.maximum(delta, 0.0)))
+        avg_loss = self.loss.update(np.where(np.isnan(delta), np.nan, -np.minimum(delta, 0.0)))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rs = avg_gain / np.where(avg_loss == 0, np.nan, avg_loss)
+            rsi = 100 - 100 / (1 + rs)
+        rsi = np.where(np.isnan(rsi), 0.0, rsi)
+        if self.smoother is not None:
+            rsi = self.smoother.update(rsi)
+        return rsi
+
+
+# ================================
+# Rolling Max / Min
+# ================================
+class _StreamingExtremum(StreamingIndicator):
+    """
+    Rolling extremum over `period` bars (van Herk / Gil-Werman): bars are
+    split into blocks of `period`; a window is the tail of the previous
+    block (whose suffix extrema are computed once, when it completes) and
+    the head of the current one (a running extremum).
+    """
+
+    _params = ("n", "period")
+    _state = ("bars", "current", "previous", "suffix", "running", "missing")
+    _reduce = None
+    _fill = None
+
+    def __init__(self, n: int, period: int):
+        if period < 1:
+            raise ValueError("Period must be a positive integer")
+        self.n = n
+        self.period = period
+        self.bars = 0
+        self.current = np.full((period, n), np.nan)     # raw values of the current block
+        self.previous = np.full((period, n), np.nan)    # raw values of the previous block
+        self.suffix = np.full((period, n), self._fill)  # suffix extrema of the previous block
+        self.running = np.full(n, self._fill)           # extremum of the current block so far
+        self.missing = np.zeros(n)                      # missing values in the window
+
+    def update(self, values) -> np.ndarray:
+        row = _as_row(values, self.n)
+        reduce = type(self)._reduce
+        pos = self.bars % self.period
+        if pos == 0 and self.bars:
+            self.previous, self.current = self.current, self.previous
+            filled = np.where(np.isnan(self.previous), self._fill, self.previous)
+            self.suffix = reduce.accumulate(filled[::-1], axis=0)[::-1]
+            self.running = np.full(self.n, self._fill)
+
+        if self.bars >= self.period:
+            self.missing -= np.isnan(self.previous[pos])
+        self.missing += np.isnan(row)
+        self.current[pos] = row
+        self.running = reduce(self.running, np.where(np.isnan(row), self._fill, row))
+        self.bars += 1
+
+        if pos == self.period - 1:
+            result = self.running.copy()
+        else:
+            result = reduce(self.suffix[pos + 1], self.running)
+        complete = (self.bars >= self.period) & (self.missing == 0)
+        return np.where(complete, result, np.nan)
+
+
+class StreamingRollingMax(_StreamingExtremum):
+    """Rolling maximum over `period` bars (compute_rolling_max_matrix)."""
+
+    _reduce = np.maximum
+    _fill = -np.inf
+
+
+class StreamingRollingMin(_StreamingExtremum):
+    """Rolling minimum over `period` bars (compute_rolling_min_matrix)."""
+
+    _reduce = np.minimum
+    _fill = np.inf
+
+
+# ================================
+# Lag
+# ================================
+class StreamingLag(StreamingIndicator):
+    """Value `lag` bars ago (DataFrame.shift), NaN until available."""
+
+    _params = ("n", "lag")
+    _state = ("bars", "buffer")
+
+    def __init__(self, n: int, lag: int):
+        self.n = n
+        self.lag = lag
+        self.bars = 0
+        self.buffer = np.full((max(lag, 1), n), np.nan)
+
+    def update(self, values) -> np.ndarray:
+        row = _as_row(values, self.n)
+        if self.lag == 0:
+            return row.copy()
+        slot = self.bars % self.lag
+        lagged = self.buffer[slot].copy()
+        self.buffer[slot] = row
+        self.bars += 1
+        return lagged
+
+
+# ================================
+# Pairs Spread Z-Score
+# ================================
+class StreamingSpreadZScore(StreamingIndicator):
+    """
+    Rolling z-score of spreads first - second over `lookback` bars for n
+    pairs (compute_spread_zscore). `update(first, second)` takes one bar of
+    each leg.
+    """
+
+    _params = ("n", "lookback")
+    _state = ("moments",)
+
+    def __init__(self, n: int, lookback: int):
+        self.n = n
+        self.lookback = lookback
+        self.moments = RollingMoments(n, lookback)
+
+    def update(self, first, second=None) -> np.ndarray:
+        if second is None:
+            first, second = np.asarray(first, dtype=float).reshape(2, -1)
+        spread = _as_row(first, self.n) - _as_row(second, self.n)
+        mean = self.moments.update(spread)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (spread - mean) / self.moments.std()
+
+    def warm_up(self, first, second=None) -> np.ndarray:
+        if second is None:
+            first, second = first
+        first, second = np.asarray(first, dtype=float), np.asarray(second, dtype=float)
+        outputs = [self.update(a, b) for a, b in zip(first, second)]
+        return np.stack(outputs) if outputs else np.empty((0, self.n))
+
+
+# ================================
+# Snapshots
+# ================================
+STREAMING_INDICATORS = {
+    cls.__name__: cls
+    for cls in (RollingMoments, StreamingSMA, StreamingBollinger, StreamingEMA, StreamingRSI,
+                StreamingRollingMax, StreamingRollingMin, StreamingLag, StreamingSpreadZScore)
+}
+
+
+def restore_indicator(snapshot: dict) -> StreamingIndicator:
+    """Rebuild an indicator from `StreamingIndicator.snapshot()`."""
+    cls = STREAMING_INDICATORS.get(snapshot["type"])
+    if cls is None:
+        raise ValueError(f"Unknown streaming indicator '{snapshot['type']}'")
+    return cls.from_snapshot(snapshot)
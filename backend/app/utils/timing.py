@@ -0,0 +1,143 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# === Stage timing spans ===
+# `span(name)` times a block with a monotonic clock. Every span is observed
+# in the process-wide `timing_histograms`; inside `collect_timings()` it is
+# also added to that collector's per-stage totals, which routes can return
+# (?timings=1) and jobs publish with their results.
+#
+# Collectors follow the context: spans in asyncio.to_thread calls and tasks
+# created inside a collector are counted, and a nested collector adds its
+# totals to the enclosing one on exit. Worker processes collect their own
+# totals and send them back (see ProgressReporter.send_timings).
+
+# Histogram bucket upper bounds in seconds (a final +Inf bucket is implied)
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+class StageTimings:
+    """Per-stage total seconds and span counts for one request, job or trial."""
+
+    def __init__(self):
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float, count: int = 1):
+        with self._lock:
+            total = self._stages.setdefault(name, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+
+    def merge(self, timings: dict):
+        """Add totals in the `as_dict` format, e.g. from a worker process."""
+        for name, stage in (timings or {}).items():
+            self.add(name, stage["seconds"], stage["count"])
+
+    def as_dict(self) -> dict:
+        """{stage: {"seconds": total, "count": spans}}, in first-seen order."""
+        with self._lock:
+            return {name: {"seconds": round(seconds, 6), "count": count} for name, (seconds, count) in self._stages.items()}
+
+
+class TimingHistograms:
+    """Thread-safe cumulative duration histograms per stage name."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            stage = self._stages.get(name)
+            if stage is None:
+                stage = self._stages[name] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    stage["counts"][i] += 1
+                    break
+            else:
+                stage["counts"][-1] += 1
+            stage["sum"] += seconds
+            stage["count"] += 1
+
+    def observe_totals(self, timings: dict):
+        """Observe each stage total of an `as_dict` result once (per-span detail stays in the worker)."""
+        for name, stage in (timings or {}).items():
+            self.observe(name, stage["seconds"])
+
+    def snapshot(self) -> dict:
+        """
+        {stage: {"buckets": [[upper bound, cumulative count], ...], "sum", "count"}},
+        the last bucket's bound being "+Inf".
+        """
+        with self._lock:
+            result = {}
+            for name, stage in self._stages.items():
+                cumulative, buckets = 0, []
+                for bound, count in zip(self.buckets + ("+Inf",), stage["counts"]):
+                    cumulative += count
+                    buckets.append([bound, cumulative])
+                result[name] = {"buckets": buckets, "sum": round(stage["sum"], 6), "count": stage["count"]}
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+timing_histograms = TimingHistograms()
+
+_current: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        timing_histograms.observe(name, elapsed)
+        timings = _current.get()
+        if timings is not None:
+            timings.add(name, elapsed)
+
+
+@contextmanager
+def collect_timings():
+    """Collect the totals of spans run inside the block; yields the StageTimings."""
+    timings = StageTimings()
+    outer = _current.get()
+    reset_token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        _current.reset(reset_token)
+        if outer is not None:
+            outer.merge(timings.as_dict())
+
+
+def record_timings(timings: dict, observe: bool = True):
+    """
+    Add stage totals produced elsewhere (a worker process, a finished job) to
+    the current collector, and to the histograms if `observe`.
+    """
+    if observe:
+        timing_histograms.observe_totals(timings)
+    current = _current.get()
+    if current is not None:
+        current.merge(timings)
+
+
+def server_timing_header(timings: dict) -> str:
+    """Format stage totals as a Server-Timing header value (durations in ms)."""
+    return ", ".join(
+        f'{name};dur={stage["seconds"] * 1000:.1f}'
+        for name, stage in (timings or {}).items()
+    )
@@ -1,7 +1,6 @@
 import sys
 import threading
 import re
-import yfinance as yf
 from contextlib import contextmanager
 
 from app.crud.missing_data import insert_missing_data
@@ -26,6 +25,8 @@ def capture_stderr_threadsafe():
         sys.stderr.write = original_write
 
 def safe_download(symbols, db=None, **kwargs):
+    import yfinance as yf  # heavy import, loaded on first use
+
     failed = []
 
     with capture_stderr_threadsafe() as output:
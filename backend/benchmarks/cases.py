@@ -0,0 +1,226 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from app.services.data.synthetic_market import generate_universe
+
+# === Benchmark cases ===
+# Each case takes a synthetic universe and returns a zero-argument callable
+# running one engine end to end. Everything before the callable is built
+# (universe slicing, price rows, inputs) is setup and is not timed.
+
+# Backtest parameters shared by the backtest and walk-forward cases
+BACKTEST_PARAMS = {
+    "initialCapital": 10000,
+    "slippage": 0.1,
+    "transactionCostPct": 0.05,
+    "fixedTransactionCost": 1,
+}
+SINGLE_STRATEGIES = ("sma_crossover", "bollinger_reversion", "rsi_reversion", "momentum", "breakout")
+BACKTEST_LOOKBACK = 200
+
+# Frontend default prescreen filters
+PRESCREEN_FILTERS = {
+    "maxBidAsk": 0.02, "maxDrawdown": 0.8, "skewness": -0.2, "kurtosis": 10,
+    "maxVolatility": 80, "percentageAboveMA": 65, "avSlope": 0.01, "posReturns": 53,
+    "minVolatilityMomentum": 10, "autocorrelation": 0, "zscoreReversion": 10,
+    "zscoreThreshold": 2, "minVolatilityBreakout": 15,
+}
+
+# Symbol caps per case, keeping the larger sizes within a sensible run time
+# (pair analysis is quadratic, the backtest date loop is per strategy key)
+SYMBOL_CAPS = {
+    "backtest": 500,
+    "walkforward": 100,
+    "analyze_pairs": 200,
+    "prescreen": None,
+    "optimise_portfolio": 500,
+    "portfolio_frontier": 500,
+    "portfolio_frontier_rebuild": 500,
+}
+
+# Risk-aversion points per efficient frontier sweep
+FRONTIER_POINTS = 20
+
+
+def _workers():
+    return max(1, (os.cpu_count() or 2) - 1)
+
+
+def _strategy_symbols(universe, symbols):
+    """Single-symbol strategies round-robin over `symbols`, plus pairs_trading on planted pairs."""
+    selected = set(symbols)
+    strategy_symbols = {}
+    for i, symbol in enumerate(symbols):
+        strategy = SINGLE_STRATEGIES[i % len(SINGLE_STRATEGIES)]
+        strategy_symbols[f"{symbol}_{strategy}"] = {"symbols": [symbol], "strategy": strategy}
+    for x, y, _beta in universe.pairs:
+        if x in selected and y in selected:
+            strategy_symbols[f"{x}-{y}_pairs_trading"] = {"symbols": [x, y], "strategy": "pairs_trading"}
+    for info in strategy_symbols.values():
+        info["weight"] = 1 / len(strategy_symbols)
+    return strategy_symbols
+
+
+def _trading_start(universe):
+    """First date after the lookback, so every strategy has warm-up history."""
+    return universe.dates[min(BACKTEST_LOOKBACK, len(universe.dates) - 1)].strftime("%Y-%m-%d")
+
+
+def backtest_case(universe, n_symbols):
+    from app.services.backtesting.engines.backtest_engine import run_backtest
+
+    symbols = universe.symbols[:n_symbols]
+    data = universe.price_rows(symbols)
+    strategy_symbols = _strategy_symbols(universe, symbols)
+    params = {**BACKTEST_PARAMS, "startDate": _trading_start(universe)}
+
+    return lambda: run_backtest(data, strategy_symbols, params)
+
+
+def walkforward_case(universe, n_symbols):
+    """
+    One-year segments run in a process pool, then aggregated into 3-segment
+    windows. Needs at least two years of history for a complete segment.
+    """
+    from app.services.backtesting.helpers.data.data_aggregation import compute_walkforward_results
+    from app.services.backtesting.helpers.data.data_preparation import create_walkforward_windows
+    from app.services.backtesting.tasks.segment_executor import run_segment
+    from app.utils.data_helpers import slice_price_data
+
+    symbols = universe.symbols[:n_symbols]
+    data = universe.price_rows(symbols)
+    strategy_symbols = _strategy_symbols(universe, symbols)
+    dates = universe.dates.strftime("%Y-%m-%d")
+    windows = create_walkforward_windows(dates[0], dates[-1], window_length=1)
+    segments = [
+        (i, slice_price_data(data, w["start"], w["end"], BACKTEST_LOOKBACK), {**BACKTEST_PARAMS, "startDate": w["start"]})
+        for i, w in enumerate(windows)
+    ]
+
+    def run():
+        with ProcessPoolExecutor(max_workers=min(_workers(), max(1, len(segments)))) as executor:
+            futures = [executor.submit(run_segment, i, seg_data, strategy_symbols, params) for i, seg_data, params in segments]
+            results = [f.result() for f in futures]
+        return compute_walkforward_results(results, min(3, len(results)))
+
+    return run
+
+
+def analyze_pairs_case(universe, n_symbols):
+    from app.services.backtesting.engines.pairs_selection import analyze_pairs
+
+    symbols = universe.symbols[:n_symbols]
+    prices = universe.price_rows(symbols)
+
+    return lambda: analyze_pairs(symbols, prices, max_workers=_workers())
+
+
+def prescreen_case(universe, n_symbols):
+    """CPU stage of the prescreen: `test_symbol` per symbol in a process pool."""
+    from app.services.portfolio.stages.prescreen.run_prescreen import test_symbol
+
+    symbols = universe.symbols[:n_symbols]
+    rows = universe.price_rows(symbols, date_format="date")
+    end = universe.dates[-1].date()
+
+    def run():
+        with ProcessPoolExecutor(max_workers=_workers()) as executor:
+            futures = [executor.submit(test_symbol, s, rows[s], end, PRESCREEN_FILTERS) for s in symbols]
+            return [f.result() for f in futures]
+
+    return run
+
+
+def optimise_portfolio_case(universe, n_symbols):
+    """Mean-variance optimisation and HRP allocation on sample moments of daily returns."""
+    from app.services.portfolio.stages.portfolio_weight_allocation.helpers.hrp_calcs import hrp_allocation
+    from app.services.portfolio.stages.portfolio_weight_allocation.helpers.optimisation_calcs import optimise_portfolio
+
+    returns = universe.close_frame().iloc[:, :n_symbols].pct_change().dropna()
+    symbols = list(returns.columns)
+    mu = (returns.mean() * 252).to_dict()
+    cov = returns.cov() * 252
+    cov_dict = {"symbols": symbols, "cov_matrix": cov.values.tolist()}
+    baseline = {s: 1 / len(symbols) for s in symbols}
+    max_weight = max(0.1, 2 / len(symbols))
+
+    def run():
+        weights = optimise_portfolio(mu, cov_dict, baseline, max_weight=max_weight)
+        hrp = hrp_allocation(cov, use_cache=False)
+        return weights, hrp
+
+    return run
+
+
+def _frontier_inputs(universe, n_symbols):
+    returns = universe.close_frame().iloc[:, :n_symbols].pct_change().dropna()
+    symbols = list(returns.columns)
+    mu = (returns.mean() * 252).to_dict()
+    cov_dict = {"symbols": symbols, "cov_matrix": (returns.cov() * 252).values.tolist()}
+    baseline = {s: 1 / len(symbols) for s in symbols}
+    params = {"risk_aversion": 0.5, "baseline_reg": 0.1, "min_weight": 0.0,
+              "max_weight": max(0.1, 2 / len(symbols))}
+    return mu, cov_dict, baseline, params, np.logspace(-1, 1, FRONTIER_POINTS).tolist()
+
+
+def portfolio_frontier_case(universe, n_symbols):
+    """Efficient frontier sweep on the cached problem, each point warm-started from the last."""
+    from app.services.portfolio.stages.portfolio_weight_allocation.helpers.optimisation_calcs import sweep_portfolios
+
+    mu, cov_dict, baseline, params, risk_aversions = _frontier_inputs(universe, n_symbols)
+    return lambda: sweep_portfolios(mu, cov_dict, baseline, params, {"risk_aversion": risk_aversions})
+
+
+def portfolio_frontier_rebuild_case(universe, n_symbols):
+    """
+    Reference for `portfolio_frontier`: the same points, each on a freshly
+    built problem as every call paid before problems were cached.
+    """
+    from app.services.portfolio.stages.portfolio_weight_allocation.helpers.optimisation_calcs import (
+        ParametrisedPortfolioProblem, _prepare_inputs,
+    )
+
+    mu_dict, cov_dict, baseline_dict, params, risk_aversions = _frontier_inputs(universe, n_symbols)
+    symbols, mu, cov_matrix, w_baseline = _prepare_inputs(mu_dict, cov_dict, baseline_dict)
+
+    def run():
+        for risk_aversion in risk_aversions:
+            problem = ParametrisedPortfolioProblem(len(symbols))
+            problem.set_covariance(cov_matrix)
+            problem.solve(mu, w_baseline, risk_aversion, params["baseline_reg"],
+                          params["min_weight"], params["max_weight"])
+
+    return run
+
+
+CASES = {
+    "backtest": backtest_case,
+    "walkforward": walkforward_case,
+    "analyze_pairs": analyze_pairs_case,
+    "prescreen": prescreen_case,
+    "optimise_portfolio": optimise_portfolio_case,
+    "portfolio_frontier": portfolio_frontier_case,
+    "portfolio_frontier_rebuild": portfolio_frontier_rebuild_case,
+}
+
+
+def build_case(name: str, n_symbols: int, years: float, seed: int):
+    """
+    Generate the universe for a case and build its timed callable.
+
+    Returns:
+        tuple: (callable, dict of case inputs actually used)
+    """
+    cap = SYMBOL_CAPS.get(name)
+    n_used = n_symbols if cap is None else min(n_symbols, cap)
+    universe = generate_universe(n_used, years, seed=seed)
+    run = CASES[name](universe, n_used)
+    return run, {
+        "symbols": n_used,
+        "years": years,
+        "dates": len(universe.dates),
+        "pairs": len(universe.pairs),
+        "seed": seed,
+    }
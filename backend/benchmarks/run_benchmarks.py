@@ -0,0 +1,231 @@
+"""
+End-to-end engine benchmarks on synthetic market data.
+
+Runs offline: universes are generated in memory and the app is configured
+for SQLite, so no database server is needed. Each case runs in a fresh
+subprocess so peak memory is measured per case.
+
+Usage (from backend/):
+    python -m benchmarks.run_benchmarks --size small
+    python -m benchmarks.run_benchmarks --symbols 300 --years 8 --cases backtest,analyze_pairs
+    python -m benchmarks.run_benchmarks --size small --baseline benchmarks/results/small-abc1234.json --threshold 0.2
+
+Results are written as JSON; with --baseline, cases slower (median time) or
+larger (peak RSS) than the baseline by more than the thresholds are
+reported and the exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+os.environ.setdefault("DB_ENGINE", "sqlite")
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+RESULTS_DIR = BACKEND_DIR / "benchmarks" / "results"
+
+# Size presets: (symbols, years)
+SIZES = {
+    "tiny": (10, 2),
+    "small": (100, 5),
+    "medium": (1000, 10),
+    "large": (5000, 20),
+}
+CASE_NAMES = ("backtest", "walkforward", "analyze_pairs", "prescreen", "optimise_portfolio",
+              "portfolio_frontier", "portfolio_frontier_rebuild")
+
+
+def _peak_rss_mb() -> tuple:
+    """Peak resident set size of this process and its waited-for children, in MB."""
+    to_mb = 1 / 1024 if sys.platform != "darwin" else 1 / (1024 * 1024)
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(own * to_mb, 1), round(children * to_mb, 1)
+
+
+def run_case(name: str, n_symbols: int, years: float, seed: int, repeat: int, trace: bool) -> dict:
+    """Run one case in this process and return its measurements."""
+    from benchmarks.cases import build_case
+
+    started = time.perf_counter()
+    run, inputs = build_case(name, n_symbols, years, seed)
+    setup_seconds = time.perf_counter() - started
+    setup_rss_mb, _ = _peak_rss_mb()
+
+    # First run kept apart: it pays one-off costs (lazy imports, solver compilation, pool start-up)
+    started = time.perf_counter()
+    run()
+    first_seconds = time.perf_counter() - started
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    result = {
+        "case": name,
+        "inputs": inputs,
+        "setup_seconds": round(setup_seconds, 4),
+        "first_seconds": round(first_seconds, 4),
+        "times": [round(t, 4) for t in times],
+        "min_seconds": round(min(times), 4),
+        "median_seconds": round(statistics.median(times), 4),
+        "setup_rss_mb": setup_rss_mb,
+    }
+    result["peak_rss_mb"], result["peak_child_rss_mb"] = _peak_rss_mb()
+
+    # Python-level allocation peak, measured on a separate (slower) run
+    if trace:
+        tracemalloc.start()
+        run()
+        result["tracemalloc_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        tracemalloc.stop()
+
+    return result
+
+
+def _spawn_case(name: str, args) -> dict:
+    """Run a case in a fresh interpreter, so memory peaks do not carry over between cases."""
+    cmd = [
+        sys.executable, "-m", "benchmarks.run_benchmarks", "--worker", name,
+        "--symbols", str(args.symbols), "--years", str(args.years),
+        "--seed", str(args.seed), "--repeat", str(args.repeat),
+    ]
+    if args.tracemalloc:
+        cmd.append("--tracemalloc")
+    proc = subprocess.run(cmd, cwd=BACKEND_DIR, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"case": name, "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit code {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float, memory_threshold: float) -> list:
+    """
+    Compare results against a baseline run.
+
+    Cases are matched by name and only compared when their inputs match.
+
+    Returns:
+        list of regression descriptions (empty if none)
+    """
+    previous = {c["case"]: c for c in baseline.get("cases", []) if "error" not in c}
+    regressions = []
+    for case in results["cases"]:
+        base = previous.get(case["case"])
+        if "error" in case or base is None or base.get("inputs") != case.get("inputs"):
+            continue
+
+        checks = (
+            ("median_seconds", threshold),
+            ("peak_rss_mb", memory_threshold),
+        )
+        for key, limit in checks:
+            old, new = base.get(key), case.get(key)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            case.setdefault("vs_baseline", {})[key] = round(change, 4)
+            if change > limit:
+                regressions.append(f"{case['case']}: {key} {old} -> {new} (+{change:.1%}, limit {limit:.0%})")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the backtest, walk-forward, pairs, prescreen and optimisation engines.")
+    parser.add_argument("--size", choices=SIZES, default="small", help="universe size preset")
+    parser.add_argument("--symbols", type=int, help="number of symbols (overrides --size)")
+    parser.add_argument("--years", type=float, help="years of history (overrides --size)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--cases", default=",".join(CASE_NAMES), help="comma-separated cases to run")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case, after a first run reported separately")
+    parser.add_argument("--tracemalloc", action="store_true", help="also record the Python allocation peak")
+    parser.add_argument("--output", help="results file (default benchmarks/results/<size>-<commit>.json)")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed median time increase vs baseline")
+    parser.add_argument("--memory-threshold", type=float, default=0.2, help="allowed peak RSS increase vs baseline")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    symbols, years = SIZES[args.size]
+    args.symbols = args.symbols or symbols
+    args.years = args.years or years
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.worker:
+        result = run_case(args.worker, args.symbols, args.years, args.seed, args.repeat, args.tracemalloc)
+        print(json.dumps(result))
+        return 0
+
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = set(cases) - set(CASE_NAMES)
+    if unknown:
+        print(f"Unknown cases: {', '.join(sorted(unknown))}", file=sys.stderr)
+        return 2
+
+    commit = _git_commit()
+    results = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "size": args.size,
+            "symbols": args.symbols,
+            "years": args.years,
+            "seed": args.seed,
+            "repeat": args.repeat,
+        },
+        "cases": [],
+    }
+
+    for name in cases:
+        print(f"{name} ...", end=" ", flush=True, file=sys.stderr)
+        case = _spawn_case(name, args)
+        results["cases"].append(case)
+        if "error" in case:
+            print(f"error: {case['error']}", file=sys.stderr)
+        else:
+            print(f"median {case['median_seconds']:.3f}s, peak rss {case['peak_rss_mb']} MB", file=sys.stderr)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold, args.memory_threshold)
+        results["regressions"] = regressions
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{args.size}-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    failed = any("error" in c for c in results["cases"])
+    return 1 if regressions or failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
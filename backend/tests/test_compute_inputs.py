@@ -0,0 +1,45 @@
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.services.portfolio.stages.portfolio_weight_allocation import compute_inputs
+
+START = date(2024, 1, 1)
+DAYS = [START + timedelta(days=i) for i in range(8)]
+# B has a hole on days 3-4 and its last close missing; C lists on day 2
+CLOSES = {
+    "A": [100, 101, 102, 103, 104, 105, 106, 107],
+    "B": [50, 51, 52, None, None, 55, 56, None],
+    "C": [None, None, 20, 21, 22, 23, 24, 25],
+}
+ROWS = [(s, d, c) for s, closes in CLOSES.items() for d, c in zip(DAYS, closes) if c is not None]
+
+
+def _get_closes(db, symbols, start, end):
+    return sorted((r for r in ROWS if r[0] in symbols and start <= r[1] <= end), key=lambda r: r[1])
+
+
+def test_returns_span_gaps_and_start_at_listing():
+    """A gap gives 0 while the close is missing and the whole move when it resumes."""
+    closes = compute_inputs._closes_matrix(ROWS, list(CLOSES))
+    returns = compute_inputs._returns_from_closes(closes)
+
+    b = returns["B"].to_numpy()
+    np.testing.assert_allclose(b[2:6], [0, 0, 55 / 52 - 1, 56 / 55 - 1])
+    assert b[-1] == 0
+    np.testing.assert_allclose(returns["C"].to_numpy()[:3], [0, 0, 21 / 20 - 1])
+
+
+def test_extending_past_a_missing_close_matches_a_full_build(monkeypatch):
+    """The cached last close skips missing values, so an incremental extend equals a rebuild."""
+    monkeypatch.setattr(compute_inputs, "get_closes", _get_closes)
+    symbols = list(CLOSES)
+
+    entry = compute_inputs._build_entry(None, symbols, DAYS[0], DAYS[3], 0.94, 0)
+    assert entry.last_closes["B"] == 52
+    entry = compute_inputs._extend_entry(None, entry, symbols, DAYS[-1], 1)
+    full = compute_inputs._build_entry(None, symbols, DAYS[0], DAYS[-1], 0.94, 1)
+
+    assert entry.last_closes["B"] == 56
+    np.testing.assert_allclose(entry.engine.covariance("sample"), full.engine.covariance("sample"), atol=1e-15)
+    np.testing.assert_allclose(entry.engine.expected_returns(), full.engine.expected_returns(), atol=1e-15)
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.portfolio.portfolio import PortfolioInputsPayload
+from app.services.portfolio.stages.portfolio_weight_allocation.helpers.ewma_engine import EwmaInputEngine
+from app.services.portfolio.stages.portfolio_weight_allocation.helpers.input_calcs import compute_expected_returns
+
+SYMBOLS = ["A", "B", "C"]
+
+
+def _returns(rows=250, seed=0):
+    return np.random.default_rng(seed).normal(0.0005, 0.01, size=(rows, len(SYMBOLS)))
+
+
+def test_sample_covariance_matches_np_cov():
+    returns = _returns()
+    engine = EwmaInputEngine.from_returns(returns, SYMBOLS)
+    np.testing.assert_allclose(engine.covariance("sample"), np.cov(returns, rowvar=False), rtol=1e-10)
+
+
+def test_ewma_covariance_matches_weighted_reference():
+    returns, decay = _returns(), 0.94
+    weights = decay ** np.arange(len(returns) - 1, -1, -1)
+    weights /= weights.sum()
+    mean = weights @ returns
+    reference = (returns - mean).T @ ((returns - mean) * weights[:, None])
+
+    engine = EwmaInputEngine.from_returns(returns, SYMBOLS, decay=decay)
+    np.testing.assert_allclose(engine.expected_returns(), mean, rtol=1e-10)
+    np.testing.assert_allclose(engine.covariance("ewma"), reference, rtol=1e-10)
+
+
+def test_incremental_updates_match_one_pass():
+    returns = _returns()
+    dates = list(range(len(returns)))
+    engine = EwmaInputEngine.from_returns(returns[:100], SYMBOLS, dates[:100])
+    engine.update(returns[90:101], dates[90:101])   # overlapping rows are skipped
+    for i in range(101, len(returns)):
+        engine.update(returns[i], [dates[i]])
+
+    full = EwmaInputEngine.from_returns(returns, SYMBOLS, dates)
+    for method in ("sample", "ewma"):
+        np.testing.assert_allclose(engine.covariance(method), full.covariance(method), rtol=1e-9)
+
+
+def test_large_mean_does_not_cancel():
+    """Small variation around a large mean keeps its precision."""
+    returns = 1e4 + _returns() * 1e-3
+    engine = EwmaInputEngine.from_returns(returns, SYMBOLS)
+    np.testing.assert_allclose(engine.covariance("sample"), np.cov(returns, rowvar=False), rtol=1e-6)
+
+
+def test_expected_returns_skip_none():
+    returns = {"A": [{"date": "d1", "return": None}, {"date": "d2", "return": 0.01}], "B": [{"date": "d1", "return": None}]}
+    expected = compute_expected_returns(returns)
+    assert expected == {"A": pytest.approx(0.01), "B": 0.0}
+
+
+def test_inputs_payload_validates_method_and_shrinkage():
+    with pytest.raises(ValidationError):
+        PortfolioInputsPayload(returns={}, cov_method="robust")
+    with pytest.raises(ValidationError):
+        PortfolioInputsPayload(returns={}, shrinkage=1.5)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import scipy.cluster.hierarchy as sch
+from scipy.spatial.distance import squareform
+
+from app.services.portfolio.stages.portfolio_weight_allocation.helpers.hrp_calcs import hrp_allocation
+
+
+def _reference_hrp(cov: pd.DataFrame) -> pd.Series:
+    """HRP as published by Lopez de Prado (2016): seriation, then recursive bisection on labels."""
+    std = np.sqrt(np.diag(cov))
+    corr = cov / np.outer(std, std)
+    dist = np.sqrt(np.clip(0.5 * (1 - corr.to_numpy()), 0, None))
+    np.fill_diagonal(dist, 0.0)
+    link = sch.linkage(squareform(dist, checks=False), "single")
+
+    # Quasi-diagonalisation
+    link = link.astype(int)
+    items = pd.Series([link[-1, 0], link[-1, 1]])
+    n = link[-1, 3]
+    while items.max() >= n:
+        items.index = range(0, items.shape[0] * 2, 2)
+        clusters = items[items >= n]
+        i, j = clusters.index, clusters.values - n
+        items[i] = link[j, 0]
+        items = pd.concat([items, pd.Series(link[j, 1], index=i + 1)]).sort_index()
+        items.index = range(items.shape[0])
+    order = cov.index[items.tolist()].tolist()
+
+    def cluster_var(names):
+        sub = cov.loc[names, names]
+        ivp = 1 / np.diag(sub)
+        ivp /= ivp.sum()
+        return float(ivp @ sub.to_numpy() @ ivp)
+
+    weights = pd.Series(1.0, index=order)
+    clusters = [order]
+    while clusters:
+        clusters = [c[j:k] for c in clusters for j, k in ((0, len(c) // 2), (len(c) // 2, len(c))) if len(c) > 1]
+        for i in range(0, len(clusters), 2):
+            left, right = clusters[i], clusters[i + 1]
+            var_left, var_right = cluster_var(left), cluster_var(right)
+            alpha = 1 - var_left / (var_left + var_right)
+            weights[left] *= alpha
+            weights[right] *= 1 - alpha
+    return weights
+
+
+def _cov(n=12, seed=3):
+    rng = np.random.default_rng(seed)
+    factors = rng.normal(size=(500, 3))
+    returns = factors @ rng.normal(size=(3, n)) * 0.01 + rng.normal(0, 0.01, size=(500, n))
+    symbols = [f"S{i}" for i in range(n)]
+    return pd.DataFrame(np.cov(returns, rowvar=False), index=symbols, columns=symbols)
+
+
+def test_matches_reference_implementation():
+    cov = _cov()
+    weights = hrp_allocation(cov, use_cache=False)
+    reference = _reference_hrp(cov)
+
+    assert list(weights.index) == list(reference.index)
+    np.testing.assert_allclose(weights.to_numpy(), reference.to_numpy(), rtol=1e-12)
+    assert abs(weights.sum() - 1) < 1e-12
+
+
+def test_uncorrelated_assets_get_inverse_variance_weights():
+    variances = np.array([0.01, 0.04, 0.02, 0.09, 0.05])
+    symbols = list("ABCDE")
+    cov = pd.DataFrame(np.diag(variances), index=symbols, columns=symbols)
+
+    weights = hrp_allocation(cov, use_cache=False).reindex(symbols)
+    np.testing.assert_allclose(weights.to_numpy(), (1 / variances) / (1 / variances).sum(), rtol=1e-12)
+
+
+def test_cached_ordering_matches_uncached():
+    cov = _cov(seed=4)
+    first = hrp_allocation(cov)
+    nudged = cov * (1 + 1e-6)
+    pd.testing.assert_series_equal(hrp_allocation(nudged), hrp_allocation(nudged, use_cache=False))
+    assert list(first.index) == list(hrp_allocation(nudged).index)
@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Optional wall-clock budget for `import app.main`. Timing depends on the
+# machine and its load, so the check only runs when a budget is set
+IMPORT_BUDGET_SECONDS = os.getenv("IMPORT_TIME_BUDGET_SECONDS")
+
+# Loaded on first use only; importing the app must not pull these in
+LAZY_MODULES = ("optuna", "cvxpy", "statsmodels", "networkx", "scipy", "yfinance", "yahooquery", "pyodbc", "aioodbc")
+
+
+def _import_app(code: str):
+    env = {**os.environ, "DB_ENGINE": "sqlite"}
+    return subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def _import_costs(stderr: str) -> dict:
+    """Parse `-X importtime` output into {module: cumulative microseconds}."""
+    costs = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        costs[name.strip()] = int(cumulative_us)
+    return costs
+
+
+@pytest.mark.skipif(not IMPORT_BUDGET_SECONDS, reason="set IMPORT_TIME_BUDGET_SECONDS to check import time")
+def test_app_import_within_budget():
+    result = _import_app("import app.main")
+    costs = _import_costs(result.stderr)
+
+    # Report the most expensive top-level imports (visible with pytest -s)
+    print("\nimport app.main: per-module cumulative import time")
+    for name, us in sorted(costs.items(), key=lambda kv: kv[1], reverse=True)[:15]:
+        print(f"  {us / 1e6:8.3f}s  {name}")
+
+    assert costs["app.main"] / 1e6 < float(IMPORT_BUDGET_SECONDS)
+
+
+def test_heavy_dependencies_load_lazily():
+    result = _import_app(
+        "import sys, app.main; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    assert result.stdout.strip() == ""
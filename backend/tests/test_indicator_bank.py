@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.strategies.signal_registry import indicator_sweep
+from app.utils import indicators
+from app.utils.indicator_bank import rolling_bank
+from app.utils.indicator_cache import IndicatorCache
+
+WINDOWS = [1, 2, 5, 20, 63, 64, 65, 130]
+
+
+def _panel(rows=700, seed=1):
+    rng = np.random.default_rng(seed)
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(rows, 4)), axis=0)), columns=list("ABCD"))
+    prices.iloc[50:90, 0] = np.nan                 # gap
+    prices.iloc[200:300, 1] = prices.iloc[199, 1]  # flat (forward-filled) stretch
+    prices.iloc[400:405, 2] = np.nan               # short gap inside a flat stretch
+    prices.iloc[380:450, 2] = 250.0
+    prices.iloc[:30, 3] = np.nan                   # late listing
+    return prices
+
+
+@pytest.mark.parametrize("stat", ["mean", "std", "min", "max"])
+def test_bank_matches_pandas_rolling(stat):
+    prices = _panel()
+    bank = rolling_bank(prices, WINDOWS, (stat,))
+    # Both sides round at the scale of the prices, not of the statistic
+    atol = 1e-12 * np.nanmax(prices.to_numpy()) ** 2
+    for i, window in enumerate(WINDOWS):
+        expected = getattr(prices.rolling(window), stat)().to_numpy()
+        got = bank[stat][i]
+        np.testing.assert_array_equal(np.isnan(got), np.isnan(expected), err_msg=f"{stat} {window}")
+        np.testing.assert_allclose(got, expected, rtol=1e-9, atol=atol, err_msg=f"{stat} {window}")
+
+
+def test_flat_stretches_are_exact():
+    prices = _panel()
+    bank = rolling_bank(prices, [20], ("mean", "std"))
+    flat = slice(219, 300)
+    assert (bank["mean"][0, flat, 1] == prices.iloc[199, 1]).all()
+    assert (bank["std"][0, flat, 1] == 0.0).all()
+
+
+def test_primed_sweep_serves_the_generators(monkeypatch):
+    cache = IndicatorCache(memory_budget_bytes=64 << 20)
+    monkeypatch.setattr(indicators, "indicator_cache", cache)
+    prices = _panel()
+
+    assert indicators.prime_rolling_indicators(prices, range(5, 31), ("mean",)) == 26
+    misses = cache.stats()["misses"]
+    sma = indicators.compute_sma_matrix(prices, 17)
+
+    assert cache.stats()["misses"] == misses
+    pd.testing.assert_frame_equal(sma, prices.rolling(17).mean(), rtol=1e-9)
+    assert indicators.prime_rolling_indicators(prices, range(5, 31), ("mean",)) == 0
+
+
+def test_indicator_sweep_from_param_space():
+    space = {
+        "shortPeriod": {"type": "int", "min": 5, "max": 8, "lookback": True},
+        "longPeriod": {"type": "int", "min": 20, "max": 21, "lookback": True},
+        "bandMultiplier": {"type": "float", "min": 1, "max": 3},
+    }
+    assert indicator_sweep("sma_crossover", space) == {"windows": [5, 6, 7, 8, 20, 21], "stats": ["mean"]}
+    assert indicator_sweep("rsi_reversion", space) is None
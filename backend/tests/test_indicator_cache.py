@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from app.utils.indicator_cache import COMPUTE_STAGE, IndicatorCache
+from app.utils.timing import collect_timings
+
+
+def _panel():
+    return pd.DataFrame(np.random.default_rng(0).normal(100, 1, size=(50, 3)), columns=["A", "B", "C"])
+
+
+def test_nested_compute_is_timed_once():
+    """An indicator computed inside another's compute is not counted as a second stage span."""
+    cache = IndicatorCache(memory_budget_bytes=1 << 20)
+    panel = _panel()
+
+    def outer():
+        inner = cache.get_or_compute(panel, "inner", (), lambda: panel.diff())
+        return inner.abs()
+
+    with collect_timings() as timings:
+        cache.get_or_compute(panel, "outer", (), outer)
+
+    assert timings.as_dict()[COMPUTE_STAGE]["count"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_disk_tier_uses_private_dir(tmp_path):
+    disk_dir = tmp_path / "indicators"
+    cache = IndicatorCache(memory_budget_bytes=1 << 20, disk_budget_bytes=1 << 20, disk_dir=str(disk_dir))
+    cache.get_or_compute(_panel(), "diff", (), lambda: _panel().diff())
+
+    assert os.stat(disk_dir).st_mode & 0o777 == 0o700
+    assert any(name.endswith(".npy") for name in os.listdir(disk_dir))
+
+
+def test_disk_tier_skips_shared_dir(tmp_path):
+    """A directory other users can write to is never read from or written to."""
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    cache = IndicatorCache(memory_budget_bytes=1 << 20, disk_budget_bytes=1 << 20, disk_dir=str(shared))
+    cache.get_or_compute(_panel(), "diff", (), lambda: _panel().diff())
+
+    assert cache.disk_dir is None
+    assert os.listdir(shared) == []
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from app.services.scheduler.job_scheduler import BATCH, INTERACTIVE, JobScheduler
+from app.utils.cancellation import CancellationToken, TaskCancelled
+
+
+def test_interactive_jobs_are_admitted_before_earlier_batch_jobs():
+    scheduler = JobScheduler(max_slots=1)
+    running = scheduler.submit(BATCH, label="trial")
+    batch = scheduler.submit(BATCH, label="trial")
+    interactive = scheduler.submit(INTERACTIVE, label="backtest")
+
+    assert running.admitted and not batch.admitted and not interactive.admitted
+    assert scheduler.queue_info(interactive)["position"] == 1
+    assert scheduler.queue_info(batch)["position"] == 2
+
+    scheduler.release(running)
+    assert interactive.admitted and not batch.admitted
+    scheduler.release(interactive)
+    assert batch.admitted
+
+
+def test_jobs_get_the_free_slots_up_to_their_request():
+    scheduler = JobScheduler(max_slots=4)
+    first = scheduler.submit(slots=3)
+    second = scheduler.submit(slots=3)
+    third = scheduler.submit(slots=1)
+
+    assert (first.granted, second.granted) == (3, 1)
+    assert not third.admitted
+    scheduler.release(first)
+    assert third.granted == 1
+    assert scheduler.stats()["free_slots"] == 2
+
+
+def test_queued_job_can_be_withdrawn():
+    scheduler = JobScheduler(max_slots=1)
+    running = scheduler.submit()
+    queued = scheduler.submit()
+    scheduler.release(queued)
+
+    assert scheduler.stats()["queued_jobs"] == 0
+    assert scheduler.stats()["withdrawn"] == 1
+    scheduler.release(running)
+    assert not queued.admitted and scheduler.stats()["free_slots"] == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    scheduler = JobScheduler(max_slots=1)
+    running = scheduler.submit()
+    token = CancellationToken()
+    token.cancel()
+
+    with pytest.raises(TaskCancelled):
+        with scheduler.acquire(cancel_token=token, refresh=0.01):
+            pass
+    assert scheduler.stats()["queued_jobs"] == 0
+    scheduler.release(running)
+
+
+def test_async_waiter_is_woken_on_release():
+    scheduler = JobScheduler(max_slots=1)
+    running = scheduler.submit()
+
+    async def main():
+        order = []
+
+        async def job():
+            async with scheduler.acquire_async(refresh=5.0) as ticket:
+                order.append(ticket.granted)
+
+        waiter = asyncio.create_task(job())
+        await asyncio.sleep(0.01)
+        assert not order
+        scheduler.release(running)
+        await asyncio.wait_for(waiter, 1.0)
+        return order
+
+    assert asyncio.run(main()) == [1]
+    assert scheduler.stats()["completed"] == 2
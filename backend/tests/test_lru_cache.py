@@ -0,0 +1,34 @@
+import numpy as np
+
+from app.utils.lru_cache import LRUCache, estimate_nbytes
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = LRUCache(maxsize=10, max_bytes=3 * 8000)
+    for key in "abc":
+        cache.set(key, np.zeros(1000))
+    cache.get("a")
+    cache.set("d", np.zeros(1000))
+
+    assert "b" not in cache and {"a", "c", "d"} <= {k for k, _ in cache.items()}
+    assert cache.stats()["bytes"] == 3 * 8000
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_entry_is_kept_alone():
+    cache = LRUCache(maxsize=10, max_bytes=1000)
+    cache.set("small", np.zeros(10))
+    cache.set("large", np.zeros(1000))
+
+    assert [k for k, _ in cache.items()] == ["large"]
+    cache.pop("large")
+    assert cache.stats()["bytes"] == 0
+
+
+def test_estimate_walks_objects_and_nested_lists():
+    class Entry:
+        def __init__(self):
+            self.matrix = np.zeros((50, 50))
+            self.rows = [[0.0] * 50 for _ in range(50)]
+
+    assert estimate_nbytes(Entry()) > 50 * 50 * 8 * 2
@@ -0,0 +1,41 @@
+import warnings
+
+import cvxpy as cp
+import numpy as np
+
+from app.services.portfolio.stages.portfolio_weight_allocation.helpers.optimisation_calcs import (
+    _prepare_inputs, get_portfolio_problem,
+)
+
+
+def _inputs(n, seed):
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0.0005, 0.01, (500, n))
+    symbols = [f"S{i}" for i in range(n)]
+    mu = dict(zip(symbols, returns.mean(axis=0) * 252))
+    cov = {"symbols": symbols, "cov_matrix": (np.cov(returns.T) * 252).tolist()}
+    return _prepare_inputs(mu, cov, {s: 1 / n for s in symbols})
+
+
+def _direct_solve(mu, cov, w_baseline, risk_aversion, baseline_reg, max_weight):
+    w = cp.Variable(len(mu))
+    objective = cp.Maximize(mu @ w - risk_aversion * cp.quad_form(w, cov)
+                            - baseline_reg * cp.sum_squares(w - w_baseline))
+    cp.Problem(objective, [cp.sum(w) == 1, w >= 0, w <= max_weight]).solve(solver="SCS")
+    return w.value
+
+
+def test_cached_problem_matches_a_direct_build():
+    """Re-solves with new parameters or a new covariance match a freshly built problem."""
+    symbols, mu, cov, w_baseline = _inputs(150, seed=0)
+    problem = get_portfolio_problem(symbols)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")   # no DPP "too many parameters" warning
+        for seed, risk_aversion in ((0, 0.5), (0, 2.0), (1, 2.0)):
+            _, mu, cov, w_baseline = _inputs(150, seed)
+            with problem.lock:
+                problem.set_covariance(cov)
+                raw = problem.solve(mu, w_baseline, risk_aversion, 0.1, 0.0, 0.05)
+            expected = _direct_solve(mu, cov, w_baseline, risk_aversion, 0.1, 0.05)
+            assert np.abs(raw - expected).max() < 1e-3
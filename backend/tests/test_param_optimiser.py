@@ -0,0 +1,38 @@
+from fastapi.testclient import TestClient
+
+from app.api.routes.backtesting import param_optimiser
+from app.main import app
+from app.utils.cancellation import register_cancellation, release_cancellation
+
+client = TestClient(app)
+
+PAYLOAD = {"strategies": {}, "globalParams": {}, "optimParams": {}, "metricRanges": None}
+
+
+def test_cancel_only_stops_the_named_run():
+    """Cancelling one optimisation leaves other users' runs going."""
+    mine = register_cancellation("param_optimisation", "mine")
+    theirs = register_cancellation("param_optimisation", "theirs")
+    try:
+        r = client.post("/api/params/optimisation/cancel/mine")
+        assert r.status_code == 200 and r.json()["run_id"] == "mine"
+        assert mine.cancelled and not theirs.cancelled
+        assert client.post("/api/params/optimisation/cancel/unknown").status_code == 404
+    finally:
+        release_cancellation("param_optimisation", "mine")
+        release_cancellation("param_optimisation", "theirs")
+
+
+def test_run_id_is_returned_and_must_be_unique(monkeypatch):
+    """The client's runId comes back as X-Run-Id; reusing a running id is rejected."""
+    monkeypatch.setattr(param_optimiser, "optimise_parameters", lambda *args: {})
+
+    r = client.post("/api/params/optimise", json={**PAYLOAD, "runId": "run-1"})
+    assert r.status_code == 200 and r.headers[param_optimiser.RUN_ID_HEADER] == "run-1"
+    assert client.post("/api/params/optimise", json=PAYLOAD).headers[param_optimiser.RUN_ID_HEADER]
+
+    register_cancellation("param_optimisation", "run-2")
+    try:
+        assert client.post("/api/params/optimise", json={**PAYLOAD, "runId": "run-2"}).status_code == 409
+    finally:
+        release_cancellation("param_optimisation", "run-2")
@@ -0,0 +1,35 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import date
+
+from fastapi import BackgroundTasks
+
+from app.api.routes.portfolio import prescreen
+from app.schemas import PreScreenPayload
+from app.services.scheduler import BATCH
+
+
+class _RecordingScheduler:
+    def __init__(self):
+        self.priorities = []
+
+    @asynccontextmanager
+    async def acquire_async(self, priority, *args, **kwargs):
+        self.priorities.append(priority)
+        raise RuntimeError("not running prescreen in this test")
+        yield
+
+
+def test_prescreen_is_admitted_as_batch(monkeypatch):
+    """A full-universe prescreen queues behind interactive backtests."""
+    scheduler = _RecordingScheduler()
+    monkeypatch.setattr(prescreen, "cpu_scheduler", scheduler)
+    payload = PreScreenPayload(symbols=["AAA", "BBB"], start=date(2020, 1, 1), end=date(2020, 12, 31), filters={})
+
+    async def start():
+        started = await prescreen.run_prescreen_tests(payload, BackgroundTasks(), db=None, profile=None)
+        await asyncio.sleep(0.05)   # let the background task reach the scheduler
+        return started["task_id"]
+
+    prescreen.tasks_store.pop(asyncio.run(start()))
+    assert scheduler.priorities == [BATCH]
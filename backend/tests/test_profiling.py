@@ -0,0 +1,38 @@
+import tracemalloc
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import profiling
+
+client = TestClient(app)
+
+
+def test_invalid_body_releases_profile_slot(monkeypatch):
+    """A profiled request rejected before its handler runs must not keep the profiling slot."""
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    headers = {profiling.PROFILE_HEADER: "secret"}
+
+    for _ in range(2):
+        r = client.post("/api/strategies/backtest", json={"unexpected": True}, headers=headers)
+        assert r.status_code == 422   # not 409: the first request's slot was released
+
+    assert profiling.profile_store._running == 0
+    assert not tracemalloc.is_tracing()
+    statuses = [p["status"] for p in profiling.profile_store.list()[:2]]
+    assert statuses == ["failed", "failed"]
+
+
+def test_profiling_is_disabled_for_a_shared_directory(monkeypatch, tmp_path):
+    """Profiles are loaded back from disk, so a directory others can write to is refused."""
+    shared = tmp_path / "profiles"
+    shared.mkdir()
+    shared.chmod(0o777)
+    monkeypatch.setattr(profiling, "PROFILING_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "profile_store", profiling.ProfileStore(str(shared)))
+
+    r = client.post("/api/strategies/backtest", json={}, headers={profiling.PROFILE_HEADER: "secret"})
+
+    assert r.status_code == 403
+    assert profiling.profile_store._running == 0
+    assert list(shared.iterdir()) == []
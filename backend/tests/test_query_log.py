@@ -0,0 +1,48 @@
+import os
+
+from sqlalchemy import create_engine, text
+
+from app.utils import query_log as query_log_module
+from app.utils.prometheus import db_query_duration
+from app.utils.query_log import QueryLog, fingerprint, install_query_log
+
+
+def test_slow_log_rotates_by_size(tmp_path):
+    path = tmp_path / "logs" / "slow.jsonl"
+    log = QueryLog(slow_ms=0.001, path=str(path), max_bytes=2000)
+    for i in range(20):
+        log.record(f"SELECT * FROM prices WHERE id = {i}", (i,), 1, 1.0)
+
+    assert os.path.getsize(path) <= 2000
+    assert os.path.exists(f"{path}.1")
+    assert os.stat(path).st_mode & 0o777 == 0o600
+
+
+def test_sample_reads_only_the_tail(tmp_path, monkeypatch):
+    path = tmp_path / "slow.jsonl"
+    writer = QueryLog(slow_ms=0.001, path=str(path), max_bytes=1 << 20)
+    writer.record("SELECT 1 FROM old_table", (1,), 1, 1.0)
+    for i in range(50):
+        writer.record("SELECT * FROM prices WHERE symbol = ?", (f"S{i}",), 1, 1.0)
+
+    monkeypatch.setattr(query_log_module, "SAMPLE_TAIL_BYTES", 2000)
+    reader = QueryLog(path=str(path))
+    statement, parameters = reader.sample(fingerprint("SELECT * FROM prices WHERE symbol = ?"))
+    assert parameters == ["S49"]
+    assert reader.sample(fingerprint("SELECT 1 FROM old_table")) is None
+
+
+def test_one_listener_pair_feeds_log_and_metrics(tmp_path):
+    engine = create_engine("sqlite://")
+    log = QueryLog(slow_ms=0, path=str(tmp_path / "slow.jsonl"))
+    install_query_log(engine, log)
+    def selects():
+        return db_query_duration._series.get(("SELECT",), [None, 0.0, 0])[2]
+
+    before = selects()
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1")).fetchall()
+
+    assert [s["calls"] for s in log.stats()] == [1]
+    assert selects() == before + 1
@@ -0,0 +1,70 @@
+import os
+from datetime import date
+
+from app.services.backtesting.helpers.data.result_caching import (
+    backtest_cache_key, get_cached_backtest, store_cached_backtest,
+)
+from app.stores.cache_stores import backtest_result_cache, bump_price_data_version
+from app.utils.result_cache import TieredResultCache
+
+
+def test_demoted_entries_round_trip_through_private_disk_tier(tmp_path):
+    cache = TieredResultCache("test", memory_budget_bytes=1, disk_budget_bytes=1 << 20, disk_dir=str(tmp_path / "results"))
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})   # demotes "a"
+
+    assert os.stat(cache.disk_dir).st_mode & 0o777 == 0o700
+    hit = cache.get("a")
+    assert hit.tier == "disk" and hit.value == {"value": 1}
+    cache.close()
+
+
+def test_shared_disk_dir_is_not_used(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    cache = TieredResultCache("test", memory_budget_bytes=1, disk_budget_bytes=1 << 20, disk_dir=str(shared))
+    cache.set("a", {"value": 1})
+    cache.set("b", {"value": 2})
+
+    assert cache.get("a") is None
+    assert os.listdir(shared) == []
+    assert cache.stats()["evictions"] == 1
+
+
+def _request(items, **params):
+    symbols = {f"{'-'.join(s)}_{strategy}": {"symbols": list(s), "strategy": strategy, "weight": w} for s, strategy, w in items}
+    return symbols, {"startDate": "2020-01-01", "endDate": "2020-12-31", **params}
+
+
+def test_cache_key_ignores_payload_order_and_number_types():
+    a = _request([(["AAA"], "momentum", 1), (["BBB", "CCC"], "pairs_trading", 0.5)], lookback=20, slippage=0.1)
+    b = _request([(["BBB", "CCC"], "pairs_trading", 0.5), (["AAA"], "momentum", 1.0)], slippage=0.1, lookback=20.0)
+
+    assert backtest_cache_key("backtest", *a, 20) == backtest_cache_key("backtest", *b, 20)
+
+
+def test_cache_key_changes_with_the_result_inputs():
+    symbols, params = _request([(["AAA"], "momentum", 1)], lookback=20)
+    base = backtest_cache_key("backtest", symbols, params, 20)
+
+    assert backtest_cache_key("walkforward", symbols, params, 20) != base
+    assert backtest_cache_key("backtest", symbols, {**params, "lookback": 21}, 20) != base
+    assert backtest_cache_key("backtest", symbols, params, 20, window_length=3) != base
+    assert backtest_cache_key("backtest", *_request([(["AAB"], "momentum", 1)], lookback=20), 20) != base
+
+
+def test_price_writes_invalidate_only_affected_results():
+    key = backtest_cache_key("backtest", *_request([(["ZZA"], "momentum", 1)]), 0)
+    store_cached_backtest(key, {"equity": [1, 2]}, ["ZZA"], "2020-12-31")
+    try:
+        bump_price_data_version("ZZB", date(2020, 1, 1))      # another symbol
+        bump_price_data_version("ZZA", date(2021, 1, 4))      # after the backtest's end
+        value, info = get_cached_backtest(key)
+        assert info["hit"] and value == {"equity": [1, 2]}
+
+        bump_price_data_version("ZZA", date(2020, 6, 1))      # inside its range
+        value, info = get_cached_backtest(key)
+        assert value is None and not info["hit"]
+    finally:
+        backtest_result_cache.pop(key)
@@ -0,0 +1,27 @@
+import copy
+
+import numpy as np
+
+from app.utils.result_views import shape_result
+
+
+def test_downsampled_returns_compound_between_kept_points():
+    """Returns kept by downsampling are recomputed against the previous kept point."""
+    rng = np.random.default_rng(0)
+    values = 100 * np.cumprod(1 + rng.normal(0, 0.01, 500))
+    records, prev = [], None
+    for i, v in enumerate(values):
+        records.append({"date": f"d{i}", "value": float(v), "return": 0.0 if prev is None else v / prev - 1})
+        prev = v
+    result = {"symbol": "AAA", "strategy": "sma", "returns": records}
+    original = copy.deepcopy(result)
+
+    view = shape_result(result, points=50)
+
+    kept = view["returns"]
+    assert len(kept) == 50 and view["returnsPoints"] == 500
+    assert kept[0]["return"] == records[0]["return"]
+    for prev, record in zip(kept, kept[1:]):
+        assert np.isclose(record["return"], record["value"] / prev["value"] - 1)
+    assert np.isclose(np.prod([1 + r["return"] for r in kept[1:]]), values[-1] / values[0])
+    assert result == original
@@ -0,0 +1,38 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from app.services.portfolio.stages.prescreen import run_prescreen
+from app.utils.cancellation import CancellationToken
+
+SYMBOLS = [f"S{i}" for i in range(6)]
+
+
+def test_cancelled_run_reports_nothing_testing(monkeypatch):
+    """Tests dropped by cancellation leave the final snapshot with testing == 0."""
+    token = CancellationToken()
+
+    async def fake_fetch(symbols, start, end, queue, stop_signal, aggregate, batch_size=25, cancel_token=None):
+        await queue.put([(s, date(2024, 1, 2), 1.0, 1.0, 1.0) for s in symbols])
+        await queue.put(stop_signal)
+
+    def slow_test(sym, data, end, filters):
+        time.sleep(0.05)   # the runner queues a second test behind this one meanwhile
+        token.cancel()
+        time.sleep(0.2)
+        return sym, {"global": True}, {}, None, None
+
+    monkeypatch.setattr(run_prescreen, "fetch_prices", fake_fetch)
+    monkeypatch.setattr(run_prescreen, "test_symbol", slow_test)
+    monkeypatch.setattr(run_prescreen, "ProcessPoolExecutor", ThreadPoolExecutor)
+    snapshots = []
+
+    asyncio.run(run_prescreen.run_tests_async(
+        SYMBOLS, date(2024, 1, 1), date(2024, 1, 2), {}, max_workers=1,
+        progress_callback=snapshots.append, cancel_token=token,
+    ))
+
+    assert snapshots[-1]["cancelled"] is True
+    assert snapshots[-1]["testing"] == 0
+    assert snapshots[-1]["completed"] == 1
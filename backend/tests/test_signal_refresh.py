@@ -0,0 +1,48 @@
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.database import Base
+from app.models import Portfolio
+from app.models.prices import Price
+from app.services.portfolio.signal_refresh import refresh_portfolio_signals
+from app.stores.cache_stores import portfolio_signal_cache
+
+START = date(2024, 1, 1)
+
+
+def _session():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[Portfolio.__table__, Price.__table__])
+    return sessionmaker(bind=engine)()
+
+
+def _add_prices(db, days):
+    for i in days:
+        db.add(Price(symbol="AAA", date=START + timedelta(days=i), close=100.0 + i % 7))
+    db.commit()
+
+
+def test_late_bars_are_applied_after_refreshing_past_them():
+    """Refreshing to a date with no bars yet must not skip bars ingested for it later."""
+    db = _session()
+    portfolio = Portfolio(data={"sma_crossover": {"symbols": [{"symbol": "AAA"}], "params": {"short_period": 3, "long_period": 5}}},
+                          meta={"start": str(START)})
+    db.add(portfolio)
+    db.commit()
+    portfolio_signal_cache.pop(portfolio.id)
+    _add_prices(db, range(10))
+
+    end = START + timedelta(days=30)
+    first = refresh_portfolio_signals(db, [portfolio.id], end)["portfolios"][0]
+    assert first["refresh"] == "rebuilt" and first["bars"] == 10
+
+    _add_prices(db, range(10, 12))
+    second = refresh_portfolio_signals(db, [portfolio.id], end)["portfolios"][0]
+    assert second["refresh"] == "incremental"
+    assert second["new_bars"] == 2
+    assert second["date"] == str(START + timedelta(days=11))
+
+    portfolio_signal_cache.pop(portfolio.id)
@@ -0,0 +1,74 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.strategies.signal_registry import generators, streaming_generators
+
+SYMBOLS = [f"S{i}" for i in range(8)]
+PARAMS = {
+    "sma_crossover": {"shortPeriod": 5, "longPeriod": 20},
+    "bollinger_reversion": {"period": 20, "bandMultiplier": 1.5},
+    "rsi_reversion": {"period": 14, "oversold": 35},
+    "rsi_reversion_smoothed": {"period": 14, "oversold": 35, "signalSmoothing": 3},
+    "momentum": {"lookback": 30},
+    "breakout": {"lookback": 20, "breakoutMultiplier": 0.1},
+    "equal_weight": {},
+}
+PAIRS = ["S0-S1", "S2-S3", "S1-S4"]
+PAIRS_PARAMS = {"lookback": 20, "entryZ": 1.5, "exitZ": 0.5}
+
+
+def _prices(rows=600):
+    rng = np.random.default_rng(7)
+    values = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.012, size=(rows, len(SYMBOLS))), axis=0)), 2)
+    values[200:260, 2] = values[199, 2]     # flat stretch: SMA ties and zero-variance windows
+    return pd.DataFrame(values, index=pd.bdate_range("2020-01-01", periods=rows), columns=SYMBOLS)
+
+
+def _batch(strategy, prices, params):
+    """Batch signals without the forced exit on the final date."""
+    return generators[strategy](prices, params).to_numpy(dtype=float)[:-1]
+
+
+def _pairs_batch(prices):
+    return np.column_stack([
+        generators["pairs_trading"](prices, *key.split("-"), PAIRS_PARAMS).to_numpy(dtype=float)[:-1]
+        for key in PAIRS
+    ])
+
+
+@pytest.mark.parametrize("case", sorted(PARAMS))
+def test_warm_up_matches_batch_generator(case):
+    strategy, params, prices = case.replace("_smoothed", ""), PARAMS[case], _prices()
+    signal = streaming_generators[strategy](SYMBOLS, params)
+    streamed = signal.warm_up(prices.to_numpy())[:-1]
+    np.testing.assert_array_equal(streamed, _batch(strategy, prices, params))
+
+
+def test_pairs_warm_up_matches_batch_generator():
+    prices = _prices()
+    signal = streaming_generators["pairs_trading"](PAIRS, PAIRS_PARAMS)
+    streamed = signal.warm_up(prices[signal.symbols].to_numpy())[:-1]
+    np.testing.assert_array_equal(streamed, _pairs_batch(prices))
+
+
+@pytest.mark.parametrize("strategy", sorted(set(streaming_generators)))
+def test_snapshot_restore_continues_identically(strategy):
+    prices = _prices()
+    keys, params = (PAIRS, PAIRS_PARAMS) if strategy == "pairs_trading" else (SYMBOLS, PARAMS[strategy])
+    cls = streaming_generators[strategy]
+
+    uninterrupted = cls(keys, params)
+    matrix = prices[uninterrupted.symbols].to_numpy()
+    expected = uninterrupted.warm_up(matrix)
+
+    first = cls(keys, params)
+    head = first.warm_up(matrix[:300])
+    restored = cls.from_snapshot(pickle.loads(pickle.dumps(first.snapshot())))
+    tail = restored.warm_up(matrix[300:])
+
+    np.testing.assert_array_equal(np.vstack([head, tail]), expected)
+    np.testing.assert_array_equal(restored.positions, uninterrupted.positions)
+    assert restored.bars == uninterrupted.bars
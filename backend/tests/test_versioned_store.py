@@ -0,0 +1,55 @@
+import os
+
+from app.stores import versioned_store
+from app.stores.versioned_store import VersionedTaskStore
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_evicts_only_idle_finished_tasks(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(versioned_store.time, "monotonic", clock)
+    store = VersionedTaskStore("ttl", ttl_seconds=60)
+    store.publish("done", status="done")
+    store.publish("running", status="running")
+
+    clock.now += 30
+    store["done"]            # a full read keeps it alive
+    clock.now += 45
+    assert store.maintain()["evicted"] == 0
+
+    clock.now += 30
+    assert store.maintain()["evicted"] == 1
+    assert "done" not in store and "running" in store
+
+
+def test_spill_and_reload_round_trip(tmp_path):
+    store = VersionedTaskStore("spill", memory_budget_bytes=1, spill_keys=("results",), spill_dir=str(tmp_path))
+    results = {"equity": list(range(1000))}
+    store.publish("a", status="done", results=results)
+    store.publish("b", status="running", results=results)
+
+    assert store.maintain()["spilled"] == 1    # only finished tasks spill
+    assert "results" not in store._tasks["a"]
+    assert os.stat(store.spill_dir).st_mode & 0o777 == 0o700
+
+    assert store["a"]["results"] == results
+    assert store.stats()["spill_loads"] == 1
+
+
+def test_no_spill_into_shared_dir(tmp_path):
+    shared = tmp_path / "shared"
+    shared.mkdir()
+    os.chmod(shared, 0o777)
+    store = VersionedTaskStore("shared", memory_budget_bytes=1, spill_keys=("results",), spill_dir=str(shared))
+    store.publish("a", status="done", results=list(range(1000)))
+
+    assert store.maintain()["spilled"] == 0
+    assert store["a"]["results"] == list(range(1000))
+    assert os.listdir(shared) == []
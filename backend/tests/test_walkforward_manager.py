@@ -0,0 +1,41 @@
+import asyncio
+import queue
+from contextlib import asynccontextmanager
+
+from app.services.backtesting.tasks import progress_channel, walkforward_manager
+from app.stores.task_stores import walkforward_tasks_store as tasks_store
+
+
+class _BrokenScheduler:
+    @asynccontextmanager
+    async def acquire_async(self, *args, **kwargs):
+        raise RuntimeError("scheduler unavailable")
+        yield
+
+
+def test_job_error_is_published_as_failed(monkeypatch):
+    """An error outside the segments ends the task as "failed" rather than leaving it running."""
+    monkeypatch.setattr(walkforward_manager, "cpu_scheduler", _BrokenScheduler())
+    windows = [{"start": "2020-01-01", "end": "2020-12-31"}]
+
+    asyncio.run(walkforward_manager.run_walkforward_async("wf-broken", windows, ["AAA"], {}, {}, 0))
+
+    task = tasks_store.pop("wf-broken")
+    assert task["status"] == "failed"
+    assert task["error"] == "scheduler unavailable"
+
+
+def test_segment_error_is_sent_to_parent(monkeypatch):
+    """A failing segment reports its error over the progress channel instead of printing it."""
+    def broken_fetch(*args, **kwargs):
+        raise ValueError("bad prices")
+
+    messages = queue.Queue()
+    monkeypatch.setattr(progress_channel, "_worker_queue", messages)
+    monkeypatch.setattr(walkforward_manager, "fetch_price_data_light", broken_fetch)
+
+    result = walkforward_manager.run_segment_with_data_fetch(2, ["AAA"], {}, {}, 0, "2020-01-01", "2020-12-31")
+
+    assert result is None
+    sent = [messages.get_nowait() for _ in range(messages.qsize())]
+    assert ("error", 2, "ValueError: bad prices") in sent